@@ -0,0 +1,688 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Train Simulator Classic 存档备份管理工具 - 性能测试脚本
+用法:
+    python benchmark_tool.py run --preset small --output result.json
+    python benchmark_tool.py run --scenarios 50000 --routes 500 --baseline baseline.json
+    python benchmark_tool.py compare baseline.json result.json --threshold 0.2
+    python benchmark_tool.py stat-calls --routes 10 --scenarios 100
+    python benchmark_tool.py delta --intervals 1 5 10 20 --backups 30
+    python benchmark_tool.py copy --sizes 1048576 67108864 --work-dir D:/bench
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from train_simulator_backup_tool import ConfigManager, TrainSimulatorBackupTool, ScanIndex, CopyEngine
+
+PROPERTIES_TEMPLATE = '''<?xml version="1.0" encoding="utf-8"?>
+<{root} xmlns:d="http://www.kuju.com/TnT/2003/Delta">
+    <DisplayName>
+        <Localisation-cUserLocalisedString>
+            <English d:type="cDeltaString">{english}</English>
+            <Other>
+                <Localisation-cUserLocalisedString-cOtherStringLangPair>
+                    <Language d:type="cDeltaString">zh</Language>
+                    <String d:type="cDeltaString">{chinese}</String>
+                </Localisation-cUserLocalisedString-cOtherStringLangPair>
+            </Other>
+            <Key d:type="cDeltaString">{key}</Key>
+        </Localisation-cUserLocalisedString>
+    </DisplayName>
+</{root}>'''
+
+# 接近真实游戏文件的XML：DisplayName之后还有描述、简介和大量其他属性
+REALISTIC_TEMPLATE = '''<?xml version="1.0" encoding="utf-8"?>
+<cDeltaObject xmlns:d="http://www.kuju.com/TnT/2003/Delta" d:version="1.0">
+    <{root}>
+        <DisplayName>
+            <Localisation-cUserLocalisedString>
+                <English d:type="cDeltaString">{english}</English>
+                <French d:type="cDeltaString">{english} (FR)</French>
+                <Italian d:type="cDeltaString"></Italian>
+                <German d:type="cDeltaString">{english} (DE)</German>
+                <Spanish d:type="cDeltaString"></Spanish>
+                <Dutch d:type="cDeltaString"></Dutch>
+                <Polish d:type="cDeltaString"></Polish>
+                <Russian d:type="cDeltaString"></Russian>
+                <Other>
+                    <Localisation-cUserLocalisedString-cOtherStringLangPair>
+                        <Language d:type="cDeltaString">zh</Language>
+                        <String d:type="cDeltaString">{chinese}</String>
+                    </Localisation-cUserLocalisedString-cOtherStringLangPair>
+                </Other>
+                <Key d:type="cDeltaString">{key}</Key>
+            </Localisation-cUserLocalisedString>
+        </DisplayName>
+        <Description>
+            <Localisation-cUserLocalisedString>
+                <English d:type="cDeltaString">{description}</English>
+                <Other/>
+                <Key d:type="cDeltaString">{key}-description</Key>
+            </Localisation-cUserLocalisedString>
+        </Description>
+        <Properties>
+{properties}
+        </Properties>
+    </{root}>
+</cDeltaObject>'''
+
+# 预设规模：(路线数, 场景总数)
+PRESETS = {
+    "tiny": (2, 10),
+    "small": (10, 1000),
+    "medium": (100, 10000),
+    "large": (500, 50000),
+}
+
+
+def realistic_properties(root: str, english: str, chinese: str, key: str, rng: random.Random) -> str:
+    """生成接近真实大小（数KB）的RouteProperties/ScenarioProperties XML"""
+    description = " ".join(rng.choice(("Drive", "the", "freight", "service", "from", "junction",
+                                       "to", "yard", "under", "signals", "in", "heavy", "rain"))
+                           for _ in range(rng.randint(40, 160)))
+    properties = "\n".join(
+        f'            <Property{i} d:type="cDeltaString">{rng.getrandbits(64):016x}</Property{i}>'
+        for i in range(rng.randint(20, 80)))
+    return REALISTIC_TEMPLATE.format(root=root, english=english, chinese=chinese, key=key,
+                                     description=description, properties=properties)
+
+
+def save_payload(rng: random.Random, size: int) -> bytes:
+    """生成模拟存档内容：大部分是重复的结构数据，夹杂少量随机字节（与真实存档的可压缩性相近）"""
+    block = bytes(rng.getrandbits(8) for _ in range(256))
+    data = bytearray()
+    while len(data) < size:
+        data += block * 7
+        data += rng.getrandbits(256 * 8).to_bytes(256, 'little')
+    return bytes(data[:size])
+
+
+def generate_railworks_tree(base_dir: str, route_count: int, scenarios_per_route: int = 0,
+                            total_scenarios: Optional[int] = None, realistic: bool = False,
+                            save_ratio: float = 0.0, max_backups: int = 0, save_size: int = 16 * 1024,
+                            seed: int = 0) -> str:
+    """生成模拟的RailWorks目录结构，返回RailWorks根目录
+    Args:
+        scenarios_per_route: 每个路线的场景数量（未指定total_scenarios时使用）
+        total_scenarios: 场景总数，平均分配到各个路线
+        realistic: 使用接近真实大小的XML
+        save_ratio: 含有CurrentSave.bin的场景比例
+        max_backups: 有存档的场景在saves/中的备份数量上限（每个场景随机0~max_backups个）
+        save_size: 存档文件大小（字节）
+        seed: 随机种子，相同参数生成完全相同的目录树
+    """
+    rng = random.Random(seed)
+    routes_path = Path(base_dir) / "Content" / "Routes"
+    if total_scenarios is None:
+        total_scenarios = route_count * scenarios_per_route
+    for r in range(route_count):
+        route_dir = routes_path / f"route-{r:05d}"
+        (route_dir / "Scenarios").mkdir(parents=True)
+        route_args = dict(english=f"Route {r}", chinese=f"路线{r}", key=f"route-{r}")
+        if realistic:
+            content = realistic_properties("RouteProperties", rng=rng, **route_args)
+        else:
+            content = PROPERTIES_TEMPLATE.format(root="RouteProperties", **route_args)
+        (route_dir / "RouteProperties.xml").write_text(content, encoding='utf-8')
+        
+        scenario_count = total_scenarios // route_count + (1 if r < total_scenarios % route_count else 0)
+        for n in range(scenario_count):
+            scenario_dir = route_dir / "Scenarios" / f"scenario-{r:05d}-{n:05d}"
+            scenario_dir.mkdir()
+            scenario_args = dict(english=f"Scenario {r}-{n}", chinese=f"场景{r}-{n}", key=f"scenario-{r}-{n}")
+            if realistic:
+                content = realistic_properties("ScenarioProperties", rng=rng, **scenario_args)
+            else:
+                content = PROPERTIES_TEMPLATE.format(root="ScenarioProperties", **scenario_args)
+            (scenario_dir / "ScenarioProperties.xml").write_text(content, encoding='utf-8')
+            
+            if rng.random() >= save_ratio:
+                continue
+            payload = save_payload(rng, save_size)
+            (scenario_dir / "CurrentSave.bin").write_bytes(payload)
+            (scenario_dir / "CurrentSave.bin.MD5").write_text(f"{rng.getrandbits(128):032x}")
+            backup_count = rng.randint(0, max_backups) if max_backups else 0
+            if backup_count:
+                saves_dir = scenario_dir / "saves"
+                saves_dir.mkdir()
+                for b in range(backup_count):
+                    backup_name = f"CurrentSave-2024-01-01-00-00-{b:02d}.bin"
+                    (saves_dir / backup_name).write_bytes(payload)
+                    (saves_dir / (backup_name + ".MD5")).write_text(f"{rng.getrandbits(128):032x}")
+    return str(base_dir)
+
+
+def make_tool(railworks_path: str, data_dir: str) -> TrainSimulatorBackupTool:
+    """创建指向测试目录的工具实例"""
+    tool = TrainSimulatorBackupTool()
+    tool.config_manager = ConfigManager(os.path.join(data_dir, "config.json"))
+    tool.scan_index = ScanIndex(tool.config_manager.get_data_path("scan_index.json"))
+    tool.railworks_path = railworks_path
+    return tool
+
+
+class _CountingDirEntry:
+    """包装DirEntry，统计stat()调用次数"""
+
+    def __init__(self, entry, counter):
+        self._entry = entry
+        self._counter = counter
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def __fspath__(self):
+        return self._entry.path
+
+    def stat(self, **kwargs):
+        self._counter.counts['direntry_stat'] += 1
+        return self._entry.stat(**kwargs)
+
+
+class _CountingScandir:
+    """包装scandir迭代器"""
+
+    def __init__(self, iterator, counter):
+        self._iterator = iterator
+        self._counter = counter
+
+    def __iter__(self):
+        for entry in self._iterator:
+            yield _CountingDirEntry(entry, self._counter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._iterator.close()
+
+
+class FsCallCounter:
+    """统计文件系统调用次数：stat/lstat（包括os.path.exists/isdir）、目录枚举和DirEntry.stat
+
+    DirEntry.stat()在Windows上直接使用目录枚举返回的数据，不产生额外的系统调用，单独计数。
+    """
+
+    def __init__(self):
+        self.counts = {'stat': 0, 'listdir': 0, 'scandir': 0, 'direntry_stat': 0}
+        self._originals = {}
+
+    def __enter__(self):
+        self._originals = {'stat': os.stat, 'lstat': os.lstat, 'listdir': os.listdir, 'scandir': os.scandir}
+        originals = self._originals
+
+        def counting_stat(*args, **kwargs):
+            self.counts['stat'] += 1
+            return originals['stat'](*args, **kwargs)
+
+        def counting_lstat(*args, **kwargs):
+            self.counts['stat'] += 1
+            return originals['lstat'](*args, **kwargs)
+
+        def counting_listdir(*args, **kwargs):
+            self.counts['listdir'] += 1
+            return originals['listdir'](*args, **kwargs)
+
+        def counting_scandir(*args, **kwargs):
+            self.counts['scandir'] += 1
+            return _CountingScandir(originals['scandir'](*args, **kwargs), self)
+
+        os.stat, os.lstat, os.listdir, os.scandir = counting_stat, counting_lstat, counting_listdir, counting_scandir
+        return self
+
+    def __exit__(self, *args):
+        os.stat = self._originals['stat']
+        os.lstat = self._originals['lstat']
+        os.listdir = self._originals['listdir']
+        os.scandir = self._originals['scandir']
+
+
+def legacy_traversal(routes_path: str):
+    """重现改用scandir之前的遍历方式（listdir + isdir + exists + 逐个stat XML）"""
+    for route_uuid in sorted(os.listdir(routes_path)):
+        route_path = os.path.join(routes_path, route_uuid)
+        if not os.path.isdir(route_path):
+            continue
+        TrainSimulatorBackupTool._xml_signature(os.path.join(route_path, "RouteProperties.xml"))
+        scenarios_path = os.path.join(route_path, "Scenarios")
+        if os.path.exists(scenarios_path):
+            for scenario_uuid in sorted(os.listdir(scenarios_path)):
+                scenario_path = os.path.join(scenarios_path, scenario_uuid)
+                if not os.path.isdir(scenario_path):
+                    continue
+                TrainSimulatorBackupTool._xml_signature(os.path.join(scenario_path, "ScenarioProperties.xml"))
+
+
+def bench_stat_calls(route_count: int, scenarios_per_route: int) -> dict:
+    """统计每个场景的文件系统调用次数（索引已是最新，只测遍历本身）"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        railworks_path = generate_railworks_tree(os.path.join(temp_dir, "RailWorks"),
+                                                 route_count, scenarios_per_route)
+        tool = make_tool(railworks_path, temp_dir)
+        tool.scan_content(mode="serial")  # 建立索引
+        scenario_count = route_count * scenarios_per_route
+        routes_path = os.path.join(railworks_path, "Content", "Routes")
+
+        with FsCallCounter() as legacy:
+            legacy_traversal(routes_path)
+        with FsCallCounter() as current:
+            tool.scan_content(mode="serial")
+
+        def per_scenario(counts):
+            return {key: round(value / scenario_count, 3) for key, value in counts.items()}
+
+        return {
+            'scenarios': scenario_count,
+            'legacy': legacy.counts,
+            'legacy_per_scenario': per_scenario(legacy.counts),
+            'scandir': current.counts,
+            'scandir_per_scenario': per_scenario(current.counts),
+        }
+
+
+def _timed(func, repeat: int = 1) -> Dict:
+    """执行repeat次并记录耗时，返回中位数和每次的耗时（秒）"""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        runs.append(time.perf_counter() - start)
+    return {'seconds': statistics.median(runs), 'runs': [round(run, 6) for run in runs], 'result': result}
+
+
+def _record(results: Dict, name: str, timing: Dict, ops: int):
+    """把一项测试的耗时写入结果"""
+    seconds = timing['seconds']
+    results[name] = {
+        'seconds': round(seconds, 6),
+        'runs': timing['runs'],
+        'ops': ops,
+        'per_op_ms': round(seconds * 1000 / ops, 4) if ops else None,
+        'ops_per_sec': round(ops / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def search_routes(tool: TrainSimulatorBackupTool, search_text: str) -> List[str]:
+    """按界面搜索框的规则匹配路线和场景名称，返回匹配的场景路径"""
+    search_text = search_text.lower()
+    matches = []
+    for route_uuid in tool.find_unloaded_routes_matching(search_text):
+        tool.load_route_scenarios(route_uuid)
+    for route_data in tool.routes_data.values():
+        route_matches = search_text in route_data['name'].lower()
+        for scenario in route_data['scenarios'] or []:
+            if route_matches or search_text in scenario['name'].lower():
+                matches.append(scenario['path'])
+    return matches
+
+
+def _git_revision() -> str:
+    """当前提交的短哈希，不在git仓库中时返回空字符串"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run_benchmarks(route_count: int, total_scenarios: int, save_ratio: float = 0.3, max_backups: int = 5,
+                   save_size: int = 64 * 1024, backup_samples: int = 50, repeat: int = 3,
+                   mode: Optional[str] = None, seed: int = 0, work_dir: Optional[str] = None,
+                   profile: bool = False, backup_mode: str = "copy") -> Dict:
+    """在生成的目录树上测试扫描、列出备份、备份、还原和搜索的耗时
+    Args:
+        backup_samples: 备份/还原测试使用的场景数量
+        repeat: 每项测试的重复次数，结果取中位数
+        mode: 扫描模式，None表示使用配置
+        work_dir: 生成目录树的位置，None表示使用临时目录
+        profile: 启用工具内置的性能统计，并把各阶段统计附加到结果中
+        backup_mode: 备份/还原测试使用的备份方式
+    Returns:
+        可序列化为JSON的测试结果
+    """
+    with tempfile.TemporaryDirectory(dir=work_dir) as temp_dir:
+        start = time.perf_counter()
+        railworks_path = generate_railworks_tree(os.path.join(temp_dir, "RailWorks"), route_count,
+                                                 total_scenarios=total_scenarios, realistic=True,
+                                                 save_ratio=save_ratio, max_backups=max_backups,
+                                                 save_size=save_size, seed=seed)
+        generate_seconds = time.perf_counter() - start
+        tool = make_tool(railworks_path, temp_dir)
+        tool.profiler.enabled = profile
+        tool.config_manager.set_backup_mode(backup_mode)
+        results = {}
+        
+        # 冷扫描：不使用索引，解析所有XML
+        timing = _timed(lambda: tool.scan_content(use_index=False, mode=mode), repeat)
+        _record(results, "scan_cold", timing, total_scenarios)
+        results["scan_cold"]['parsed_files'] = tool.last_scan_stats.get('parsed_files')
+        
+        # 热扫描：索引已是最新，只遍历目录
+        timing = _timed(lambda: tool.scan_content(mode=mode), repeat)
+        _record(results, "scan_warm", timing, total_scenarios)
+        
+        scenarios = list(tool.iter_scenarios())
+        
+        def list_all():
+            return sum(len(tool.list_backups(scenario['path'])) for _, _, scenario in scenarios)
+        
+        timing = _timed(list_all, repeat)
+        _record(results, "list_backups", timing, len(scenarios))
+        results["list_backups"]['backups'] = timing['result']
+        
+        # 备份/还原/删除：在有存档的场景中抽样
+        saved = [scenario['path'] for _, _, scenario in scenarios
+                 if os.path.exists(os.path.join(scenario['path'], "CurrentSave.bin"))]
+        sample = random.Random(seed).sample(saved, min(backup_samples, len(saved)))
+        backup_name = "benchmark-backup"
+        
+        def backup_all():
+            return sum(1 for path in sample if tool.create_backup(path, backup_name)[0])
+        
+        def restore_all():
+            return sum(1 for path in sample if tool.restore_backup(path, backup_name + ".bin"))
+        
+        def delete_all():
+            return sum(1 for path in sample if tool.delete_backup(path, backup_name + ".bin"))
+        
+        for name, func in (("backup", backup_all), ("restore", restore_all), ("delete", delete_all)):
+            # 每轮备份都要先删除，因此这三项只执行一次
+            timing = _timed(func)
+            _record(results, name, timing, len(sample))
+            results[name]['succeeded'] = timing['result']
+            results[name]['bytes'] = save_size * len(sample)
+            if timing['seconds'] > 0:
+                results[name]['mb_per_sec'] = round(save_size * len(sample) / timing['seconds'] / 2 ** 20, 2)
+        
+        # 批量备份所有存档，再次执行时存档没有变化，全部跳过
+        for name, skip_unchanged in (("backup_all", False), ("backup_all_unchanged", True)):
+            timing = _timed(lambda: tool.backup_all(skip_unchanged=skip_unchanged, backup_name=name))
+            _record(results, name, timing, len(saved))
+            summary = timing['result']
+            results[name].update({key: summary[key] for key in ('backed_up', 'skipped', 'failed', 'bytes')})
+            results[name]['mb_per_sec'] = round(summary['mb_per_sec'], 2)
+        
+        queries = ["场景1", "route 4", "scenario 0-1", "不存在的名称"]
+        timing = _timed(lambda: sum(len(search_routes(tool, query)) for query in queries), repeat)
+        _record(results, "search", timing, len(queries))
+        results["search"]['matches'] = timing['result']
+        
+        output = {
+            'meta': {
+                'revision': _git_revision(),
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+            },
+            'params': {
+                'routes': route_count,
+                'scenarios': total_scenarios,
+                'save_ratio': save_ratio,
+                'max_backups': max_backups,
+                'save_size': save_size,
+                'backup_samples': len(sample),
+                'repeat': repeat,
+                'mode': mode or tool.config_manager.get_scan_mode(),
+                'backup_mode': backup_mode,
+                'seed': seed,
+                'generate_seconds': round(generate_seconds, 3),
+            },
+            'results': results,
+        }
+        output['copy_engine'] = tool.copy_engine.snapshot()
+        if profile:
+            output['profile'] = tool.profiler.snapshot()
+        return output
+
+
+def mutate_save(rng: random.Random, data: bytes, edits: int = 8) -> bytes:
+    """模拟一次游戏存档：在随机位置修改少量数据，偶尔插入或删除一小段"""
+    result = bytearray(data)
+    for _ in range(edits):
+        pos = rng.randrange(len(result))
+        result[pos:pos + 16] = rng.getrandbits(128).to_bytes(16, 'little')
+    if rng.random() < 0.3:
+        pos = rng.randrange(len(result))
+        result[pos:pos] = rng.getrandbits(8 * 64).to_bytes(64, 'little')
+    if rng.random() < 0.3:
+        pos = rng.randrange(len(result) - 64)
+        del result[pos:pos + 64]
+    return bytes(result)
+
+
+def bench_delta(intervals: List[int], backup_count: int, save_size: int, seed: int = 0) -> Dict:
+    """用同一组连续变化的存档测试不同完整备份间隔下的空间占用和还原耗时"""
+    rng = random.Random(seed)
+    saves = [save_payload(rng, save_size)]
+    for _ in range(backup_count - 1):
+        saves.append(mutate_save(rng, saves[-1]))
+    
+    results = {}
+    for interval in intervals:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            railworks_path = generate_railworks_tree(os.path.join(temp_dir, "RailWorks"), 1, total_scenarios=1)
+            tool = make_tool(railworks_path, temp_dir)
+            tool.config_manager.config["backup_mode"] = "delta"
+            tool.config_manager.config["delta_keyframe_interval"] = interval
+            tool.scan_content()
+            scenario_path = next(tool.iter_scenarios())[2]['path']
+            save_file = os.path.join(scenario_path, "CurrentSave.bin")
+            
+            start = time.perf_counter()
+            for i, content in enumerate(saves):
+                with open(save_file, 'wb') as f:
+                    f.write(content)
+                os.utime(save_file, ns=(i * 10 ** 9, i * 10 ** 9))
+                tool.create_backup(scenario_path, f"backup-{i:04d}")
+            backup_seconds = time.perf_counter() - start
+            
+            report = tool.analyze_delta_chains(scenario_path)
+            results[str(interval)] = {
+                'stored_bytes': report['stored_bytes'],
+                'original_bytes': report['original_bytes'],
+                'savings': report['savings'],
+                'avg_restore_ms': report['avg_restore_ms'],
+                'max_restore_ms': report['max_restore_ms'],
+                'backup_ms_per_save': round(backup_seconds * 1000 / backup_count, 3),
+            }
+    return {'params': {'backups': backup_count, 'save_size': save_size, 'seed': seed}, 'intervals': results}
+
+
+def bench_copy(sizes: List[int], files: int = 5, repeat: int = 3, work_dir: Optional[str] = None,
+               seed: int = 0) -> Dict:
+    """比较各复制方式和shutil.copy2的吞吐量
+    每种方式单独创建CopyEngine并只允许该方式，不可用时记录错误；"auto"为工具实际使用的自动选择。
+    Args:
+        sizes: 测试的文件大小（字节）
+        files: 每种大小复制的文件数量
+        work_dir: 测试文件的位置，应与存档位于同一文件系统才能反映实际效果
+    """
+    rng = random.Random(seed)
+    candidates = [(method, CopyEngine((method,)).copy) for method in CopyEngine.available_methods()]
+    candidates.append(("auto", CopyEngine().copy))
+    candidates.append(("shutil.copy2", shutil.copy2))
+    
+    results = {}
+    with tempfile.TemporaryDirectory(dir=work_dir) as temp_dir:
+        for size in sizes:
+            sources = []
+            for i in range(files):
+                path = os.path.join(temp_dir, f"source-{size}-{i}.bin")
+                with open(path, 'wb') as f:
+                    f.write(save_payload(rng, size))
+                sources.append(path)
+            
+            size_results = {}
+            for name, copy in candidates:
+                targets = [os.path.join(temp_dir, f"target-{i}.bin") for i in range(files)]
+                
+                def copy_all():
+                    for source, target in zip(sources, targets):
+                        copy(source, target)
+                
+                try:
+                    timing = _timed(copy_all, repeat)
+                except OSError as e:
+                    size_results[name] = {'error': str(e)}
+                    continue
+                finally:
+                    for target in targets:
+                        if os.path.exists(target):
+                            os.remove(target)
+                _record(size_results, name, timing, files)
+                if timing['seconds'] > 0:
+                    size_results[name]['mb_per_sec'] = round(size * files / timing['seconds'] / 2 ** 20, 2)
+            results[str(size)] = size_results
+            for path in sources:
+                os.remove(path)
+        
+        engine = CopyEngine()
+        probe = os.path.join(temp_dir, "probe.bin")
+        with open(probe, 'wb') as f:
+            f.write(b"probe")
+        selected = engine.copy(probe, probe + ".copy")
+    
+    return {'params': {'sizes': sizes, 'files': files, 'repeat': repeat, 'platform': platform.platform()},
+            'selected': selected, 'results': results}
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 0.2) -> List[Dict]:
+    """与基准结果对比每项测试的耗时
+    Args:
+        threshold: 耗时增加超过该比例时视为性能回退
+    Returns:
+        [{'name', 'baseline', 'current', 'change', 'regression'}, ...]
+    """
+    rows = []
+    for name, current_result in current.get('results', {}).items():
+        baseline_result = baseline.get('results', {}).get(name)
+        if not baseline_result or not baseline_result.get('seconds'):
+            continue
+        change = current_result['seconds'] / baseline_result['seconds'] - 1
+        rows.append({
+            'name': name,
+            'baseline': baseline_result['seconds'],
+            'current': current_result['seconds'],
+            'change': round(change, 4),
+            'regression': change > threshold,
+        })
+    return rows
+
+
+def print_comparison(rows: List[Dict], baseline: Dict, current: Dict) -> bool:
+    """打印对比结果，存在性能回退时返回True"""
+    if baseline.get('params') != current.get('params'):
+        print("警告: 两次测试的参数不同，对比结果仅供参考")
+    print(f"基准: {baseline.get('meta', {}).get('revision') or '-'}  "
+          f"当前: {current.get('meta', {}).get('revision') or '-'}")
+    for row in rows:
+        flag = "  <-- 回退" if row['regression'] else ""
+        print(f"{row['name']:<14}{row['baseline']:>12.4f}s{row['current']:>12.4f}s{row['change']:>+10.1%}{flag}")
+    return any(row['regression'] for row in rows)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="Train Simulator Classic 存档备份管理工具 - 性能测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    run_parser = subparsers.add_parser("run", help="生成模拟目录树并测试扫描、列出、备份、还原和搜索")
+    run_parser.add_argument("--preset", choices=sorted(PRESETS), default="small", help="预设规模")
+    run_parser.add_argument("--routes", type=int, help="路线数量（覆盖预设）")
+    run_parser.add_argument("--scenarios", type=int, help="场景总数，10~50000（覆盖预设）")
+    run_parser.add_argument("--save-ratio", type=float, default=0.3, help="含有存档的场景比例")
+    run_parser.add_argument("--max-backups", type=int, default=5, help="每个场景saves/中的备份数量上限")
+    run_parser.add_argument("--save-size", type=int, default=64 * 1024, help="存档文件大小（字节）")
+    run_parser.add_argument("--samples", type=int, default=50, help="备份/还原测试的场景数量")
+    run_parser.add_argument("--repeat", type=int, default=3, help="每项测试的重复次数")
+    run_parser.add_argument("--mode", choices=("serial", "thread", "process"), help="扫描模式")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--work-dir", help="生成目录树的位置（默认使用系统临时目录）")
+    run_parser.add_argument("--backup-mode", choices=("copy", "dedup", "compressed", "delta"), default="copy", help="备份方式")
+    run_parser.add_argument("--profile", action="store_true", help="附加工具内置的分阶段性能统计")
+    run_parser.add_argument("--output", help="把JSON结果写入文件")
+    run_parser.add_argument("--baseline", help="与该JSON结果对比")
+    run_parser.add_argument("--threshold", type=float, default=0.2, help="耗时增加超过该比例视为回退")
+    
+    compare_parser = subparsers.add_parser("compare", help="对比两次测试结果")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="耗时增加超过该比例视为回退")
+
+    stat_parser = subparsers.add_parser("stat-calls", help="统计扫描时每个场景的文件系统调用次数")
+    stat_parser.add_argument("--routes", type=int, default=10)
+    stat_parser.add_argument("--scenarios", type=int, default=100, help="每个路线的场景数量")
+
+    delta_parser = subparsers.add_parser("delta", help="测试不同完整备份间隔下增量备份的空间占用和还原耗时")
+    delta_parser.add_argument("--intervals", type=int, nargs="+", default=[1, 5, 10, 20])
+    delta_parser.add_argument("--backups", type=int, default=30, help="连续备份的数量")
+    delta_parser.add_argument("--save-size", type=int, default=4 * 1024 * 1024, help="存档文件大小（字节）")
+    delta_parser.add_argument("--seed", type=int, default=0)
+    
+    copy_parser = subparsers.add_parser("copy", help="比较各复制方式的吞吐量")
+    copy_parser.add_argument("--sizes", type=int, nargs="+", default=[64 * 1024, 4 * 1024 * 1024, 64 * 1024 * 1024],
+                             help="测试的文件大小（字节）")
+    copy_parser.add_argument("--files", type=int, default=5, help="每种大小复制的文件数量")
+    copy_parser.add_argument("--repeat", type=int, default=3, help="每项测试的重复次数")
+    copy_parser.add_argument("--work-dir", help="测试文件的位置（默认使用系统临时目录）")
+    copy_parser.add_argument("--seed", type=int, default=0)
+    
+    args = parser.parse_args()
+    if args.command == "run":
+        route_count, total_scenarios = PRESETS[args.preset]
+        route_count = args.routes or route_count
+        total_scenarios = args.scenarios or total_scenarios
+        result = run_benchmarks(route_count, total_scenarios, save_ratio=args.save_ratio,
+                                max_backups=args.max_backups, save_size=args.save_size,
+                                backup_samples=args.samples, repeat=args.repeat, mode=args.mode,
+                                seed=args.seed, work_dir=args.work_dir, profile=args.profile,
+                                backup_mode=args.backup_mode)
+        output = json.dumps(result, ensure_ascii=False, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output)
+        print(output)
+        if args.baseline:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            if print_comparison(compare_results(baseline, result, args.threshold), baseline, result):
+                sys.exit(1)
+    elif args.command == "compare":
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.current, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+        if print_comparison(compare_results(baseline, current, args.threshold), baseline, current):
+            sys.exit(1)
+    elif args.command == "delta":
+        result = bench_delta(args.intervals, args.backups, args.save_size, args.seed)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    elif args.command == "copy":
+        result = bench_copy(args.sizes, args.files, args.repeat, args.work_dir, args.seed)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    elif args.command == "stat-calls":
+        result = bench_stat_calls(args.routes, args.scenarios)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,14 +7,67 @@ Train Simulator Classic 存档备份管理工具 - 测试脚本
 
 import os
 import sys
+import json
+import hashlib
+import io
+import contextlib
 import tempfile
 import shutil
+import threading
+import time
+import tarfile
+import zipfile
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # 添加当前目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from train_simulator_backup_tool import ConfigManager, XMLParser, TrainSimulatorBackupTool
+from train_simulator_backup_tool import ConfigManager, XMLParser, TrainSimulatorBackupTool, ScanIndex, DirectoryPoller, Profiler, BackupContainer, DeltaCodec, CopyEngine, AutoBackupService, ObjectStore
+
+PROPERTIES_TEMPLATE = '''<?xml version="1.0" encoding="utf-8"?>
+<{root} xmlns:d="http://www.kuju.com/TnT/2003/Delta">
+    <DisplayName>
+        <Localisation-cUserLocalisedString>
+            <English d:type="cDeltaString">{english}</English>
+            <Other>
+                <Localisation-cUserLocalisedString-cOtherStringLangPair>
+                    <Language d:type="cDeltaString">zh</Language>
+                    <String d:type="cDeltaString">{chinese}</String>
+                </Localisation-cUserLocalisedString-cOtherStringLangPair>
+            </Other>
+            <Key d:type="cDeltaString">{key}</Key>
+        </Localisation-cUserLocalisedString>
+    </DisplayName>
+</{root}>'''
+
+def write_properties(path, root, english, chinese, key="key"):
+    """写入RouteProperties.xml/ScenarioProperties.xml测试文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(PROPERTIES_TEMPLATE.format(root=root, english=english, chinese=chinese, key=key))
+
+def make_railworks_tree(base_dir, route_count=2, scenario_count=3):
+    """创建模拟的RailWorks/Content/Routes目录结构"""
+    routes_path = Path(base_dir) / "Content" / "Routes"
+    for r in range(route_count):
+        route_dir = routes_path / f"route-{r:04d}"
+        (route_dir / "Scenarios").mkdir(parents=True)
+        write_properties(route_dir / "RouteProperties.xml", "RouteProperties",
+                         f"Route {r}", f"路线{r}")
+        for n in range(scenario_count):
+            scenario_dir = route_dir / "Scenarios" / f"scenario-{r:04d}-{n:04d}"
+            scenario_dir.mkdir()
+            write_properties(scenario_dir / "ScenarioProperties.xml", "ScenarioProperties",
+                             f"Scenario {r}-{n}", f"场景{r}-{n}")
+    return routes_path
+
+def make_tool(base_dir):
+    """创建指向临时目录的工具实例（配置和索引文件都写在临时目录中）"""
+    tool = TrainSimulatorBackupTool()
+    tool.config_manager = ConfigManager(os.path.join(base_dir, "config.json"))
+    tool.scan_index = ScanIndex(tool.config_manager.get_data_path("scan_index.json"))
+    tool.railworks_path = str(base_dir)
+    return tool
 
 def test_config_manager():
     """测试配置管理器"""
@@ -155,6 +208,1731 @@ def test_main_tool():
     
     print("✓ 主工具类测试通过")
 
+def test_scan_index():
+    """测试增量扫描索引"""
+    print("测试增量扫描索引...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        routes_path = make_railworks_tree(temp_dir)
+        tool = make_tool(temp_dir)
+        
+        # 首次扫描解析全部XML（2个路线 + 6个场景）
+        assert tool.scan_content(), "扫描失败"
+        assert tool.last_scan_stats['parsed_files'] == 8, f"首次扫描解析数量错误: {tool.last_scan_stats}"
+        assert tool.routes_data['route-0000']['name'] == "路线0"
+        
+        # 未变化时不再解析
+        assert tool.scan_content()
+        assert tool.last_scan_stats['parsed_files'] == 0, "未变化的目录被重新解析"
+        
+        # 修改一个场景、删除一个场景
+        changed = routes_path / "route-0000" / "Scenarios" / "scenario-0000-0001" / "ScenarioProperties.xml"
+        write_properties(changed, "ScenarioProperties", "Changed", "已修改的场景")
+        os.utime(changed, ns=(0, 1))
+        shutil.rmtree(routes_path / "route-0001" / "Scenarios" / "scenario-0001-0002")
+        assert tool.scan_content()
+        assert tool.last_scan_stats['parsed_files'] == 1, f"增量扫描解析数量错误: {tool.last_scan_stats}"
+        names = {s['uuid']: s['name'] for s in tool.routes_data['route-0000']['scenarios']}
+        assert names['scenario-0000-0001'] == "已修改的场景"
+        assert len(tool.routes_data['route-0001']['scenarios']) == 2, "已删除的场景未被移除"
+        
+        # 新实例直接从索引载入
+        fresh_tool = make_tool(temp_dir)
+        assert fresh_tool.load_scan_index(), "从索引载入失败"
+        assert fresh_tool.routes_data == tool.routes_data, "索引载入的数据与扫描结果不一致"
+        
+        print("✓ 增量扫描索引测试通过")
+
+def test_parallel_scan():
+    """测试并行扫描模式"""
+    print("测试并行扫描模式...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=4, scenario_count=5)
+        tool = make_tool(temp_dir)
+        
+        results = tool.compare_scan_modes(workers=2)
+        for mode in ("serial", "thread", "process"):
+            assert results[mode]['success'], f"{mode}模式扫描失败"
+            assert results[mode]['parsed_files'] == 24, f"{mode}模式解析数量错误"
+        assert results['thread']['matches_serial'], "线程池扫描结果与串行不一致"
+        assert results['process']['matches_serial'], "进程池扫描结果与串行不一致"
+        assert 'speedup' in results['thread'], "缺少加速比"
+        assert list(tool.routes_data) == sorted(tool.routes_data), "路线合并顺序不确定"
+        
+        print("✓ 并行扫描模式测试通过")
+
+def test_streaming_xml_parser():
+    """测试流式DisplayName解析与完整解析结果一致"""
+    print("测试流式XML解析...")
+    
+    variants = {
+        "zh_and_english": PROPERTIES_TEMPLATE.format(root="ScenarioProperties", english="Scenario", chinese="场景", key="k"),
+        "english_only": PROPERTIES_TEMPLATE.format(root="ScenarioProperties", english="Scenario", chinese="", key="k"),
+        "french_fallback": '''<?xml version="1.0" encoding="utf-8"?>
+<ScenarioProperties xmlns:d="http://www.kuju.com/TnT/2003/Delta">
+    <ID><cGUID><DevString>abc</DevString></cGUID></ID>
+    <DisplayName>
+        <Localisation-cUserLocalisedString>
+            <English d:type="cDeltaString"></English>
+            <French d:type="cDeltaString">Scénario</French>
+            <Other/>
+        </Localisation-cUserLocalisedString>
+    </DisplayName>
+</ScenarioProperties>''',
+        "no_display_name": '''<?xml version="1.0" encoding="utf-8"?>
+<ScenarioProperties><Description>none</Description></ScenarioProperties>''',
+    }
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, content in variants.items():
+            xml_file = os.path.join(temp_dir, name + ".xml")
+            with open(xml_file, 'w', encoding='utf-8') as f:
+                f.write(content)
+            for language in ("zh", "en", "fr", ""):
+                streamed = XMLParser.parse_display_name(xml_file, language)
+                full = XMLParser.parse_display_name(xml_file, language, streaming=False)
+                assert streamed == full, f"{name}/{language}: 流式 '{streamed}' != 完整 '{full}'"
+        
+        # 流式解析在读完DisplayName后停止，不会读到后面损坏的内容
+        truncated_file = os.path.join(temp_dir, "truncated.xml")
+        content = variants["zh_and_english"].replace("</ScenarioProperties>", "<Description><broken")
+        with open(truncated_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+        assert XMLParser.parse_display_name(truncated_file, "zh") == "场景", "流式解析未提前结束"
+        
+        print("✓ 流式XML解析测试通过")
+
+def test_scan_batches_and_cancel():
+    """测试分批扫描回调和取消扫描"""
+    print("测试分批扫描和取消...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        route_count = TrainSimulatorBackupTool.SCAN_BATCH_SIZE * 2 + 1
+        make_railworks_tree(temp_dir, route_count=route_count, scenario_count=1)
+        tool = make_tool(temp_dir)
+        
+        batches = []
+        progress = []
+        assert tool.scan_content(batch_callback=batches.append,
+                                 progress_callback=lambda done, total: progress.append((done, total)))
+        assert len(batches) == 3, f"批次数量错误: {len(batches)}"
+        merged = {}
+        for batch in batches:
+            merged.update(batch)
+        assert merged == tool.routes_data, "分批结果与最终结果不一致"
+        assert progress[-1] == (route_count, route_count), f"进度错误: {progress}"
+        
+        # 第一批完成后取消：扫描返回False，routes_data保持不变
+        previous = tool.routes_data
+        cancel_event = threading.Event()
+        assert not tool.scan_content(use_index=False, batch_callback=lambda batch: cancel_event.set(),
+                                     cancel_event=cancel_event), "取消后扫描应返回False"
+        assert tool.last_scan_stats['cancelled'], "未记录取消状态"
+        assert tool.routes_data is previous, "取消的扫描不应替换routes_data"
+        
+        print("✓ 分批扫描和取消测试通过")
+
+def test_lazy_scan():
+    """测试延迟加载场景"""
+    print("测试延迟加载场景...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=3, scenario_count=4)
+        eager_tool = make_tool(temp_dir)
+        eager_tool.scan_index = ScanIndex(os.path.join(temp_dir, "eager_index.json"))
+        assert eager_tool.scan_content(lazy=False)
+        
+        tool = make_tool(temp_dir)
+        assert tool.scan_content(lazy=True)
+        assert tool.last_scan_stats['parsed_files'] == 3, "延迟模式下只应解析路线XML"
+        assert all(route['scenarios'] is None for route in tool.routes_data.values()), "场景不应被加载"
+        
+        # 首次展开时加载并缓存
+        assert tool.load_route_scenarios('route-0001')
+        assert tool.routes_data['route-0001'] == eager_tool.routes_data['route-0001'], "延迟加载结果不一致"
+        
+        # 再次延迟扫描时，已加载的路线保持加载状态
+        assert tool.scan_content(lazy=True)
+        assert tool.routes_data['route-0001']['scenarios'] is not None, "已加载的路线被重置"
+        assert tool.routes_data['route-0000']['scenarios'] is None
+        
+        # 索引中缓存的场景名称可用于搜索未加载的路线
+        cached_tool = make_tool(temp_dir)
+        cached_tool.scan_index = ScanIndex(os.path.join(temp_dir, "eager_index.json"))
+        assert cached_tool.scan_content(lazy=True)
+        assert cached_tool.find_unloaded_routes_matching("场景2-3") == ['route-0002']
+        assert cached_tool.unindexed_routes() == []
+        # 索引中没有场景名称的路线只能加载后再搜索
+        assert tool.unindexed_routes() == ['route-0000', 'route-0002'], tool.unindexed_routes()
+        
+        # 扫描期间加载的路线在扫描结束替换结果后仍保持加载状态
+        loading_tool = make_tool(temp_dir)
+        loading_tool.scan_index = ScanIndex(os.path.join(temp_dir, "loading_index.json"))
+        assert loading_tool.scan_content(lazy=True)
+        assert loading_tool.scan_content(lazy=True, progress_callback=lambda done, total:
+                                         loading_tool.load_route_scenarios('route-0002'))
+        assert loading_tool.routes_data['route-0002'] == eager_tool.routes_data['route-0002'], "扫描期间加载的场景丢失"
+        assert not loading_tool.scan_index.get_route('route-0002').get('lazy'), "索引未保留加载后的条目"
+        assert loading_tool.unindexed_routes() == ['route-0000', 'route-0001']
+        
+        scenario_count = sum(1 for _ in tool.iter_scenarios())
+        assert scenario_count == 12, f"遍历场景数量错误: {scenario_count}"
+        assert tool.routes_data == eager_tool.routes_data
+        
+        # 后台扫描与界面线程刷新路线同时修改和保存索引：保存不会失败，索引文件完整
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            scanner = threading.Thread(target=lambda: [tool.scan_content(lazy=True) for _ in range(20)])
+            scanner.start()
+            while scanner.is_alive():
+                tool.refresh_route('route-0002')
+            scanner.join()
+        assert "保存扫描索引失败" not in output.getvalue(), output.getvalue()
+        fresh_tool = make_tool(temp_dir)
+        assert fresh_tool.load_scan_index() and sorted(fresh_tool.routes_data) == sorted(tool.routes_data)
+        
+        print("✓ 延迟加载场景测试通过")
+
+def test_incremental_refresh():
+    """测试文件变化后的增量刷新和轮询监视"""
+    print("测试增量刷新...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        routes_path = make_railworks_tree(temp_dir, route_count=2, scenario_count=2)
+        tool = make_tool(temp_dir)
+        assert tool.scan_content()
+        
+        poller = DirectoryPoller()
+        saves_path = routes_path / "route-0000" / "Scenarios" / "scenario-0000-0000" / "saves"
+        poller.add_path(str(routes_path))
+        poller.add_path(str(saves_path))  # 尚不存在的目录
+        assert poller.poll() == [], "未变化时不应报告变化"
+        
+        # 新增路线
+        new_route = make_railworks_tree(os.path.join(temp_dir, "extra"), route_count=3, scenario_count=1)
+        shutil.move(str(new_route / "route-0002"), str(routes_path / "route-0002"))
+        saves_path.mkdir()
+        assert sorted(poller.poll()) == sorted([str(routes_path), str(saves_path)]), "轮询未发现变化"
+        
+        added, removed = tool.refresh_routes()
+        assert added == ['route-0002'] and removed == [], f"新增路线检测错误: {added}, {removed}"
+        assert tool.routes_data['route-0002']['name'] == "路线2", "新增路线名称解析错误"
+        
+        # 场景增删只重新扫描所在路线
+        shutil.rmtree(routes_path / "route-0001" / "Scenarios" / "scenario-0001-0000")
+        assert tool.refresh_route('route-0001')
+        assert [s['uuid'] for s in tool.routes_data['route-0001']['scenarios']] == ['scenario-0001-0001']
+        
+        # 删除路线
+        shutil.rmtree(routes_path / "route-0000")
+        added, removed = tool.refresh_routes()
+        assert removed == ['route-0000'] and 'route-0000' not in tool.routes_data
+        
+        # 刷新结果已写入索引
+        fresh_tool = make_tool(temp_dir)
+        assert fresh_tool.load_scan_index()
+        assert fresh_tool.routes_data == tool.routes_data, "增量刷新结果未写入索引"
+        
+        print("✓ 增量刷新测试通过")
+
+def test_language_switch():
+    """测试切换语言不重新解析XML"""
+    print("测试切换显示语言...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        routes_path = make_railworks_tree(temp_dir, route_count=2, scenario_count=2)
+        german_xml = routes_path / "route-0000" / "Scenarios" / "scenario-0000-0000" / "ScenarioProperties.xml"
+        content = german_xml.read_text(encoding='utf-8').replace(
+            "<Other>", '<German d:type="cDeltaString">Szenario 0-0</German>\n            <Other>')
+        german_xml.write_text(content, encoding='utf-8')
+        
+        tool = make_tool(temp_dir)
+        assert tool.scan_content()
+        assert tool.routes_data['route-0000']['name'] == "路线0"
+        
+        # 切换语言直接使用已解析的名称表
+        tool.set_language("en")
+        assert tool.routes_data['route-0000']['name'] == "Route 0", "切换英文后路线名称错误"
+        names = {s['uuid']: s['name'] for s in tool.routes_data['route-0000']['scenarios']}
+        assert names['scenario-0000-0001'] == "Scenario 0-1", "切换英文后场景名称错误"
+        tool.set_language("de")
+        names = {s['uuid']: s['name'] for s in tool.routes_data['route-0000']['scenarios']}
+        assert names['scenario-0000-0000'] == "Szenario 0-0", "德文名称错误"
+        assert names['scenario-0000-0001'] == "Scenario 0-1", "没有德文时应回退到英文"
+        
+        # 索引与语言无关，切换语言后重新扫描不解析任何XML
+        assert tool.scan_content()
+        assert tool.last_scan_stats['parsed_files'] == 0, "切换语言后不应重新解析XML"
+        assert tool.routes_data['route-0001']['name'] == "Route 1"
+        
+        table = XMLParser.parse_localisation_table(str(german_xml))
+        assert XMLParser.resolve_display_name(table, "zh") == "场景0-0"
+        assert XMLParser.resolve_display_name(table, "de") == "Szenario 0-0"
+        assert XMLParser.resolve_display_name(table, "fr") == "Scenario 0-0"
+        
+        print("✓ 切换显示语言测试通过")
+
+def test_benchmark_suite():
+    """测试性能测试脚本的目录树生成和结果对比"""
+    print("测试性能测试脚本...")
+    
+    import benchmark_tool
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        railworks_path = benchmark_tool.generate_railworks_tree(
+            os.path.join(temp_dir, "RailWorks"), 3, total_scenarios=10, realistic=True,
+            save_ratio=1.0, max_backups=2, save_size=1024)
+        tool = make_tool(railworks_path)
+        assert tool.scan_content()
+        scenarios = [scenario for _, _, scenario in tool.iter_scenarios()]
+        assert len(scenarios) == 10, f"场景数量错误: {len(scenarios)}"
+        assert tool.routes_data['route-00000']['name'] == "路线0", "真实格式XML名称解析错误"
+        assert all(os.path.getsize(os.path.join(s['path'], "CurrentSave.bin")) == 1024 for s in scenarios)
+    
+    result = benchmark_tool.run_benchmarks(2, 10, save_ratio=0.5, backup_samples=3, save_size=1024, repeat=1)
+    for name in ("scan_cold", "scan_warm", "list_backups", "backup", "restore", "delete", "search"):
+        assert name in result['results'], f"缺少测试项: {name}"
+    assert result['results']['backup']['succeeded'] == result['results']['restore']['succeeded']
+    json.dumps(result)  # 结果必须可以序列化为JSON
+    
+    slower = json.loads(json.dumps(result))
+    slower['results']['scan_cold']['seconds'] *= 2
+    rows = {row['name']: row for row in benchmark_tool.compare_results(result, slower, threshold=0.5)}
+    assert rows['scan_cold']['regression'], "未检测到性能回退"
+    assert not rows['scan_warm']['regression'], "误报性能回退"
+    
+    print("✓ 性能测试脚本测试通过")
+
+def test_profiler():
+    """测试性能统计"""
+    print("测试性能统计...")
+    
+    # 未启用时不记录任何数据
+    profiler = Profiler()
+    with profiler.phase("scan.parse"):
+        pass
+    profiler.add("files_read")
+    profiler.record_file("a.xml", 0.001, 100)
+    assert profiler.snapshot() == {"enabled": False, "phases": {}, "counters": {}, "slowest_files": []}
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=2, scenario_count=3)
+        tool = make_tool(temp_dir)
+        tool.profiler.enabled = True
+        assert tool.scan_content()
+        
+        snapshot = tool.profiler.snapshot()
+        for phase in ("scan.list_routes", "scan.enumerate", "scan.parse", "scan.build", "scan.total", "xml.parse_file"):
+            assert phase in snapshot["phases"], f"缺少阶段: {phase}"
+        assert snapshot["counters"]["files_read"] == 8, f"读取文件数错误: {snapshot['counters']}"
+        assert snapshot["counters"]["scenarios_listed"] == 6
+        assert snapshot["counters"]["bytes_read"] > 0
+        assert sum(snapshot["phases"]["xml.parse_file"]["histogram"].values()) == 8, "直方图计数错误"
+        assert len(snapshot["slowest_files"]) == 8
+        times = [item["ms"] for item in snapshot["slowest_files"]]
+        assert times == sorted(times, reverse=True), "最慢文件未按耗时排序"
+        
+        scenario_path = tool.routes_data['route-0000']['scenarios'][0]['path']
+        with open(os.path.join(scenario_path, "CurrentSave.bin"), 'wb') as f:
+            f.write(b"save")
+        assert tool.create_backup(scenario_path, "profiled")[0]
+        assert tool.list_backups(scenario_path) == ["profiled"]
+        assert tool.create_backup.__name__ == "create_backup", "装饰器未保留方法名"
+        snapshot = tool.profiler.snapshot()
+        assert snapshot["phases"]["backup.create"]["count"] == 1
+        assert snapshot["phases"]["backup.list"]["count"] == 1
+        
+        export_file = os.path.join(temp_dir, "profile.json")
+        assert tool.profiler.export_json(export_file)
+        with open(export_file, 'r', encoding='utf-8') as f:
+            assert json.load(f)["counters"]["files_read"] == 8
+        assert "scan.parse" in tool.profiler.format_report()
+        
+        tool.profiler.reset()
+        assert tool.profiler.snapshot()["phases"] == {}, "清空后仍有数据"
+    
+    print("✓ 性能统计测试通过")
+
+def test_archive_scan():
+    """测试扫描.ap压缩包中的场景"""
+    print("测试扫描.ap压缩包...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        routes_path = make_railworks_tree(temp_dir, route_count=1, scenario_count=1)
+        route_dir = routes_path / "route-0000"
+        
+        def write_archive(path, entries):
+            with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for member, root, english, chinese in entries:
+                    archive.writestr(member, PROPERTIES_TEMPLATE.format(root=root, english=english,
+                                                                        chinese=chinese, key="key"))
+        
+        # 路线中有一个压缩包，包含两个场景；其中一个场景已保存过（目录中只有存档）
+        write_archive(route_dir / "MainContent.ap", [
+            ("Scenarios/packed-0001/ScenarioProperties.xml", "ScenarioProperties", "Packed 1", "打包场景1"),
+            ("Scenarios\\packed-0002\\ScenarioProperties.xml", "ScenarioProperties", "Packed 2", "打包场景2"),
+            ("Scenarios/packed-0001/Scenario.bin", "ScenarioProperties", "", ""),
+        ])
+        saved_dir = route_dir / "Scenarios" / "packed-0001"
+        saved_dir.mkdir()
+        (saved_dir / "CurrentSave.bin").write_bytes(b"save")
+        
+        # 完全打包的路线：路线目录中只有压缩包
+        packed_route = routes_path / "route-packed"
+        packed_route.mkdir()
+        write_archive(packed_route / "Content.ap", [
+            ("RouteProperties.xml", "RouteProperties", "Packed Route", "打包路线"),
+            ("Scenarios/packed-0003/ScenarioProperties.xml", "ScenarioProperties", "Packed 3", "打包场景3"),
+        ])
+        
+        tool = make_tool(temp_dir)
+        assert tool.scan_content(), "扫描失败"
+        scenarios = {s['uuid']: s for s in tool.routes_data['route-0000']['scenarios']}
+        assert list(scenarios) == ["packed-0001", "packed-0002", "scenario-0000-0000"], f"场景列表错误: {list(scenarios)}"
+        assert scenarios['packed-0001']['name'] == "打包场景1", "压缩包中的场景名称错误"
+        assert scenarios['packed-0001']['archive'] == "MainContent.ap"
+        assert scenarios['packed-0001']['path'] == str(saved_dir), "打包场景应使用Scenarios下的目录保存备份"
+        assert scenarios['scenario-0000-0000']['archive'] is None
+        assert tool.routes_data['route-packed']['name'] == "打包路线", "压缩包中的路线名称错误"
+        assert [s['name'] for s in tool.routes_data['route-packed']['scenarios']] == ["打包场景3"]
+        
+        # 压缩包未变化时不再读取
+        assert tool.scan_content()
+        assert tool.last_scan_stats['parsed_files'] == 0, "未变化的压缩包被重新读取"
+        
+        # 备份打包场景
+        assert tool.create_backup(str(saved_dir), "packed")[0], "打包场景备份失败"
+        assert tool.list_backups(str(saved_dir)) == ["packed"]
+        
+        # 压缩包变化后重新读取
+        write_archive(packed_route / "Content.ap", [
+            ("RouteProperties.xml", "RouteProperties", "Packed Route", "打包路线"),
+            ("Scenarios/packed-0004/ScenarioProperties.xml", "ScenarioProperties", "Packed 4", "打包场景4"),
+        ])
+        os.utime(packed_route / "Content.ap", ns=(0, 1))
+        assert tool.scan_content()
+        assert tool.last_scan_stats['parsed_files'] == 2, f"变化的压缩包解析数量错误: {tool.last_scan_stats}"
+        assert [s['uuid'] for s in tool.routes_data['route-packed']['scenarios']] == ["packed-0004"]
+        
+        # 延迟加载模式下只有压缩包的路线也能显示并加载
+        lazy_tool = make_tool(temp_dir)
+        assert lazy_tool.scan_content(lazy=True)
+        assert lazy_tool.routes_data['route-packed']['scenarios'] is None
+        assert lazy_tool.load_route_scenarios('route-packed')
+        assert [s['name'] for s in lazy_tool.routes_data['route-packed']['scenarios']] == ["打包场景4"]
+        
+        # 损坏的压缩包不影响其他场景
+        (route_dir / "Broken.ap").write_bytes(b"not a zip")
+        assert tool.scan_content()
+        assert len(tool.routes_data['route-0000']['scenarios']) == 3
+    
+    print("✓ 扫描.ap压缩包测试通过")
+
+def test_dedup_backup():
+    """测试去重备份存储"""
+    print("测试去重备份存储...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=1, scenario_count=2)
+        tool = make_tool(temp_dir)
+        tool.config_manager.set_backup_mode("dedup")
+        assert tool.scan_content()
+        first, second = [s['path'] for s in tool.routes_data['route-0000']['scenarios']]
+        for scenario_path in (first, second):
+            with open(os.path.join(scenario_path, "CurrentSave.bin"), 'wb') as f:
+                f.write(b"same save" * 1000)
+            with open(os.path.join(scenario_path, "CurrentSave.bin.MD5"), 'w') as f:
+                f.write("md5")
+        
+        # 两个场景的三个相同存档只保存一次
+        assert tool.create_backup(first, "a")[0]
+        assert tool.create_backup(first, "b")[0]
+        assert tool.create_backup(second, "a")[0]
+        assert not tool.create_backup(first, "a")[0], "同名备份应创建失败"
+        store = tool.get_object_store()
+        assert store.stats() == {'objects': 1, 'bytes': 9000, 'references': 3}, f"存储状态错误: {store.stats()}"
+        assert os.path.exists(os.path.join(first, "saves", "a.bin.ref"))
+        assert os.path.exists(os.path.join(first, "saves", "a.bin.MD5"))
+        assert tool.list_backups(first) == ["b", "a"]
+        
+        # 旧的完整复制备份和去重备份同时存在
+        tool.config_manager.set_backup_mode("copy")
+        assert tool.create_backup(first, "c")[0]
+        assert tool.list_backups(first) == ["c", "b", "a"]
+        
+        # 从存储还原
+        with open(os.path.join(first, "CurrentSave.bin"), 'wb') as f:
+            f.write(b"changed")
+        assert tool.restore_backup(first, "a.bin"), "去重备份还原失败"
+        with open(os.path.join(first, "CurrentSave.bin"), 'rb') as f:
+            assert f.read() == b"same save" * 1000, "还原内容错误"
+        
+        # 删除引用：最后一个引用删除后对象随之删除
+        assert tool.delete_backup(first, "a.bin")
+        assert tool.delete_backup(first, "b.bin")
+        assert store.stats()['objects'] == 1, "仍有引用的对象被删除"
+        assert tool.delete_backup(second, "a.bin")
+        assert store.stats() == {'objects': 0, 'bytes': 0, 'references': 0}, "无引用的对象未删除"
+        assert tool.list_backups(first) == ["c"]
+        
+        # 引用文件被手动删除后，垃圾回收按实际引用重建计数
+        tool.config_manager.set_backup_mode("dedup")
+        assert tool.create_backup(first, "d")[0]
+        assert tool.create_backup(second, "d")[0]
+        os.remove(os.path.join(second, "saves", "d.bin.ref"))
+        result = tool.collect_backup_garbage()
+        assert result['references'] == 1 and result['removed'] == 0 and not result['missing']
+        assert store.stats()['references'] == 1, "引用计数未重建"
+        os.remove(os.path.join(first, "saves", "d.bin.ref"))
+        result = tool.collect_backup_garbage()
+        assert result['removed'] == 1 and result['freed_bytes'] == 9000, f"垃圾回收错误: {result}"
+        
+        # 存入时存档被不断改写：每个对象的内容都与其哈希一致，并发存入相同内容只保存一次
+        save_file = os.path.join(first, "CurrentSave.bin")
+        stop = threading.Event()
+        
+        def rewrite():
+            k = 0
+            while not stop.is_set():
+                with open(save_file, 'r+b') as f:
+                    f.write(bytes([k % 256]) * (2 * 1024 * 1024))
+                k += 1
+        
+        writer = threading.Thread(target=rewrite)
+        writer.start()
+        try:
+            for _ in range(20):
+                digest, size, _ = store.put_file(save_file, add_reference=False)
+                store.settle([digest])
+                assert ObjectStore.hash_file(store.object_path(digest)) == (digest, size), "对象内容与哈希不一致"
+        finally:
+            stop.set()
+            writer.join()
+        shared = os.path.join(temp_dir, "shared.bin")
+        with open(shared, 'wb') as f:
+            f.write(os.urandom(300 * 1024))
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: store.put_file(shared), range(8)))
+        store.settle([digest for digest, _, _ in results])
+        assert len({digest for digest, _, _ in results}) == 1 and sum(created for _, _, created in results) == 1, \
+            f"相同内容重复写入: {results}"
+        assert store._load_refcounts()[results[0][0]] == 8, "并发存入的引用计数错误"
+        assert not os.listdir(store.temp_path), "残留临时文件"
+        
+        # 对象已存入、引用文件尚未写入时进行垃圾回收：新对象保留，备份可以还原
+        with open(save_file, 'wb') as f:
+            f.write(b"racing save" * 500)
+        write_json_atomic = tool._write_json_atomic
+        collected = []
+        
+        def collect_then_write(path, data):
+            if path.endswith(".bin.ref"):
+                collected.append(tool.collect_backup_garbage())
+            write_json_atomic(path, data)
+        
+        tool._write_json_atomic = collect_then_write
+        try:
+            assert tool.create_backup(first, "racing")[0]
+        finally:
+            tool._write_json_atomic = write_json_atomic
+        assert collected and collected[0]['objects'] == 1, f"尚未写入引用的对象被删除: {collected}"
+        with open(save_file, 'wb') as f:
+            f.write(b"changed")
+        assert tool.restore_backup(first, "racing.bin")
+        with open(save_file, 'rb') as f:
+            assert f.read() == b"racing save" * 500, "还原内容错误"
+        assert store._load_refcounts()[ObjectStore.hash_file(save_file)[0]] == 1, "引用计数错误"
+        
+        # 扫描引用期间存入并写好引用的对象，即使扫描没有看到引用也保留
+        with open(shared, 'wb') as f:
+            f.write(b"late object")
+        with store.collecting():
+            digest, _, _ = store.put_file(shared)
+            store.settle([digest])
+            store.collect_garbage({})
+            assert store.has_object(digest) and store._load_refcounts() == {digest: 1}, "扫描期间存入的对象被删除"
+        assert store.collect_garbage({})['removed'] == 1 and not store.has_object(digest)
+    
+    print("✓ 去重备份存储测试通过")
+
+def test_compressed_backup():
+    """测试压缩备份"""
+    print("测试压缩备份...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=1, scenario_count=1)
+        tool = make_tool(temp_dir)
+        assert tool.scan_content()
+        scenario_path = tool.routes_data['route-0000']['scenarios'][0]['path']
+        save_file = os.path.join(scenario_path, "CurrentSave.bin")
+        md5_file = os.path.join(scenario_path, "CurrentSave.bin.MD5")
+        # 超过一个块的存档，验证分块压缩和解压
+        content = (b"railworks save data " * 4096 + os.urandom(1024)) * 20
+        with open(save_file, 'wb') as f:
+            f.write(content)
+        with open(md5_file, 'w') as f:
+            f.write("0123456789abcdef")
+        
+        # 旧格式的完整复制备份
+        assert tool.create_backup(scenario_path, "legacy")[0]
+        
+        tool.config_manager.set_backup_mode("compressed")
+        for codec in BackupContainer.available_codecs():
+            tool.config_manager.config["compression"] = codec
+            assert tool.create_backup(scenario_path, codec)[0], f"{codec}压缩备份失败"
+            container = os.path.join(scenario_path, "saves", codec + ".bin.cz")
+            header = BackupContainer.read_header(container)
+            assert header["codec"] == codec and header["size"] == len(content)
+            assert header["md5"] == b"0123456789abcdef", "容器中缺少MD5校验文件内容"
+            assert os.path.getsize(container) < len(content) / 4, f"{codec}压缩效果异常"
+            assert not os.path.exists(container[:-3] + ".MD5"), "压缩备份不应单独复制MD5文件"
+        assert set(tool.list_backups(scenario_path)) == {"legacy"} | set(BackupContainer.available_codecs())
+        
+        # 从压缩备份还原，包括MD5校验文件
+        for codec in BackupContainer.available_codecs():
+            with open(save_file, 'wb') as f:
+                f.write(b"changed")
+            os.remove(md5_file)
+            assert tool.restore_backup(scenario_path, codec + ".bin"), f"{codec}还原失败"
+            with open(save_file, 'rb') as f:
+                assert f.read() == content, f"{codec}还原内容错误"
+            with open(md5_file, 'r') as f:
+                assert f.read() == "0123456789abcdef", "MD5校验文件未还原"
+        assert tool.restore_backup(scenario_path, "legacy.bin"), "旧格式备份还原失败"
+        
+        # 损坏的压缩备份还原失败时不覆盖当前存档（当前存档与备份不同，需要真正还原）
+        container = os.path.join(scenario_path, "saves", "zlib.bin.cz")
+        with open(container, 'r+b') as f:
+            f.seek(-100, os.SEEK_END)
+            f.write(b"\0" * 100)
+        with open(save_file, 'wb') as f:
+            f.write(b"changed")
+        assert not tool.restore_backup(scenario_path, "zlib.bin"), "损坏的备份应还原失败"
+        with open(save_file, 'rb') as f:
+            assert f.read() == b"changed", "还原失败时存档被覆盖"
+        
+        assert tool.delete_backup(scenario_path, "zlib.bin")
+        assert "zlib" not in tool.list_backups(scenario_path)
+    
+    print("✓ 压缩备份测试通过")
+
+def test_delta_backup():
+    """测试增量备份"""
+    print("测试增量备份...")
+    
+    # 差异编码：修改、插入和删除
+    import random
+    rng = random.Random(0)
+    base = bytes(rng.getrandbits(8) for _ in range(200000))
+    target = bytearray(base)
+    target[1000:1010] = b"x" * 10
+    target[50000:50000] = b"inserted" * 11
+    del target[120000:120777]
+    target = bytes(target)
+    encoded = DeltaCodec.encode(DeltaCodec.diff(base, target))
+    assert DeltaCodec.apply(base, encoded) == target, "差异还原结果错误"
+    assert len(encoded) < 2000, f"差异数据过大: {len(encoded)}"
+    for a, b in ((b"", target), (target, b""), (base, os.urandom(5000))):
+        assert DeltaCodec.apply(a, DeltaCodec.encode(DeltaCodec.diff(a, b))) == b
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=1, scenario_count=1)
+        tool = make_tool(temp_dir)
+        tool.config_manager.set_backup_mode("delta")
+        tool.config_manager.config["delta_keyframe_interval"] = 3
+        assert tool.scan_content()
+        scenario_path = tool.routes_data['route-0000']['scenarios'][0]['path']
+        save_file = os.path.join(scenario_path, "CurrentSave.bin")
+        saves = os.path.join(scenario_path, "saves")
+        
+        versions = []
+        content = bytearray(base)
+        for i in range(5):
+            content[i * 30000:i * 30000 + 16] = bytes([i]) * 16
+            versions.append(bytes(content))
+            with open(save_file, 'wb') as f:
+                f.write(versions[-1])
+            os.utime(save_file, ns=(i * 10 ** 9, i * 10 ** 9))
+            assert tool.create_backup(scenario_path, f"v{i}")[0], f"第{i}个备份失败"
+        
+        # 间隔为3：完整、增量、增量、完整、增量
+        kinds = [tool._resolve_backup(scenario_path, f"v{i}.bin")[0] for i in range(5)]
+        assert kinds == ["copy", "delta", "delta", "copy", "delta"], f"完整备份间隔错误: {kinds}"
+        assert os.path.getsize(os.path.join(saves, "v2.bin.delta")) < 1000
+        
+        for i in (2, 4, 0):
+            assert tool.restore_backup(scenario_path, f"v{i}.bin"), f"还原v{i}失败"
+            with open(save_file, 'rb') as f:
+                assert f.read() == versions[i], f"还原v{i}内容错误"
+        
+        report = tool.analyze_delta_chains(scenario_path)
+        assert len(report['backups']) == 5 and report['savings'] > 0.5, f"空间统计错误: {report}"
+        assert report['original_bytes'] == 5 * len(base)
+        
+        # 删除链中间的备份：依赖它的备份改用它的基准
+        assert tool.delete_backup(scenario_path, "v1.bin")
+        assert DeltaCodec.read(os.path.join(saves, "v2.bin.delta"), with_data=False)["base"] == "v0"
+        # 删除完整备份：依赖它的增量备份变为完整备份
+        assert tool.delete_backup(scenario_path, "v0.bin")
+        assert tool._resolve_backup(scenario_path, "v2.bin")[0] == "copy"
+        assert tool.list_backups(scenario_path) == ["v4", "v3", "v2"]
+        for i in (2, 3, 4):
+            assert tool.restore_backup(scenario_path, f"v{i}.bin")
+            with open(save_file, 'rb') as f:
+                assert f.read() == versions[i], f"删除后还原v{i}内容错误"
+    
+    print("✓ 增量备份测试通过")
+
+def test_copy_engine():
+    """测试复制引擎"""
+    print("测试复制引擎...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        src = os.path.join(temp_dir, "src.bin")
+        content = os.urandom(3 * CopyEngine.BUFFER_SIZE + 123)
+        with open(src, 'wb') as f:
+            f.write(content)
+        os.utime(src, ns=(10 ** 9, 10 ** 9))
+        
+        # 每种可用方式都能正确复制，不支持时退回后续方式
+        for method in CopyEngine.available_methods():
+            engine = CopyEngine((method, "buffered"))
+            dst = os.path.join(temp_dir, method + ".bin")
+            with open(dst, 'wb') as f:
+                f.write(b"old content that is longer than nothing")
+            used = engine.copy(src, dst)
+            assert used in (method, "buffered"), f"{method}使用了意外的复制方式: {used}"
+            with open(dst, 'rb') as f:
+                assert f.read() == content, f"{method}复制内容错误"
+            assert os.stat(dst).st_mtime_ns == 10 ** 9, f"{method}未保留修改时间"
+            # 选中的方式按设备缓存
+            assert engine.method_for(src, dst) == used
+            assert engine.snapshot()['methods'][used] == {'files': 1, 'bytes': len(content)}
+        
+        # 空文件和不复制元数据
+        empty = os.path.join(temp_dir, "empty.bin")
+        open(empty, 'wb').close()
+        engine = CopyEngine()
+        engine.copy(empty, os.path.join(temp_dir, "empty-copy.bin"), metadata=False)
+        assert os.path.getsize(os.path.join(temp_dir, "empty-copy.bin")) == 0
+        
+        # 源文件不存在时抛出原始错误，而不是退回其他方式
+        try:
+            engine.copy(os.path.join(temp_dir, "missing.bin"), os.path.join(temp_dir, "x.bin"))
+            assert False, "源文件不存在时应抛出异常"
+        except FileNotFoundError:
+            pass
+        
+        # 备份和还原使用复制引擎
+        make_railworks_tree(temp_dir, route_count=1, scenario_count=1)
+        tool = make_tool(temp_dir)
+        assert tool.scan_content()
+        scenario_path = tool.routes_data['route-0000']['scenarios'][0]['path']
+        save_file = os.path.join(scenario_path, "CurrentSave.bin")
+        with open(save_file, 'wb') as f:
+            f.write(content)
+        assert tool.create_backup(scenario_path, "engine")[0]
+        with open(save_file, 'wb') as f:
+            f.write(b"changed")
+        assert tool.restore_backup(scenario_path, "engine.bin")
+        with open(save_file, 'rb') as f:
+            assert f.read() == content, "还原内容错误"
+        stats = tool.copy_engine.snapshot()['methods']
+        assert sum(item['files'] for item in stats.values()) == 2, f"复制次数错误: {stats}"
+    
+    print("✓ 复制引擎测试通过")
+
+def test_backup_all():
+    """测试批量备份"""
+    print("测试批量备份...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=2, scenario_count=3)
+        tool = make_tool(temp_dir)
+        assert tool.scan_content()
+        scenarios = [scenario['path'] for _, _, scenario in tool.iter_scenarios()]
+        # 只有4个场景有存档
+        for i, scenario_path in enumerate(scenarios[:4]):
+            with open(os.path.join(scenario_path, "CurrentSave.bin"), 'wb') as f:
+                f.write(bytes([i]) * 1000)
+        
+        progress = []
+        result = tool.backup_all(workers=3, progress_callback=lambda *args: progress.append(args))
+        assert result['total'] == 4 and result['backed_up'] == 4, f"批量备份结果错误: {result}"
+        assert result['skipped'] == 0 and result['failed'] == 0 and result['bytes'] == 4000
+        assert len(progress) == 4 and sorted(p[0] for p in progress) == [1, 2, 3, 4]
+        backup_id = result['backup_name'][:-4]
+        for scenario_path in scenarios[:4]:
+            assert tool.list_backups(scenario_path) == [backup_id]
+        for scenario_path in scenarios[4:]:
+            assert tool.list_backups(scenario_path) == []
+        
+        # 没有变化的存档跳过，修改过的重新备份
+        save_file = os.path.join(scenarios[0], "CurrentSave.bin")
+        with open(save_file, 'wb') as f:
+            f.write(b"changed")
+        os.utime(save_file, ns=(5 * 10 ** 9, 5 * 10 ** 9))
+        result = tool.backup_all(backup_name="second")
+        assert result['backed_up'] == 1 and result['skipped'] == 3, f"未跳过未变化的存档: {result}"
+        assert len(tool.list_backups(scenarios[0])) == 2
+        
+        # 单个场景失败不影响其他场景，错误按场景记录
+        result = tool.backup_all(skip_unchanged=False, workers=2, backup_name="forced")
+        assert result['backed_up'] == 4
+        original_create = tool.create_backup
+        tool.create_backup = lambda path, name=None: (False, "磁盘已满") if path == scenarios[1] else original_create(path, name)
+        result = tool.backup_all(skip_unchanged=False, backup_name="partial")
+        assert result['failed'] == 1 and result['backed_up'] == 3
+        assert result['errors'] == {scenarios[1]: "磁盘已满"}
+        tool.create_backup = original_create
+        
+        # 取消后不再开始新的备份
+        cancel_event = threading.Event()
+        cancel_event.set()
+        result = tool.backup_all(skip_unchanged=False, cancel_event=cancel_event)
+        assert result['cancelled'] == 4 and result['backed_up'] == 0
+        
+        # 延迟模式下直接枚举文件系统，不加载路线的场景
+        lazy_tool = make_tool(temp_dir)
+        assert lazy_tool.scan_content(lazy=True)
+        result = lazy_tool.backup_all(skip_unchanged=False, backup_name="lazy")
+        assert result['backed_up'] == 4, f"延迟模式下批量备份结果错误: {result}"
+        assert all(route['scenarios'] is None for route in lazy_tool.routes_data.values()), "批量备份不应加载场景"
+    
+    print("✓ 批量备份测试通过")
+
+def test_snapshots():
+    """测试存档快照"""
+    print("测试存档快照...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=2, scenario_count=2)
+        tool = make_tool(temp_dir)
+        assert tool.scan_content()
+        scenarios = [scenario['path'] for _, _, scenario in tool.iter_scenarios()]
+        
+        def write_save(scenario_path, content, mtime):
+            save_file = os.path.join(scenario_path, "CurrentSave.bin")
+            with open(save_file, 'wb') as f:
+                f.write(content)
+            os.utime(save_file, ns=(mtime * 10 ** 9, mtime * 10 ** 9))
+        
+        def read_save(scenario_path):
+            with open(os.path.join(scenario_path, "CurrentSave.bin"), 'rb') as f:
+                return f.read()
+        
+        # 3个场景有存档，其中两个内容相同
+        write_save(scenarios[0], b"same" * 100, 1)
+        write_save(scenarios[1], b"same" * 100, 2)
+        write_save(scenarios[2], b"third" * 100, 3)
+        with open(os.path.join(scenarios[0], "CurrentSave.bin.MD5"), 'wb') as f:
+            f.write(b"md5-of-save-0")
+        
+        # 每个存档只读一遍：存入对象库时计算的哈希就是快照记录的哈希
+        def unexpected_hash(path):
+            raise AssertionError("快照不应单独计算存档哈希")
+        
+        hash_file = ObjectStore.hash_file
+        ObjectStore.hash_file = staticmethod(unexpected_hash)
+        try:
+            result = tool.create_snapshot("tuesday", workers=2)
+        finally:
+            ObjectStore.hash_file = hash_file
+        assert not result['error'] and not result['errors'], f"创建快照失败: {result}"
+        assert result['scenarios'] == 3 and result['stored'] == 3 and result['new_objects'] == 2
+        assert tool.create_snapshot("tuesday")['error'], "同名快照应创建失败"
+        assert tool.create_snapshot("bad/name")['error'], "无效名称应创建失败"
+        
+        # 未变化的存档直接引用上一个快照的对象
+        write_save(scenarios[2], b"changed" * 100, 4)
+        write_save(scenarios[3], b"new save" * 100, 5)
+        result = tool.create_snapshot("wednesday")
+        assert result['reused'] == 2 and result['stored'] == 2 and result['new_objects'] == 2, f"未复用未变化的存档: {result}"
+        assert [item['name'] for item in tool.list_snapshots()] == ["wednesday", "tuesday"], "快照应按创建时间倒序"
+        
+        keys = sorted(tool.load_snapshot("wednesday")["scenarios"])
+        difference = tool.compare_snapshots("tuesday", "wednesday")
+        assert difference['changed'] == [keys[2]] and difference['added'] == [keys[3]]
+        assert difference['removed'] == [] and difference['unchanged'] == 2
+        assert tool.compare_snapshots("wednesday")['unchanged'] == 4, "与当前存档比较错误"
+        assert tool.compare_snapshots("missing") is None
+        
+        # 整体还原：修改和删除的存档恢复，快照之后新增的存档不受影响
+        write_save(scenarios[0], b"played again", 9)
+        os.remove(os.path.join(scenarios[0], "CurrentSave.bin.MD5"))
+        os.remove(os.path.join(scenarios[2], "CurrentSave.bin"))
+        assert sorted(tool.compare_snapshots("tuesday")['changed']) == [keys[0]]
+        result = tool.restore_snapshot("tuesday", workers=3)
+        assert not result['error'] and result['failed'] == 0, f"还原快照失败: {result}"
+        assert result['restored'] == 2 and result['unchanged'] == 1, f"还原统计错误: {result}"
+        assert read_save(scenarios[0]) == b"same" * 100 and read_save(scenarios[2]) == b"third" * 100
+        assert read_save(scenarios[3]) == b"new save" * 100, "快照之后新增的存档不应被改动"
+        assert os.stat(os.path.join(scenarios[2], "CurrentSave.bin")).st_mtime_ns == 3 * 10 ** 9
+        with open(os.path.join(scenarios[0], "CurrentSave.bin.MD5"), 'rb') as f:
+            assert f.read() == b"md5-of-save-0", "MD5校验文件未还原"
+        assert tool.restore_snapshot("missing")['error']
+        
+        # 清理去重存储时保留快照引用的对象；删除快照后释放
+        store = tool.get_object_store()
+        assert tool.collect_backup_garbage()['removed'] == 0
+        assert store.stats()['objects'] == 4
+        assert tool.delete_snapshot("wednesday")
+        assert store.stats()['objects'] == 2, "删除快照后未释放只被它引用的对象"
+        assert not tool.delete_snapshot("wednesday")
+        result = tool.restore_snapshot("tuesday")
+        assert result['failed'] == 0
+        
+        # 写入快照清单失败或取消时释放已登记的引用，不留下快照
+        write_save(scenarios[1], b"changed again", 10)
+        refcounts = store._load_refcounts()
+        write_json_atomic = tool._write_json_atomic
+        
+        def fail_write(path, data):
+            raise OSError("磁盘已满")
+        
+        tool._write_json_atomic = fail_write
+        try:
+            result = tool.create_snapshot("failed")
+        finally:
+            tool._write_json_atomic = write_json_atomic
+        assert result['error'] and tool.load_snapshot("failed") is None
+        assert store._load_refcounts() == refcounts, "清单写入失败后引用未释放"
+        assert store.stats()['objects'] == 2, "未被引用的新对象应随引用释放删除"
+        cancel_event = threading.Event()
+        cancel_event.set()
+        result = tool.create_snapshot("cancelled", cancel_event=cancel_event)
+        assert result['cancelled'] and not result['error'] and tool.load_snapshot("cancelled") is None
+        assert store._load_refcounts() == refcounts
+        result = tool.restore_snapshot("tuesday", cancel_event=cancel_event)
+        assert result['cancelled'] == 3 and result['restored'] == 0, f"取消后不应还原: {result}"
+    
+    print("✓ 存档快照测试通过")
+
+def test_backup_manifest():
+    """测试备份清单"""
+    print("测试备份清单...")
+    
+    import hashlib
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=1, scenario_count=1)
+        tool = make_tool(temp_dir)
+        tool.profiler.enabled = True
+        assert tool.scan_content()
+        scenario_path = tool.routes_data['route-0000']['scenarios'][0]['path']
+        save_file = os.path.join(scenario_path, "CurrentSave.bin")
+        saves = os.path.join(scenario_path, "saves")
+        manifest_file = os.path.join(saves, TrainSimulatorBackupTool.BACKUP_MANIFEST_NAME)
+        
+        # 自定义名称的字母顺序与存档时间相反
+        for i, (name, mode) in enumerate((("zebra", "copy"), ("mango", "compressed"), ("apple", "dedup"))):
+            tool.config_manager.set_backup_mode(mode)
+            with open(save_file, 'wb') as f:
+                f.write(bytes([i]) * (1000 + i))
+            os.utime(save_file, ns=((i + 1) * 10 ** 9, (i + 1) * 10 ** 9))
+            if i == 0:
+                with open(os.path.join(scenario_path, "CurrentSave.bin.MD5"), 'w') as f:
+                    f.write("md5")
+            assert tool.create_backup(scenario_path, name)[0]
+        assert os.path.exists(manifest_file), "未生成备份清单"
+        
+        details = tool.list_backup_details(scenario_path)
+        assert [entry['name'] for entry in details] == ["apple", "mango", "zebra"], "应按存档时间排序"
+        zebra = details[2]
+        assert zebra['kind'] == "copy" and zebra['size'] == 1000 and zebra['mtime_ns'] == 10 ** 9
+        assert zebra['sha256'] == hashlib.sha256(b"\0" * 1000).hexdigest(), "完整复制备份的哈希错误"
+        assert zebra['md5'] and details[1]['md5'], "MD5校验文件状态错误"
+        assert details[0]['sha256'] == hashlib.sha256(b"\2" * 1002).hexdigest()
+        
+        # 清单有效时不再重建
+        tool.profiler.reset()
+        for _ in range(3):
+            assert tool.list_backups(scenario_path) == ["apple", "mango", "zebra"]
+        assert tool.profiler.counters.get("backup.manifest_hits") == 3
+        assert "backup.manifest_rebuilds" not in tool.profiler.counters
+        
+        # 删除备份时更新清单
+        assert tool.delete_backup(scenario_path, "mango.bin")
+        assert tool.list_backups(scenario_path) == ["apple", "zebra"]
+        assert "backup.manifest_rebuilds" not in tool.profiler.counters
+        
+        # 在工具之外复制进来的备份：目录修改时间变化，清单重建，已记录的哈希保留
+        time.sleep(0.01)
+        shutil.copy2(os.path.join(saves, "zebra.bin"), os.path.join(saves, "copied.bin"))
+        names = tool.list_backups(scenario_path)
+        assert tool.profiler.counters.get("backup.manifest_rebuilds") == 1
+        assert set(names) == {"apple", "zebra", "copied"}
+        rebuilt = {entry['name']: entry for entry in tool.list_backup_details(scenario_path)}
+        assert rebuilt['zebra']['sha256'] == zebra['sha256'] and rebuilt['copied']['sha256'] is None
+        
+        # 损坏的清单会被重建
+        with open(manifest_file, 'w') as f:
+            f.write("{broken")
+        assert set(tool.list_backups(scenario_path)) == {"apple", "zebra", "copied"}
+        assert tool.list_backups(os.path.join(temp_dir, "missing")) == []
+        
+        # 取得清单之后其他程序复制进来的备份不会被遗漏
+        snapshot = tool._manifest_backups(saves)
+        shutil.copy2(os.path.join(saves, "zebra.bin"), os.path.join(saves, "other.bin"))
+        tool._update_manifest(saves, snapshot, ["zebra"])
+        assert "other" in tool.list_backups(scenario_path), "清单遗漏了同时新建的备份"
+        
+        # 多个线程同时在一个场景中创建和删除备份
+        tool.config_manager.set_backup_mode("copy")
+        errors = []
+        
+        def create(n):
+            for k in range(5):
+                ok, error = tool.create_backup(scenario_path, f"thread-{n}-{k}")
+                if not ok:
+                    errors.append(error)
+            tool.delete_backup(scenario_path, f"thread-{n}-0.bin")
+        
+        threads = [threading.Thread(target=create, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, errors
+        listed = set(tool.list_backups(scenario_path))
+        assert {f"thread-{n}-{k}" for n in range(4) for k in range(1, 5)} <= listed
+        assert not any(f"thread-{n}-0" in listed for n in range(4))
+        os.remove(manifest_file)
+        assert set(tool.list_backups(scenario_path)) == listed, "清单与目录中的备份不一致"
+    
+    print("✓ 备份清单测试通过")
+
+def test_backup_catalog():
+    """测试备份目录数据库"""
+    print("测试备份目录数据库...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=2, scenario_count=2)
+        tool = make_tool(temp_dir)
+        assert tool.scan_content()
+        scenarios = [scenario['path'] for _, _, scenario in tool.iter_scenarios()]
+        
+        for i, scenario_path in enumerate(scenarios[:3]):
+            save_file = os.path.join(scenario_path, "CurrentSave.bin")
+            with open(save_file, 'wb') as f:
+                f.write(b"s" * (1000 * (i + 1)))
+            os.utime(save_file, ns=((i + 1) * 10 ** 9, (i + 1) * 10 ** 9))
+            assert tool.create_backup(scenario_path, f"backup-{i}")[0]
+        assert tool.create_backup(scenarios[0], "second")[0]
+        assert os.path.exists(os.path.join(temp_dir, TrainSimulatorBackupTool.CATALOG_FILE)), "数据库应与配置文件同目录"
+        
+        # 创建备份时更新数据库，按存档时间倒序
+        rows = tool.query_all_backups()
+        assert [row['name'] for row in rows] == ["backup-2", "backup-1", "second", "backup-0"], f"查询结果错误: {rows}"
+        assert len(rows) == 4 and rows[0]['route_name'] == "路线1" and rows[0]['scenario_name'] == "场景1-0"
+        assert rows[0]['size'] == 3000 and rows[0]['sha256'] is not None
+        assert [row['name'] for row in tool.query_all_backups("场景0-0")] == ["second", "backup-0"]
+        assert len(tool.query_all_backups(limit=2)) == 2
+        
+        usage = {row['route_name']: row for row in tool.backup_usage_by_route()}
+        assert usage["路线0"]['scenarios'] == 2 and usage["路线0"]['backups'] == 3
+        assert usage["路线1"]['size'] == 3000
+        totals = tool.get_backup_catalog().totals()
+        assert totals['backups'] == 4 and totals['scenarios'] == 3 and totals['newest_mtime_ns'] == 3 * 10 ** 9
+        
+        # 还原记录时间，删除后移除
+        assert tool.restore_backup(scenarios[1], "backup-1.bin")
+        restored = [row for row in tool.query_all_backups() if row['name'] == "backup-1"][0]
+        assert restored['last_restored'] is not None
+        assert tool.delete_backup(scenarios[0], "second.bin")
+        assert len(tool.query_all_backups()) == 3
+        
+        # 没有变化的saves目录不重新读取
+        assert tool.sync_backup_catalog()['updated'] == 0
+        
+        # 工具之外的变化在扫描时同步
+        time.sleep(0.01)
+        shutil.copy2(os.path.join(scenarios[1], "saves", "backup-1.bin"), os.path.join(scenarios[1], "saves", "copied.bin"))
+        shutil.rmtree(os.path.join(scenarios[2], "saves"))
+        assert tool.scan_content()
+        names = sorted(row['name'] for row in tool.query_all_backups())
+        assert names == ["backup-0", "backup-1", "copied"], f"扫描后未同步: {names}"
+        assert tool.get_backup_catalog().totals()['scenarios'] == 2
+        tool.get_backup_catalog().close()
+    
+    print("✓ 备份目录数据库测试通过")
+
+def test_retention():
+    """测试备份保留策略"""
+    print("测试备份保留策略...")
+    
+    from datetime import datetime
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=1, scenario_count=2)
+        tool = make_tool(temp_dir)
+        assert tool.scan_content()
+        scenario_a, scenario_b = [scenario['path'] for scenario in tool.routes_data['route-0000']['scenarios']]
+        
+        def add_backup(scenario_path, name, when, content):
+            save_file = os.path.join(scenario_path, "CurrentSave.bin")
+            with open(save_file, 'wb') as f:
+                f.write(content)
+            mtime_ns = int(when.timestamp()) * 10 ** 9
+            os.utime(save_file, ns=(mtime_ns, mtime_ns))
+            assert tool.create_backup(scenario_path, name)[0]
+        
+        # 场景A：一条增量备份链，b0最新
+        tool.config_manager.set_backup_mode("delta")
+        times = [datetime(2024, 1, 10, 12), datetime(2024, 1, 10, 11), datetime(2024, 1, 10, 10, 30),
+                 datetime(2024, 1, 9, 12), datetime(2024, 1, 9, 11), datetime(2024, 1, 8, 12), datetime(2024, 1, 2, 12)]
+        contents = {}
+        for i in reversed(range(len(times))):
+            contents[f"b{i}"] = bytes(range(256)) * 8 + bytes([i]) * 16
+            add_backup(scenario_a, f"b{i}", times[i], contents[f"b{i}"])
+        # 场景B：完整复制备份，比场景A的都旧
+        tool.config_manager.set_backup_mode("copy")
+        for i in range(3):
+            add_backup(scenario_b, f"old{i}", datetime(2023, 12, 30 - i), bytes([i]) * 2000)
+        
+        # 配置中的非法值使用默认值
+        tool.config_manager.config["retention"] = {"keep_last": "x", "keep_daily": 3, "workers": 0}
+        policy = tool.config_manager.get_retention_policy()
+        assert policy['keep_last'] == 0 and policy['keep_daily'] == 3 and policy['workers'] == 1
+        tool.config_manager.config["retention"] = {}
+        
+        # 没有任何规则时不删除
+        assert tool.plan_retention()['delete'] == 0
+        
+        # 数量规则：最新1个 + 最近3天各保留最新的一个
+        plan = tool.plan_retention({"keep_last": 1, "keep_daily": 3})
+        assert [entry['name'] for entry in plan['deletions'][scenario_a]] == ["b1", "b2", "b4", "b6"], \
+            f"要删除的备份错误: {plan['deletions']}"
+        assert scenario_b not in plan['deletions'], "场景B的3个备份在不同的3天，应全部保留"
+        assert plan['scenarios'] == 2 and plan['delete'] == 4 and plan['keep'] == 6
+        hourly = tool.plan_retention({"keep_hourly": 2})
+        assert [entry['name'] for entry in hourly['deletions'][scenario_a]] == ["b2", "b3", "b4", "b5", "b6"]
+        
+        # 预览不删除文件
+        result = tool.apply_retention({"keep_last": 1, "keep_daily": 3}, dry_run=True)
+        assert result['delete'] == 4 and result['deleted'] == 0 and len(tool.list_backups(scenario_a)) == 7
+        
+        # 空间上限：每个场景最新的备份总会保留，全局从最旧的开始删除
+        plan = tool.plan_retention({"max_scenario_bytes": 4500})
+        assert scenario_a not in plan['deletions'] and [e['name'] for e in plan['deletions'][scenario_b]] == ["old2"]
+        assert [e['name'] for e in tool.plan_retention({"max_scenario_bytes": 1})['deletions'][scenario_b]] == ["old1", "old2"]
+        total = plan['keep_bytes'] + plan['delete_bytes']
+        plan = tool.plan_retention({"max_total_bytes": total - 1})
+        assert list(plan['deletions']) == [scenario_b] and [e['name'] for e in plan['deletions'][scenario_b]] == ["old2"]
+        
+        # 执行清理：增量链中被删除的基准不影响保留的备份还原
+        progress = []
+        result = tool.apply_retention({"keep_last": 1, "keep_daily": 3}, workers=2,
+                                      progress_callback=lambda *args: progress.append(args))
+        assert result['deleted'] == 4 and result['failed'] == 0 and not result['errors'], f"清理失败: {result}"
+        assert result['deleted_bytes'] == result['delete_bytes']
+        assert progress == [(1, 1, 4)], f"进度回调错误: {progress}"
+        assert tool.list_backups(scenario_a) == ["b0", "b3", "b5"]
+        assert tool.list_backups(scenario_b) == ["old0", "old1", "old2"]
+        for name in ("b0", "b3", "b5"):
+            assert tool.restore_backup(scenario_a, name + ".bin")
+            with open(os.path.join(scenario_a, "CurrentSave.bin"), 'rb') as f:
+                assert f.read() == contents[name], f"{name} 还原内容错误"
+        assert sorted(row['name'] for row in tool.query_all_backups()) == ["b0", "b3", "b5", "old0", "old1", "old2"], "数据库未更新"
+        
+        # 取消后不再处理
+        cancel_event = threading.Event()
+        cancel_event.set()
+        result = tool.apply_retention({"keep_last": 1}, cancel_event=cancel_event)
+        assert result['deleted'] == 0 and result['cancelled'] == 4 and len(tool.list_backups(scenario_b)) == 3
+        tool.get_backup_catalog().close()
+    
+    print("✓ 备份保留策略测试通过")
+
+def test_auto_backup():
+    """测试自动备份"""
+    print("测试自动备份...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=2, scenario_count=2)
+        tool = make_tool(temp_dir)
+        scenarios = sorted(path for _, _, path in tool.iter_scenario_dirs())
+        
+        # 设置
+        settings = tool.config_manager.get_auto_backup()
+        assert not settings['enabled'] and settings['scenarios'] == []
+        assert tool.auto_backup_paths() == [path for _, _, path in tool.iter_scenario_dirs()], "未指定场景时应监视所有场景"
+        tool.config_manager.set_auto_backup(dict(settings, scenarios=["route-0001/scenario-0001-0000", "bad"]))
+        assert tool.config_manager.get_auto_backup()['scenarios'] == ["route-0001/scenario-0001-0000"]
+        assert tool.auto_backup_paths() == [scenarios[2]]
+        
+        now = [100.0]
+        service = AutoBackupService(tool, settle_seconds=5, min_interval=60, sweep_batch=1, clock=lambda: now[0])
+        service.set_scenarios(scenarios)
+        
+        def save(scenario_path, content, md5=True):
+            with open(os.path.join(scenario_path, "CurrentSave.bin"), 'wb') as f:
+                f.write(content)
+            if md5:
+                with open(os.path.join(scenario_path, "CurrentSave.bin.MD5"), 'w') as f:
+                    f.write(str(len(content)))
+        
+        def tick(seconds=1.0):
+            now[0] += seconds
+            return service.tick()
+        
+        # 开始监视时已有的存档不备份
+        save(scenarios[0], b"existing")
+        service.set_scenarios(scenarios)
+        assert tick() == [] and tick(10) == []
+        assert tool.list_backups(scenarios[0]) == []
+        
+        # 变化后等待稳定：通知的场景立即检查，稳定前不备份
+        save(scenarios[1], b"a" * 100)
+        service.notify([os.path.join(scenarios[1], "CurrentSave.bin")])
+        assert tick() == []
+        assert scenarios[1] in service.pending
+        save(scenarios[1], b"a" * 200)  # 仍在写入
+        assert tick(3) == [] and tick(3) == []
+        results = tick(3)
+        assert len(results) == 1 and results[0]['success'] and results[0]['bytes'] == 200, f"自动备份结果错误: {results}"
+        assert results[0]['backup_name'].startswith("Auto-")
+        assert tool.list_backups(scenarios[1]) == [results[0]['backup_name']]
+        
+        # 最短间隔内的再次保存在间隔到期后才备份，同名时加序号
+        save(scenarios[1], b"b" * 300)
+        service.notify([scenarios[1]])
+        assert tick() == [] and tick(10) == []
+        results = tick(60)
+        assert len(results) == 1 and results[0]['success'] and results[0]['bytes'] == 300
+        assert len(tool.list_backups(scenarios[1])) == 2
+        
+        # 没有通知时轮转检查也能发现变化（每次一个场景）
+        save(scenarios[3], b"c" * 50)
+        results = []
+        for _ in range(12):
+            results += tick()
+        assert [result['scenario_path'] for result in results] == [scenarios[3]], "轮转检查未发现变化"
+        
+        # 已手动备份的存档不再自动备份
+        save(scenarios[2], b"d" * 10)
+        assert tool.create_backup(scenarios[2], "manual")[0]
+        service.notify([scenarios[2]])
+        assert tick() == [] and tick(10) == []
+        assert tool.list_backups(scenarios[2]) == ["manual"]
+        
+        # 速率上限：额度用完后其余场景留到之后
+        limited = AutoBackupService(tool, settle_seconds=0, min_interval=0, max_bytes_per_second=1000,
+                                    clock=lambda: now[0])
+        limited.set_scenarios(scenarios)
+        limited.tick()
+        for path in scenarios:
+            save(path, os.urandom(600), md5=False)
+        now[0] += 1
+        first = limited.tick()
+        assert len(first) == 1, f"超出速率上限: {first}"
+        now[0] += 0.1
+        assert limited.tick() == [], "额度未恢复时不应备份"
+        done = len(first)
+        for _ in range(10):
+            now[0] += 2
+            done += len(limited.tick())
+        assert done == 4 and not limited.pending
+        
+        # 增量方式下自动备份与删除备份同时进行：新备份的基准不会被同时删除，所有备份都能还原
+        tool.config_manager.set_backup_mode("delta")
+        racing = AutoBackupService(tool, settle_seconds=0, min_interval=0, clock=lambda: now[0])
+        racing.set_scenarios([scenarios[0]])
+        base = os.urandom(64 * 1024)
+        stop = threading.Event()
+        
+        def delete_latest():
+            while not stop.is_set():
+                names = tool.list_backups(scenarios[0])
+                if len(names) > 1:
+                    tool.delete_backup(scenarios[0], names[0] + ".bin")
+        
+        deleter = threading.Thread(target=delete_latest)
+        deleter.start()
+        try:
+            for k in range(30):
+                save(scenarios[0], base + str(k).encode(), md5=False)
+                racing.notify([scenarios[0]])
+                now[0] += 1
+                racing.tick()
+        finally:
+            stop.set()
+            deleter.join()
+        backup_dir = os.path.join(scenarios[0], "saves")
+        for name in tool.list_backups(scenarios[0]):
+            # 基准丢失或内容不一致时抛出异常
+            tool._read_backup_data(backup_dir, name)
+        tool.get_backup_catalog().close()
+    
+    print("✓ 自动备份测试通过")
+
+def test_verify_backups():
+    """测试备份完整性校验"""
+    print("测试备份完整性校验...")
+    
+    import hashlib
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=2, scenario_count=1)
+        tool = make_tool(temp_dir)
+        tool.profiler.enabled = True
+        assert tool.scan_content()
+        scenario_path = tool.routes_data['route-0000']['scenarios'][0]['path']
+        save_file = os.path.join(scenario_path, "CurrentSave.bin")
+        saves = os.path.join(scenario_path, "saves")
+        
+        def save(content, md5=None):
+            with open(save_file, 'wb') as f:
+                f.write(content)
+            with open(save_file + ".MD5", 'w') as f:
+                f.write(md5 or hashlib.md5(content).hexdigest().upper())
+        
+        for i, mode in enumerate(("copy", "dedup", "compressed", "delta")):
+            tool.config_manager.set_backup_mode(mode)
+            save(bytes(range(256)) * 4096 + bytes([i]) * 100)
+            assert tool.create_backup(scenario_path, mode)[0]
+        
+        # 全部正常，大于块大小的文件分块计算
+        result = tool.verify_backups()
+        assert result['scenarios'] == 2 and result['checked'] == 5 and result['ok'] == 5, \
+            f"校验结果错误: {[(item['name'], item['status'], item['message']) for item in result['items']]}"
+        assert result['hashed_bytes'] > 4 * 1024 * 1024 and result['cached'] == 0
+        assert [item['name'] for item in result['items']][0] == "CurrentSave"
+        
+        # 未变化的文件使用缓存（增量备份除外）
+        result = tool.verify_backups([scenario_path])
+        assert result['ok'] == 5 and result['cached'] == 4, f"缓存未生效: {result}"
+        assert result['hashed_bytes'] == os.path.getsize(save_file), "只有增量备份需要重新计算"
+        assert os.path.exists(os.path.join(temp_dir, TrainSimulatorBackupTool.VERIFY_CACHE_FILE))
+        
+        # 位翻转但修改时间不变：缓存会掩盖，不使用缓存时可以发现
+        copy_file = os.path.join(saves, "copy.bin")
+        stat_result = os.stat(copy_file)
+        with open(copy_file, 'r+b') as f:
+            f.seek(1000)
+            byte = f.read(1)
+            f.seek(1000)
+            f.write(bytes([byte[0] ^ 1]))
+        os.utime(copy_file, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+        assert tool.verify_backups([scenario_path])['corrupt'] == 0
+        result = tool.verify_backups([scenario_path], use_cache=False)
+        statuses = {item['name']: item['status'] for item in result['items']}
+        assert statuses['copy'] == "corrupt" and statuses['dedup'] == "ok", f"未发现损坏: {statuses}"
+        
+        # 压缩数据损坏、去重对象丢失、MD5不一致和没有校验信息的备份
+        compressed_file = os.path.join(saves, "compressed.bin.cz")
+        with open(compressed_file, 'r+b') as f:
+            f.seek(-20, os.SEEK_END)
+            f.write(b"\0" * 10)
+        os.remove(tool.get_object_store().object_path(tool._read_reference(os.path.join(saves, "dedup.bin.ref"))["object"]))
+        save(b"current", md5="0" * 32)
+        time.sleep(0.01)
+        shutil.copy2(os.path.join(saves, "delta.bin.delta"), os.path.join(saves, "copied.bin"))
+        result = tool.verify_backups([scenario_path])
+        statuses = {item['name']: item['status'] for item in result['items']}
+        # 增量备份的基准是损坏的压缩备份，同样无法还原
+        assert statuses == {"CurrentSave": "md5_mismatch", "copy": "corrupt", "dedup": "error", "compressed": "corrupt",
+                            "delta": "corrupt", "copied": "unverified"}, f"校验结果错误: {statuses}"
+        assert result['corrupt'] == 3 and result['error'] == 1 and result['md5_mismatch'] == 1
+        
+        report = tool.format_verify_report(result)
+        assert "已损坏（3）" in report and "MD5不一致（1）" in report and "路线0 / 场景0-0 / 当前存档" in report
+        
+        # 按路线校验，进度回调
+        progress = []
+        result = tool.verify_backups(route_uuid="route-0001", progress_callback=lambda *args: progress.append(args))
+        assert result['scenarios'] == 1 and result['checked'] == 0 and progress == []
+        cancel_event = threading.Event()
+        cancel_event.set()
+        result = tool.verify_backups([scenario_path], cancel_event=cancel_event)
+        assert result['checked'] == 0 and result['cancelled'] == 6
+        tool.get_backup_catalog().close()
+    
+    print("✓ 备份完整性校验测试通过")
+
+def test_fast_compare():
+    """测试存档与备份的快速比较"""
+    print("测试存档与备份的快速比较...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        make_railworks_tree(temp_dir, route_count=1, scenario_count=1)
+        tool = make_tool(temp_dir)
+        tool.profiler.enabled = True
+        assert tool.scan_content()
+        scenario_path = tool.routes_data['route-0000']['scenarios'][0]['path']
+        save_file = os.path.join(scenario_path, "CurrentSave.bin")
+        md5_file = save_file + ".MD5"
+        saves = os.path.join(scenario_path, "saves")
+        content_a = os.urandom(3 * 1024 * 1024)
+        content_b = content_a[:-1] + bytes([content_a[-1] ^ 1])
+        mtime = [10 ** 9]
+        
+        def save(content, md5="md5"):
+            with open(save_file, 'wb') as f:
+                f.write(content)
+            with open(md5_file, 'w') as f:
+                f.write(md5)
+            mtime[0] += 10 ** 9
+            os.utime(save_file, ns=(mtime[0], mtime[0]))
+        
+        def counter(name):
+            return tool.profiler.counters.get(name, 0)
+        
+        assert tool.find_identical_backup(scenario_path) is None
+        save(content_a)
+        assert tool.create_backup(scenario_path, "a")[0]
+        save(b"short")
+        assert tool.create_backup(scenario_path, "short")[0]
+        
+        # 刚备份的存档：记录的修改时间和大小相同，直接比较哈希
+        save(content_a)
+        os.utime(save_file, ns=(os.stat(os.path.join(saves, "a.bin")).st_mtime_ns,) * 2)
+        tool.profiler.reset()
+        assert tool.find_identical_backup(scenario_path) == "a"
+        assert counter("compare.hash") == 1 and counter("compare.mmap") == 0
+        assert counter("compare.size_rejected") == 1, "大小不同的备份应直接排除"
+        
+        # 大小相同、只有最后一个字节不同
+        save(content_b)
+        assert tool.find_identical_backup(scenario_path) is None
+        assert not tool.save_unchanged_since_backup(scenario_path)
+        
+        # 内容相同但修改时间不同：逐字节比较，之后使用缓存的哈希
+        save(content_a)
+        tool.profiler.reset()
+        assert tool.find_identical_backup(scenario_path) == "a"
+        assert counter("compare.mmap") == 1
+        assert tool.find_identical_backup(scenario_path) == "a"
+        assert counter("compare.mmap") == 1 and counter("compare.hash") == 1, "第二次比较应使用缓存的哈希"
+        assert tool.save_unchanged_since_backup(scenario_path)
+        
+        # 相同内容的备份可以创建为硬链接，哈希沿用原备份
+        assert tool.create_backup(scenario_path, "linked", link_to="a")[0]
+        assert os.path.samefile(os.path.join(saves, "linked.bin"), os.path.join(saves, "a.bin"))
+        details = {entry['name']: entry for entry in tool.list_backup_details(scenario_path)}
+        assert details['linked']['sha256'] == details['a']['sha256'] and counter("backup.linked") == 1
+        assert os.path.exists(os.path.join(saves, "linked.bin.MD5"))
+        # 存档已变化时不链接，正常写入
+        save(content_b)
+        assert tool.create_backup(scenario_path, "b", link_to="a")[0]
+        assert not os.path.samefile(os.path.join(saves, "b.bin"), os.path.join(saves, "a.bin"))
+        assert counter("backup.linked") == 1
+        
+        # 压缩备份计算存档哈希比较
+        tool.config_manager.set_backup_mode("compressed")
+        save(content_a + b"c")
+        assert tool.create_backup(scenario_path, "c")[0]
+        save(content_a + b"c")
+        tool.profiler.reset()
+        assert tool.find_identical_backup(scenario_path) == "c" and counter("compare.hashed") == 1
+        
+        # 还原：内容相同时不重写存档，只还原不同的MD5校验文件
+        save(content_a, md5="other")
+        before = os.stat(save_file).st_mtime_ns
+        assert tool.restore_backup(scenario_path, "a.bin")
+        assert counter("backup.restore_skipped") == 1
+        assert os.stat(save_file).st_mtime_ns == before, "内容相同时不应重写存档"
+        with open(md5_file) as f:
+            assert f.read() == "md5", "MD5校验文件未还原"
+        assert tool.restore_backup(scenario_path, "b.bin")
+        assert counter("backup.restore_skipped") == 1
+        with open(save_file, 'rb') as f:
+            assert f.read() == content_b
+        
+        # 批量备份按内容跳过没有变化的存档
+        save(content_b)
+        result = tool.backup_all()
+        assert result['skipped'] == 1 and result['backed_up'] == 0, f"内容未变化的存档应跳过: {result}"
+        
+        # 完整复制备份被直接改写（目录修改时间不变，清单不会重建）：不再使用清单中记录的哈希
+        recorded = {entry['name']: entry for entry in tool.list_backup_details(scenario_path)}['a']['mtime_ns']
+        with open(os.path.join(saves, "a.bin"), 'r+b') as f:
+            f.write(bytes([content_a[0] ^ 1]))
+        save(content_a)
+        os.utime(save_file, ns=(recorded, recorded))
+        assert tool.find_identical_backup(scenario_path, "a") is None, "改写过的完整复制备份不应按记录的哈希判断相同"
+        
+        # 清单中记录的哈希与备份内容不符时，还原前仍逐字节确认，不会跳过写入
+        save(content_a + b"d")
+        manifest_file = os.path.join(saves, "backups.manifest.json")
+        with open(manifest_file, 'r+', encoding='utf-8') as f:
+            manifest = json.load(f)
+            manifest["backups"]["c"]["sha256"] = hashlib.sha256(content_a + b"d").hexdigest()
+            f.seek(0)
+            f.truncate()
+            json.dump(manifest, f)
+        tool.profiler.reset()
+        assert tool.restore_backup(scenario_path, "c.bin")
+        assert counter("backup.restore_skipped") == 0 and counter("compare.stream") == 1
+        with open(save_file, 'rb') as f:
+            assert f.read() == content_a + b"c", "清单哈希过期时还原被错误跳过"
+        tool.get_backup_catalog().close()
+    
+    print("✓ 存档与备份的快速比较测试通过")
+
+def test_backup_archive():
+    """测试备份的导出和导入"""
+    print("测试备份的导出和导入...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "source")
+        make_railworks_tree(source_dir, route_count=1, scenario_count=2)
+        tool = make_tool(source_dir)
+        assert tool.scan_content()
+        scenarios = [scenario['path'] for scenario in tool.routes_data['route-0000']['scenarios']]
+        base = os.urandom(256 * 1024)
+        contents = {}
+        
+        def backup(scenario_path, name, content, mode):
+            tool.config_manager.set_backup_mode(mode)
+            with open(os.path.join(scenario_path, "CurrentSave.bin"), 'wb') as f:
+                f.write(content)
+            with open(os.path.join(scenario_path, "CurrentSave.bin.MD5"), 'w') as f:
+                f.write(name)
+            assert tool.create_backup(scenario_path, name)[0], f"创建备份 {name} 失败"
+            contents[(os.path.basename(scenario_path), name)] = content
+        
+        backup(scenarios[0], "a", base, "copy")
+        backup(scenarios[0], "b", base + b"b", "dedup")
+        backup(scenarios[0], "c", base + b"c", "compressed")
+        backup(scenarios[0], "d1", base + b"d1", "delta")
+        backup(scenarios[0], "d2", base + b"d2", "delta")
+        assert tool._resolve_in_dir(os.path.join(scenarios[0], "saves"), "d2")[0] == "delta"
+        backup(scenarios[1], "x", os.urandom(1024), "copy")
+        
+        # 导出全部备份
+        archive = os.path.join(temp_dir, "backups.tar")
+        result = tool.export_backups(archive)
+        assert result['completed'] and not result['errors'] and not result['error'], f"导出失败: {result}"
+        assert result['scenarios'] == 2 and result['backups'] == 6 and result['throughput'] > 0
+        assert os.path.exists(archive) and not os.path.exists(archive + ".part")
+        with tarfile.open(archive) as tar:
+            names = tar.getnames()
+            manifest = json.load(tar.extractfile(names[0]))
+        assert names[0] == "manifest.json" and len(names) == result['files'] + 1
+        assert "backups/route-0000/scenario-0000-0000/b.bin" in names, "去重备份应导出为完整复制"
+        assert "backups/route-0000/scenario-0000-0000/c.bin.MD5" not in names, "压缩备份的MD5已包含在容器中"
+        assert manifest["scenarios"]["route-0000/scenario-0000-0001"]["scenario_name"] == "场景0-1"
+        
+        # 只导出增量备份时一并导出它的基准
+        partial = os.path.join(temp_dir, "partial.tar")
+        result = tool.export_backups(partial, {scenarios[0]: ["d2.bin"]})
+        with tarfile.open(partial) as tar:
+            exported = [backup["name"] for backup in json.load(tar.extractfile("manifest.json"))["scenarios"]
+                        ["route-0000/scenario-0000-0000"]["backups"]]
+        assert result['completed'] and exported == ["c", "d1", "d2"], f"基准应排在增量备份之前: {exported}"
+        
+        # 取消后继续导出：截掉写了一半的文件，结果与一次导出的相同
+        resumed = os.path.join(temp_dir, "resumed.tar")
+        cancel_event = threading.Event()
+        result = tool.export_backups(resumed, progress_callback=lambda done, total: cancel_event.set(),
+                                     cancel_event=cancel_event)
+        assert not result['completed'] and result['files'] == 1 and os.path.exists(resumed + ".part")
+        with open(resumed + ".part", 'ab') as f:
+            f.write(b"\0" * 700)
+        result = tool.export_backups(resumed)
+        assert result['completed'] and result['resumed'] == 1 and result['files'] == len(names) - 2, f"继续导出失败: {result}"
+        with tarfile.open(resumed) as tar:
+            assert tar.getnames() == names
+        
+        # 写入文件的中途出错时停止导出并保留未完成的归档，继续导出后结果完整
+        failing = os.path.join(temp_dir, "failing.tar")
+        copyfileobj = tarfile.copyfileobj
+        
+        calls = []
+        
+        def fail_halfway(src, dst, length=None, *args, **kwargs):
+            calls.append(length)
+            if len(calls) == 1:  # 清单正常写入
+                return copyfileobj(src, dst, length, *args, **kwargs)
+            dst.write(src.read(length // 2))
+            raise OSError("磁盘已满")
+        
+        tarfile.copyfileobj = fail_halfway
+        try:
+            result = tool.export_backups(failing)
+        finally:
+            tarfile.copyfileobj = copyfileobj
+        assert result['error'] and not result['completed'] and len(result['errors']) == 1, f"写入出错后应停止导出: {result}"
+        assert not os.path.exists(failing) and os.path.exists(failing + ".part")
+        result = tool.export_backups(failing)
+        assert result['completed'] and result['resumed'] == 0 and not result['errors'], f"继续导出失败: {result}"
+        with tarfile.open(failing) as tar, tarfile.open(archive) as expected:
+            assert tar.getnames() == names
+            for name in names[1:]:
+                assert tar.extractfile(name).read() == expected.extractfile(name).read(), f"{name} 内容错误"
+        
+        # 导入到另一台机器：路线目录不同的场景按场景UUID对应
+        target_dir = os.path.join(temp_dir, "target")
+        make_railworks_tree(target_dir, route_count=1, scenario_count=2)
+        os.rename(os.path.join(target_dir, "Content", "Routes", "route-0000", "Scenarios", "scenario-0000-0001"),
+                  os.path.join(temp_dir, "moved"))
+        moved_route = os.path.join(target_dir, "Content", "Routes", "route-0001", "Scenarios")
+        os.makedirs(moved_route)
+        shutil.move(os.path.join(temp_dir, "moved"), os.path.join(moved_route, "scenario-0000-0001"))
+        shutil.copy(os.path.join(target_dir, "Content", "Routes", "route-0000", "RouteProperties.xml"),
+                    os.path.join(target_dir, "Content", "Routes", "route-0001"))
+        target = make_tool(target_dir)
+        assert target.scan_content()
+        result = target.import_backups(archive)
+        assert not result['error'] and not result['errors'], f"导入失败: {result}"
+        assert result['scenarios'] == 2 and result['imported'] == 6 and result['throughput'] > 0
+        assert result['remapped'] == {"route-0000/scenario-0000-0001": "route-0001/scenario-0000-0001"}
+        for (scenario_uuid, name), content in contents.items():
+            route = "route-0001" if scenario_uuid == "scenario-0000-0001" else "route-0000"
+            backup_dir = os.path.join(target_dir, "Content", "Routes", route, "Scenarios", scenario_uuid, "saves")
+            assert target._read_backup_data(backup_dir, name) == content, f"导入的备份 {name} 内容不正确"
+        verify = target.verify_backups()
+        assert verify['ok'] == 6 and verify['checked'] == 6, f"导入的备份校验失败: {verify}"
+        assert target.get_backup_catalog().totals()['backups'] == 6
+        
+        # 重新导入时跳过已有的备份，只补充缺少的文件
+        md5_path = os.path.join(target_dir, "Content", "Routes", "route-0000", "Scenarios", "scenario-0000-0000",
+                                "saves", "a.bin.MD5")
+        os.remove(md5_path)
+        result = target.import_backups(archive)
+        assert result['imported'] == 0 and result['present'] == 6 and result['files'] == 1
+        with open(md5_path) as f:
+            assert f.read() == "a"
+        
+        # 同名但内容不同的备份作为冲突跳过，以它为基准的增量备份也跳过
+        conflict_dir = os.path.join(temp_dir, "conflict")
+        make_railworks_tree(conflict_dir, route_count=1, scenario_count=2)
+        conflict = make_tool(conflict_dir)
+        assert conflict.scan_content()
+        conflict_path = conflict.routes_data['route-0000']['scenarios'][0]['path']
+        with open(os.path.join(conflict_path, "CurrentSave.bin"), 'wb') as f:
+            f.write(b"other")
+        assert conflict.create_backup(conflict_path, "d1")[0]
+        result = conflict.import_backups(archive)
+        assert sorted(result['conflicts']) == ["route-0000/scenario-0000-0000/d1", "route-0000/scenario-0000-0000/d2"]
+        assert result['imported'] == 4 and sorted(conflict.list_backups(conflict_path)) == ["a", "b", "c", "d1"]
+        
+        # 归档中的文件损坏时不写入，以它为基准的增量备份无法还原校验，同样不写入
+        with open(archive, 'rb') as f:
+            data = bytearray(f.read())
+        offset = data.index(base[:64])
+        data[offset] ^= 0xFF
+        broken = os.path.join(temp_dir, "broken.tar")
+        with open(broken, 'wb') as f:
+            f.write(data)
+        empty_dir = os.path.join(temp_dir, "empty")
+        make_railworks_tree(empty_dir, route_count=1, scenario_count=2)
+        empty = make_tool(empty_dir)
+        assert empty.scan_content()
+        result = empty.import_backups(broken)
+        assert result['failed'] == 3 and result['imported'] == 3, f"损坏的文件不应导入: {result}"
+        assert sorted(empty.list_backups(empty.routes_data['route-0000']['scenarios'][0]['path'])) == ["a", "b"]
+        assert empty.import_backups(os.path.join(temp_dir, "missing.tar"))['error']
+        
+        # 损坏的增量备份用先导入的基准还原后校验，不一致时不写入
+        with tarfile.open(partial) as tar:
+            member = tar.getmember("backups/route-0000/scenario-0000-0000/d2.bin.delta")
+        with open(partial, 'rb') as f:
+            data = bytearray(f.read())
+        data[member.offset_data + member.size - 1] ^= 0xFF
+        with open(broken, 'wb') as f:
+            f.write(data)
+        delta_dir = os.path.join(temp_dir, "delta")
+        make_railworks_tree(delta_dir, route_count=1, scenario_count=1)
+        delta = make_tool(delta_dir)
+        assert delta.scan_content()
+        result = delta.import_backups(broken)
+        assert result['imported'] == 2 and result['failed'] == 1, f"损坏的增量备份不应导入: {result}"
+        assert sorted(delta.list_backups(delta.routes_data['route-0000']['scenarios'][0]['path'])) == ["c", "d1"]
+        
+        for each in (tool, target, conflict, empty, delta):
+            each.get_backup_catalog().close()
+    
+    print("✓ 备份的导出和导入测试通过")
+
+def test_backup_mirror():
+    """测试备份镜像的增量同步和还原"""
+    print("测试备份镜像的增量同步和还原...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        railworks_dir = os.path.join(temp_dir, "RailWorks")
+        make_railworks_tree(railworks_dir, route_count=1, scenario_count=2)
+        tool = make_tool(railworks_dir)
+        assert tool.scan_content()
+        scenarios = [scenario['path'] for scenario in tool.routes_data['route-0000']['scenarios']]
+        contents = {}
+        
+        def backup(scenario_path, name, content, mode):
+            tool.config_manager.set_backup_mode(mode)
+            with open(os.path.join(scenario_path, "CurrentSave.bin"), 'wb') as f:
+                f.write(content)
+            with open(os.path.join(scenario_path, "CurrentSave.bin.MD5"), 'w') as f:
+                f.write(name)
+            assert tool.create_backup(scenario_path, name)[0], f"创建备份 {name} 失败"
+            contents[(scenario_path, name)] = content
+        
+        base = os.urandom(128 * 1024)
+        backup(scenarios[0], "a", base, "copy")
+        backup(scenarios[0], "b", base + b"b", "dedup")
+        backup(scenarios[1], "c", base + b"c", "compressed")
+        backup(scenarios[1], "d1", base + b"d1", "delta")
+        backup(scenarios[1], "d2", base + b"d2", "delta")
+        
+        assert tool.sync_mirror()['error'] == "未设置镜像目录"
+        assert tool.sync_mirror(os.path.join(railworks_dir, "mirror"))['error'], "镜像目录不能位于RailWorks目录中"
+        mirror = os.path.join(temp_dir, "mirror")
+        tool.config_manager.set_mirror_path(mirror)
+        
+        # 首次同步复制所有文件，去重备份镜像为完整复制
+        result = tool.sync_mirror()
+        assert not result['error'] and not result['errors'], f"同步失败: {result}"
+        files = result['files']
+        assert result['scenarios'] == 2 and result['copied'] == files == 9 and result['throughput'] > 0
+        mirrored = os.path.join(mirror, "route-0000", "scenario-0000-0000")
+        with open(os.path.join(mirrored, "b.bin"), 'rb') as f:
+            assert f.read() == base + b"b"
+        
+        # 再次同步时没有变化的文件不复制
+        result = tool.sync_mirror()
+        assert result['copied'] == 0 and result['unchanged'] == files
+        
+        # 只复制新的备份
+        backup(scenarios[0], "e", base + b"e", "copy")
+        result = tool.sync_mirror()
+        assert result['copied'] == 2 and result['unchanged'] == files
+        
+        # 只有修改时间变化时按哈希判断，镜像中丢失的文件重新复制
+        os.utime(os.path.join(scenarios[0], "saves", "a.bin"), ns=(10 ** 18, 10 ** 18))
+        os.remove(os.path.join(mirrored, "a.bin.MD5"))
+        result = tool.sync_mirror()
+        assert result['copied'] == 1 and result['unchanged'] == files + 1, f"增量同步不正确: {result}"
+        assert os.stat(os.path.join(mirrored, "a.bin")).st_mtime_ns == 10 ** 18
+        
+        # 本机删除的备份保留在镜像中
+        assert tool.delete_backup(scenarios[0], "a.bin")
+        result = tool.sync_mirror()
+        assert result['copied'] == 0 and os.path.exists(os.path.join(mirrored, "a.bin"))
+        with open(os.path.join(mirror, "mirror.log"), encoding='utf-8') as f:
+            log = f.read()
+        assert log.count(" 复制 ") == files + 3 and log.count("同步完成") == 5
+        
+        listed = {item['key']: item for item in tool.list_mirror_scenarios()}
+        assert listed["route-0000/scenario-0000-0000"]['backups'] == 3
+        assert listed["route-0000/scenario-0000-0001"]['scenario_name'] == "场景0-1"
+        
+        # 游戏目录中的备份全部丢失后从镜像还原
+        for scenario_path in scenarios:
+            shutil.rmtree(os.path.join(scenario_path, "saves"))
+        shutil.rmtree(os.path.join(railworks_dir, "SaveBackupStore"))
+        result = tool.restore_from_mirror(["route-0000/scenario-0000-0001"])
+        assert result['scenarios'] == 1 and result['restored'] == 3 and not result['errors'], f"还原失败: {result}"
+        result = tool.restore_from_mirror()
+        assert result['restored'] == 3 and result['present'] == 3 and not result['unmatched']
+        for (scenario_path, name), content in contents.items():
+            assert tool._read_backup_data(os.path.join(scenario_path, "saves"), name) == content, f"备份 {name} 内容不正确"
+        verify = tool.verify_backups()
+        assert verify['checked'] == verify['ok'] + 2, f"还原的备份校验失败: {verify}"
+        assert tool.get_backup_catalog().totals()['backups'] == 6
+        result = tool.restore_from_mirror()
+        assert result['restored'] == 0 and result['present'] == 6 and result['copied'] == 0
+        tool.get_backup_catalog().close()
+    
+    print("✓ 备份镜像的增量同步和还原测试通过")
+
 def run_all_tests():
     """运行所有测试"""
     print("Train Simulator Classic 存档备份管理工具 - 测试套件")
@@ -164,7 +1942,31 @@ def run_all_tests():
         test_config_manager,
         test_xml_parser,
         test_file_operations,
-        test_main_tool
+        test_main_tool,
+        test_scan_index,
+        test_parallel_scan,
+        test_streaming_xml_parser,
+        test_scan_batches_and_cancel,
+        test_lazy_scan,
+        test_incremental_refresh,
+        test_language_switch,
+        test_benchmark_suite,
+        test_profiler,
+        test_archive_scan,
+        test_dedup_backup,
+        test_compressed_backup,
+        test_delta_backup,
+        test_copy_engine,
+        test_backup_all,
+        test_snapshots,
+        test_backup_manifest,
+        test_backup_catalog,
+        test_retention,
+        test_auto_backup,
+        test_verify_backups,
+        test_fast_compare,
+        test_backup_archive,
+        test_backup_mirror
     ]
     
     passed = 0
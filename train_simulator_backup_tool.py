@@ -3,22 +3,51 @@
 
 import os
 import sys
+import errno
 import shutil
 import json
 import re
+import functools
+import hashlib
+import io
+import tarfile
+import zipfile
+import zlib
+import lzma
+import struct
+import mmap
+import sqlite3
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 import xml.etree.ElementTree as ET
 
+# reflink复制需要fcntl.ioctl，Windows上没有fcntl
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# zstd压缩为可选功能，未安装zstandard时只能使用zlib/lzma
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 # 尝试导入PyQt5，如果没有则尝试PyQt6，最后尝试GTK
 try:
     from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                                 QHBoxLayout, QTreeWidget, QTreeWidgetItem, QLabel,
                                 QPushButton, QListWidget, QListWidgetItem, QMessageBox,
                                 QFileDialog, QLineEdit, QFormLayout, QDialog, QDialogButtonBox,
-                                QGroupBox, QTextEdit, QSplitter)
-    from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
+                                QGroupBox, QTextEdit, QSplitter, QProgressBar, QInputDialog, QSpinBox)
+    from PyQt5.QtCore import Qt, QTimer, QThread, QObject, QFileSystemWatcher, pyqtSignal
     from PyQt5.QtGui import QIcon, QFont
     PYQT_VERSION = 5
 except ImportError:
@@ -27,8 +56,8 @@ except ImportError:
                                     QHBoxLayout, QTreeWidget, QTreeWidgetItem, QLabel,
                                     QPushButton, QListWidget, QListWidgetItem, QMessageBox,
                                     QFileDialog, QLineEdit, QFormLayout, QDialog, QDialogButtonBox,
-                                    QGroupBox, QTextEdit, QSplitter)
-        from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal
+                                    QGroupBox, QTextEdit, QSplitter, QProgressBar, QInputDialog, QSpinBox)
+        from PyQt6.QtCore import Qt, QTimer, QThread, QObject, QFileSystemWatcher, pyqtSignal
         from PyQt6.QtGui import QIcon, QFont
         PYQT_VERSION = 6
     except ImportError:
@@ -52,6 +81,26 @@ except ImportError:
 class ConfigManager:
     """配置文件管理器"""
     
+    # 备份保留策略，各项为0表示不使用该规则
+    RETENTION_DEFAULTS = {
+        "keep_last": 0,
+        "keep_hourly": 0,
+        "keep_daily": 0,
+        "keep_weekly": 0,
+        "max_scenario_bytes": 0,
+        "max_total_bytes": 0,
+        "workers": 2
+    }
+    
+    # 自动备份设置，scenarios为空时监视所有场景
+    AUTO_BACKUP_DEFAULTS = {
+        "enabled": False,
+        "scenarios": [],
+        "settle_seconds": 5,
+        "min_interval_seconds": 600,
+        "max_bytes_per_second": 0
+    }
+    
     def __init__(self, config_file: str = "train_simulator_backup_config.json"):
         self.config_file = config_file
         self.config = self._load_config()
@@ -62,7 +111,21 @@ class ConfigManager:
             "railworks_path": "",
             "language": "zh",
             "window_geometry": {"width": 1200, "height": 800},
-            "last_scan_time": ""
+            "last_scan_time": "",
+            "scan_mode": "thread",
+            "scan_workers": 0,
+            "lazy_scenarios": False,
+            "watcher_mode": "auto",
+            "profiling": False,
+            "backup_mode": "copy",
+            "compression": "zlib",
+            "delta_keyframe_interval": 10,
+            "backup_workers": 4,
+            "verify_workers": 4,
+            "mirror_path": "",
+            "mirror_workers": 4,
+            "retention": dict(self.RETENTION_DEFAULTS),
+            "auto_backup": dict(self.AUTO_BACKUP_DEFAULTS)
         }
         
         if os.path.exists(self.config_file):
@@ -106,6 +169,444 @@ class ConfigManager:
         self.config["language"] = language
         self.save_config()
 
+    def get_scan_mode(self) -> str:
+        """获取扫描模式：serial（串行）、thread（线程池）或 process（进程池解析XML）"""
+        mode = self.config.get("scan_mode", "thread")
+        return mode if mode in ("serial", "thread", "process") else "thread"
+    
+    def get_scan_workers(self) -> int:
+        """获取扫描线程/进程数，0表示自动"""
+        try:
+            return max(0, int(self.config.get("scan_workers", 0)))
+        except (TypeError, ValueError):
+            return 0
+    
+    def get_lazy_scenarios(self) -> bool:
+        """获取是否延迟加载场景（只在展开路线时扫描其场景）"""
+        return bool(self.config.get("lazy_scenarios", False))
+    
+    def get_watcher_mode(self) -> str:
+        """获取文件监视模式：auto（系统文件监视，不可用时轮询）、poll（仅轮询）或 off（关闭）"""
+        mode = self.config.get("watcher_mode", "auto")
+        return mode if mode in ("auto", "poll", "off") else "auto"
+    
+    def get_profiling(self) -> bool:
+        """获取是否启用性能统计"""
+        return bool(self.config.get("profiling", False))
+    
+    def set_profiling(self, enabled: bool):
+        """设置是否启用性能统计"""
+        self.config["profiling"] = enabled
+        self.save_config()
+    
+    def get_backup_mode(self) -> str:
+        """获取备份方式：copy（完整复制）、dedup（去重存储）、compressed（压缩）或 delta（增量）"""
+        mode = self.config.get("backup_mode", "copy")
+        return mode if mode in ("copy", "dedup", "compressed", "delta") else "copy"
+    
+    def set_backup_mode(self, mode: str):
+        """设置备份方式"""
+        self.config["backup_mode"] = mode
+        self.save_config()
+    
+    def get_delta_keyframe_interval(self) -> int:
+        """获取增量备份的完整备份间隔：每N个备份写一个完整备份，增量链最长N-1"""
+        try:
+            return max(1, int(self.config.get("delta_keyframe_interval", 10)))
+        except (TypeError, ValueError):
+            return 10
+    
+    def get_backup_workers(self) -> int:
+        """获取批量备份的并发数，至少为1"""
+        try:
+            return max(1, int(self.config.get("backup_workers", 4)))
+        except (TypeError, ValueError):
+            return 4
+    
+    def get_verify_workers(self) -> int:
+        """获取校验备份时并发计算哈希的线程数，至少为1"""
+        try:
+            return max(1, int(self.config.get("verify_workers", 4)))
+        except (TypeError, ValueError):
+            return 4
+    
+    def get_mirror_path(self) -> str:
+        """获取备份镜像目录（RailWorks目录之外），未设置时为空"""
+        return self.config.get("mirror_path", "")
+    
+    def set_mirror_path(self, path: str):
+        """设置备份镜像目录"""
+        self.config["mirror_path"] = path
+        self.save_config()
+    
+    def get_mirror_workers(self) -> int:
+        """获取同步镜像时并发复制的文件数，至少为1"""
+        try:
+            return max(1, int(self.config.get("mirror_workers", 4)))
+        except (TypeError, ValueError):
+            return 4
+    
+    def get_retention_policy(self) -> Dict:
+        """获取备份保留策略
+        keep_last: 保留最新的N个备份
+        keep_hourly/keep_daily/keep_weekly: 最近N个有备份的小时/天/周各保留其中最新的备份
+        max_scenario_bytes/max_total_bytes: 每个场景/所有场景的备份占用空间上限
+        workers: 清理时并发处理的场景数，至少为1
+        """
+        policy = dict(self.RETENTION_DEFAULTS)
+        configured = self.config.get("retention")
+        if isinstance(configured, dict):
+            for key in policy:
+                try:
+                    policy[key] = max(0, int(configured.get(key, policy[key])))
+                except (TypeError, ValueError):
+                    pass
+        policy["workers"] = max(1, policy["workers"])
+        return policy
+    
+    def set_retention_policy(self, policy: Dict):
+        """设置备份保留策略（只保存已知的项）"""
+        self.config["retention"] = {key: policy.get(key, value) for key, value in self.RETENTION_DEFAULTS.items()}
+        self.save_config()
+    
+    def get_auto_backup(self) -> Dict:
+        """获取自动备份设置
+        enabled: 是否启用
+        scenarios: 监视的场景（"路线UUID/场景UUID"），为空时监视所有场景
+        settle_seconds: 存档和校验文件都多少秒不再变化后才备份
+        min_interval_seconds: 同一场景两次自动备份的最短间隔
+        max_bytes_per_second: 所有自动备份合计的读写速率上限，0表示不限制
+        """
+        settings = dict(self.AUTO_BACKUP_DEFAULTS)
+        configured = self.config.get("auto_backup")
+        if isinstance(configured, dict):
+            settings["enabled"] = bool(configured.get("enabled", False))
+            scenarios = configured.get("scenarios", [])
+            if isinstance(scenarios, list):
+                settings["scenarios"] = [key for key in scenarios if isinstance(key, str) and key.count("/") == 1]
+            for key in ("settle_seconds", "min_interval_seconds", "max_bytes_per_second"):
+                try:
+                    settings[key] = max(0, int(configured.get(key, settings[key])))
+                except (TypeError, ValueError):
+                    pass
+        return settings
+    
+    def set_auto_backup(self, settings: Dict):
+        """设置自动备份（只保存已知的项）"""
+        self.config["auto_backup"] = {key: settings.get(key, value) for key, value in self.AUTO_BACKUP_DEFAULTS.items()}
+        self.save_config()
+    
+    def get_compression(self) -> str:
+        """获取压缩备份使用的算法：zlib、lzma或zstd（未安装zstandard时使用zlib）"""
+        codec = self.config.get("compression", "zlib")
+        return codec if codec in BackupContainer.available_codecs() else "zlib"
+    
+    def set_compression(self, codec: str):
+        """设置压缩算法"""
+        self.config["compression"] = codec
+        self.save_config()
+    
+    def get_data_path(self, filename: str) -> str:
+        """获取与配置文件同目录的数据文件路径"""
+        config_dir = os.path.dirname(os.path.abspath(self.config_file))
+        return os.path.join(config_dir, filename)
+
+
+class ScanIndex:
+    """扫描索引，持久化保存路线/场景的多语言名称表，按目录和XML的mtime/size判断是否需要重新解析
+
+    后台扫描线程和界面线程（延迟加载路线、刷新单个路线）都会修改和保存索引，修改和保存由锁保护。
+    """
+
+    VERSION = 2
+
+    def __init__(self, index_file: str):
+        self.index_file = index_file
+        self.data = self._empty("")
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _empty(railworks_path: str) -> Dict:
+        """生成空索引"""
+        return {
+            "version": ScanIndex.VERSION,
+            "railworks_path": railworks_path,
+            "routes": {}
+        }
+
+    def load(self) -> bool:
+        """加载索引文件"""
+        if not os.path.exists(self.index_file):
+            return False
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != ScanIndex.VERSION:
+                return False
+            with self._lock:
+                self.data = data
+            return True
+        except Exception as e:
+            print(f"加载扫描索引失败: {e}")
+            return False
+
+    def save(self):
+        """保存索引文件（先写临时文件再替换，避免中断时损坏索引）"""
+        temp_file = self.index_file + ".tmp"
+        try:
+            with self._lock:
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(temp_file, self.index_file)
+        except Exception as e:
+            print(f"保存扫描索引失败: {e}")
+
+    def matches(self, railworks_path: str) -> bool:
+        """判断索引是否属于当前RailWorks路径（名称表包含所有语言，与语言设置无关）"""
+        return self.data.get("railworks_path") == railworks_path
+
+    def get_route(self, route_uuid: str) -> Optional[Dict]:
+        """获取路线的索引条目"""
+        return self.data["routes"].get(route_uuid)
+
+    def route_ids(self) -> set:
+        """索引中的所有路线UUID"""
+        with self._lock:
+            return set(self.data["routes"])
+
+    def set_route(self, route_uuid: str, entry: Dict):
+        """更新单个路线的索引条目"""
+        with self._lock:
+            self.data["routes"][route_uuid] = entry
+
+    def remove_route(self, route_uuid: str):
+        """移除单个路线的索引条目"""
+        with self._lock:
+            self.data["routes"].pop(route_uuid, None)
+
+    def replace(self, railworks_path: str, routes: Dict):
+        """用新的扫描结果替换索引内容（已删除的目录随之丢弃）"""
+        data = self._empty(railworks_path)
+        data["routes"] = routes
+        with self._lock:
+            self.data = data
+
+
+class _NullPhase:
+    """未启用性能统计时使用的空上下文"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class _Phase:
+    """计时上下文，退出时把耗时记入Profiler"""
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.record_phase(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """性能统计：分阶段计时、计数器、耗时直方图和最慢的文件
+
+    未启用时phase()返回共享的空上下文，add()/record_*()直接返回，几乎没有开销。
+    """
+
+    HISTOGRAM_BOUNDS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+    SLOWEST_COUNT = 20
+    _NULL_PHASE = _NullPhase()
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """清空统计数据"""
+        with self._lock:
+            self.phases = {}
+            self.counters = {}
+            self.slowest_files = []  # [(耗时秒, 路径, 字节数)]，按耗时从大到小
+
+    def _new_stats(self) -> Dict:
+        return {"count": 0, "total": 0.0, "max": 0.0,
+                "histogram": [0] * (len(self.HISTOGRAM_BOUNDS_MS) + 1)}
+
+    def _bucket(self, seconds: float) -> int:
+        milliseconds = seconds * 1000
+        for i, bound in enumerate(self.HISTOGRAM_BOUNDS_MS):
+            if milliseconds < bound:
+                return i
+        return len(self.HISTOGRAM_BOUNDS_MS)
+
+    def phase(self, name: str):
+        """返回计时上下文：with profiler.phase("scan.parse"): ..."""
+        if not self.enabled:
+            return self._NULL_PHASE
+        return _Phase(self, name)
+
+    def record_phase(self, name: str, seconds: float):
+        """记录一次阶段耗时"""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = self._new_stats()
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["histogram"][self._bucket(seconds)] += 1
+
+    def add(self, counter: str, value: int = 1):
+        """累加计数器"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def record_file(self, path: str, seconds: float, size: int):
+        """记录一次文件读取/解析：计入files_read、bytes_read、parse阶段直方图和最慢文件列表"""
+        if not self.enabled:
+            return
+        self.record_phase("xml.parse_file", seconds)
+        with self._lock:
+            self.counters["files_read"] = self.counters.get("files_read", 0) + 1
+            self.counters["bytes_read"] = self.counters.get("bytes_read", 0) + size
+            if (len(self.slowest_files) < self.SLOWEST_COUNT or
+                    seconds > self.slowest_files[-1][0]):
+                self.slowest_files.append((seconds, path, size))
+                self.slowest_files.sort(key=lambda item: item[0], reverse=True)
+                del self.slowest_files[self.SLOWEST_COUNT:]
+
+    def snapshot(self) -> Dict:
+        """返回可序列化为JSON的统计数据（耗时单位为毫秒）"""
+        labels = [f"<{bound}ms" for bound in self.HISTOGRAM_BOUNDS_MS]
+        labels.append(f">={self.HISTOGRAM_BOUNDS_MS[-1]}ms")
+        with self._lock:
+            phases = {}
+            for name, stats in sorted(self.phases.items()):
+                phases[name] = {
+                    "count": stats["count"],
+                    "total_ms": round(stats["total"] * 1000, 3),
+                    "avg_ms": round(stats["total"] * 1000 / stats["count"], 3),
+                    "max_ms": round(stats["max"] * 1000, 3),
+                    "histogram": dict(zip(labels, stats["histogram"]))
+                }
+            return {
+                "enabled": self.enabled,
+                "phases": phases,
+                "counters": dict(sorted(self.counters.items())),
+                "slowest_files": [{"path": path, "ms": round(seconds * 1000, 3), "bytes": size}
+                                  for seconds, path, size in self.slowest_files]
+            }
+
+    def format_report(self) -> str:
+        """生成便于阅读的文本报告"""
+        snapshot = self.snapshot()
+        lines = [f"性能统计: {'已启用' if snapshot['enabled'] else '未启用'}", ""]
+        if snapshot["phases"]:
+            lines.append(f"{'阶段':<26}{'次数':>8}{'总计(ms)':>12}{'平均(ms)':>12}{'最大(ms)':>12}")
+            for name, stats in snapshot["phases"].items():
+                lines.append(f"{name:<28}{stats['count']:>8}{stats['total_ms']:>12.1f}"
+                             f"{stats['avg_ms']:>12.3f}{stats['max_ms']:>12.3f}")
+            parse_stats = snapshot["phases"].get("xml.parse_file")
+            if parse_stats:
+                lines += ["", "XML解析耗时分布:"]
+                lines += [f"  {label:>10}: {count}" for label, count in parse_stats["histogram"].items() if count]
+        if snapshot["counters"]:
+            lines += ["", "计数器:"]
+            lines += [f"  {name}: {value}" for name, value in snapshot["counters"].items()]
+        if snapshot["slowest_files"]:
+            lines += ["", "最慢的文件:"]
+            lines += [f"  {item['ms']:>9.3f} ms  {item['bytes']:>8} B  {item['path']}"
+                      for item in snapshot["slowest_files"]]
+        if len(lines) == 2:
+            lines.append("暂无数据")
+        return "\n".join(lines)
+
+    def export_json(self, path: str) -> bool:
+        """导出统计数据为JSON文件"""
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+            return True
+        except Exception as e:
+            print(f"导出性能统计失败: {e}")
+            return False
+
+
+def profiled(phase_name: str):
+    """方法装饰器：在self.profiler启用时记录方法耗时"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if not profiler.enabled:
+                return method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                profiler.record_phase(phase_name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class DirectoryPoller:
+    """轮询方式的文件/目录监视器，用于系统文件监视不可用的情况
+    
+    每次poll()只对登记的路径各做一次stat，比较mtime/size签名；
+    目录在增删文件时mtime会变化，文件在写入时mtime/size会变化。
+    """
+    
+    def __init__(self):
+        self.signatures = {}  # 路径 -> [mtime_ns, size]，路径不存在时为None
+    
+    @staticmethod
+    def _signature(path: str) -> Optional[List[int]]:
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            return None
+        return [stat_result.st_mtime_ns, stat_result.st_size]
+    
+    def add_path(self, path: str):
+        """登记要监视的路径（路径可以暂时不存在）"""
+        if path not in self.signatures:
+            self.signatures[path] = self._signature(path)
+    
+    def remove_path(self, path: str):
+        """取消监视"""
+        self.signatures.pop(path, None)
+    
+    def paths(self) -> List[str]:
+        """获取所有监视中的路径"""
+        return list(self.signatures)
+    
+    def poll(self) -> List[str]:
+        """检查所有路径，返回签名发生变化（包括出现或消失）的路径"""
+        changed = []
+        for path, old_signature in self.signatures.items():
+            signature = self._signature(path)
+            if signature != old_signature:
+                self.signatures[path] = signature
+                changed.append(path)
+        return changed
+
 
 class XMLParser:
     """XML解析器，用于解析RouteProperties.xml和ScenarioProperties.xml"""
@@ -131,9 +632,230 @@ class XMLParser:
         # 其他语言精确匹配
         return lang_code.lower() == target_language.lower()
 
+    # DisplayName中按优先级回退的语言节点
+    LANGUAGES = ['English', 'French', 'German', 'Spanish', 'Italian', 'Russian', 'Dutch', 'Polish']
+    # 语言代码对应的DisplayName语言节点
+    LANGUAGE_NODES = {'en': 'English', 'fr': 'French', 'de': 'German', 'es': 'Spanish',
+                      'it': 'Italian', 'ru': 'Russian', 'nl': 'Dutch', 'pl': 'Polish'}
+    LOCALISATION_TAG = 'Localisation-cUserLocalisedString'
+    LANG_PAIR_TAG = 'Localisation-cUserLocalisedString-cOtherStringLangPair'
+    # .ap压缩包内的路径相对于路线目录，例如 Scenarios/<UUID>/ScenarioProperties.xml
+    ARCHIVE_SCENARIO_PATTERN = re.compile(r'(?:^|/)Scenarios/([^/]+)/ScenarioProperties\.xml$', re.IGNORECASE)
+    ARCHIVE_ROUTE_NAME = 'routeproperties.xml'
+
+    @staticmethod
+    def _fallback_languages(language: str) -> List[str]:
+        """获取回退语言节点的顺序：与目标语言对应的节点优先，其余按LANGUAGES顺序"""
+        preferred = XMLParser.LANGUAGE_NODES.get((language or "").lower())
+        if preferred is None:
+            return XMLParser.LANGUAGES
+        return [preferred] + [lang for lang in XMLParser.LANGUAGES if lang != preferred]
+
+    @staticmethod
+    def _empty_table() -> Dict:
+        """空的多语言名称表"""
+        return {'languages': {}, 'other': []}
+
+    @staticmethod
+    def resolve_display_name(table: Optional[Dict], language: str = "zh") -> str:
+        """从多语言名称表中解析指定语言的显示名称，无需重新读取XML"""
+        if not table:
+            return ""
+        
+        # 首先尝试Other语言 - 支持所有中文变体
+        for lang_code, text in table.get('other', []):
+            if text and XMLParser._matches_language(lang_code, language):
+                return text
+        
+        # 如果Other中没有找到，尝试其他语言
+        languages = table.get('languages', {})
+        for lang in XMLParser._fallback_languages(language):
+            if languages.get(lang):
+                return languages[lang]
+        return ""
+
+    @staticmethod
+    def parse_localisation_table(xml_file_path: str) -> Dict:
+        """一次解析出DisplayName中的所有本地化名称
+        Returns:
+            {'languages': {'English': 名称, ...}, 'other': [[语言代码, 名称], ...]}，
+            文件不存在或没有DisplayName时返回空表
+        """
+        if not os.path.exists(xml_file_path):
+            return XMLParser._empty_table()
+        table = XMLParser._parse_localisation_streaming(xml_file_path)
+        if table is None:
+            table = XMLParser._parse_localisation_tree(xml_file_path)
+        return table
+
+    @staticmethod
+    def parse_archive_tables(archive_path: str) -> Dict:
+        """读取.ap（zip）压缩包的中央目录，直接从压缩流解析其中的RouteProperties.xml和ScenarioProperties.xml
+        Returns:
+            {'route': 路线名称表（压缩包中没有RouteProperties.xml时为None）, 'scenarios': {场景UUID: 名称表}}，
+            压缩包无法读取时返回空结果
+        """
+        result = {'route': None, 'scenarios': {}}
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                for info in archive.infolist():
+                    member = info.filename.replace('\\', '/')
+                    match = XMLParser.ARCHIVE_SCENARIO_PATTERN.search(member)
+                    if match:
+                        scenario_uuid = match.group(1)
+                        if scenario_uuid not in result['scenarios']:
+                            result['scenarios'][scenario_uuid] = XMLParser._parse_archive_member(
+                                archive, info, archive_path)
+                    elif result['route'] is None and member.lower() == XMLParser.ARCHIVE_ROUTE_NAME:
+                        result['route'] = XMLParser._parse_archive_member(archive, info, archive_path)
+        except (zipfile.BadZipFile, OSError) as e:
+            print(f"读取压缩包失败 {archive_path}: {e}")
+        return result
+
+    @staticmethod
+    def _parse_archive_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, archive_path: str) -> Dict:
+        """从压缩包成员中解析名称表，先流式解压解析，失败时读出整个成员完整解析"""
+        source = f"{archive_path}:{info.filename}"
+        try:
+            with archive.open(info) as stream:
+                table = XMLParser._parse_localisation_streaming(source, stream)
+            if table is None:
+                table = XMLParser._parse_localisation_tree(source, archive.read(info))
+            return table
+        except Exception as e:
+            print(f"解析压缩包中的XML失败 {source}: {e}")
+            return XMLParser._empty_table()
+
+    @staticmethod
+    def parse_localisation_table_timed(xml_file_path: str) -> Tuple[Dict, float]:
+        """解析名称表并返回解析耗时（秒），供启用性能统计时使用（可在进程池中运行）"""
+        start = time.perf_counter()
+        table = XMLParser.parse_localisation_table(xml_file_path)
+        return table, time.perf_counter() - start
+
+    @staticmethod
+    def parse_display_name(xml_file_path: str, language: str = "zh", streaming: bool = True) -> str:
+        """解析DisplayName标签，获取显示名称
+        Args:
+            streaming: 为True时使用流式解析，读完DisplayName即停止；
+                       流式解析未找到DisplayName或出错时回退到完整的ElementTree解析
+        """
+        if streaming:
+            if not os.path.exists(xml_file_path):
+                return ""
+            table = XMLParser._parse_localisation_streaming(xml_file_path)
+            if table is not None:
+                return XMLParser.resolve_display_name(table, language)
+        return XMLParser._parse_display_name_tree(xml_file_path, language)
+
+    @staticmethod
+    def _parse_localisation_streaming(xml_file_path: str, stream=None) -> Optional[Dict]:
+        """流式解析DisplayName，单次遍历收集Other语言对和各语言节点
+        Args:
+            stream: 已打开的二进制流（例如压缩包成员），为None时打开xml_file_path
+        Returns:
+            多语言名称表；未找到DisplayName或解析出错时返回None，由调用方回退到完整解析
+        """
+        in_display_name = False
+        in_other = False
+        localisation_depth = 0
+        table = XMLParser._empty_table()
+        seen_languages = set()  # 与完整解析一致，每种语言只取第一次出现的节点
+        
+        try:
+            with open(xml_file_path, 'rb') if stream is None else nullcontext(stream) as f:
+                for event, elem in ET.iterparse(f, events=('start', 'end')):
+                    tag = elem.tag
+                    if event == 'start':
+                        if not in_display_name:
+                            in_display_name = tag == 'DisplayName'
+                        elif tag == XMLParser.LOCALISATION_TAG:
+                            localisation_depth += 1
+                        elif tag == 'Other' and localisation_depth:
+                            in_other = True
+                        continue
+                    
+                    if not in_display_name:
+                        # DisplayName之前的节点已经用不到，及时释放
+                        elem.clear()
+                        continue
+                    
+                    if tag == 'DisplayName':
+                        # DisplayName结束但没有Localisation节点，交给完整解析处理
+                        return None
+                    if not localisation_depth:
+                        continue
+                    
+                    if tag == XMLParser.LOCALISATION_TAG:
+                        localisation_depth -= 1
+                        if not localisation_depth:
+                            break  # 本地化块已读完，提前结束
+                    elif tag == 'Other':
+                        in_other = False
+                    elif tag == XMLParser.LANG_PAIR_TAG and in_other:
+                        lang_node = elem.find('.//Language')
+                        string_node = elem.find('.//String')
+                        if (lang_node is not None and string_node is not None and
+                            lang_node.text and string_node.text):
+                            table['other'].append([lang_node.text, string_node.text])
+                    elif tag in XMLParser.LANGUAGES and tag not in seen_languages and not in_other:
+                        seen_languages.add(tag)
+                        if elem.text:
+                            table['languages'][tag] = elem.text
+        except ET.ParseError:
+            return None
+        except Exception as e:
+            print(f"流式解析XML文件失败 {xml_file_path}: {e}")
+            return None
+        
+        if not in_display_name:
+            return None
+        return table
+
+    @staticmethod
+    def _parse_localisation_tree(xml_file_path: str, content: Optional[bytes] = None) -> Dict:
+        """使用完整的ElementTree解析多语言名称表（流式解析的回退路径）
+        Args:
+            content: XML内容（例如压缩包成员），为None时读取xml_file_path
+        """
+        table = XMLParser._empty_table()
+        try:
+            if content is None:
+                with open(xml_file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            root = ET.fromstring(content)
+            
+            display_name_node = root.find('.//DisplayName')
+            if display_name_node is None:
+                print(f"在 {xml_file_path} 中未找到DisplayName节点")
+                return table
+            localisation_node = display_name_node.find('.//Localisation-cUserLocalisedString')
+            if localisation_node is None:
+                print(f"在 {xml_file_path} 中未找到Localisation-cUserLocalisedString节点")
+                return table
+            
+            other_node = localisation_node.find('.//Other')
+            if other_node is not None:
+                for string_pair in other_node.findall('.//Localisation-cUserLocalisedString-cOtherStringLangPair'):
+                    lang_node = string_pair.find('.//Language')
+                    string_node = string_pair.find('.//String')
+                    if (lang_node is not None and string_node is not None and
+                        lang_node.text and string_node.text):
+                        table['other'].append([lang_node.text, string_node.text])
+            
+            for lang in XMLParser.LANGUAGES:
+                lang_node = localisation_node.find(f'.//{lang}')
+                if lang_node is not None and lang_node.text:
+                    table['languages'][lang] = lang_node.text
+        except ET.ParseError as e:
+            print(f"XML解析错误 {xml_file_path}: {e}")
+        except Exception as e:
+            print(f"解析XML文件失败 {xml_file_path}: {e}")
+        return table
+
     @staticmethod
-    def parse_display_name(xml_file_path: str, language: str = "zh") -> str:
-        """解析DisplayName标签，获取显示名称"""
+    def _parse_display_name_tree(xml_file_path: str, language: str = "zh") -> str:
+        """使用完整的ElementTree解析DisplayName（流式解析的回退路径）"""
         try:
             if not os.path.exists(xml_file_path):
                 return ""
@@ -173,7 +895,7 @@ class XMLParser:
                         return string_node.text
             
             # 如果Other中没有找到，尝试其他语言
-            languages = ['English', 'French', 'German', 'Spanish', 'Italian', 'Russian', 'Dutch', 'Polish']
+            languages = XMLParser._fallback_languages(language)
             for lang in languages:
                 lang_node = localisation_node.find(f'.//{lang}')
                 if (lang_node is not None and lang_node.text and 
@@ -196,52 +918,923 @@ class XMLParser:
             return ""
 
 
-class TrainSimulatorBackupTool:
-    """Train Simulator Classic存档备份工具主类"""
-    
-    def __init__(self):
-        self.config_manager = ConfigManager()
-        self.xml_parser = XMLParser()
-        self.routes_data = {}  # 存储路线和场景数据
-        self.backup_dir_name = "saves"
-        
-        # 尝试自动检测RailWorks路径
-        self.railworks_path = self._auto_detect_railworks_path()
-        if self.railworks_path:
-            self.config_manager.set_railworks_path(self.railworks_path)
-    
-    def _auto_detect_railworks_path(self) -> str:
-        """自动检测RailWorks安装路径"""
-        # 默认Steam安装路径
-        default_paths = [
-            "D:/Program Files (x86)/Steam/steamapps/common/RailWorks",
-            "C:/Program Files (x86)/Steam/steamapps/common/RailWorks",
-            "E:/Program Files (x86)/Steam/steamapps/common/RailWorks",
-            "D:/Program Files/Steam/steamapps/common/RailWorks",
-            "C:/Program Files/Steam/steamapps/common/RailWorks"
-        ]
-        
-        # 实际存在的RailWorks可执行文件
-        possible_exes = [
-            "Railworks.exe",           # 32位版本
-            "Railworks64.exe",         # 64位版本  
-            "RailworksDX12_64.exe"     # 64位DX12版本
-        ]
+class BackupContainer:
+    """压缩备份容器：文件头保存原始大小、修改时间、SHA-256和MD5校验文件内容，之后是分块压缩的存档数据
+
+    读写都按块流式处理，内存占用与存档大小无关。
+    """
+
+    MAGIC = b"TSBK"
+    VERSION = 1
+    HEADER = struct.Struct("<4sBBHQQ32sI")  # 标识、版本、算法、保留、原始大小、mtime_ns、SHA-256、MD5长度
+    CHUNK_SIZE = 1024 * 1024
+    CODECS = {"zlib": 0, "lzma": 1, "zstd": 2}
+
+    @staticmethod
+    def available_codecs() -> List[str]:
+        """当前环境可用的压缩算法"""
+        return [codec for codec in BackupContainer.CODECS if codec != "zstd" or zstandard is not None]
+
+    @staticmethod
+    def _compressor(codec: str):
+        if codec == "zlib":
+            return zlib.compressobj(6)
+        if codec == "lzma":
+            return lzma.LZMACompressor(preset=6)
+        if codec == "zstd" and zstandard is not None:
+            return zstandard.ZstdCompressor(level=3).compressobj()
+        raise ValueError(f"不支持的压缩算法: {codec}")
+
+    @staticmethod
+    def _decompressor(codec: str):
+        if codec == "zlib":
+            return zlib.decompressobj()
+        if codec == "lzma":
+            return lzma.LZMADecompressor()
+        if codec == "zstd" and zstandard is not None:
+            return zstandard.ZstdDecompressor().decompressobj()
+        raise ValueError(f"不支持的压缩算法: {codec}")
+
+    @staticmethod
+    def write(source_path: str, container_path: str, codec: str = "zlib",
+              md5_content: Optional[bytes] = None) -> Dict:
+        """把存档压缩写入容器（先写临时文件，完成后再替换）
+        Returns:
+            read_header()格式的文件头信息
+        """
+        compressor = BackupContainer._compressor(codec)
+        md5_content = md5_content or b""
+        digest = hashlib.sha256()
+        size = 0
+        temp_file = container_path + ".tmp"
+        try:
+            with open(source_path, 'rb') as src, open(temp_file, 'wb') as dst:
+                mtime_ns = os.fstat(src.fileno()).st_mtime_ns
+                # 先写占位文件头，数据写完后再回填大小和哈希
+                dst.write(BackupContainer.HEADER.pack(BackupContainer.MAGIC, BackupContainer.VERSION,
+                                                      BackupContainer.CODECS[codec], 0, 0, 0, b"\0" * 32,
+                                                      len(md5_content)))
+                dst.write(md5_content)
+                for chunk in iter(lambda: src.read(BackupContainer.CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    dst.write(compressor.compress(chunk))
+                dst.write(compressor.flush())
+                dst.seek(0)
+                dst.write(BackupContainer.HEADER.pack(BackupContainer.MAGIC, BackupContainer.VERSION,
+                                                      BackupContainer.CODECS[codec], 0, size, mtime_ns,
+                                                      digest.digest(), len(md5_content)))
+            os.replace(temp_file, container_path)
+        except BaseException:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        return {"codec": codec, "size": size, "mtime_ns": mtime_ns, "sha256": digest.hexdigest(),
+                "md5": md5_content or None, "data_offset": BackupContainer.HEADER.size + len(md5_content)}
+
+    @staticmethod
+    def read_header(container_path: str) -> Dict:
+        """读取容器文件头
+        Returns:
+            {'codec', 'size', 'mtime_ns', 'sha256', 'md5'（MD5校验文件内容或None）, 'data_offset'}
+        """
+        with open(container_path, 'rb') as f:
+            return BackupContainer._read_header(f)
+
+    @staticmethod
+    def _read_header(f) -> Dict:
+        raw = f.read(BackupContainer.HEADER.size)
+        if len(raw) != BackupContainer.HEADER.size:
+            raise ValueError("压缩备份文件头不完整")
+        magic, version, codec_id, _, size, mtime_ns, sha256, md5_length = BackupContainer.HEADER.unpack(raw)
+        if magic != BackupContainer.MAGIC or version != BackupContainer.VERSION:
+            raise ValueError("不是有效的压缩备份文件")
+        codecs = {value: name for name, value in BackupContainer.CODECS.items()}
+        if codec_id not in codecs:
+            raise ValueError(f"未知的压缩算法: {codec_id}")
+        md5_content = f.read(md5_length)
+        return {"codec": codecs[codec_id], "size": size, "mtime_ns": mtime_ns, "sha256": sha256.hex(),
+                "md5": md5_content or None, "data_offset": BackupContainer.HEADER.size + md5_length}
+
+    @staticmethod
+    def iter_chunks(container_path: str):
+        """流式解压容器数据，逐块产生原始存档内容，最后校验大小和SHA-256"""
+        with open(container_path, 'rb') as f:
+            header = BackupContainer._read_header(f)
+            decompressor = BackupContainer._decompressor(header["codec"])
+            digest = hashlib.sha256()
+            size = 0
+            for chunk in iter(lambda: f.read(BackupContainer.CHUNK_SIZE), b''):
+                data = decompressor.decompress(chunk)
+                if data:
+                    digest.update(data)
+                    size += len(data)
+                    yield data
+            if hasattr(decompressor, 'flush'):
+                data = decompressor.flush()
+                if data:
+                    digest.update(data)
+                    size += len(data)
+                    yield data
+        if size != header["size"] or digest.hexdigest() != header["sha256"]:
+            raise ValueError("压缩备份数据校验失败")
+
+    @staticmethod
+    def extract(container_path: str, target_path: str) -> Dict:
+        """解压到目标文件（先写临时文件，校验通过后再替换，失败时不影响原文件）
+        Returns:
+            文件头信息
+        """
+        header = BackupContainer.read_header(container_path)
+        temp_file = target_path + ".tmp"
+        try:
+            with open(temp_file, 'wb') as dst:
+                for data in BackupContainer.iter_chunks(container_path):
+                    dst.write(data)
+            os.replace(temp_file, target_path)
+        except BaseException:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        os.utime(target_path, ns=(header["mtime_ns"], header["mtime_ns"]))
+        return header
+
+
+class DeltaCodec:
+    """二进制差异编码：把目标文件表示为对基准文件的COPY(偏移, 长度)和INSERT(数据)操作序列
+
+    基准按固定大小分块建立索引，目标中未对齐的插入/删除通过在附近窗口内查找同步点重新对齐。
+    操作序列经zlib压缩后保存。文件头记录基准备份名称、链深度、目标大小、mtime和SHA-256。
+    """
+
+    MAGIC = b"TSDL"
+    VERSION = 1
+    HEADER = struct.Struct("<4sBBHQQ32sI")  # 标识、版本、链深度、保留、目标大小、mtime_ns、SHA-256、基准名称长度
+    OP_COPY = struct.Struct("<cQI")
+    OP_INSERT = struct.Struct("<cI")
+    BLOCK_SIZE = 4096
+    SYNC_LENGTH = 32  # 匹配长度至少为此值才使用COPY
+    SEARCH_WINDOW = 64 * 1024  # 失去同步时在基准当前位置前后查找的范围
+
+    @staticmethod
+    def _match_length(base: bytes, base_pos: int, target: bytes, pos: int) -> int:
+        """从base_pos和pos开始相同的字节数（按块比较，最后一块二分查找第一个不同的字节）"""
+        if base_pos < 0:
+            return 0
+        max_length = min(len(base) - base_pos, len(target) - pos)
+        length = 0
+        while length < max_length:
+            step = min(DeltaCodec.BLOCK_SIZE, max_length - length)
+            if base[base_pos + length:base_pos + length + step] == target[pos + length:pos + length + step]:
+                length += step
+                continue
+            low, high = 0, step
+            while low < high:
+                middle = (low + high + 1) // 2
+                if base[base_pos + length:base_pos + length + middle] == target[pos + length:pos + length + middle]:
+                    low = middle
+                else:
+                    high = middle - 1
+            return length + low
+        return length
+
+    @staticmethod
+    def diff(base: bytes, target: bytes) -> List[Tuple]:
+        """计算差异
+        Returns:
+            [('copy', 基准偏移, 长度) 或 ('insert', 数据), ...]
+        """
+        block_size = DeltaCodec.BLOCK_SIZE
+        sync_length = DeltaCodec.SYNC_LENGTH
+        index = {}
+        for offset in range(0, len(base) - block_size + 1, block_size):
+            index.setdefault(zlib.crc32(base[offset:offset + block_size]), []).append(offset)
         
-        for path in default_paths:
-            for exe_name in possible_exes:
-                exe_path = os.path.join(path, exe_name)
-                if os.path.exists(exe_path):
-                    return path
+        def locate(pos: int, base_pos: int) -> int:
+            block = target[pos:pos + block_size]
+            if len(block) == block_size:
+                for offset in index.get(zlib.crc32(block), ()):
+                    if base[offset:offset + block_size] == block:
+                        return offset
+            probe = target[pos:pos + sync_length]
+            start = max(0, base_pos - DeltaCodec.SEARCH_WINDOW)
+            return base.find(probe, start, min(len(base), base_pos + DeltaCodec.SEARCH_WINDOW + sync_length))
         
-        # 尝试从注册表读取（Windows）
-        try:
-            import winreg
-            # 尝试从Steam注册表读取安装路径
-            try:
-                with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, 
-                                  r"SOFTWARE\\WOW6432Node\\Valve\\Steam") as key:
-                    steam_path = winreg.QueryValueEx(key, "InstallPath")[0]
+        ops = []
+        literal_start = 0
+        pos = 0
+        base_pos = 0
+        skip = sync_length * 2
+        while pos < len(target):
+            length = DeltaCodec._match_length(base, base_pos, target, pos)
+            if length < sync_length:
+                found = locate(pos, base_pos)
+                found_length = DeltaCodec._match_length(base, found, target, pos)
+                if found_length >= sync_length:
+                    base_pos, length = found, found_length
+            if length < sync_length:
+                # 没有匹配：跳过一段作为插入数据，连续不匹配时跳过的长度逐步加倍（最多一块）
+                pos = min(len(target), pos + skip)
+                base_pos += skip
+                skip = min(skip * 2, block_size)
+                continue
+            skip = sync_length * 2
+            # 向前扩展匹配，收回插入数据末尾与基准相同的部分
+            while pos > literal_start and base_pos > 0 and base[base_pos - 1] == target[pos - 1]:
+                pos -= 1
+                base_pos -= 1
+                length += 1
+            if pos > literal_start:
+                ops.append(('insert', target[literal_start:pos]))
+            ops.append(('copy', base_pos, length))
+            pos += length
+            base_pos += length
+            literal_start = pos
+        if literal_start < len(target):
+            ops.append(('insert', target[literal_start:]))
+        return ops
+
+    @staticmethod
+    def encode(ops: List[Tuple]) -> bytes:
+        """把操作序列编码并压缩"""
+        compressor = zlib.compressobj(6)
+        chunks = []
+        for op in ops:
+            if op[0] == 'copy':
+                chunks.append(compressor.compress(DeltaCodec.OP_COPY.pack(b'C', op[1], op[2])))
+            else:
+                chunks.append(compressor.compress(DeltaCodec.OP_INSERT.pack(b'I', len(op[1]))))
+                chunks.append(compressor.compress(op[1]))
+        chunks.append(compressor.flush())
+        return b"".join(chunks)
+
+    @staticmethod
+    def apply(base: bytes, encoded: bytes) -> bytes:
+        """把编码后的操作序列应用到基准，得到目标内容"""
+        data = zlib.decompress(encoded)
+        result = bytearray()
+        pos = 0
+        while pos < len(data):
+            if data[pos:pos + 1] == b'C':
+                _, offset, length = DeltaCodec.OP_COPY.unpack_from(data, pos)
+                pos += DeltaCodec.OP_COPY.size
+                if offset + length > len(base):
+                    raise ValueError("差异数据超出基准范围")
+                result += base[offset:offset + length]
+            elif data[pos:pos + 1] == b'I':
+                _, length = DeltaCodec.OP_INSERT.unpack_from(data, pos)
+                pos += DeltaCodec.OP_INSERT.size
+                result += data[pos:pos + length]
+                pos += length
+            else:
+                raise ValueError("无效的差异数据")
+        return bytes(result)
+
+    @staticmethod
+    def write(delta_path: str, base_name: str, depth: int, target: bytes, mtime_ns: int, encoded: bytes):
+        """写入差异备份文件（先写临时文件再替换）"""
+        base_name_bytes = base_name.encode('utf-8')
+        temp_file = delta_path + ".tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(DeltaCodec.HEADER.pack(DeltaCodec.MAGIC, DeltaCodec.VERSION, min(depth, 255), 0, len(target),
+                                           mtime_ns, hashlib.sha256(target).digest(), len(base_name_bytes)))
+            f.write(base_name_bytes)
+            f.write(encoded)
+        os.replace(temp_file, delta_path)
+
+    @staticmethod
+    def read(delta_path: str, with_data: bool = True) -> Dict:
+        """读取差异备份文件
+        Returns:
+            {'base'（基准备份名称）, 'depth', 'size', 'mtime_ns', 'sha256', 'encoded'（with_data为False时不读取）}
+        """
+        with open(delta_path, 'rb') as f:
+            raw = f.read(DeltaCodec.HEADER.size)
+            if len(raw) != DeltaCodec.HEADER.size:
+                raise ValueError("差异备份文件头不完整")
+            magic, version, depth, _, size, mtime_ns, sha256, name_length = DeltaCodec.HEADER.unpack(raw)
+            if magic != DeltaCodec.MAGIC or version != DeltaCodec.VERSION:
+                raise ValueError("不是有效的差异备份文件")
+            header = {"base": f.read(name_length).decode('utf-8'), "depth": depth, "size": size,
+                      "mtime_ns": mtime_ns, "sha256": sha256.hex()}
+            if with_data:
+                header["encoded"] = f.read()
+        return header
+
+
+class CopyEngine:
+    """文件复制引擎：按速度从快到慢依次尝试各种复制方式，记住每个设备上可用的最快方式
+
+    reflink（FICLONE，btrfs/xfs等支持写时复制的文件系统）只复制元数据，几乎不耗时；
+    copy_file_range/sendfile在内核中复制数据，不经过用户空间；都不可用时使用大缓冲区读写。
+    某种方式因文件系统或平台不支持而失败时退回下一种，成功的方式按(源设备, 目标设备)缓存，
+    之后同一对设备上的复制直接从该方式开始。
+    """
+
+    METHODS = ("reflink", "copy_file_range", "sendfile", "buffered")
+    BUFFER_SIZE = 1024 * 1024
+    FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+    # 这些错误表示当前方式在此文件系统或平台上不可用，而不是复制本身出错
+    FALLBACK_ERRNOS = frozenset(code for code in (
+        getattr(errno, name, None) for name in (
+            "EXDEV", "EOPNOTSUPP", "ENOTSUP", "ENOSYS", "EINVAL", "ENOTTY",
+            "EBADF", "ENOTSOCK", "EPERM", "ETXTBSY")) if code is not None)
+
+    def __init__(self, methods: Tuple[str, ...] = None):
+        self.methods = tuple(m for m in (methods or self.METHODS) if m in self.available_methods())
+        if not self.methods:
+            self.methods = ("buffered",)
+        self._lock = threading.Lock()
+        self._device_methods = {}  # {(源设备, 目标设备): 方式}
+        self.stats = {}  # {方式: {'files': 次数, 'bytes': 字节数}}
+
+    @classmethod
+    def available_methods(cls) -> Tuple[str, ...]:
+        """当前平台可以尝试的复制方式"""
+        methods = []
+        if fcntl is not None and sys.platform.startswith("linux"):
+            methods.append("reflink")
+        if hasattr(os, "copy_file_range"):
+            methods.append("copy_file_range")
+        if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+            methods.append("sendfile")
+        methods.append("buffered")
+        return tuple(methods)
+
+    def method_for(self, src: str, dst: str) -> Optional[str]:
+        """已缓存的某对设备上的复制方式，尚未复制过时返回None"""
+        try:
+            key = (os.stat(src).st_dev, os.stat(os.path.dirname(os.path.abspath(dst))).st_dev)
+        except OSError:
+            return None
+        return self._device_methods.get(key)
+
+    def copy(self, src: str, dst: str, metadata: bool = True) -> str:
+        """复制文件，metadata为True时与shutil.copy2一样复制修改时间和权限
+        Returns:
+            实际使用的复制方式
+        """
+        binary = getattr(os, "O_BINARY", 0)
+        src_fd = os.open(src, os.O_RDONLY | binary)
+        try:
+            src_stat = os.fstat(src_fd)
+            dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | binary, 0o666)
+            try:
+                key = (src_stat.st_dev, os.fstat(dst_fd).st_dev)
+                method = self._copy_fds(src_fd, dst_fd, src_stat.st_size, key)
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+        if metadata:
+            shutil.copystat(src, dst)
+        with self._lock:
+            stats = self.stats.setdefault(method, {'files': 0, 'bytes': 0})
+            stats['files'] += 1
+            stats['bytes'] += src_stat.st_size
+        return method
+
+    def _copy_fds(self, src_fd: int, dst_fd: int, size: int, key: Tuple[int, int]) -> str:
+        cached = self._device_methods.get(key)
+        start = self.methods.index(cached) if cached in self.methods else 0
+        for method in self.methods[start:]:
+            try:
+                getattr(self, "_copy_" + method)(src_fd, dst_fd, size)
+            except OSError as e:
+                if method == "buffered" or e.errno not in self.FALLBACK_ERRNOS:
+                    raise
+                # 丢弃可能已写入的部分数据，换下一种方式重新复制
+                os.ftruncate(dst_fd, 0)
+                os.lseek(dst_fd, 0, os.SEEK_SET)
+                os.lseek(src_fd, 0, os.SEEK_SET)
+                continue
+            if cached != method:
+                with self._lock:
+                    self._device_methods[key] = method
+            return method
+        raise OSError(errno.ENOTSUP, "没有可用的复制方式")
+
+    def _copy_reflink(self, src_fd: int, dst_fd: int, size: int):
+        fcntl.ioctl(dst_fd, self.FICLONE, src_fd)
+
+    def _copy_copy_file_range(self, src_fd: int, dst_fd: int, size: int):
+        remaining = size
+        while remaining > 0:
+            copied = os.copy_file_range(src_fd, dst_fd, min(remaining, 1 << 30))
+            if copied == 0:
+                break
+            remaining -= copied
+        if remaining > 0:
+            # 部分虚拟文件系统报告的大小与实际内容不符，交给下一种方式
+            raise OSError(errno.EINVAL, "copy_file_range未复制完整")
+
+    def _copy_sendfile(self, src_fd: int, dst_fd: int, size: int):
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(dst_fd, src_fd, offset, min(size - offset, 1 << 30))
+            if sent == 0:
+                break
+            offset += sent
+        if offset < size:
+            raise OSError(errno.EINVAL, "sendfile未复制完整")
+
+    def _copy_buffered(self, src_fd: int, dst_fd: int, size: int):
+        buffer = bytearray(self.BUFFER_SIZE)
+        view = memoryview(buffer)
+        with open(src_fd, 'rb', buffering=0, closefd=False) as src, \
+                open(dst_fd, 'wb', buffering=0, closefd=False) as dst:
+            while True:
+                count = src.readinto(buffer)
+                if not count:
+                    break
+                written = 0
+                while written < count:
+                    written += dst.write(view[written:count])
+
+    def snapshot(self) -> Dict:
+        """各复制方式的使用次数和字节数，以及每对设备缓存的方式"""
+        with self._lock:
+            return {'methods': {method: dict(stats) for method, stats in self.stats.items()},
+                    'devices': {f"{src}:{dst}": method for (src, dst), method in self._device_methods.items()}}
+
+
+class ObjectStore:
+    """按内容寻址的去重存储：存档按SHA-256保存一次，备份只是引用
+
+    目录结构：objects/<哈希前两位>/<哈希> 保存数据，refcounts.json 记录每个对象被多少个备份引用。
+    引用计数归零时删除对象；collect_garbage()按实际存在的引用文件重建计数并清理无引用的对象。
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_path = os.path.join(root, "objects")
+        self.temp_path = os.path.join(root, "tmp")
+        self.refcounts_file = os.path.join(root, "refcounts.json")
+        self._lock = threading.Lock()
+        self._writing = set()  # 正在写入的临时文件，清理时保留
+        self._pending = {}  # {哈希: 次数}，已存入但引用文件/快照清单尚未写入的对象
+        self._collecting = 0  # 正在进行的垃圾回收数量
+        self._touched = set()  # 垃圾回收扫描引用期间存入的对象
+
+    @staticmethod
+    def hash_file(path: str) -> Tuple[str, int]:
+        """分块计算文件的SHA-256，返回(十六进制哈希, 文件大小)"""
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(ObjectStore.CHUNK_SIZE), b''):
+                digest.update(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size
+
+    def object_path(self, digest: str) -> str:
+        """获取对象文件路径"""
+        return os.path.join(self.objects_path, digest[:2], digest)
+
+    def has_object(self, digest: str) -> bool:
+        """判断对象是否已存在"""
+        return os.path.exists(self.object_path(digest))
+
+    def _load_refcounts(self) -> Dict[str, int]:
+        if not os.path.exists(self.refcounts_file):
+            return {}
+        try:
+            with open(self.refcounts_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"加载引用计数失败: {e}")
+            return {}
+
+    def _save_refcounts(self, refcounts: Dict[str, int]):
+        os.makedirs(self.root, exist_ok=True)
+        temp_file = self.refcounts_file + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(refcounts, f, separators=(',', ':'))
+        os.replace(temp_file, self.refcounts_file)
+
+    def put_file(self, path: str, add_reference: bool = True) -> Tuple[str, int, bool]:
+        """把文件存入对象库并增加一次引用；内容相同的对象已存在时不再写入
+        
+        一边复制到临时文件一边计算哈希，对象内容与哈希一定一致（复制期间存档被改写也不会以旧哈希保存新内容）。
+        复制在锁外进行，只有检查对象是否存在、替换和更新引用计数时持有锁。
+        写入引用文件或快照清单后调用方必须调用settle()，在此之前垃圾回收不会删除这个对象。
+        Args:
+            add_reference: 为False时只写入对象，由调用方稍后用add_references()批量登记引用
+        Returns:
+            (哈希, 文件大小, 是否新写入了对象)
+        """
+        os.makedirs(self.temp_path, exist_ok=True)
+        temp_file = os.path.join(self.temp_path, f"put.{os.getpid()}.{threading.get_ident()}")
+        with self._lock:
+            self._writing.add(temp_file)
+        try:
+            sha256 = hashlib.sha256()
+            size = 0
+            with open(path, 'rb') as src, open(temp_file, 'wb') as dst:
+                for chunk in iter(lambda: src.read(self.CHUNK_SIZE), b''):
+                    sha256.update(chunk)
+                    dst.write(chunk)
+                    size += len(chunk)
+            digest = sha256.hexdigest()
+            object_path = self.object_path(digest)
+            with self._lock:
+                created = not os.path.exists(object_path)
+                if created:
+                    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                    os.replace(temp_file, object_path)
+                self._pending[digest] = self._pending.get(digest, 0) + 1
+                if add_reference:
+                    refcounts = self._load_refcounts()
+                    refcounts[digest] = refcounts.get(digest, 0) + 1
+                    self._save_refcounts(refcounts)
+        finally:
+            with self._lock:
+                self._writing.discard(temp_file)
+            # 对象已存在时丢弃临时文件
+            try:
+                os.remove(temp_file)
+            except FileNotFoundError:
+                pass
+        return digest, size, created
+    
+    def add_references(self, digests: List[str]):
+        """批量增加引用（每个哈希出现一次增加一次），只读写一次引用计数文件"""
+        with self._lock:
+            refcounts = self._load_refcounts()
+            for digest in digests:
+                refcounts[digest] = refcounts.get(digest, 0) + 1
+            self._save_refcounts(refcounts)
+
+    def release(self, digest: str) -> bool:
+        """减少一次引用，计数归零时删除对象
+        Returns:
+            对象被删除时返回True
+        """
+        return self.release_references([digest]) > 0
+
+    def release_references(self, digests: List[str]) -> int:
+        """批量减少引用，删除计数归零的对象
+        Returns:
+            删除的对象数量
+        """
+        removed = 0
+        with self._lock:
+            refcounts = self._load_refcounts()
+            for digest in digests:
+                count = refcounts.get(digest, 0) - 1
+                if count > 0:
+                    refcounts[digest] = count
+                    continue
+                refcounts.pop(digest, None)
+                try:
+                    os.remove(self.object_path(digest))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            self._save_refcounts(refcounts)
+        return removed
+
+    def settle(self, digests: List[str]):
+        """put_file()存入的对象的引用文件或快照清单已写入（或已放弃写入）后调用，之后按实际引用回收"""
+        with self._lock:
+            for digest in digests:
+                count = self._pending.get(digest, 0) - 1
+                if count > 0:
+                    self._pending[digest] = count
+                else:
+                    self._pending.pop(digest, None)
+                if self._collecting:
+                    self._touched.add(digest)
+    
+    @contextmanager
+    def collecting(self):
+        """垃圾回收扫描引用文件期间使用：期间存入的对象即使扫描时没有看到引用也会保留"""
+        with self._lock:
+            self._collecting += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._collecting -= 1
+                if not self._collecting:
+                    self._touched.clear()
+    
+    def collect_garbage(self, referenced: Dict[str, int]) -> Dict:
+        """按实际引用重建引用计数，删除没有引用的对象和残留的临时文件
+        
+        尚未写入引用的对象和在collecting()期间存入的对象不会被删除，引用计数取扫描结果和当前计数中较大的一个
+        （扫描可能没有看到新写入的引用文件）。
+        Args:
+            referenced: {哈希: 引用次数}，由调用方扫描所有引用文件得到
+        Returns:
+            {'objects': 保留的对象数, 'removed': 删除的对象数, 'freed_bytes': 释放的字节数, 'missing': 缺失对象的哈希列表}
+        """
+        result = {'objects': 0, 'removed': 0, 'freed_bytes': 0, 'missing': []}
+        with self._lock:
+            protected = set(self._pending) | self._touched
+            existing = set()
+            try:
+                with os.scandir(self.objects_path) as prefixes:
+                    for prefix in prefixes:
+                        if not prefix.is_dir():
+                            continue
+                        with os.scandir(prefix.path) as objects:
+                            for entry in objects:
+                                if entry.name in referenced or entry.name in protected:
+                                    existing.add(entry.name)
+                                    continue
+                                result['freed_bytes'] += entry.stat().st_size
+                                os.remove(entry.path)
+                                result['removed'] += 1
+            except FileNotFoundError:
+                pass
+            try:
+                with os.scandir(self.temp_path) as temps:
+                    for entry in temps:
+                        if entry.path not in self._writing:
+                            os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            
+            result['objects'] = len(existing)
+            result['missing'] = sorted(set(referenced) - existing)
+            current = self._load_refcounts()
+            refcounts = {}
+            for digest in existing:
+                count = max(referenced.get(digest, 0), current.get(digest, 0) if digest in protected else 0)
+                if count > 0:
+                    refcounts[digest] = count
+            self._save_refcounts(refcounts)
+        return result
+
+    def stats(self) -> Dict:
+        """对象数量、占用空间和引用总数"""
+        objects = 0
+        total_bytes = 0
+        try:
+            with os.scandir(self.objects_path) as prefixes:
+                for prefix in prefixes:
+                    if prefix.is_dir():
+                        with os.scandir(prefix.path) as it:
+                            for entry in it:
+                                objects += 1
+                                total_bytes += entry.stat().st_size
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            references = sum(self._load_refcounts().values())
+        return {'objects': objects, 'bytes': total_bytes, 'references': references}
+
+
+class BackupCatalog:
+    """所有场景备份的SQLite目录，用于查询全部备份和按路线统计占用空间
+
+    数据来自各saves目录的备份清单：扫描时按saves目录的修改时间只同步有变化的场景，
+    创建/删除/还原备份时更新对应场景。数据库只是缓存，删除后下次扫描会重建。
+    """
+
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """首次使用时打开数据库并建表（后台扫描线程和界面线程共用一个连接，由锁保护）"""
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            # WAL模式下每次提交不需要同步整个数据库文件，批量备份时逐个更新也很快
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            if connection.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+                connection.executescript("""
+                    DROP TABLE IF EXISTS scenarios;
+                    DROP TABLE IF EXISTS backups;
+                    CREATE TABLE scenarios (
+                        scenario_key TEXT PRIMARY KEY,
+                        route_uuid TEXT NOT NULL,
+                        scenario_uuid TEXT NOT NULL,
+                        scenario_path TEXT NOT NULL,
+                        dir_mtime_ns INTEGER
+                    );
+                    CREATE TABLE backups (
+                        scenario_key TEXT NOT NULL,
+                        name TEXT NOT NULL,
+                        kind TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        stored_bytes INTEGER NOT NULL,
+                        mtime_ns INTEGER NOT NULL,
+                        sha256 TEXT,
+                        md5 INTEGER NOT NULL,
+                        first_seen REAL NOT NULL,
+                        last_restored REAL,
+                        PRIMARY KEY (scenario_key, name)
+                    );
+                    CREATE INDEX scenarios_route ON scenarios (route_uuid);
+                    CREATE INDEX backups_mtime ON backups (mtime_ns);
+                    CREATE INDEX backups_sha256 ON backups (sha256);
+                """)
+                connection.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+                connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def dir_mtimes(self) -> Dict[str, Optional[int]]:
+        """已登记场景的saves目录修改时间 {场景键: mtime_ns}"""
+        with self._lock:
+            rows = self._connect().execute("SELECT scenario_key, dir_mtime_ns FROM scenarios").fetchall()
+        return {row["scenario_key"]: row["dir_mtime_ns"] for row in rows}
+
+    def replace_scenario(self, scenario_key: str, scenario_path: str, dir_mtime_ns: Optional[int],
+                         backups: List[Dict]):
+        """用备份清单替换一个场景的全部记录，保留仍然存在的备份的首次登记和最近还原时间"""
+        route_uuid, scenario_uuid = scenario_key.split("/")
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT INTO scenarios (scenario_key, route_uuid, scenario_uuid, scenario_path, dir_mtime_ns) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (scenario_key) DO UPDATE SET "
+                    "scenario_path = excluded.scenario_path, dir_mtime_ns = excluded.dir_mtime_ns",
+                    (scenario_key, route_uuid, scenario_uuid, scenario_path, dir_mtime_ns))
+                names = [backup['name'] for backup in backups]
+                connection.execute(
+                    f"DELETE FROM backups WHERE scenario_key = ? AND name NOT IN ({','.join('?' * len(names))})",
+                    [scenario_key] + names)
+                connection.executemany(
+                    "INSERT INTO backups (scenario_key, name, kind, size, stored_bytes, mtime_ns, sha256, md5, first_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (scenario_key, name) DO UPDATE SET "
+                    "kind = excluded.kind, size = excluded.size, stored_bytes = excluded.stored_bytes, "
+                    "mtime_ns = excluded.mtime_ns, sha256 = excluded.sha256, md5 = excluded.md5",
+                    [(scenario_key, backup['name'], backup['kind'], backup['size'], backup['stored_bytes'],
+                      backup['mtime_ns'], backup['sha256'], int(backup['md5']), now) for backup in backups])
+
+    def remove_scenarios(self, scenario_keys: List[str]):
+        """删除场景及其备份记录"""
+        if not scenario_keys:
+            return
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                for table in ("backups", "scenarios"):
+                    connection.executemany(f"DELETE FROM {table} WHERE scenario_key = ?",
+                                           [(key,) for key in scenario_keys])
+
+    def clear(self):
+        """清空所有记录（例如RailWorks路径改变时）"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM backups")
+                connection.execute("DELETE FROM scenarios")
+
+    def mark_restored(self, scenario_key: str, name: str):
+        """记录备份的最近还原时间"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("UPDATE backups SET last_restored = ? WHERE scenario_key = ? AND name = ?",
+                                   (time.time(), scenario_key, name))
+
+    def query_backups(self, route_uuid: Optional[str] = None, sha256: Optional[str] = None,
+                      limit: Optional[int] = None) -> List[Dict]:
+        """查询备份，按存档时间倒序
+        Returns:
+            [{'scenario_key', 'route_uuid', 'scenario_uuid', 'scenario_path', 'name', 'kind', 'size',
+              'stored_bytes', 'mtime_ns', 'sha256', 'md5', 'first_seen', 'last_restored'}, ...]
+        """
+        conditions, params = [], []
+        if route_uuid is not None:
+            conditions.append("s.route_uuid = ?")
+            params.append(route_uuid)
+        if sha256 is not None:
+            conditions.append("b.sha256 = ?")
+            params.append(sha256)
+        sql = ("SELECT b.*, s.route_uuid, s.scenario_uuid, s.scenario_path FROM backups b "
+               "JOIN scenarios s ON s.scenario_key = b.scenario_key")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY b.mtime_ns DESC, b.name DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        return [dict(row, md5=bool(row["md5"])) for row in rows]
+
+    def route_summary(self) -> List[Dict]:
+        """按路线统计备份，按占用空间从大到小
+        Returns:
+            [{'route_uuid', 'scenarios'（有备份的场景数）, 'backups', 'size', 'stored_bytes', 'newest_mtime_ns'}, ...]
+        """
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT s.route_uuid, COUNT(DISTINCT b.scenario_key) AS scenarios, COUNT(*) AS backups, "
+                "SUM(b.size) AS size, SUM(b.stored_bytes) AS stored_bytes, MAX(b.mtime_ns) AS newest_mtime_ns "
+                "FROM backups b JOIN scenarios s ON s.scenario_key = b.scenario_key "
+                "GROUP BY s.route_uuid ORDER BY stored_bytes DESC, s.route_uuid").fetchall()
+        return [dict(row) for row in rows]
+
+    def totals(self) -> Dict:
+        """全部备份的数量、占用空间和最新备份的存档时间"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT COUNT(*) AS backups, COUNT(DISTINCT scenario_key) AS scenarios, "
+                "COALESCE(SUM(size), 0) AS size, COALESCE(SUM(stored_bytes), 0) AS stored_bytes, "
+                "MAX(mtime_ns) AS newest_mtime_ns FROM backups").fetchone()
+        return dict(row)
+
+
+class TrainSimulatorBackupTool:
+    """Train Simulator Classic存档备份工具主类"""
+    
+    SCAN_BATCH_SIZE = 16  # 每批扫描的路线数量，每批完成后回调一次
+    STORE_DIR_NAME = "SaveBackupStore"  # 去重存储目录，位于RailWorks目录下，不受Content目录变化影响
+    SNAPSHOT_DIR_NAME = "snapshots"  # 快照清单目录，位于去重存储目录下
+    BACKUP_DIR_NAME = "saves"  # 场景目录中存放备份的目录
+    CATALOG_FILE = "train_simulator_backup_catalog.db"  # 备份目录数据库，与配置文件同目录
+    VERIFY_CACHE_FILE = "train_simulator_verify_cache.json"  # 校验时计算的哈希，按文件大小和修改时间缓存
+    VERIFY_CHUNK_SIZE = 1024 * 1024
+    # 各备份方式的备份文件后缀，按此顺序查找同名备份
+    BACKUP_SUFFIXES = (("copy", ".bin"), ("dedup", ".bin.ref"), ("compressed", ".bin.cz"), ("delta", ".bin.delta"))
+    DELTA_MAX_RATIO = 0.5  # 差异数据超过存档大小的一半时改为完整备份
+    BACKUP_MANIFEST_NAME = "backups.manifest.json"  # 每个saves目录中的备份清单，按目录修改时间判断是否过期
+    BACKUP_MANIFEST_VERSION = 1
+    COMPARE_CHUNK_SIZE = 1024 * 1024
+    CONTENT_HASH_CACHE_SIZE = 4096  # 比较时计算的存档哈希，按(路径, 大小, 修改时间)缓存
+    ARCHIVE_FORMAT = "train-simulator-backups"  # 导出归档清单中的格式标识
+    ARCHIVE_VERSION = 1
+    ARCHIVE_MANIFEST_NAME = "manifest.json"  # 导出归档的第一个文件
+    ARCHIVE_CHUNK_SIZE = 1024 * 1024
+    MIRROR_MANIFEST_NAME = "mirror.manifest.json"  # 镜像目录中的清单：各场景备份文件的大小、修改时间和哈希
+    MIRROR_MANIFEST_VERSION = 1
+    MIRROR_LOG_NAME = "mirror.log"  # 镜像目录中的传输日志
+    
+    def __init__(self):
+        self.config_manager = ConfigManager()
+        self.xml_parser = XMLParser()
+        self.routes_data = {}  # 存储路线和场景数据
+        self._routes_lock = threading.Lock()  # 后台扫描替换routes_data与加载路线场景互斥
+        self.backup_dir_name = self.BACKUP_DIR_NAME
+        self.scan_index = ScanIndex(self.config_manager.get_data_path("train_simulator_scan_index.json"))
+        self.last_scan_stats = {}
+        self.profiler = Profiler(self.config_manager.get_profiling())
+        self.copy_engine = CopyEngine()
+        self._object_store = None
+        self._catalog = None
+        self._content_hashes = {}
+        self._dir_locks = {}  # saves目录 -> 锁
+        self._dir_locks_lock = threading.Lock()
+
+        # 尝试自动检测RailWorks路径
+        self.railworks_path = self._auto_detect_railworks_path()
+        if self.railworks_path:
+            self.config_manager.set_railworks_path(self.railworks_path)
+    
+    def _auto_detect_railworks_path(self) -> str:
+        """自动检测RailWorks安装路径"""
+        # 默认Steam安装路径
+        default_paths = [
+            "D:/Program Files (x86)/Steam/steamapps/common/RailWorks",
+            "C:/Program Files (x86)/Steam/steamapps/common/RailWorks",
+            "E:/Program Files (x86)/Steam/steamapps/common/RailWorks",
+            "D:/Program Files/Steam/steamapps/common/RailWorks",
+            "C:/Program Files/Steam/steamapps/common/RailWorks"
+        ]
+        
+        # 实际存在的RailWorks可执行文件
+        possible_exes = [
+            "Railworks.exe",           # 32位版本
+            "Railworks64.exe",         # 64位版本  
+            "RailworksDX12_64.exe"     # 64位DX12版本
+        ]
+        
+        for path in default_paths:
+            for exe_name in possible_exes:
+                exe_path = os.path.join(path, exe_name)
+                if os.path.exists(exe_path):
+                    return path
+        
+        # 尝试从注册表读取（Windows）
+        try:
+            import winreg
+            # 尝试从Steam注册表读取安装路径
+            try:
+                with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, 
+                                  r"SOFTWARE\\WOW6432Node\\Valve\\Steam") as key:
+                    steam_path = winreg.QueryValueEx(key, "InstallPath")[0]
                     railworks_path = os.path.join(steam_path, "steamapps\\common\\RailWorks")
                     if os.path.exists(railworks_path):
                         return railworks_path
@@ -252,135 +1845,1470 @@ class TrainSimulatorBackupTool:
         
         return ""
     
-    def scan_content(self) -> bool:
-        """扫描RailWorks内容目录"""
+    def _get_routes_path(self) -> str:
+        """获取Content/Routes目录，不存在时返回空字符串"""
         if not self.railworks_path:
-            return False
+            return ""
         
         content_path = os.path.join(self.railworks_path, "Content")
         if not os.path.exists(content_path):
-            return False
+            return ""
         
         routes_path = os.path.join(content_path, "Routes")
         if not os.path.exists(routes_path):
-            return False
-        
-        self.routes_data = {}
-        language = self.config_manager.get_language()
+            return ""
         
+        return routes_path
+    
+    @staticmethod
+    def _xml_signature(xml_path: str) -> Optional[List[int]]:
+        """获取XML文件的[mtime_ns, size]签名，文件不存在时返回None"""
         try:
-            for route_uuid in os.listdir(routes_path):
-                route_path = os.path.join(routes_path, route_uuid)
-                if not os.path.isdir(route_path):  # 修正：使用完整路径而不是文件夹名
-                    continue
-                
-                # 解析路线名称
-                route_properties_path = os.path.join(route_path, "RouteProperties.xml")
-                route_name = self.xml_parser.parse_display_name(route_properties_path, language)
-                if not route_name:
-                    route_name = route_uuid  # 如果解析失败，使用UUID作为名称
-                
-                # 扫描场景
-                scenarios_path = os.path.join(route_path, "Scenarios")
-                scenarios = []
-                
-                if os.path.exists(scenarios_path):
-                    for scenario_uuid in os.listdir(scenarios_path):
-                        scenario_path = os.path.join(scenarios_path, scenario_uuid)
-                        if not os.path.isdir(scenario_path):
-                            continue
-                        
-                        # 解析场景名称
-                        scenario_properties_path = os.path.join(scenario_path, "ScenarioProperties.xml")
-                        scenario_name = self.xml_parser.parse_display_name(scenario_properties_path, language)
-                        if not scenario_name:
-                            scenario_name = scenario_uuid  # 如果解析失败，使用UUID作为名称
-                        
-                        scenarios.append({
-                            'uuid': scenario_uuid,
-                            'name': scenario_name,
-                            'path': scenario_path,
-                            'save_path': os.path.join(scenario_path, self.backup_dir_name)
-                        })
-                
-                if scenarios:  # 只添加有场景的路线
-                    self.routes_data[route_uuid] = {
-                        'name': route_name,
-                        'path': route_path,
-                        'scenarios': scenarios
-                    }
-            
-            return True
+            stat_result = os.stat(xml_path)
+        except OSError:
+            return None
+        return [stat_result.st_mtime_ns, stat_result.st_size]
+    
+    @staticmethod
+    def _entry_signature(entry: Optional[os.DirEntry]) -> Optional[List[int]]:
+        """由DirEntry获取文件的[mtime_ns, size]签名（Windows上直接使用目录枚举返回的数据）"""
+        if entry is None:
+            return None
+        try:
+            stat_result = entry.stat()
+        except OSError:
+            return None
+        return [stat_result.st_mtime_ns, stat_result.st_size]
+    
+    @staticmethod
+    def _list_directory(path: str) -> Dict[str, os.DirEntry]:
+        """枚举目录一次，返回 {文件名: DirEntry}；Windows文件名不区分大小写，按小写匹配"""
+        entries = {}
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    entries[entry.name.lower() if os.name == 'nt' else entry.name] = entry
+        except OSError:
+            pass
+        return entries
+    
+    @staticmethod
+    def _find_entry(entries: Dict[str, os.DirEntry], name: str) -> Optional[os.DirEntry]:
+        """在目录枚举结果中查找文件"""
+        return entries.get(name.lower() if os.name == 'nt' else name)
+    
+    @staticmethod
+    def _enumerate_scenarios(scenarios_path: str, cached_scenarios: Dict) -> Dict:
+        """枚举Scenarios目录，XML未变化的场景直接沿用索引中的名称表"""
+        find_entry = TrainSimulatorBackupTool._find_entry
+        scenarios = {}
+        
+        scenario_dirs = [entry for entry in TrainSimulatorBackupTool._list_directory(scenarios_path).values()
+                         if entry.is_dir()]
+        for scenario_entry in sorted(scenario_dirs, key=lambda entry: entry.name):
+            scenario_uuid = scenario_entry.name
+            scenario_files = TrainSimulatorBackupTool._list_directory(scenario_entry.path)
+            signature = TrainSimulatorBackupTool._entry_signature(
+                find_entry(scenario_files, "ScenarioProperties.xml"))
+            cached_scenario = cached_scenarios.get(scenario_uuid)
+            if signature is not None and cached_scenario and cached_scenario.get('xml') == signature:
+                names = cached_scenario.get('names')
+            else:
+                names = None if signature else XMLParser._empty_table()
+            # saves目录的修改时间用于判断备份目录数据库是否需要同步（Windows上直接使用目录枚举返回的数据）
+            saves_entry = find_entry(scenario_files, TrainSimulatorBackupTool.BACKUP_DIR_NAME)
+            saves_mtime = saves_entry.stat().st_mtime_ns if saves_entry is not None and saves_entry.is_dir() else None
             
-        except Exception as e:
-            print(f"扫描内容失败: {e}")
+            scenarios[scenario_uuid] = {'names': names, 'xml': signature, 'saves': saves_mtime}
+        
+        return scenarios
+    
+    @staticmethod
+    def _has_scenario_dirs(scenarios_path: str) -> bool:
+        """判断Scenarios目录下是否有场景目录，找到第一个即返回"""
+        try:
+            with os.scandir(scenarios_path) as it:
+                return any(entry.is_dir() for entry in it)
+        except OSError:
             return False
     
-    def create_backup(self, scenario_path: str, custom_filename: str = None) -> tuple[bool, str]:
-        """创建存档备份
+    @staticmethod
+    def _enumerate_archives(route_entries: Dict[str, os.DirEntry], cached_archives: Dict) -> Dict:
+        """枚举路线目录下的.ap压缩包，mtime/size未变化的压缩包直接沿用索引中的内容
         Returns:
-            (success: bool, error_message: str)
+            {压缩包文件名: {'sig': [mtime_ns, size], 'route': 名称表, 'scenarios': {UUID: 名称表}}}，
+            需要重新读取的压缩包scenarios为None
         """
-        try:
-            save_file = os.path.join(scenario_path, "CurrentSave.bin")
-            if not os.path.exists(save_file):
-                return False, "未找到CurrentSave.bin文件"
-            
-            backup_dir = os.path.join(scenario_path, self.backup_dir_name)
-            if not os.path.exists(backup_dir):
-                os.makedirs(backup_dir)
-            
-            # 使用自定义文件名或生成默认文件名
-            if custom_filename:
-                # 确保文件名以.bin结尾
-                if not custom_filename.endswith('.bin'):
-                    custom_filename += '.bin'
-                backup_file = custom_filename
+        archives = {}
+        for entry in sorted(route_entries.values(), key=lambda entry: entry.name):
+            if not entry.name.lower().endswith('.ap') or not entry.is_file():
+                continue
+            signature = TrainSimulatorBackupTool._entry_signature(entry)
+            cached_archive = cached_archives.get(entry.name)
+            if signature is not None and cached_archive and cached_archive.get('sig') == signature:
+                archives[entry.name] = cached_archive
             else:
-                # 生成默认文件名
-                timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-                backup_file = f"CurrentSave-{timestamp}.bin"
-            
-            backup_path = os.path.join(backup_dir, backup_file)
-            
-            # 检查文件是否已存在
-            if os.path.exists(backup_path):
-                return False, f"备份文件 '{backup_file}' 已存在，请使用不同的名称"
+                archives[entry.name] = {'sig': signature, 'route': None, 'scenarios': None}
+        return archives
+    
+    @staticmethod
+    def _enumerate_route(route_uuid: str, route_path: str, cached: Optional[Dict] = None,
+                         lazy: bool = False) -> Dict:
+        """枚举单个路线目录，XML未变化的条目直接沿用索引中的名称表
+        每个目录只枚举一次，文件是否存在及其mtime/size都从枚举结果中获得
+        Args:
+            lazy: 为True时不枚举场景，只记录路线下是否有场景，场景在首次展开时再加载
+        Returns:
+            索引条目，需要重新解析的条目names为None
+        """
+        cached = cached or {}
+        find_entry = TrainSimulatorBackupTool._find_entry
+        
+        route_entries = TrainSimulatorBackupTool._list_directory(route_path)
+        route_signature = TrainSimulatorBackupTool._entry_signature(find_entry(route_entries, "RouteProperties.xml"))
+        if route_signature is not None and cached.get('xml') == route_signature:
+            route_names = cached.get('names')
+        else:
+            route_names = None if route_signature else XMLParser._empty_table()
+        
+        scenarios_entry = find_entry(route_entries, "Scenarios")
+        has_scenarios_dir = scenarios_entry is not None and scenarios_entry.is_dir()
+        # 压缩包按路线读取，延迟加载模式下也需要枚举，才能知道路线下是否有打包的场景
+        archives = TrainSimulatorBackupTool._enumerate_archives(route_entries, cached.get('archives', {}))
+        
+        if lazy:
+            # 保留索引中的场景条目（未校验），加载场景时再校验
+            return {
+                'names': route_names,
+                'xml': route_signature,
+                'scenarios': cached.get('scenarios', {}),
+                'archives': archives,
+                'lazy': True,
+                'has_scenarios': has_scenarios_dir and TrainSimulatorBackupTool._has_scenario_dirs(scenarios_entry.path)
+            }
+        
+        # 枚举场景
+        scenarios = {}
+        if has_scenarios_dir:
+            scenarios = TrainSimulatorBackupTool._enumerate_scenarios(scenarios_entry.path, cached.get('scenarios', {}))
+        
+        return {'names': route_names, 'xml': route_signature, 'scenarios': scenarios, 'archives': archives}
+    
+    @staticmethod
+    def _pending_xml_files(routes_path: str, route_entries: Dict) -> List[Tuple[Dict, str]]:
+        """收集需要解析的XML文件
+        Returns:
+            [(待填写名称表的条目, XML路径), ...]
+        """
+        pending = []
+        for route_uuid, entry in route_entries.items():
+            route_path = os.path.join(routes_path, route_uuid)
+            if entry['names'] is None:
+                pending.append((entry, os.path.join(route_path, "RouteProperties.xml")))
+            if entry.get('lazy'):
+                continue
+            for scenario_uuid, scenario_entry in entry['scenarios'].items():
+                if scenario_entry['names'] is None:
+                    xml_path = os.path.join(route_path, "Scenarios", scenario_uuid, "ScenarioProperties.xml")
+                    pending.append((scenario_entry, xml_path))
+        return pending
+    
+    @staticmethod
+    def _pending_archives(routes_path: str, route_entries: Dict) -> List[Tuple[Dict, str]]:
+        """收集需要重新读取的.ap压缩包
+        Returns:
+            [(压缩包条目, 压缩包路径), ...]
+        """
+        pending = []
+        for route_uuid, entry in route_entries.items():
+            for archive_name, archive_entry in entry.get('archives', {}).items():
+                if archive_entry['scenarios'] is None:
+                    pending.append((archive_entry, os.path.join(routes_path, route_uuid, archive_name)))
+        return pending
+    
+    def _parse_pending_archives(self, pending: List[Tuple[Dict, str]], executor=None) -> int:
+        """读取待处理的压缩包，把路线和场景名称表填入压缩包条目
+        Returns:
+            从压缩包中解析的XML数量
+        """
+        archive_paths = [archive_path for _, archive_path in pending]
+        if executor is None or not archive_paths:
+            results = [XMLParser.parse_archive_tables(archive_path) for archive_path in archive_paths]
+        else:
+            results = list(executor.map(XMLParser.parse_archive_tables, archive_paths))
+        
+        parsed_count = 0
+        for (archive_entry, _), result in zip(pending, results):
+            archive_entry['route'] = result['route']
+            archive_entry['scenarios'] = result['scenarios']
+            parsed_count += len(result['scenarios']) + (result['route'] is not None)
+        if self.profiler.enabled:
+            self.profiler.add("archives_read", len(pending))
+            self.profiler.add("archive_xml_parsed", parsed_count)
+            self.profiler.add("archive_bytes", sum(entry['sig'][1] for entry, _ in pending if entry['sig']))
+        return parsed_count
+    
+    def _parse_pending(self, pending: List[Tuple[Dict, str]], executor=None):
+        """解析待处理的XML文件，把多语言名称表填入对应条目"""
+        xml_paths = [xml_path for _, xml_path in pending]
+        parse = XMLParser.parse_localisation_table_timed if self.profiler.enabled else XMLParser.parse_localisation_table
+        if executor is None or not xml_paths:
+            results = [parse(xml_path) for xml_path in xml_paths]
+        else:
+            results = list(executor.map(parse, xml_paths, chunksize=32))
+        
+        if not self.profiler.enabled:
+            for (entry, _), table in zip(pending, results):
+                entry['names'] = table
+            return
+        for (entry, xml_path), (table, seconds) in zip(pending, results):
+            entry['names'] = table
+            # 索引签名为[mtime_ns, size]，无需再次stat
+            self.profiler.record_file(xml_path, seconds, entry['xml'][1] if entry['xml'] else 0)
+    
+    @staticmethod
+    def _display_name(names: Optional[Dict], uuid: str, language: str) -> str:
+        """从名称表解析显示名称，解析失败时使用UUID作为名称"""
+        return XMLParser.resolve_display_name(names, language) or uuid
+    
+    def _build_routes_data(self, routes_path: str, route_entries: Dict) -> Dict:
+        """由索引条目生成routes_data，延迟加载的路线scenarios为None"""
+        language = self.config_manager.get_language()
+        routes_data = {}
+        for route_uuid, entry in route_entries.items():
+            route_path = os.path.join(routes_path, route_uuid)
+            archives = entry.get('archives', {})
+            route_names = entry['names']
+            if entry['xml'] is None:
+                # 路线目录中没有RouteProperties.xml时使用压缩包中的
+                route_names = next((archive['route'] for archive in archives.values() if archive.get('route')),
+                                   route_names)
             
-            # 复制存档文件
-            shutil.copy2(save_file, backup_path)
+            if entry.get('lazy'):
+                if entry.get('has_scenarios') or any(archive['scenarios'] for archive in archives.values()):
+                    routes_data[route_uuid] = {
+                        'name': self._display_name(route_names, route_uuid, language),
+                        'names': route_names,
+                        'path': route_path,
+                        'scenarios': None
+                    }
+                continue
             
-            # 复制MD5校验文件（如果存在）
-            md5_file = os.path.join(scenario_path, "CurrentSave.bin.MD5")
-            if os.path.exists(md5_file):
-                # MD5文件名与存档文件名保持一致（只改扩展名）
-                md5_backup_file = backup_file + ".MD5" if not backup_file.endswith('.MD5') else backup_file
-                backup_md5_path = os.path.join(backup_dir, md5_backup_file)
-                shutil.copy2(md5_file, backup_md5_path)
+            # 场景目录中有ScenarioProperties.xml时优先使用目录中的，否则使用压缩包中的
+            # （打包的场景保存后，游戏会在Scenarios下创建只含存档的同名目录）
+            scenario_sources = {scenario_uuid: (scenario_entry['names'], None)
+                                for scenario_uuid, scenario_entry in entry['scenarios'].items()}
+            scenario_entries = entry['scenarios']
+            for archive_name, archive in archives.items():
+                for scenario_uuid, names in (archive['scenarios'] or {}).items():
+                    loose = entry['scenarios'].get(scenario_uuid)
+                    if loose is not None and loose['xml'] is not None:
+                        continue
+                    # 多个压缩包包含同一场景时使用第一个（按文件名排序）
+                    if scenario_sources.get(scenario_uuid, (None, None))[1] is None:
+                        scenario_sources[scenario_uuid] = (names, archive_name)
             
-            return True, ""
+            scenarios = []
+            for scenario_uuid in sorted(scenario_sources):
+                names, archive_name = scenario_sources[scenario_uuid]
+                scenario_path = os.path.join(route_path, "Scenarios", scenario_uuid)
+                scenarios.append({
+                    'uuid': scenario_uuid,
+                    'name': self._display_name(names, scenario_uuid, language),
+                    'names': names,
+                    'path': scenario_path,
+                    'save_path': os.path.join(scenario_path, self.backup_dir_name),
+                    'saves_mtime': scenario_entries.get(scenario_uuid, {}).get('saves'),
+                    'archive': archive_name
+                })
             
-        except Exception as e:
-            return False, f"创建备份失败: {e}"
+            if scenarios:  # 只添加有场景的路线
+                routes_data[route_uuid] = {
+                    'name': self._display_name(route_names, route_uuid, language),
+                    'names': route_names,
+                    'path': route_path,
+                    'scenarios': scenarios
+                }
+        return routes_data
     
-    def restore_backup(self, scenario_path: str, backup_filename: str) -> bool:
-        """还原存档备份"""
+    def load_route_scenarios(self, route_uuid: str) -> bool:
+        """加载延迟扫描模式下某个路线的场景，结果缓存在routes_data和扫描索引中
+        Returns:
+            场景已加载（或之前已加载）时返回True
+        """
+        route_data = self.routes_data.get(route_uuid)
+        if route_data is None:
+            return False
+        if route_data['scenarios'] is not None:
+            return True
+        
+        routes_path = os.path.dirname(route_data['path'])
+        cached = self.scan_index.get_route(route_uuid) or {}
+        
         try:
-            backup_path = os.path.join(scenario_path, self.backup_dir_name, backup_filename)
-            if not os.path.exists(backup_path):
-                return False
-            
-            save_file = os.path.join(scenario_path, "CurrentSave.bin")
-            
-            # 复制备份文件覆盖原存档
-            shutil.copy2(backup_path, save_file)
-            
-            # 还原MD5校验文件（如果存在）
+            scenarios = self._enumerate_scenarios(os.path.join(route_data['path'], "Scenarios"),
+                                                  cached.get('scenarios', {}))
+            entry = {'names': cached.get('names', route_data['names']), 'xml': cached.get('xml'),
+                     'scenarios': scenarios, 'archives': cached.get('archives', {})}
+            self._parse_pending(self._pending_xml_files(routes_path, {route_uuid: entry}))
+        except Exception as e:
+            print(f"加载路线场景失败 {route_uuid}: {e}")
+            return False
+        
+        built = self._build_routes_data(routes_path, {route_uuid: entry})
+        scenarios = built[route_uuid]['scenarios'] if route_uuid in built else []
+        with self._routes_lock:
+            route_data['scenarios'] = scenarios
+            # 加载期间后台扫描可能已经替换了routes_data
+            current = self.routes_data.get(route_uuid)
+            if current is not None and current['scenarios'] is None:
+                current['scenarios'] = scenarios
+            if self.scan_index.matches(self.railworks_path):
+                self.scan_index.set_route(route_uuid, entry)
+        self.sync_backup_catalog([route_uuid])
+        
+        if self.scan_index.matches(self.railworks_path):
+            self.scan_index.save()
+        return True
+    
+    def find_unloaded_routes_matching(self, search_text: str) -> List[str]:
+        """在尚未加载场景的路线中，按索引缓存的场景名称查找可能匹配搜索文本的路线"""
+        search_text = search_text.lower()
+        language = self.config_manager.get_language()
+        matches = []
+        for route_uuid, route_data in self.routes_data.items():
+            if route_data['scenarios'] is not None:
+                continue
+            cached = self.scan_index.get_route(route_uuid) or {}
+            tables = [scenario.get('names') for scenario in cached.get('scenarios', {}).values()]
+            for archive in cached.get('archives', {}).values():
+                tables.extend((archive['scenarios'] or {}).values())
+            if any(search_text in XMLParser.resolve_display_name(names, language).lower() for names in tables):
+                matches.append(route_uuid)
+        return matches
+    
+    def unindexed_routes(self) -> List[str]:
+        """尚未加载场景、索引中也没有缓存场景名称的路线
+        （例如首次使用延迟模式扫描时），只有加载后才能按场景名称搜索
+        """
+        unindexed = []
+        for route_uuid, route_data in self.routes_data.items():
+            if route_data['scenarios'] is not None:
+                continue
+            cached = self.scan_index.get_route(route_uuid) or {}
+            if not cached.get('scenarios') and not any(archive['scenarios']
+                                                       for archive in cached.get('archives', {}).values()):
+                unindexed.append(route_uuid)
+        return unindexed
+    
+    def iter_scenarios(self, load: bool = True):
+        """遍历所有场景，产生(route_uuid, route_data, scenario)
+        Args:
+            load: 为True时先加载延迟扫描模式下尚未加载的路线
+        """
+        for route_uuid, route_data in list(self.routes_data.items()):
+            if route_data['scenarios'] is None and load:
+                self.load_route_scenarios(route_uuid)
+            for scenario in route_data['scenarios'] or []:
+                yield route_uuid, route_data, scenario
+    
+    def _rescan_route(self, routes_path: str, route_uuid: str, lazy: bool) -> bool:
+        """重新扫描单个路线并更新routes_data和扫描索引（不保存索引文件）
+        Returns:
+            路线目录仍然存在时返回True
+        """
+        route_path = os.path.join(routes_path, route_uuid)
+        index_matches = self.scan_index.matches(self.railworks_path)
+        
+        if not os.path.isdir(route_path):
+            self.routes_data.pop(route_uuid, None)
+            if index_matches:
+                self.scan_index.remove_route(route_uuid)
+            return False
+        
+        cached = self.scan_index.get_route(route_uuid) if index_matches else None
+        entry = self._enumerate_route(route_uuid, route_path, cached, lazy)
+        self._parse_pending(self._pending_xml_files(routes_path, {route_uuid: entry}))
+        self._parse_pending_archives(self._pending_archives(routes_path, {route_uuid: entry}))
+        
+        built = self._build_routes_data(routes_path, {route_uuid: entry})
+        if route_uuid in built:
+            self.routes_data[route_uuid] = built[route_uuid]
+        else:
+            self.routes_data.pop(route_uuid, None)
+        if index_matches:
+            self.scan_index.set_route(route_uuid, entry)
+        return True
+    
+    def refresh_routes(self) -> Tuple[List[str], List[str]]:
+        """Routes目录发生变化时增量更新：只扫描新增的路线，移除已删除的路线
+        Returns:
+            (新增的路线UUID列表, 已删除的路线UUID列表)
+        """
+        routes_path = self._get_routes_path()
+        if not routes_path:
+            return [], []
+        
+        try:
+            with os.scandir(routes_path) as it:
+                current = {entry.name for entry in it if entry.is_dir()}
+        except OSError as e:
+            print(f"刷新路线失败: {e}")
+            return [], []
+        
+        known = self.scan_index.route_ids() | set(self.routes_data)
+        added = sorted(current - known)
+        removed = sorted(known - current)
+        lazy = self.config_manager.get_lazy_scenarios()
+        
+        for route_uuid in added + removed:
+            self._rescan_route(routes_path, route_uuid, lazy)
+        if added or removed:
+            self.scan_index.save()
+        
+        return [route_uuid for route_uuid in added if route_uuid in self.routes_data], removed
+    
+    def refresh_route(self, route_uuid: str) -> bool:
+        """路线的Scenarios目录发生变化时，只重新扫描这一个路线
+        Returns:
+            路线仍在routes_data中时返回True
+        """
+        routes_path = self._get_routes_path()
+        if not routes_path:
+            return False
+        
+        # 尚未加载场景的路线保持延迟状态
+        route_data = self.routes_data.get(route_uuid)
+        lazy = route_data is not None and route_data['scenarios'] is None
+        try:
+            self._rescan_route(routes_path, route_uuid, lazy)
+        except Exception as e:
+            print(f"刷新路线失败 {route_uuid}: {e}")
+            return False
+        self.scan_index.save()
+        return route_uuid in self.routes_data
+    
+    def load_scan_index(self) -> bool:
+        """从扫描索引载入routes_data，无需遍历目录
+        Returns:
+            索引可用并已载入时返回True
+        """
+        routes_path = self._get_routes_path()
+        if not routes_path:
+            return False
+        
+        if not self.scan_index.load():
+            return False
+        if not self.scan_index.matches(self.railworks_path):
+            return False
+        
+        self.routes_data = self._build_routes_data(routes_path, self.scan_index.data["routes"])
+        return True
+    
+    def set_language(self, language: str):
+        """切换显示语言，直接用已解析的名称表重新生成名称，不重新扫描"""
+        self.config_manager.set_language(language)
+        for route_uuid, route_data in self.routes_data.items():
+            route_data['name'] = self._display_name(route_data.get('names'), route_uuid, language)
+            for scenario in route_data['scenarios'] or []:
+                scenario['name'] = self._display_name(scenario.get('names'), scenario['uuid'], language)
+    
+    def _create_scan_executor(self, mode: str, workers: int, for_parsing: bool = False):
+        """按扫描模式创建线程池/进程池，串行模式返回None"""
+        max_workers = workers or None  # 0表示由标准库自动决定
+        if mode == "thread":
+            return ThreadPoolExecutor(max_workers=max_workers)
+        if mode == "process":
+            # 目录枚举是I/O密集型，始终使用线程池；只有XML解析才使用进程池
+            if for_parsing:
+                return ProcessPoolExecutor(max_workers=max_workers)
+            return ThreadPoolExecutor(max_workers=max_workers)
+        return None
+    
+    def scan_content(self, use_index: bool = True, mode: Optional[str] = None,
+                     workers: Optional[int] = None, lazy: Optional[bool] = None,
+                     batch_callback: Optional[Callable[[Dict], None]] = None,
+                     progress_callback: Optional[Callable[[int, int], None]] = None,
+                     cancel_event: Optional[threading.Event] = None) -> bool:
+        """扫描RailWorks内容目录
+        Args:
+            use_index: 为True时复用扫描索引，只重新解析新增或XML已变化的目录
+            mode: 扫描模式 serial/thread/process，默认读取配置
+            workers: 线程池/进程池大小，0表示自动，默认读取配置
+            lazy: 为True时只扫描路线，场景在首次展开时加载（已加载的路线仍会重新校验），默认读取配置
+            batch_callback: 每扫描完一批路线调用一次，参数为这批路线的routes_data
+            progress_callback: 进度回调，参数为(已完成路线数, 路线总数)
+            cancel_event: 设置后在下一批开始前取消扫描，已完成的部分仍写入索引
+        Returns:
+            扫描完成返回True，失败或被取消返回False（取消时last_scan_stats['cancelled']为True）
+        """
+        routes_path = self._get_routes_path()
+        if not routes_path:
+            return False
+        
+        mode = mode or self.config_manager.get_scan_mode()
+        workers = self.config_manager.get_scan_workers() if workers is None else workers
+        profiler = self.profiler
+        lazy = self.config_manager.get_lazy_scenarios() if lazy is None else lazy
+        start_time = time.perf_counter()
+        
+        # 延迟模式下，本次运行中已经加载过场景的路线照常完整扫描
+        loaded_routes = {route_uuid for route_uuid, route_data in self.routes_data.items()
+                         if route_data['scenarios'] is not None}
+        
+        index_routes = {}
+        if use_index and (self.scan_index.matches(self.railworks_path) or
+                          (self.scan_index.load() and self.scan_index.matches(self.railworks_path))):
+            index_routes = self.scan_index.data["routes"]
+        
+        enumerate_executor = self._create_scan_executor(mode, workers)
+        parse_executor = self._create_scan_executor(mode, workers, for_parsing=True)
+        try:
+            with profiler.phase("scan.list_routes"), os.scandir(routes_path) as it:
+                # DirEntry.is_dir()直接使用目录枚举返回的类型信息，无需逐个stat
+                route_uuids = sorted(entry.name for entry in it if entry.is_dir())
+            
+            route_entries = {}
+            parsed_count = 0
+            cancelled = False
+            for batch_start in range(0, len(route_uuids), self.SCAN_BATCH_SIZE):
+                if cancel_event is not None and cancel_event.is_set():
+                    cancelled = True
+                    break
+                
+                batch_uuids = route_uuids[batch_start:batch_start + self.SCAN_BATCH_SIZE]
+                route_args = [(route_uuid, os.path.join(routes_path, route_uuid), index_routes.get(route_uuid),
+                               lazy and route_uuid not in loaded_routes)
+                              for route_uuid in batch_uuids]
+                
+                # 第一阶段：枚举目录（按路线并行）
+                with profiler.phase("scan.enumerate"):
+                    if enumerate_executor is None:
+                        entries = [self._enumerate_route(*args) for args in route_args]
+                    else:
+                        entries = list(enumerate_executor.map(lambda args: self._enumerate_route(*args), route_args))
+                # executor.map按提交顺序返回结果，合并顺序与串行模式一致
+                batch_entries = dict(zip(batch_uuids, entries))
+                if profiler.enabled:
+                    profiler.add("routes_listed", len(batch_entries))
+                    profiler.add("scenarios_listed", sum(len(entry['scenarios']) for entry in entries
+                                                         if not entry.get('lazy')))
+                
+                # 第二阶段：解析新增或已变化的XML文件（按文件并行）
+                # 名称表包含所有语言，切换语言时无需重新解析
+                with profiler.phase("scan.parse"):
+                    pending = self._pending_xml_files(routes_path, batch_entries)
+                    self._parse_pending(pending, parse_executor)
+                parsed_count += len(pending)
+                
+                # .ap压缩包按mtime/size缓存，只读取新增或已变化的压缩包（按压缩包并行）
+                with profiler.phase("scan.archives"):
+                    pending_archives = self._pending_archives(routes_path, batch_entries)
+                    parsed_count += self._parse_pending_archives(pending_archives, parse_executor)
+                
+                route_entries.update(batch_entries)
+                
+                if batch_callback is not None:
+                    batch_data = self._build_routes_data(routes_path, batch_entries)
+                    if batch_data:
+                        batch_callback(batch_data)
+                if progress_callback is not None:
+                    progress_callback(len(route_entries), len(route_uuids))
+            
+            if cancelled:
+                # 已完成的路线写入索引，未扫描的路线保留原索引条目
+                for route_uuid in route_uuids:
+                    if route_uuid not in route_entries and route_uuid in index_routes:
+                        route_entries[route_uuid] = index_routes[route_uuid]
+            else:
+                # 一次性替换，避免后台扫描时界面读到不完整的数据
+                with profiler.phase("scan.build"):
+                    routes_data = self._build_routes_data(routes_path, route_entries)
+                    with self._routes_lock:
+                        # 扫描期间加载了场景的路线保留加载结果，索引也使用加载后的条目
+                        index_matches = self.scan_index.matches(self.railworks_path)
+                        for route_uuid, route_data in routes_data.items():
+                            previous = self.routes_data.get(route_uuid)
+                            if route_data['scenarios'] is None and previous is not None and \
+                                    previous['scenarios'] is not None:
+                                route_data['scenarios'] = previous['scenarios']
+                                loaded_entry = self.scan_index.get_route(route_uuid) if index_matches else None
+                                if loaded_entry is not None and not loaded_entry.get('lazy'):
+                                    route_entries[route_uuid] = loaded_entry
+                        self.routes_data = routes_data
+                with profiler.phase("scan.catalog"):
+                    self.sync_backup_catalog()
+            with profiler.phase("scan.save_index"):
+                self.scan_index.replace(self.railworks_path, route_entries)
+                self.scan_index.save()
+            
+            self.last_scan_stats = {
+                'mode': mode,
+                'workers': workers,
+                'routes': len(self.routes_data),
+                'scenarios': sum(len(r['scenarios'] or []) for r in self.routes_data.values()),
+                'parsed_files': parsed_count,
+                'elapsed': time.perf_counter() - start_time,
+                'cancelled': cancelled
+            }
+            profiler.record_phase("scan.total", self.last_scan_stats['elapsed'])
+            return not cancelled
+            
+        except Exception as e:
+            print(f"扫描内容失败: {e}")
+            return False
+        finally:
+            for executor in (enumerate_executor, parse_executor):
+                if executor is not None:
+                    executor.shutdown()
+    
+    def compare_scan_modes(self, modes: Tuple[str, ...] = ("serial", "thread", "process"),
+                           workers: Optional[int] = None) -> Dict[str, Dict]:
+        """不使用索引，按各扫描模式分别完整扫描一次，报告相对串行模式的加速比"""
+        results = {}
+        serial_data = None
+        for mode in modes:
+            if not self.scan_content(use_index=False, mode=mode, workers=workers):
+                results[mode] = {'success': False}
+                continue
+            stats = dict(self.last_scan_stats, success=True)
+            if mode == "serial":
+                serial_data = self.routes_data
+            elif serial_data is not None:
+                # 并行模式的结果必须与串行模式完全一致
+                stats['matches_serial'] = self.routes_data == serial_data
+            results[mode] = stats
+        
+        serial_elapsed = results.get("serial", {}).get('elapsed')
+        for mode, stats in results.items():
+            if serial_elapsed and stats.get('elapsed'):
+                stats['speedup'] = serial_elapsed / stats['elapsed']
+        return results
+    
+    def get_object_store(self) -> Optional[ObjectStore]:
+        """获取RailWorks目录下的去重存储，未设置RailWorks路径时返回None"""
+        if not self.railworks_path:
+            return None
+        root = os.path.join(self.railworks_path, self.STORE_DIR_NAME)
+        if self._object_store is None or self._object_store.root != root:
+            self._object_store = ObjectStore(root)
+        return self._object_store
+    
+    def get_backup_catalog(self) -> BackupCatalog:
+        """获取与配置文件同目录的备份目录数据库"""
+        path = self.config_manager.get_data_path(self.CATALOG_FILE)
+        if self._catalog is None or self._catalog.path != path:
+            if self._catalog is not None:
+                self._catalog.close()
+            self._catalog = BackupCatalog(path)
+        return self._catalog
+    
+    @staticmethod
+    def _scenario_key(scenario_path: str) -> str:
+        """场景目录对应的"路线UUID/场景UUID"（与快照清单相同）"""
+        scenario_path = os.path.normpath(scenario_path)
+        route_path = os.path.dirname(os.path.dirname(scenario_path))
+        return f"{os.path.basename(route_path)}/{os.path.basename(scenario_path)}"
+    
+    def _in_routes(self, scenario_path: str) -> bool:
+        """场景目录是否位于当前RailWorks的Content/Routes下（只有这些场景记入备份目录数据库）"""
+        routes_path = self._get_routes_path()
+        if not routes_path:
+            return False
+        return os.path.normcase(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(scenario_path))))) == \
+            os.path.normcase(os.path.abspath(routes_path))
+    
+    def _catalog_scenario(self, scenario_path: str):
+        """按saves目录的备份清单更新数据库中该场景的记录"""
+        if not self._in_routes(scenario_path):
+            return
+        try:
+            backup_dir = os.path.join(scenario_path, self.backup_dir_name)
+            backups = self._backup_details(backup_dir)
+            try:
+                # 在读取清单之后取修改时间：首次生成清单文件会改变目录的修改时间
+                dir_mtime_ns = os.stat(backup_dir).st_mtime_ns
+            except FileNotFoundError:
+                dir_mtime_ns = None
+            key = self._scenario_key(scenario_path)
+            catalog = self.get_backup_catalog()
+            if dir_mtime_ns is None and not backups:
+                catalog.remove_scenarios([key])
+            else:
+                catalog.replace_scenario(key, scenario_path, dir_mtime_ns, backups)
+            # 同时更新扫描结果中的saves目录修改时间，之后按扫描结果同步时不会把它当作已删除
+            route_data = self.routes_data.get(key.split("/")[0])
+            for scenario in (route_data or {}).get('scenarios') or []:
+                if scenario['uuid'] == key.split("/")[1]:
+                    scenario['saves_mtime'] = dir_mtime_ns
+        except Exception as e:
+            print(f"更新备份目录失败 {scenario_path}: {e}")
+    
+    def sync_backup_catalog(self, route_uuids: Optional[List[str]] = None) -> Dict:
+        """按扫描结果同步备份目录数据库：只重新读取saves目录修改时间有变化的场景，删除已不存在的场景
+        Args:
+            route_uuids: 只同步这些路线，默认同步全部（延迟模式下尚未加载的路线保留原记录）
+        Returns:
+            {'checked': 检查的场景数, 'updated': 重新读取的场景数, 'removed': 删除的场景数}
+        """
+        result = {'checked': 0, 'updated': 0, 'removed': 0}
+        try:
+            catalog = self.get_backup_catalog()
+            known = catalog.dir_mtimes()
+            present = set()
+            skipped_routes = set()
+            for route_uuid, route_data in list(self.routes_data.items()):
+                if route_uuids is not None and route_uuid not in route_uuids:
+                    skipped_routes.add(route_uuid)
+                    continue
+                if route_data['scenarios'] is None:
+                    skipped_routes.add(route_uuid)
+                    continue
+                for scenario in route_data['scenarios']:
+                    result['checked'] += 1
+                    saves_mtime = scenario.get('saves_mtime')
+                    if saves_mtime is None:
+                        continue
+                    key = f"{route_uuid}/{scenario['uuid']}"
+                    present.add(key)
+                    if known.get(key) != saves_mtime:
+                        self._catalog_scenario(scenario['path'])
+                        result['updated'] += 1
+            
+            stale = [key for key in known if key not in present and key.split("/")[0] not in skipped_routes
+                     and (route_uuids is None or key.split("/")[0] in route_uuids)]
+            catalog.remove_scenarios(stale)
+            result['removed'] = len(stale)
+        except Exception as e:
+            print(f"同步备份目录失败: {e}")
+        return result
+    
+    def _scenario_names(self) -> Dict[str, Tuple[str, str]]:
+        """{场景键: (路线名称, 场景名称)}，按当前显示语言"""
+        return {f"{route_uuid}/{scenario['uuid']}": (route_data['name'], scenario['name'])
+                for route_uuid, route_data, scenario in self.iter_scenarios(load=False)}
+    
+    def query_all_backups(self, search_text: str = "", limit: Optional[int] = None) -> List[Dict]:
+        """查询所有场景的备份，按存档时间倒序
+        Args:
+            search_text: 按备份名称、路线名称或场景名称过滤（不区分大小写）
+        Returns:
+            BackupCatalog.query_backups()的结果，每项额外包含'route_name'和'scenario_name'
+        """
+        names = self._scenario_names()
+        search_text = search_text.strip().lower()
+        rows = []
+        for row in self.get_backup_catalog().query_backups():
+            route_name, scenario_name = names.get(row['scenario_key'], (None, None))
+            row['route_name'] = route_name or self.routes_data.get(row['route_uuid'], {}).get('name', row['route_uuid'])
+            row['scenario_name'] = scenario_name or row['scenario_uuid']
+            if search_text and not any(search_text in text.lower()
+                                       for text in (row['name'], row['route_name'], row['scenario_name'])):
+                continue
+            rows.append(row)
+            if limit is not None and len(rows) >= limit:
+                break
+        return rows
+    
+    def backup_usage_by_route(self) -> List[Dict]:
+        """按路线统计备份数量和占用空间（BackupCatalog.route_summary()的结果，额外包含'route_name'）"""
+        rows = self.get_backup_catalog().route_summary()
+        for row in rows:
+            row['route_name'] = self.routes_data.get(row['route_uuid'], {}).get('name', row['route_uuid'])
+        return rows
+    
+    def _backup_dir_lock(self, backup_dir: str) -> threading.RLock:
+        """saves目录的锁：新建/删除备份和读写备份清单时持有，同一场景的备份操作（界面、批量备份、
+        自动备份、清理旧备份等线程）依次进行。可重入，持有时可以再读取清单。
+        """
+        key = os.path.normcase(os.path.abspath(backup_dir))
+        with self._dir_locks_lock:
+            lock = self._dir_locks.get(key)
+            if lock is None:
+                lock = self._dir_locks[key] = threading.RLock()
+            return lock
+    
+    def _copy_file(self, src: str, dst: str, metadata: bool = True):
+        """用复制引擎复制文件，并按实际使用的复制方式计入性能统计"""
+        method = self.copy_engine.copy(src, dst, metadata)
+        if self.profiler.enabled:
+            self.profiler.add(f"copy.{method}.files")
+            self.profiler.add(f"copy.{method}.bytes", os.path.getsize(dst))
+    
+    @staticmethod
+    def _backup_id(backup_filename: str) -> str:
+        """由备份文件名（xxx.bin）得到备份名称"""
+        return backup_filename[:-4] if backup_filename.endswith(".bin") else backup_filename
+    
+    def _resolve_backup(self, scenario_path: str, backup_filename: str) -> Optional[Tuple[str, str]]:
+        """查找备份对应的文件，不同备份方式使用不同的后缀
+        Returns:
+            (备份方式, 备份文件路径)，备份不存在时返回None
+        """
+        return self._resolve_in_dir(os.path.join(scenario_path, self.backup_dir_name),
+                                    self._backup_id(backup_filename))
+    
+    def _resolve_in_dir(self, backup_dir: str, backup_id: str) -> Optional[Tuple[str, str]]:
+        """在saves目录中按备份名称查找备份文件"""
+        for kind, suffix in self.BACKUP_SUFFIXES:
+            backup_path = os.path.join(backup_dir, backup_id + suffix)
+            if os.path.exists(backup_path):
+                return kind, backup_path
+        return None
+    
+    def _read_backup_data(self, backup_dir: str, backup_id: str, _chain: Optional[set] = None) -> bytes:
+        """读取任意备份方式的备份内容；增量备份沿链读取基准后依次应用差异"""
+        resolved = self._resolve_in_dir(backup_dir, backup_id)
+        if resolved is None:
+            raise FileNotFoundError(f"备份 '{backup_id}' 不存在")
+        kind, backup_path = resolved
+        if kind == "dedup":
+            backup_path = self.get_object_store().object_path(self._read_reference(backup_path)["object"])
+        elif kind == "compressed":
+            return b"".join(BackupContainer.iter_chunks(backup_path))
+        elif kind == "delta":
+            chain = _chain or set()
+            if backup_id in chain:
+                raise ValueError(f"增量备份链存在循环: {backup_id}")
+            chain.add(backup_id)
+            delta = DeltaCodec.read(backup_path)
+            data = DeltaCodec.apply(self._read_backup_data(backup_dir, delta["base"], chain), delta["encoded"])
+            if len(data) != delta["size"] or hashlib.sha256(data).hexdigest() != delta["sha256"]:
+                raise ValueError(f"增量备份 '{backup_id}' 校验失败")
+            return data
+        with open(backup_path, 'rb') as f:
+            return f.read()
+    
+    def _backup_mtime_ns(self, kind: str, backup_path: str) -> int:
+        """备份对应存档的修改时间（增量/去重/压缩备份记录在文件中）"""
+        if kind == "delta":
+            return DeltaCodec.read(backup_path, with_data=False)["mtime_ns"]
+        if kind == "dedup":
+            return self._read_reference(backup_path)["mtime_ns"]
+        if kind == "compressed":
+            return BackupContainer.read_header(backup_path)["mtime_ns"]
+        return os.stat(backup_path).st_mtime_ns
+    
+    def _latest_backup(self, backup_dir: str) -> Optional[Tuple[str, str, str]]:
+        """saves目录中最新的备份（按备份时存档的修改时间，重写过的增量备份不受影响）
+        Returns:
+            (备份名称, 备份方式, 备份文件路径)
+        """
+        latest = None
+        latest_key = None
+        try:
+            with os.scandir(backup_dir) as it:
+                names = [entry.name for entry in it if entry.is_file()]
+        except FileNotFoundError:
+            return None
+        for name in names:
+            for kind, suffix in self.BACKUP_SUFFIXES:
+                if name.endswith(suffix):
+                    backup_path = os.path.join(backup_dir, name)
+                    try:
+                        key = (self._backup_mtime_ns(kind, backup_path), name)
+                    except Exception as e:
+                        print(f"读取备份信息失败 {backup_path}: {e}")
+                        break
+                    if latest_key is None or key > latest_key:
+                        latest_key = key
+                        latest = (name[:-len(suffix)], kind, backup_path)
+                    break
+        return latest
+    
+    def _write_delta_or_full(self, backup_dir: str, backup_id: str, target: bytes, mtime_ns: int,
+                             base_id: Optional[str], base_depth: int) -> str:
+        """以base_id为基准写入增量备份；没有基准、链已达到长度上限或差异过大时写入完整备份"""
+        if base_id is not None and base_depth + 1 < self.config_manager.get_delta_keyframe_interval():
+            base_data = self._read_backup_data(backup_dir, base_id)
+            encoded = DeltaCodec.encode(DeltaCodec.diff(base_data, target))
+            if len(encoded) <= len(target) * self.DELTA_MAX_RATIO:
+                delta_path = os.path.join(backup_dir, backup_id + ".bin.delta")
+                DeltaCodec.write(delta_path, base_id, base_depth + 1, target, mtime_ns, encoded)
+                return delta_path
+        
+        # 完整备份（关键帧）
+        backup_path = os.path.join(backup_dir, backup_id + ".bin")
+        temp_file = backup_path + ".tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(target)
+        os.replace(temp_file, backup_path)
+        os.utime(backup_path, ns=(mtime_ns, mtime_ns))
+        return backup_path
+    
+    def _rebase_dependents(self, backup_dir: str, backup_id: str, kind: str, backup_path: str) -> List[str]:
+        """删除备份前，把以它为基准的增量备份改为以它的基准为基准（它本身是完整备份时改为完整备份）
+        Returns:
+            被改写的备份名称
+        """
+        dependents = []
+        with os.scandir(backup_dir) as it:
+            delta_paths = [entry.path for entry in it if entry.name.endswith(".bin.delta")]
+        for delta_path in delta_paths:
+            if delta_path != backup_path and DeltaCodec.read(delta_path, with_data=False)["base"] == backup_id:
+                dependents.append(delta_path)
+        if not dependents:
+            return []
+        
+        if kind == "delta":
+            header = DeltaCodec.read(backup_path, with_data=False)
+            new_base, new_base_depth = header["base"], header["depth"] - 1
+        else:
+            new_base, new_base_depth = None, 0
+        for delta_path in dependents:
+            dependent_id = os.path.basename(delta_path)[:-len(".bin.delta")]
+            data = self._read_backup_data(backup_dir, dependent_id)
+            mtime_ns = DeltaCodec.read(delta_path, with_data=False)["mtime_ns"]
+            # 重新编码后的路径可能变为完整备份，先写新文件再删除旧文件
+            new_path = self._write_delta_or_full(backup_dir, dependent_id, data, mtime_ns, new_base, new_base_depth)
+            if new_path != delta_path:
+                os.remove(delta_path)
+        return [os.path.basename(path)[:-len(".bin.delta")] for path in dependents]
+    
+    def analyze_delta_chains(self, scenario_path: str) -> Dict:
+        """统计场景备份的存储空间和还原耗时，用于调整完整备份间隔
+        Returns:
+            {'backups': [{'name', 'kind', 'depth', 'size', 'stored_bytes', 'restore_ms'}, ...],
+             'original_bytes', 'stored_bytes', 'savings', 'avg_restore_ms', 'max_restore_ms'}
+        """
+        backup_dir = os.path.join(scenario_path, self.backup_dir_name)
+        rows = []
+        for backup_id in self.list_backups(scenario_path):
+            resolved = self._resolve_in_dir(backup_dir, backup_id)
+            if resolved is None:
+                continue
+            kind, backup_path = resolved
+            start = time.perf_counter()
+            try:
+                data = self._read_backup_data(backup_dir, backup_id)
+            except Exception as e:
+                print(f"读取备份失败 {backup_id}: {e}")
+                continue
+            restore_ms = (time.perf_counter() - start) * 1000
+            depth = DeltaCodec.read(backup_path, with_data=False)["depth"] if kind == "delta" else 0
+            rows.append({'name': backup_id, 'kind': kind, 'depth': depth, 'size': len(data),
+                         'stored_bytes': os.path.getsize(backup_path), 'restore_ms': round(restore_ms, 3)})
+        
+        original_bytes = sum(row['size'] for row in rows)
+        stored_bytes = sum(row['stored_bytes'] for row in rows)
+        return {
+            'backups': rows,
+            'original_bytes': original_bytes,
+            'stored_bytes': stored_bytes,
+            'savings': round(1 - stored_bytes / original_bytes, 4) if original_bytes else 0.0,
+            'avg_restore_ms': round(sum(row['restore_ms'] for row in rows) / len(rows), 3) if rows else 0.0,
+            'max_restore_ms': max((row['restore_ms'] for row in rows), default=0.0)
+        }
+    
+    @staticmethod
+    def _read_reference(ref_path: str) -> Dict:
+        """读取去重备份的引用文件"""
+        with open(ref_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    @staticmethod
+    def _write_json_atomic(path: str, data: Dict):
+        """先写临时文件再替换，避免中断时留下不完整的文件"""
+        temp_file = path + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_file, path)
+    
+    def _write_backup(self, mode: str, save_file: str, backup_dir: str, backup_id: str) -> str:
+        """按备份方式写入备份文件，返回备份文件路径"""
+        if mode == "dedup":
+            store = self.get_object_store()
+            mtime_ns = os.stat(save_file).st_mtime_ns
+            digest, size, _ = store.put_file(save_file)
+            ref_path = os.path.join(backup_dir, backup_id + ".bin.ref")
+            try:
+                self._write_json_atomic(ref_path, {"object": digest, "size": size, "mtime_ns": mtime_ns})
+            except Exception:
+                store.release(digest)
+                raise
+            finally:
+                store.settle([digest])
+            return ref_path
+        
+        if mode == "delta":
+            # 以同一saves目录中最新的备份为基准，每N个备份写一个完整备份
+            with open(save_file, 'rb') as f:
+                target = f.read()
+            mtime_ns = os.stat(save_file).st_mtime_ns
+            latest = self._latest_backup(backup_dir)
+            base_id, base_depth = None, 0
+            if latest is not None:
+                base_id, base_kind, base_path = latest
+                if base_kind == "delta":
+                    base_depth = DeltaCodec.read(base_path, with_data=False)["depth"]
+            return self._write_delta_or_full(backup_dir, backup_id, target, mtime_ns, base_id, base_depth)
+        
+        if mode == "compressed":
+            # MD5校验文件的内容保存在容器中，不再单独复制
+            md5_file = os.path.join(os.path.dirname(save_file), "CurrentSave.bin.MD5")
+            md5_content = None
+            if os.path.exists(md5_file):
+                with open(md5_file, 'rb') as f:
+                    md5_content = f.read()
+            container_path = os.path.join(backup_dir, backup_id + ".bin.cz")
+            BackupContainer.write(save_file, container_path, self.config_manager.get_compression(), md5_content)
+            return container_path
+        
+        backup_path = os.path.join(backup_dir, backup_id + ".bin")
+        self._copy_file(save_file, backup_path)
+        return backup_path
+    
+    @staticmethod
+    def _read_small_file(path: str) -> Optional[bytes]:
+        """读取MD5校验文件等小文件，不存在时返回None"""
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    
+    def _restore_backup_file(self, kind: str, backup_path: str, save_file: str):
+        """把备份内容写回存档文件"""
+        if kind == "dedup":
+            reference = self._read_reference(backup_path)
+            object_path = self.get_object_store().object_path(reference["object"])
+            self._copy_file(object_path, save_file, metadata=False)
+            # 与copy2一致，还原后的存档保留备份时的修改时间
+            os.utime(save_file, ns=(reference["mtime_ns"], reference["mtime_ns"]))
+            return
+        if kind == "compressed":
+            header = BackupContainer.extract(backup_path, save_file)
+            if header["md5"] is not None:
+                with open(os.path.join(os.path.dirname(save_file), "CurrentSave.bin.MD5"), 'wb') as f:
+                    f.write(header["md5"])
+            return
+        if kind == "delta":
+            # 沿增量链重建存档，校验通过后再替换
+            backup_dir = os.path.dirname(backup_path)
+            data = self._read_backup_data(backup_dir, os.path.basename(backup_path)[:-len(".bin.delta")])
+            temp_file = save_file + ".tmp"
+            with open(temp_file, 'wb') as f:
+                f.write(data)
+            os.replace(temp_file, save_file)
+            mtime_ns = DeltaCodec.read(backup_path, with_data=False)["mtime_ns"]
+            os.utime(save_file, ns=(mtime_ns, mtime_ns))
+            return
+        
+        self._copy_file(backup_path, save_file)
+    
+    def _describe_backup(self, backup_dir: str, backup_id: str, kind: str, backup_path: str,
+                         names: Optional[set] = None, sha256: Optional[str] = None) -> Dict:
+        """读取一个备份的清单条目
+        Args:
+            names: saves目录中的文件名集合，提供时不再单独检查MD5文件是否存在
+            sha256: 完整复制备份的哈希（其他方式的哈希记录在备份文件中）
+        """
+        stat_result = os.stat(backup_path)
+        entry = {"kind": kind, "size": stat_result.st_size, "stored_bytes": stat_result.st_size,
+                 "mtime_ns": stat_result.st_mtime_ns, "sha256": sha256, "md5": False}
+        if kind == "dedup":
+            reference = self._read_reference(backup_path)
+            entry.update(size=reference["size"], mtime_ns=reference["mtime_ns"], sha256=reference["object"])
+        elif kind in ("compressed", "delta"):
+            header = (BackupContainer.read_header(backup_path) if kind == "compressed"
+                      else DeltaCodec.read(backup_path, with_data=False))
+            entry.update(size=header["size"], mtime_ns=header["mtime_ns"], sha256=header["sha256"])
+            if kind == "compressed":
+                # 压缩备份的MD5校验文件内容保存在容器中
+                entry["md5"] = header["md5"] is not None
+        if not entry["md5"]:
+            md5_name = backup_id + ".bin.MD5"
+            entry["md5"] = md5_name in names if names is not None else os.path.exists(os.path.join(backup_dir, md5_name))
+        return entry
+    
+    @staticmethod
+    def _list_files(backup_dir: str) -> set:
+        """saves目录中的文件名"""
+        with os.scandir(backup_dir) as it:
+            return {entry.name for entry in it if entry.is_file()}
+    
+    def _listed_backup_ids(self, names: set) -> set:
+        """文件名集合中的备份名称"""
+        return {name[:-len(suffix)] for name in names for _, suffix in self.BACKUP_SUFFIXES if name.endswith(suffix)}
+    
+    def _build_manifest(self, backup_dir: str, previous: Dict[str, Dict], names: Optional[set] = None) -> Dict[str, Dict]:
+        """枚举saves目录重建备份清单；完整复制备份的哈希沿用旧清单中未变化的条目，否则为None"""
+        if names is None:
+            names = self._list_files(backup_dir)
+        backups = {}
+        for kind, suffix in self.BACKUP_SUFFIXES:
+            for name in names:
+                if not name.endswith(suffix):
+                    continue
+                backup_id = name[:-len(suffix)]
+                if backup_id in backups:
+                    # 同名备份按BACKUP_SUFFIXES顺序取第一个，与_resolve_in_dir一致
+                    continue
+                backup_path = os.path.join(backup_dir, name)
+                try:
+                    entry = self._describe_backup(backup_dir, backup_id, kind, backup_path, names)
+                except Exception as e:
+                    print(f"读取备份信息失败 {backup_path}: {e}")
+                    continue
+                old = previous.get(backup_id)
+                if (kind == "copy" and old is not None and old.get("kind") == kind
+                        and (old["stored_bytes"], old["mtime_ns"]) == (entry["stored_bytes"], entry["mtime_ns"])):
+                    entry["sha256"] = old.get("sha256")
+                backups[backup_id] = entry
+        return backups
+    
+    def _read_manifest(self, backup_dir: str) -> Optional[Dict]:
+        """读取saves目录中的备份清单文件，不存在或已损坏时返回None"""
+        try:
+            with open(os.path.join(backup_dir, self.BACKUP_MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("version") == self.BACKUP_MANIFEST_VERSION and isinstance(manifest.get("backups"), dict):
+                return manifest
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"读取备份清单失败 {backup_dir}: {e}")
+        return None
+    
+    def _manifest_dir_mtime(self, backup_dir: str) -> Optional[int]:
+        """在列出saves目录之前取得目录的修改时间，写入清单时记录这个时间
+        
+        只有新建、删除或重命名目录项才会改变目录的修改时间，因此先创建清单文件，之后原地改写，
+        不会使记录的时间失效；列出目录之后其他程序新建的备份会改变目录的修改时间，下次读取时重建。
+        Returns:
+            目录的修改时间，无法写入清单时为None
+        """
+        try:
+            path = os.path.join(backup_dir, self.BACKUP_MANIFEST_NAME)
+            if not os.path.exists(path):
+                open(path, 'w').close()
+            return os.stat(backup_dir).st_mtime_ns
+        except Exception as e:
+            print(f"写入备份清单失败 {backup_dir}: {e}")
+            return None
+    
+    def _write_manifest(self, backup_dir: str, backups: Dict[str, Dict], dir_mtime_ns: int):
+        """写入备份清单（清单只是缓存，写入中断损坏时下次会重建）
+        Args:
+            dir_mtime_ns: _manifest_dir_mtime()在列出目录之前取得的修改时间
+        """
+        path = os.path.join(backup_dir, self.BACKUP_MANIFEST_NAME)
+        manifest = {"version": self.BACKUP_MANIFEST_VERSION,
+                    "dir_mtime_ns": dir_mtime_ns,
+                    "backups": backups}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    
+    def _manifest_backups(self, backup_dir: str) -> Dict[str, Dict]:
+        """获取saves目录的备份清单{备份名称: 条目}
+        清单记录的目录修改时间与当前一致时直接使用（只需一次stat和一次读取），否则重建并写回。
+        """
+        with self._backup_dir_lock(backup_dir):
+            try:
+                dir_mtime_ns = os.stat(backup_dir).st_mtime_ns
+            except FileNotFoundError:
+                return {}
+            manifest = self._read_manifest(backup_dir)
+            if manifest is not None and manifest.get("dir_mtime_ns") == dir_mtime_ns:
+                self.profiler.add("backup.manifest_hits")
+                return manifest["backups"]
+            
+            self.profiler.add("backup.manifest_rebuilds")
+            dir_mtime_ns = self._manifest_dir_mtime(backup_dir)
+            backups = self._build_manifest(backup_dir, manifest["backups"] if manifest is not None else {})
+            if dir_mtime_ns is not None:
+                try:
+                    self._write_manifest(backup_dir, backups, dir_mtime_ns)
+                except Exception as e:
+                    print(f"写入备份清单失败 {backup_dir}: {e}")
+            return backups
+    
+    def _update_manifest(self, backup_dir: str, backups: Dict[str, Dict], backup_ids: List[str],
+                         sha256: Optional[Dict[str, str]] = None):
+        """备份新建/删除后更新清单中对应的条目并写回
+        
+        更新后的备份与目录中的不一致（其他程序在取得清单之后新建或删除了备份）时重建清单。
+        Args:
+            backups: 操作前取得的有效清单，原地更新
+            backup_ids: 发生变化的备份名称，备份已不存在时移除条目
+            sha256: {备份名称: 哈希}，新建的完整复制备份的哈希
+        """
+        try:
+            with self._backup_dir_lock(backup_dir):
+                dir_mtime_ns = self._manifest_dir_mtime(backup_dir)
+                names = self._list_files(backup_dir)
+                for backup_id in backup_ids:
+                    resolved = self._resolve_in_dir(backup_dir, backup_id)
+                    if resolved is None:
+                        backups.pop(backup_id, None)
+                        continue
+                    backups[backup_id] = self._describe_backup(backup_dir, backup_id, *resolved, names=names,
+                                                               sha256=(sha256 or {}).get(backup_id))
+                if set(backups) != self._listed_backup_ids(names):
+                    self.profiler.add("backup.manifest_rebuilds")
+                    rebuilt = self._build_manifest(backup_dir, backups, names)
+                    backups.clear()
+                    backups.update(rebuilt)
+                if dir_mtime_ns is not None:
+                    self._write_manifest(backup_dir, backups, dir_mtime_ns)
+        except Exception as e:
+            print(f"更新备份清单失败 {backup_dir}: {e}")
+    
+    def _compare_mapped(self, save_file: str, other_path: str, size: int) -> Tuple[bool, Optional[str]]:
+        """用内存映射按块逐字节比较两个大小相同的文件，不相同时尽早停止
+        Returns:
+            (是否相同, 相同时顺便得到的SHA-256)
+        """
+        if size == 0:
+            return True, hashlib.sha256().hexdigest()
+        digest = hashlib.sha256()
+        with open(save_file, 'rb') as f, open(other_path, 'rb') as g:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as a, \
+                    mmap.mmap(g.fileno(), 0, access=mmap.ACCESS_READ) as b:
+                if len(a) != len(b):
+                    return False, None
+                for offset in range(0, len(a), self.COMPARE_CHUNK_SIZE):
+                    chunk = a[offset:offset + self.COMPARE_CHUNK_SIZE]
+                    if chunk != b[offset:offset + self.COMPARE_CHUNK_SIZE]:
+                        return False, None
+                    digest.update(chunk)
+        return True, digest.hexdigest()
+    
+    def _cache_content_hash(self, key: Tuple[str, int, int], sha256: str):
+        if len(self._content_hashes) >= self.CONTENT_HASH_CACHE_SIZE:
+            self._content_hashes.clear()
+        self._content_hashes[key] = sha256
+    
+    def _compare_stream(self, save_file: str, chunks) -> Tuple[bool, Optional[str]]:
+        """把存档与逐块产生的备份内容比较，不相同时尽早停止
+        Returns:
+            (是否相同, 相同时顺便得到的SHA-256)
+        """
+        digest = hashlib.sha256()
+        with open(save_file, 'rb') as f:
+            for chunk in chunks:
+                if f.read(len(chunk)) != chunk:
+                    return False, None
+                digest.update(chunk)
+            if f.read(1):
+                return False, None
+        return True, digest.hexdigest()
+    
+    @staticmethod
+    def _recorded_sha256(backup_dir: str, entry: Dict) -> Optional[str]:
+        """清单中记录的备份内容哈希
+        完整复制备份的文件可能被直接改写（目录修改时间不变，清单不会重建），只有文件的大小和修改时间
+        仍与清单一致时才使用记录的哈希；其他方式的哈希来自备份文件本身。
+        """
+        if entry['sha256'] is None or entry['kind'] != "copy":
+            return entry['sha256']
+        try:
+            stat_result = os.stat(os.path.join(backup_dir, entry['name'] + ".bin"))
+        except OSError:
+            return None
+        if (stat_result.st_size, stat_result.st_mtime_ns) != (entry['size'], entry['mtime_ns']):
+            return None
+        return entry['sha256']
+    
+    @profiled("backup.compare")
+    def find_identical_backup(self, scenario_path: str, backup_id: Optional[str] = None,
+                              confirm: bool = False) -> Optional[str]:
+        """查找与当前存档内容相同的备份（存档时间最新的优先）
+        
+        依次比较：大小；缓存的哈希（备份记录的存档修改时间和大小与当前存档相同时即为该备份的哈希，
+        或之前比较时计算过的哈希）；完整复制和去重备份用内存映射逐字节比较；压缩和增量备份计算存档的
+        SHA-256与备份记录的比较。大小不同的备份不需要读取任何数据。
+        Args:
+            backup_id: 只与这个备份比较
+            confirm: 不只凭记录的哈希判断相同，始终逐字节比较内容确认（还原时跳过写入、创建硬链接前使用）；
+                压缩备份流式解压比较，增量备份还原后比较
+        Returns:
+            相同的备份名称，没有时返回None
+        """
+        save_file = os.path.join(scenario_path, "CurrentSave.bin")
+        try:
+            save_stat = os.stat(save_file)
+        except FileNotFoundError:
+            return None
+        backup_dir = os.path.join(scenario_path, self.backup_dir_name)
+        details = self._backup_details(backup_dir)
+        candidates = [entry for entry in details if entry['size'] == save_stat.st_size
+                      and (backup_id is None or entry['name'] == backup_id)]
+        if backup_id is None:
+            self.profiler.add("compare.size_rejected", len(details) - len(candidates))
+        if not candidates:
+            return None
+        
+        key = (save_file, save_stat.st_size, save_stat.st_mtime_ns)
+        save_sha256 = self._content_hashes.get(key)
+        if save_sha256 is None:
+            save_sha256 = next((sha256 for sha256 in (self._recorded_sha256(backup_dir, entry) for entry in details
+                                if (entry['mtime_ns'], entry['size']) == (save_stat.st_mtime_ns, save_stat.st_size))
+                                if sha256 is not None), None)
+        
+        for entry in candidates:
+            recorded = self._recorded_sha256(backup_dir, entry)
+            if save_sha256 is not None and recorded is not None:
+                self.profiler.add("compare.hash")
+                if save_sha256 != recorded:
+                    continue
+                if not confirm:
+                    return entry['name']
+            
+            try:
+                kind, backup_path = self._resolve_in_dir(backup_dir, entry['name'])
+                if kind in ("copy", "dedup"):
+                    if kind == "dedup":
+                        backup_path = self.get_object_store().object_path(self._read_reference(backup_path)["object"])
+                    self.profiler.add("compare.mmap")
+                    same, digest = self._compare_mapped(save_file, backup_path, save_stat.st_size)
+                elif confirm:
+                    self.profiler.add("compare.stream")
+                    chunks = (BackupContainer.iter_chunks(backup_path) if kind == "compressed"
+                              else [self._read_backup_data(backup_dir, entry['name'])])
+                    same, digest = self._compare_stream(save_file, chunks)
+                elif recorded is not None:
+                    self.profiler.add("compare.hashed")
+                    save_sha256 = digest = ObjectStore.hash_file(save_file)[0]
+                    self._cache_content_hash(key, digest)
+                    same = digest == recorded
+                else:
+                    continue
+                if same:
+                    self._cache_content_hash(key, digest)
+                    return entry['name']
+            except Exception as e:
+                print(f"比较备份失败 {entry['name']}: {e}")
+        return None
+    
+    def _link_backup(self, scenario_path: str, backup_dir: str, source_id: str, backup_id: str) -> Optional[str]:
+        """当前存档与备份source_id相同时，把新备份创建为它的硬链接
+        只用于创建后不会再改写的完整复制和压缩备份（增量备份可能被改写，去重备份的引用需要计数）
+        Returns:
+            新备份文件路径，不能链接时返回None
+        """
+        resolved = self._resolve_in_dir(backup_dir, source_id)
+        if resolved is None or resolved[0] not in ("copy", "compressed"):
+            return None
+        if self.find_identical_backup(scenario_path, source_id, confirm=True) != source_id:
+            return None
+        kind, source_path = resolved
+        link_path = os.path.join(backup_dir, backup_id + dict(self.BACKUP_SUFFIXES)[kind])
+        try:
+            os.link(source_path, link_path)
+        except OSError as e:
+            # 文件系统不支持硬链接（例如FAT32）时改为正常写入
+            print(f"创建硬链接失败: {e}")
+            return None
+        self.profiler.add("backup.linked")
+        return link_path
+    
+    @profiled("backup.create")
+    def create_backup(self, scenario_path: str, custom_filename: str = None,
+                      link_to: Optional[str] = None) -> tuple[bool, str]:
+        """创建存档备份
+        Args:
+            link_to: 当前存档与这个备份相同时，新备份为它的硬链接，不写入数据
+        Returns:
+            (success: bool, error_message: str)
+        """
+        try:
+            save_file = os.path.join(scenario_path, "CurrentSave.bin")
+            if not os.path.exists(save_file):
+                return False, "未找到CurrentSave.bin文件"
+            
+            backup_dir = os.path.join(scenario_path, self.backup_dir_name)
+            if not os.path.exists(backup_dir):
+                os.makedirs(backup_dir)
+            
+            # 使用自定义文件名或生成默认文件名
+            if custom_filename:
+                # 确保文件名以.bin结尾
+                if not custom_filename.endswith('.bin'):
+                    custom_filename += '.bin'
+                backup_file = custom_filename
+            else:
+                # 生成默认文件名
+                timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+                backup_file = f"CurrentSave-{timestamp}.bin"
+            
+            # 同一场景的备份操作依次进行：增量备份选择的基准不会被同时删除，清单不会遗漏备份
+            with self._backup_dir_lock(backup_dir):
+                # 检查文件是否已存在（任何备份方式的同名备份都算）
+                if self._resolve_backup(scenario_path, backup_file):
+                    return False, f"备份文件 '{backup_file}' 已存在，请使用不同的名称"
+                
+                # 复制存档文件（去重方式下只写入引用）
+                backups = self._manifest_backups(backup_dir)
+                mode = self.config_manager.get_backup_mode()
+                backup_id = self._backup_id(backup_file)
+                backup_path = None
+                if link_to:
+                    backup_path = self._link_backup(scenario_path, backup_dir, self._backup_id(link_to), backup_id)
+                if backup_path is None:
+                    backup_path = self._write_backup(mode, save_file, backup_dir, backup_id)
+                
+                # 复制MD5校验文件（如果存在，压缩备份已包含在容器中）
+                md5_file = os.path.join(scenario_path, "CurrentSave.bin.MD5")
+                if not backup_path.endswith(".bin.cz") and os.path.exists(md5_file):
+                    # MD5文件名与存档文件名保持一致（只改扩展名）
+                    md5_backup_file = backup_file + ".MD5" if not backup_file.endswith('.MD5') else backup_file
+                    backup_md5_path = os.path.join(backup_dir, md5_backup_file)
+                    self._copy_file(md5_file, backup_md5_path)
+                
+                # 完整复制的备份文件中没有哈希，记录在清单中（硬链接沿用原备份的哈希）
+                sha256 = None
+                if backup_path.endswith(".bin"):
+                    linked = backups.get(self._backup_id(link_to)) if link_to else None
+                    if linked is not None and linked.get("sha256") and os.path.samefile(
+                            backup_path, os.path.join(backup_dir, self._backup_id(link_to) + ".bin")):
+                        sha256 = {backup_id: linked["sha256"]}
+                    else:
+                        sha256 = {backup_id: ObjectStore.hash_file(backup_path)[0]}
+                self._update_manifest(backup_dir, backups, [backup_id], sha256)
+            self._catalog_scenario(scenario_path)
+            
+            return True, ""
+            
+        except Exception as e:
+            return False, f"创建备份失败: {e}"
+    
+    @profiled("backup.restore")
+    def restore_backup(self, scenario_path: str, backup_filename: str) -> bool:
+        """还原存档备份"""
+        try:
+            resolved = self._resolve_backup(scenario_path, backup_filename)
+            if resolved is None:
+                return False
+            
+            save_file = os.path.join(scenario_path, "CurrentSave.bin")
+            original_md5_file = os.path.join(scenario_path, "CurrentSave.bin.MD5")
+            
+            # 用备份内容覆盖原存档（内容相同时不重写）
+            kind, backup_path = resolved
+            if self.find_identical_backup(scenario_path, self._backup_id(backup_filename), confirm=True) is None:
+                self._restore_backup_file(kind, backup_path, save_file)
+            else:
+                self.profiler.add("backup.restore_skipped")
+                if kind == "compressed":
+                    md5_content = BackupContainer.read_header(backup_path)["md5"]
+                    if md5_content is not None and self._read_small_file(original_md5_file) != md5_content:
+                        with open(original_md5_file, 'wb') as f:
+                            f.write(md5_content)
+            
+            # 还原MD5校验文件（如果存在且不同）
             md5_filename = backup_filename + ".MD5"
             backup_md5_path = os.path.join(scenario_path, self.backup_dir_name, md5_filename)
-            if os.path.exists(backup_md5_path):
-                original_md5_file = os.path.join(scenario_path, "CurrentSave.bin.MD5")
-                shutil.copy2(backup_md5_path, original_md5_file)
+            if os.path.exists(backup_md5_path) and \
+                    self._read_small_file(backup_md5_path) != self._read_small_file(original_md5_file):
+                self._copy_file(backup_md5_path, original_md5_file)
+            
+            if self._in_routes(scenario_path):
+                try:
+                    self.get_backup_catalog().mark_restored(self._scenario_key(scenario_path),
+                                                            self._backup_id(backup_filename))
+                except Exception as e:
+                    print(f"更新备份目录失败: {e}")
             
             return True
             
@@ -388,64 +3316,2093 @@ class TrainSimulatorBackupTool:
             print(f"还原备份失败: {e}")
             return False
     
-    def delete_backup(self, scenario_path: str, backup_filename: str) -> bool:
-        """删除备份"""
-        try:
-            backup_path = os.path.join(scenario_path, self.backup_dir_name, backup_filename)
-            deleted = False
-            
-            # 删除存档文件
-            if os.path.exists(backup_path):
-                os.remove(backup_path)
-                deleted = True
+    @profiled("backup.delete")
+    def delete_backup(self, scenario_path: str, backup_filename: str) -> bool:
+        """删除备份"""
+        try:
+            deleted, errors = self._delete_backups(scenario_path, [self._backup_id(backup_filename)])
+            for error in errors.values():
+                print(f"删除备份失败: {error}")
+            return bool(deleted)
+            
+        except Exception as e:
+            print(f"删除备份失败: {e}")
+            return False
+    
+    def _delete_backups(self, scenario_path: str, backup_ids: List[str]) -> Tuple[List[str], Dict[str, str]]:
+        """按给定顺序删除一个场景的多个备份，去重对象的引用、备份清单和备份目录数据库都只更新一次
+        
+        以被删除备份为基准的增量备份会先改用它的基准，否则将无法还原。按存档时间由新到旧传入时，
+        同样要删除的增量备份在它的基准之前删除，不会被白白改写。
+        Returns:
+            (已删除的备份名称, {备份名称: 错误信息})
+        """
+        backup_dir = os.path.join(scenario_path, self.backup_dir_name)
+        with self._backup_dir_lock(backup_dir):
+            backups = self._manifest_backups(backup_dir)
+            changed_ids = []
+            deleted = []
+            errors = {}
+            released = []
+            
+            for backup_id in backup_ids:
+                try:
+                    removed = False
+                    # 删除存档文件，去重备份同时释放对存储对象的引用
+                    resolved = self._resolve_in_dir(backup_dir, backup_id)
+                    if resolved is not None:
+                        kind, backup_path = resolved
+                        reference = self._read_reference(backup_path) if kind == "dedup" else None
+                        changed_ids += self._rebase_dependents(backup_dir, backup_id, kind, backup_path)
+                        os.remove(backup_path)
+                        if reference is not None:
+                            released.append(reference["object"])
+                        removed = True
+                    
+                    # 删除对应的MD5校验文件
+                    backup_md5_path = os.path.join(backup_dir, backup_id + ".bin.MD5")
+                    if os.path.exists(backup_md5_path):
+                        os.remove(backup_md5_path)
+                        removed = True
+                    
+                    if removed:
+                        deleted.append(backup_id)
+                        changed_ids.append(backup_id)
+                except Exception as e:
+                    errors[backup_id] = str(e)
+            
+            if released:
+                self.get_object_store().release_references(released)
+            if changed_ids:
+                self._update_manifest(backup_dir, backups, changed_ids)
+                self._catalog_scenario(scenario_path)
+        return deleted, errors
+    
+    @profiled("backup.list")
+    def list_backup_details(self, scenario_path: str) -> List[Dict]:
+        """列出所有备份及其信息，按备份时存档的修改时间倒序（最新的在前面）
+        Returns:
+            [{'name', 'kind', 'size'（存档大小）, 'stored_bytes'（备份占用）, 'mtime_ns'（存档修改时间）,
+              'sha256'（旧的完整复制备份可能为None）, 'md5'（是否有MD5校验文件）}, ...]
+        """
+        try:
+            return self._backup_details(os.path.join(scenario_path, self.backup_dir_name))
+        except Exception as e:
+            print(f"列出备份失败: {e}")
+            return []
+    
+    def _backup_details(self, backup_dir: str) -> List[Dict]:
+        """备份清单中的条目按存档时间倒序排列（不计入backup.list统计）"""
+        details = [dict(entry, name=backup_id) for backup_id, entry in self._manifest_backups(backup_dir).items()]
+        details.sort(key=lambda entry: (entry['mtime_ns'], entry['name']), reverse=True)
+        return details
+    
+    def list_backups(self, scenario_path: str) -> List[str]:
+        """列出所有备份名称（最新的在前面）"""
+        return [entry['name'] for entry in self.list_backup_details(scenario_path)]
+    
+    def iter_scenario_dirs(self):
+        """直接枚举文件系统，遍历所有Content/Routes/*/Scenarios/*目录（包括未扫描到的场景）
+        产生(路线UUID, 场景UUID, 场景目录)
+        """
+        routes_path = self._get_routes_path()
+        if not routes_path:
+            return
+        for route_entry in self._list_directory(routes_path).values():
+            if not route_entry.is_dir():
+                continue
+            scenarios_path = os.path.join(route_entry.path, "Scenarios")
+            for scenario_entry in self._list_directory(scenarios_path).values():
+                if scenario_entry.is_dir():
+                    yield route_entry.name, scenario_entry.name, scenario_entry.path
+    
+    def iter_backup_dirs(self):
+        """遍历所有Content/Routes/*/Scenarios/*/saves目录（包括未扫描到的场景）
+        产生(场景目录, saves目录)
+        """
+        for _, _, scenario_path in self.iter_scenario_dirs():
+            backup_dir = os.path.join(scenario_path, self.backup_dir_name)
+            if os.path.isdir(backup_dir):
+                yield scenario_path, backup_dir
+    
+    def collect_backup_garbage(self) -> Dict:
+        """扫描所有去重备份的引用文件，重建引用计数并删除没有被引用的存储对象
+        Returns:
+            ObjectStore.collect_garbage()的结果，额外包含'references'（引用文件数量）
+        """
+        store = self.get_object_store()
+        if store is None:
+            return {}
+        
+        # 扫描期间新建的去重备份和快照即使没有被扫描到，其对象也会保留
+        with store.collecting():
+            referenced = {}
+            references = 0
+            for _, backup_dir in self.iter_backup_dirs():
+                with os.scandir(backup_dir) as it:
+                    ref_paths = [entry.path for entry in it if entry.name.endswith(".bin.ref")]
+                for ref_path in ref_paths:
+                    try:
+                        digest = self._read_reference(ref_path)["object"]
+                    except Exception as e:
+                        print(f"读取备份引用失败 {ref_path}: {e}")
+                        continue
+                    referenced[digest] = referenced.get(digest, 0) + 1
+                    references += 1
+            # 快照清单中的存档也引用去重存储中的对象
+            for name in self.list_snapshot_names():
+                manifest = self.load_snapshot(name)
+                if manifest is None:
+                    continue
+                for digest in self._snapshot_objects(manifest):
+                    referenced[digest] = referenced.get(digest, 0) + 1
+                    references += 1
+            
+            result = store.collect_garbage(referenced)
+        result['references'] = references
+        return result
+    
+    def _snapshots_path(self) -> str:
+        return os.path.join(self.railworks_path, self.STORE_DIR_NAME, self.SNAPSHOT_DIR_NAME)
+    
+    def list_snapshot_names(self) -> List[str]:
+        """所有快照的名称"""
+        if not self.railworks_path:
+            return []
+        try:
+            with os.scandir(self._snapshots_path()) as it:
+                return [entry.name[:-5] for entry in it if entry.name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+    
+    def load_snapshot(self, name: str) -> Optional[Dict]:
+        """读取快照清单，不存在或无法读取时返回None"""
+        path = os.path.join(self._snapshots_path(), name + ".json")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"读取快照失败 {name}: {e}")
+            return None
+    
+    @staticmethod
+    def _snapshot_objects(manifest: Dict) -> List[str]:
+        """快照引用的对象哈希（每个场景一个）"""
+        return [entry["object"] for entry in manifest["scenarios"].values()]
+    
+    def list_snapshots(self) -> List[Dict]:
+        """所有快照的概要，按创建时间倒序
+        Returns:
+            [{'name', 'created', 'scenarios', 'bytes'}]
+        """
+        snapshots = []
+        for name in self.list_snapshot_names():
+            manifest = self.load_snapshot(name)
+            if manifest is None:
+                continue
+            snapshots.append({'name': name, 'created': manifest["created"],
+                              'scenarios': len(manifest["scenarios"]),
+                              'bytes': sum(entry["size"] for entry in manifest["scenarios"].values())})
+        snapshots.sort(key=lambda item: (item['created'], item['name']), reverse=True)
+        return snapshots
+    
+    @profiled("snapshot.create")
+    def create_snapshot(self, name: Optional[str] = None, workers: Optional[int] = None,
+                        progress_callback: Optional[Callable[[int, int], None]] = None,
+                        cancel_event: Optional[threading.Event] = None) -> Dict:
+        """记录所有场景当前的CurrentSave.bin和MD5校验文件，生成一个可整体还原的快照
+        
+        存档数据保存在去重存储中；修改时间和大小与最近一个快照相同的存档直接引用原对象，不再计算哈希。
+        每个存档存入时即登记引用，写入快照清单失败或取消时全部释放，清单不会指向没有引用的对象。
+        Args:
+            name: 快照名称，默认按当前时间生成
+            workers: 并发数，默认读取backup_workers配置
+            progress_callback: 每处理完一个场景回调(已完成数, 总数)
+            cancel_event: 设置后不再读取新的存档，不创建快照
+        Returns:
+            {'name', 'scenarios', 'reused', 'stored', 'new_objects', 'bytes', 'elapsed', 'cancelled',
+             'errors': {场景键: 错误信息}, 'error'（整体失败时的错误信息，成功时为空字符串）}
+        """
+        start = time.perf_counter()
+        name = name or f"Snapshot-{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}"
+        result = {'name': name, 'scenarios': 0, 'reused': 0, 'stored': 0, 'new_objects': 0, 'bytes': 0,
+                  'elapsed': 0.0, 'cancelled': False, 'errors': {}, 'error': ""}
+        store = self.get_object_store()
+        if store is None:
+            result['error'] = "请先设置RailWorks路径"
+            return result
+        if not name or any(char in name for char in '\\/:*?"<>|'):
+            result['error'] = f"快照名称无效: {name}"
+            return result
+        if self.load_snapshot(name) is not None:
+            result['error'] = f"快照 '{name}' 已存在，请使用不同的名称"
+            return result
+        
+        # 以最近的快照为基准，未变化的存档不再读取内容
+        previous = {}
+        for summary in self.list_snapshots()[:1]:
+            previous = (self.load_snapshot(summary['name']) or {}).get("scenarios", {})
+        names = {scenario['path']: (route_data['name'], scenario['name'])
+                 for _, route_data, scenario in self.iter_scenarios(load=False)}
+        targets = [(f"{route_uuid}/{scenario_uuid}", path) for route_uuid, scenario_uuid, path in self.iter_scenario_dirs()
+                   if os.path.isfile(os.path.join(path, "CurrentSave.bin"))]
+        entries = {}
+        new_objects = set()
+        stored = []  # put_file()存入并已登记引用的对象，快照清单写入后settle()
+        reused_objects = []  # 引用上一个快照中对象的存档
+        lock = threading.Lock()
+        
+        def snapshot_one(target):
+            key, scenario_path = target
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            try:
+                save_file = os.path.join(scenario_path, "CurrentSave.bin")
+                save_stat = os.stat(save_file)
+                md5_file = os.path.join(scenario_path, "CurrentSave.bin.MD5")
+                md5 = None
+                if os.path.exists(md5_file):
+                    with open(md5_file, 'rb') as f:
+                        md5 = f.read().hex()
+                entry = previous.get(key)
+                reused = (entry is not None and entry["mtime_ns"] == save_stat.st_mtime_ns
+                          and entry["size"] == save_stat.st_size and store.has_object(entry["object"]))
+                size = save_stat.st_size
+                if reused:
+                    digest = entry["object"]
+                    with lock:
+                        reused_objects.append(digest)
+                else:
+                    # 复制时计算的哈希就是对象的哈希，不需要再单独读一遍存档
+                    digest, size, created = store.put_file(save_file)
+                    with lock:
+                        stored.append(digest)
+                        if created:
+                            new_objects.add(digest)
+                route_name, scenario_name = names.get(scenario_path, ("", ""))
+                new_entry = {"object": digest, "size": size, "mtime_ns": save_stat.st_mtime_ns,
+                             "md5": md5, "route_name": route_name, "scenario_name": scenario_name}
+                with lock:
+                    entries[key] = new_entry
+                    result['reused' if reused else 'stored'] += 1
+                    result['bytes'] += size
+            except Exception as e:
+                with lock:
+                    result['errors'][key] = f"读取存档失败: {e}"
+            if progress_callback:
+                with lock:
+                    done = len(entries) + len(result['errors'])
+                progress_callback(done, len(targets))
+        
+        with ThreadPoolExecutor(max_workers=workers or self.config_manager.get_backup_workers()) as executor:
+            list(executor.map(snapshot_one, targets))
+        
+        manifest = {"version": 1, "name": name, "created": datetime.now().isoformat(timespec='seconds'),
+                    "scenarios": dict(sorted(entries.items()))}
+        # 复用的对象仍被上一个快照引用，在写入清单之前登记引用即可
+        referenced = list(stored)
+        try:
+            if cancel_event is not None and cancel_event.is_set():
+                result['cancelled'] = True
+            else:
+                store.add_references(reused_objects)
+                referenced.extend(reused_objects)
+                os.makedirs(self._snapshots_path(), exist_ok=True)
+                self._write_json_atomic(os.path.join(self._snapshots_path(), name + ".json"), manifest)
+                referenced = []
+        except Exception as e:
+            result['error'] = f"保存快照失败: {e}"
+        finally:
+            try:
+                if referenced:
+                    store.release_references(referenced)
+            except Exception as e:
+                print(f"释放快照引用失败: {e}")
+            store.settle(stored)
+        result['scenarios'] = len(entries)
+        result['new_objects'] = len(new_objects)
+        result['elapsed'] = time.perf_counter() - start
+        return result
+    
+    @profiled("snapshot.restore")
+    def restore_snapshot(self, name: str, scenario_keys: Optional[List[str]] = None, workers: Optional[int] = None,
+                         progress_callback: Optional[Callable[[int, int], None]] = None,
+                         cancel_event: Optional[threading.Event] = None) -> Dict:
+        """把快照中的存档整体写回各场景（并发写入）；快照中没有的场景不受影响
+        Args:
+            scenario_keys: 只还原这些场景（"路线UUID/场景UUID"），默认还原全部
+            cancel_event: 设置后不再开始还原新的场景（已开始的场景照常完成）
+        Returns:
+            {'restored', 'unchanged'（当前存档已与快照相同）, 'failed', 'cancelled'（未还原的场景数）, 'elapsed',
+             'errors': {场景键: 错误信息}, 'error'}
+        """
+        start = time.perf_counter()
+        result = {'restored': 0, 'unchanged': 0, 'failed': 0, 'cancelled': 0, 'elapsed': 0.0, 'errors': {}, 'error': ""}
+        manifest = self.load_snapshot(name) if self.railworks_path else None
+        if manifest is None:
+            result['error'] = f"快照 '{name}' 不存在"
+            return result
+        store = self.get_object_store()
+        routes_path = self._get_routes_path()
+        items = [(key, entry) for key, entry in manifest["scenarios"].items()
+                 if scenario_keys is None or key in scenario_keys]
+        lock = threading.Lock()
+        done = [0]
+        
+        def restore_one(item):
+            key, entry = item
+            if cancel_event is not None and cancel_event.is_set():
+                with lock:
+                    result['cancelled'] += 1
+                return
+            route_uuid, scenario_uuid = key.split("/")
+            scenario_path = os.path.join(routes_path, route_uuid, "Scenarios", scenario_uuid)
+            save_file = os.path.join(scenario_path, "CurrentSave.bin")
+            try:
+                if not os.path.isdir(scenario_path):
+                    raise FileNotFoundError(f"场景目录不存在: {scenario_path}")
+                try:
+                    save_stat = os.stat(save_file)
+                    unchanged = (save_stat.st_mtime_ns, save_stat.st_size) == (entry["mtime_ns"], entry["size"])
+                except FileNotFoundError:
+                    unchanged = False
+                if not unchanged:
+                    # 先写临时文件，复制完成后再替换，避免中断时留下不完整的存档
+                    temp_file = save_file + ".tmp"
+                    self._copy_file(store.object_path(entry["object"]), temp_file, metadata=False)
+                    os.replace(temp_file, save_file)
+                    os.utime(save_file, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+                if entry["md5"] is not None:
+                    with open(os.path.join(scenario_path, "CurrentSave.bin.MD5"), 'wb') as f:
+                        f.write(bytes.fromhex(entry["md5"]))
+                outcome, error = ('unchanged' if unchanged else 'restored'), ""
+            except Exception as e:
+                outcome, error = 'failed', f"还原存档失败: {e}"
+            with lock:
+                result[outcome] += 1
+                if error:
+                    result['errors'][key] = error
+                done[0] += 1
+                count = done[0]
+            if progress_callback:
+                progress_callback(count, len(items))
+        
+        with ThreadPoolExecutor(max_workers=workers or self.config_manager.get_backup_workers()) as executor:
+            list(executor.map(restore_one, items))
+        result['elapsed'] = time.perf_counter() - start
+        return result
+    
+    def delete_snapshot(self, name: str) -> bool:
+        """删除快照并释放它引用的对象"""
+        try:
+            manifest = self.load_snapshot(name) if self.railworks_path else None
+            if manifest is None:
+                return False
+            os.remove(os.path.join(self._snapshots_path(), name + ".json"))
+            self.get_object_store().release_references(self._snapshot_objects(manifest))
+            return True
+        except Exception as e:
+            print(f"删除快照失败: {e}")
+            return False
+    
+    def _current_snapshot_entries(self) -> Dict[str, Dict]:
+        """当前各场景存档的修改时间和大小，格式与快照清单相同（不含对象哈希）"""
+        entries = {}
+        for route_uuid, scenario_uuid, scenario_path in self.iter_scenario_dirs():
+            try:
+                save_stat = os.stat(os.path.join(scenario_path, "CurrentSave.bin"))
+            except FileNotFoundError:
+                continue
+            entries[f"{route_uuid}/{scenario_uuid}"] = {"size": save_stat.st_size, "mtime_ns": save_stat.st_mtime_ns}
+        return entries
+    
+    def compare_snapshots(self, old_name: str, new_name: Optional[str] = None) -> Optional[Dict]:
+        """比较两个快照，new_name为None时与当前存档比较
+        两个快照之间按对象哈希比较；与当前存档比较时按修改时间和大小比较。
+        Returns:
+            {'added': [场景键], 'removed': [场景键], 'changed': [场景键], 'unchanged': 数量}，快照不存在时返回None
+        """
+        old = self.load_snapshot(old_name)
+        new = self.load_snapshot(new_name) if new_name is not None else {"scenarios": self._current_snapshot_entries()}
+        if old is None or new is None:
+            return None
+        old_entries, new_entries = old["scenarios"], new["scenarios"]
+        fields = ("object", "md5") if new_name is not None else ("mtime_ns", "size")
+        changed = [key for key in sorted(set(old_entries) & set(new_entries))
+                   if any(old_entries[key].get(field) != new_entries[key].get(field) for field in fields)]
+        return {'added': sorted(set(new_entries) - set(old_entries)),
+                'removed': sorted(set(old_entries) - set(new_entries)),
+                'changed': changed,
+                'unchanged': len(set(old_entries) & set(new_entries)) - len(changed)}
+    
+    def save_unchanged_since_backup(self, scenario_path: str) -> bool:
+        """当前存档是否已有内容相同的备份（从旧备份还原后未再游戏的存档也视为已备份）"""
+        return self.find_identical_backup(scenario_path) is not None
+    
+    @profiled("backup.all")
+    def backup_all(self, skip_unchanged: bool = True, workers: Optional[int] = None, backup_name: Optional[str] = None,
+                   progress_callback: Optional[Callable[[int, int, int], None]] = None,
+                   cancel_event: Optional[threading.Event] = None) -> Dict:
+        """备份所有含有CurrentSave.bin的场景（例如游戏更新前），使用有上限的线程池并发备份
+        Args:
+            skip_unchanged: 为True时跳过当前存档已有备份（没有变化）的场景
+            workers: 并发数，默认读取配置
+            backup_name: 这批备份的名称，默认按当前时间生成
+            progress_callback: 每完成一个场景回调(已完成数, 总数, 已备份字节数)
+            cancel_event: 设置后不再开始新的备份，已开始的备份照常完成
+        Returns:
+            {'total', 'backed_up', 'skipped', 'failed', 'cancelled', 'bytes', 'elapsed', 'mb_per_sec',
+             'backup_name', 'errors': {场景目录: 错误信息}}
+        """
+        start = time.perf_counter()
+        # 直接枚举文件系统：延迟模式下不需要加载路线的场景，也不会在后台线程中修改扫描结果
+        scenario_paths = [scenario_path for _, _, scenario_path in self.iter_scenario_dirs()
+                          if os.path.isfile(os.path.join(scenario_path, "CurrentSave.bin"))]
+        # 同一批备份使用相同的名称，便于辨认
+        if not backup_name:
+            backup_name = f"CurrentSave-{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}"
+        if not backup_name.endswith('.bin'):
+            backup_name += '.bin'
+
+        result = {'total': len(scenario_paths), 'backed_up': 0, 'skipped': 0, 'failed': 0, 'cancelled': 0,
+                  'bytes': 0, 'backup_name': backup_name, 'errors': {}}
+        lock = threading.Lock()
+        
+        def backup_one(scenario_path: str):
+            try:
+                if cancel_event is not None and cancel_event.is_set():
+                    outcome, size, error = 'cancelled', 0, ""
+                elif skip_unchanged and self.save_unchanged_since_backup(scenario_path):
+                    outcome, size, error = 'skipped', 0, ""
+                else:
+                    size = os.path.getsize(os.path.join(scenario_path, "CurrentSave.bin"))
+                    success, error = self.create_backup(scenario_path, backup_name)
+                    outcome = 'backed_up' if success else 'failed'
+            except Exception as e:
+                outcome, size, error = 'failed', 0, f"创建备份失败: {e}"
+            with lock:
+                result[outcome] += 1
+                if outcome == 'backed_up':
+                    result['bytes'] += size
+                elif outcome == 'failed':
+                    result['errors'][scenario_path] = error
+                done = result['backed_up'] + result['skipped'] + result['failed'] + result['cancelled']
+                backed_up_bytes = result['bytes']
+            if progress_callback:
+                progress_callback(done, len(scenario_paths), backed_up_bytes)
+        
+        with ThreadPoolExecutor(max_workers=workers or self.config_manager.get_backup_workers()) as executor:
+            list(executor.map(backup_one, scenario_paths))
+        
+        result['elapsed'] = time.perf_counter() - start
+        result['mb_per_sec'] = result['bytes'] / 2 ** 20 / result['elapsed'] if result['elapsed'] > 0 else 0.0
+        return result
+    
+    def auto_backup_paths(self) -> List[str]:
+        """自动备份监视的场景目录：设置中指定的场景，未指定时为文件系统中的所有场景"""
+        keys = self.config_manager.get_auto_backup()["scenarios"]
+        if not keys:
+            return [scenario_path for _, _, scenario_path in self.iter_scenario_dirs()]
+        routes_path = self._get_routes_path()
+        if not routes_path:
+            return []
+        paths = []
+        for key in keys:
+            route_uuid, scenario_uuid = key.split("/")
+            paths.append(os.path.join(routes_path, route_uuid, "Scenarios", scenario_uuid))
+        return paths
+    
+    @staticmethod
+    def _retention_keep(details: List[Dict], policy: Dict) -> set:
+        """按数量规则选出一个场景要保留的备份名称（details按存档时间倒序），没有数量规则时全部保留"""
+        if not any(policy[key] for key in ("keep_last", "keep_hourly", "keep_daily", "keep_weekly")):
+            return {entry['name'] for entry in details}
+        keep = {entry['name'] for entry in details[:policy['keep_last']]}
+        periods = (("keep_hourly", lambda t: (t.date(), t.hour)),
+                   ("keep_daily", lambda t: t.date()),
+                   ("keep_weekly", lambda t: t.isocalendar()[:2]))
+        for key, period_of in periods:
+            seen = set()
+            for entry in details:
+                if len(seen) >= policy[key]:
+                    break
+                # 倒序遍历，每个时间段遇到的第一个备份就是其中最新的
+                period = period_of(datetime.fromtimestamp(entry['mtime_ns'] / 1e9))
+                if period not in seen:
+                    seen.add(period)
+                    keep.add(entry['name'])
+        return keep
+    
+    @profiled("retention.plan")
+    def plan_retention(self, policy: Optional[Dict] = None) -> Dict:
+        """一次遍历所有saves目录，按保留策略计算要删除的备份，不修改任何文件（用于预览）
+        
+        数量规则选中的备份都保留；之后仍超出每个场景或所有场景的空间上限时，从存档时间最旧的开始删除。
+        每个场景最新的备份总会保留。占用空间按备份文件计算，去重备份只计引用文件。
+        Args:
+            policy: 覆盖配置中的部分或全部保留策略
+        Returns:
+            {'policy', 'scenarios'（有备份的场景数）, 'keep', 'keep_bytes', 'delete', 'delete_bytes',
+             'deletions': {场景目录: [备份信息, ...]（按存档时间倒序）}}
+        """
+        policy = dict(self.config_manager.get_retention_policy(), **(policy or {}))
+        scenarios = []  # [(场景目录, 保留的备份, 删除的备份)]，均按存档时间倒序
+        for scenario_path, backup_dir in self.iter_backup_dirs():
+            try:
+                details = self._backup_details(backup_dir)
+            except Exception as e:
+                print(f"读取备份清单失败 {backup_dir}: {e}")
+                continue
+            if not details:
+                continue
+            keep_names = self._retention_keep(details, policy)
+            kept = [entry for entry in details if entry['name'] in keep_names]
+            deleted = [entry for entry in details if entry['name'] not in keep_names]
+            if policy['max_scenario_bytes']:
+                used = sum(entry['stored_bytes'] for entry in kept)
+                while len(kept) > 1 and used > policy['max_scenario_bytes']:
+                    entry = kept.pop()
+                    used -= entry['stored_bytes']
+                    deleted.append(entry)
+            scenarios.append((scenario_path, kept, deleted))
+        
+        # 所有场景的空间上限：在各场景最新备份之外，全局按存档时间从旧到新删除
+        if policy['max_total_bytes']:
+            used = sum(entry['stored_bytes'] for _, kept, _ in scenarios for entry in kept)
+            candidates = sorted((entry['mtime_ns'], entry['name'], index)
+                                for index, (_, kept, _) in enumerate(scenarios) for entry in kept[1:])
+            over_budget = set()
+            for mtime_ns, name, index in candidates:
+                if used <= policy['max_total_bytes']:
+                    break
+                over_budget.add((index, name))
+                used -= next(entry['stored_bytes'] for entry in scenarios[index][1] if entry['name'] == name)
+            for index, (scenario_path, kept, deleted) in enumerate(scenarios):
+                deleted.extend(entry for entry in kept if (index, entry['name']) in over_budget)
+                kept[:] = [entry for entry in kept if (index, entry['name']) not in over_budget]
+        
+        plan = {'policy': policy, 'scenarios': len(scenarios), 'keep': 0, 'keep_bytes': 0,
+                'delete': 0, 'delete_bytes': 0, 'deletions': {}}
+        for scenario_path, kept, deleted in scenarios:
+            plan['keep'] += len(kept)
+            plan['keep_bytes'] += sum(entry['stored_bytes'] for entry in kept)
+            if deleted:
+                deleted.sort(key=lambda entry: (entry['mtime_ns'], entry['name']), reverse=True)
+                plan['deletions'][scenario_path] = deleted
+                plan['delete'] += len(deleted)
+                plan['delete_bytes'] += sum(entry['stored_bytes'] for entry in deleted)
+        return plan
+    
+    @profiled("retention.apply")
+    def apply_retention(self, policy: Optional[Dict] = None, dry_run: bool = False, workers: Optional[int] = None,
+                        progress_callback: Optional[Callable[[int, int, int], None]] = None,
+                        cancel_event: Optional[threading.Event] = None) -> Dict:
+        """按保留策略清理旧备份
+        
+        每个场景的备份在一个批次中删除（清单和数据库只更新一次），最多同时处理workers个场景，
+        避免清理大量旧备份时占满磁盘I/O。
+        Args:
+            policy: 覆盖配置中的部分或全部保留策略
+            dry_run: 为True时只计算不删除
+            workers: 并发处理的场景数，默认读取保留策略
+            progress_callback: 每处理完一个场景回调(已完成场景数, 场景总数, 已删除的备份数)
+            cancel_event: 设置后不再开始处理新的场景
+        Returns:
+            plan_retention()的结果，额外包含'dry_run', 'deleted', 'deleted_bytes', 'failed', 'cancelled',
+            'elapsed', 'errors': {备份文件路径: 错误信息}
+        """
+        start = time.perf_counter()
+        result = self.plan_retention(policy)
+        result.update(dry_run=dry_run, deleted=0, deleted_bytes=0, failed=0, cancelled=0, errors={})
+        items = list(result['deletions'].items())
+        if dry_run or not items:
+            result['elapsed'] = time.perf_counter() - start
+            return result
+        
+        lock = threading.Lock()
+        done = [0]
+        
+        def prune_one(item):
+            scenario_path, entries = item
+            sizes = {entry['name']: entry['stored_bytes'] for entry in entries}
+            if cancel_event is not None and cancel_event.is_set():
+                deleted, errors = [], {}
+                cancelled = len(entries)
+            else:
+                try:
+                    deleted, errors = self._delete_backups(scenario_path, [entry['name'] for entry in entries])
+                except Exception as e:
+                    deleted, errors = [], {name: str(e) for name in sizes}
+                cancelled = 0
+            with lock:
+                result['deleted'] += len(deleted)
+                result['deleted_bytes'] += sum(sizes[name] for name in deleted)
+                result['failed'] += len(errors)
+                result['cancelled'] += cancelled
+                for name, error in errors.items():
+                    result['errors'][os.path.join(scenario_path, self.backup_dir_name, name + ".bin")] = error
+                done[0] += 1
+                progress = (done[0], len(items), result['deleted'])
+            if progress_callback:
+                progress_callback(*progress)
+        
+        with ThreadPoolExecutor(max_workers=workers or result['policy']['workers']) as executor:
+            list(executor.map(prune_one, items))
+        
+        result['elapsed'] = time.perf_counter() - start
+        return result
+    
+    @staticmethod
+    def _parse_md5_sidecar(content: Optional[bytes]) -> Optional[str]:
+        """从MD5校验文件内容中取出MD5（十六进制文本或16字节二进制），无法识别时返回None"""
+        if not content:
+            return None
+        match = re.match(rb"\s*([0-9a-fA-F]{32})\b", content)
+        if match:
+            return match.group(1).decode("ascii").lower()
+        if len(content) == 16:
+            return content.hex()
+        return None
+    
+    def _hash_chunks(self, chunks) -> Dict:
+        """流式计算MD5和SHA-256
+        Returns:
+            {'md5', 'sha256', 'size'}
+        """
+        md5 = hashlib.md5()
+        sha256 = hashlib.sha256()
+        size = 0
+        for chunk in chunks:
+            md5.update(chunk)
+            sha256.update(chunk)
+            size += len(chunk)
+        self.profiler.add("verify.hashed_bytes", size)
+        return {"md5": md5.hexdigest(), "sha256": sha256.hexdigest(), "size": size}
+    
+    def _iter_file_chunks(self, path: str):
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.VERIFY_CHUNK_SIZE), b''):
+                yield chunk
+    
+    def _verify_targets(self, scenario_path: str) -> List[Dict]:
+        """一个场景中要校验的文件：当前存档和saves目录中的所有备份
+        Returns:
+            [{'scenario_path', 'name', 'kind'（当前存档为current）, 'path', 'sha256'（应有的哈希或None）}, ...]
+        """
+        targets = []
+        save_file = os.path.join(scenario_path, "CurrentSave.bin")
+        if os.path.isfile(save_file):
+            targets.append({'scenario_path': scenario_path, 'name': "CurrentSave", 'kind': "current",
+                            'path': save_file, 'sha256': None})
+        backup_dir = os.path.join(scenario_path, self.backup_dir_name)
+        if os.path.isdir(backup_dir):
+            for entry in self._backup_details(backup_dir):
+                suffix = dict(self.BACKUP_SUFFIXES)[entry['kind']]
+                targets.append({'scenario_path': scenario_path, 'name': entry['name'], 'kind': entry['kind'],
+                                'path': os.path.join(backup_dir, entry['name'] + suffix), 'sha256': entry['sha256']})
+        return targets
+    
+    def _verify_one(self, target: Dict, cache: Dict) -> Tuple[Dict, Optional[Tuple[str, Dict]]]:
+        """校验一个文件：内容与记录的SHA-256（备份方式自带的校验）和MD5校验文件比较
+        
+        完整复制、去重和压缩备份按固定大小的块流式读取；增量备份需要沿链在内存中还原。
+        Returns:
+            (校验结果, 需要写入缓存的(路径, 哈希)或None)
+            校验结果在target基础上增加'status'（ok/corrupt/md5_mismatch/unverified/error）、'message'、
+            'size'（内容大小）和'cached'（是否使用了缓存的哈希）
+        """
+        result = dict(target, cached=False, size=0)
+        kind, path = target['kind'], target['path']
+        backup_dir = os.path.dirname(path)
+        cache_update = None
+        try:
+            # 取得内容的读取方式、缓存使用的文件和MD5校验文件内容
+            if kind == "compressed":
+                header = BackupContainer.read_header(path)
+                sidecar = header["md5"]
+                content_path = path
+                chunks = lambda: BackupContainer.iter_chunks(path)
+            else:
+                if kind == "current":
+                    md5_path = path + ".MD5"
+                else:
+                    md5_path = os.path.join(backup_dir, target['name'] + ".bin.MD5")
+                try:
+                    with open(md5_path, 'rb') as f:
+                        sidecar = f.read()
+                except FileNotFoundError:
+                    sidecar = None
+                if kind == "dedup":
+                    store = self.get_object_store()
+                    content_path = store.object_path(self._read_reference(path)["object"])
+                    if not os.path.exists(content_path):
+                        raise FileNotFoundError("去重存储中的对象已丢失")
+                else:
+                    content_path = path
+                chunks = lambda: self._iter_file_chunks(content_path)
+            
+            if kind == "delta":
+                # 增量备份的内容取决于整条链，不使用缓存
+                data = self._read_backup_data(backup_dir, target['name'])
+                hashes = self._hash_chunks(memoryview(data)[offset:offset + self.VERIFY_CHUNK_SIZE]
+                                           for offset in range(0, len(data), self.VERIFY_CHUNK_SIZE))
+            else:
+                stat_result = os.stat(content_path)
+                cached = cache.get(content_path)
+                if cached is not None and (cached["size"], cached["mtime_ns"]) == (stat_result.st_size,
+                                                                                  stat_result.st_mtime_ns):
+                    self.profiler.add("verify.cache_hits")
+                    result['cached'] = True
+                    hashes = {"md5": cached["md5"], "sha256": cached["sha256"], "size": cached["content_size"]}
+                else:
+                    hashes = self._hash_chunks(chunks())
+                    cache_update = (content_path, {"size": stat_result.st_size, "mtime_ns": stat_result.st_mtime_ns,
+                                                   "content_size": hashes["size"], "md5": hashes["md5"],
+                                                   "sha256": hashes["sha256"]})
+        except FileNotFoundError as e:
+            result.update(status="error", message=f"文件不存在: {e}")
+            return result, None
+        except (ValueError, zlib.error, lzma.LZMAError) as e:
+            # 压缩/增量备份自带的校验失败或数据无法解码
+            result.update(status="corrupt", message=str(e))
+            return result, None
+        except Exception as e:
+            result.update(status="error", message=f"读取失败: {e}")
+            return result, None
+        
+        result['size'] = hashes["size"]
+        expected_md5 = self._parse_md5_sidecar(sidecar)
+        if target['sha256'] is not None and hashes["sha256"] != target['sha256']:
+            result.update(status="corrupt", message="内容与备份时记录的SHA-256不一致")
+        elif expected_md5 is not None and hashes["md5"] != expected_md5:
+            result.update(status="md5_mismatch", message=f"内容MD5 {hashes['md5']} 与校验文件中的 {expected_md5} 不一致")
+        elif target['sha256'] is None and expected_md5 is None:
+            result.update(status="unverified",
+                          message="没有MD5校验文件" if sidecar is None else "无法识别MD5校验文件的格式")
+        else:
+            result.update(status="ok", message="")
+        return result, cache_update
+    
+    def _load_verify_cache(self) -> Dict:
+        path = self.config_manager.get_data_path(self.VERIFY_CACHE_FILE)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except Exception as e:
+            print(f"加载校验缓存失败: {e}")
+            return {}
+    
+    def _save_verify_cache(self, cache: Dict):
+        """保存校验缓存，去掉已不存在的文件"""
+        try:
+            cache = {path: entry for path, entry in cache.items() if os.path.exists(path)}
+            self._write_json_atomic(self.config_manager.get_data_path(self.VERIFY_CACHE_FILE), cache)
+        except Exception as e:
+            print(f"保存校验缓存失败: {e}")
+    
+    @profiled("backup.verify")
+    def verify_backups(self, scenario_paths: Optional[List[str]] = None, route_uuid: Optional[str] = None,
+                       workers: Optional[int] = None, use_cache: bool = True,
+                       progress_callback: Optional[Callable[[int, int], None]] = None,
+                       cancel_event: Optional[threading.Event] = None) -> Dict:
+        """校验备份和当前存档的完整性，使用有上限的线程池并发计算哈希
+        Args:
+            scenario_paths: 要校验的场景目录；未指定时校验route_uuid路线的所有场景，都未指定时校验所有场景
+            workers: 并发数，默认读取配置
+            use_cache: 为False时忽略缓存重新计算所有文件
+            progress_callback: 每校验完一个文件回调(已完成数, 总数)
+            cancel_event: 设置后不再开始校验新的文件
+        Returns:
+            {'scenarios', 'checked', 'ok', 'corrupt', 'md5_mismatch', 'unverified', 'error', 'cancelled',
+             'cached'（使用缓存的文件数）, 'hashed_bytes', 'elapsed', 'items': [校验结果, ...]}
+        """
+        start = time.perf_counter()
+        if scenario_paths is None:
+            scenario_paths = [path for route, _, path in self.iter_scenario_dirs()
+                              if route_uuid is None or route == route_uuid]
+        targets = []
+        for scenario_path in scenario_paths:
+            try:
+                targets.extend(self._verify_targets(scenario_path))
+            except Exception as e:
+                print(f"读取备份清单失败 {scenario_path}: {e}")
+        
+        cache = self._load_verify_cache() if use_cache else {}
+        result = {'scenarios': len(scenario_paths), 'checked': 0, 'ok': 0, 'corrupt': 0, 'md5_mismatch': 0,
+                  'unverified': 0, 'error': 0, 'cancelled': 0, 'cached': 0, 'hashed_bytes': 0, 'items': []}
+        lock = threading.Lock()
+        
+        def verify_one(target: Dict):
+            if cancel_event is not None and cancel_event.is_set():
+                with lock:
+                    result['cancelled'] += 1
+                return
+            item, cache_update = self._verify_one(target, cache)
+            with lock:
+                result['checked'] += 1
+                result[item['status']] += 1
+                result['items'].append(item)
+                if cache_update is not None:
+                    cache[cache_update[0]] = cache_update[1]
+                if item['cached']:
+                    result['cached'] += 1
+                else:
+                    result['hashed_bytes'] += item['size']
+                done = result['checked'] + result['cancelled']
+            if progress_callback:
+                progress_callback(done, len(targets))
+        
+        with ThreadPoolExecutor(max_workers=workers or self.config_manager.get_verify_workers()) as executor:
+            list(executor.map(verify_one, targets))
+        
+        self._save_verify_cache(cache)
+        result['items'].sort(key=lambda item: (item['scenario_path'], item['kind'] != "current", item['name']))
+        result['elapsed'] = time.perf_counter() - start
+        return result
+    
+    def format_verify_report(self, result: Dict) -> str:
+        """生成校验报告文本：汇总和每个有问题的文件"""
+        labels = {"corrupt": "已损坏", "md5_mismatch": "MD5不一致", "unverified": "无法校验", "error": "错误"}
+        lines = [f"校验 {result['scenarios']} 个场景的 {result['checked']} 个文件，用时 {result['elapsed']:.1f} 秒"
+                 f"（计算 {result['hashed_bytes'] / 1024 / 1024:.1f} MB，{result['cached']} 个文件使用缓存）",
+                 f"正常 {result['ok']}，" + "，".join(f"{label} {result[status]}" for status, label in labels.items())]
+        if result['cancelled']:
+            lines.append(f"已取消，{result['cancelled']} 个文件未校验")
+        names = self._scenario_names()
+        for status, label in labels.items():
+            items = [item for item in result['items'] if item['status'] == status]
+            if not items:
+                continue
+            lines.append("")
+            lines.append(f"{label}（{len(items)}）:")
+            for item in items:
+                route_name, scenario_name = names.get(self._scenario_key(item['scenario_path']),
+                                                      ("", os.path.basename(item['scenario_path'])))
+                name = "当前存档" if item['kind'] == "current" else item['name']
+                location = f"{route_name} / {scenario_name}" if route_name else scenario_name
+                lines.append(f"    {location} / {name}: {item['message']}")
+        return "\n".join(lines)
+    
+    def _archive_source(self, backup_dir: str, filename: str) -> str:
+        """归档中的文件在本机对应的文件；去重备份导出为完整复制，内容取自存储对象"""
+        path = os.path.join(backup_dir, filename)
+        if filename.endswith(".bin") and not os.path.exists(path) and os.path.exists(path + ".ref"):
+            return self.get_object_store().object_path(self._read_reference(path + ".ref")["object"])
+        return path
+    
+    def _plan_export(self, selection: Optional[Dict[str, Optional[List[str]]]]) -> Dict:
+        """生成导出归档的清单：各场景的路线/场景UUID、名称和要导出的备份及其在归档中的文件
+        
+        增量备份依赖的基准备份一并导出，并排在增量备份之前；去重备份导出为完整复制；
+        没有记录哈希的旧完整复制备份计算一次哈希，导入时用于校验。
+        """
+        if selection is None:
+            selection = {scenario_path: None for scenario_path, _ in self.iter_backup_dirs()}
+        names = self._scenario_names()
+        scenarios = {}
+        files = 0
+        total_bytes = 0
+        for scenario_path, backup_ids in selection.items():
+            backup_dir = os.path.join(scenario_path, self.backup_dir_name)
+            details = {entry['name']: entry for entry in self._backup_details(backup_dir)}
+            wanted = list(details) if backup_ids is None else \
+                [self._backup_id(backup_id) for backup_id in backup_ids if self._backup_id(backup_id) in details]
+            key = self._scenario_key(scenario_path)
+            backups = []
+            exported = set()
+            while wanted:
+                backup_id = wanted.pop(0)
+                if backup_id in exported:
+                    continue
+                exported.add(backup_id)
+                entry = details[backup_id]
+                kind, backup_path = self._resolve_in_dir(backup_dir, backup_id)
+                backup = {"name": backup_id, "kind": "copy" if kind == "dedup" else kind, "size": entry['size'],
+                          "mtime_ns": entry['mtime_ns'], "sha256": entry['sha256'], "base": None, "members": []}
+                if kind == "delta":
+                    backup["base"] = DeltaCodec.read(backup_path, with_data=False)["base"]
+                    if backup["base"] in details:
+                        wanted.append(backup["base"])
+                if backup["sha256"] is None:
+                    backup["sha256"] = ObjectStore.hash_file(backup_path)[0]
+                filenames = [backup_id + dict(self.BACKUP_SUFFIXES)[backup["kind"]]]
+                if entry['md5'] and kind != "compressed":
+                    filenames.append(backup_id + ".bin.MD5")
+                for filename in filenames:
+                    size = os.path.getsize(self._archive_source(backup_dir, filename))
+                    backup["members"].append({"name": f"backups/{key}/{filename}", "size": size})
+                    files += 1
+                    total_bytes += size
+                backups.append(backup)
+            if backups:
+                # 基准排在以它为基准的增量备份之前，导入增量备份时基准已经写入，可以还原校验
+                by_name = {backup["name"]: backup for backup in backups}
+                ordered, placed = [], set()
+                
+                def place(backup: Dict):
+                    if backup["name"] in placed:
+                        return
+                    placed.add(backup["name"])
+                    if backup["base"] in by_name:
+                        place(by_name[backup["base"]])
+                    ordered.append(backup)
+                
+                for backup in backups:
+                    place(backup)
+                backups = ordered
+                route_name, scenario_name = names.get(key, ("", ""))
+                scenarios[key] = {"route_uuid": key.split("/")[0], "scenario_uuid": key.split("/")[1],
+                                  "route_name": route_name, "scenario_name": scenario_name, "backups": backups}
+        return {"format": self.ARCHIVE_FORMAT, "version": self.ARCHIVE_VERSION,
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "scenarios": scenarios, "files": files, "bytes": total_bytes}
+    
+    def _read_archive_manifest(self, tar: tarfile.TarFile, member: tarfile.TarInfo) -> Dict:
+        """读取归档开头的清单"""
+        if member.name != self.ARCHIVE_MANIFEST_NAME:
+            raise ValueError("归档中没有备份清单")
+        manifest = json.loads(tar.extractfile(member).read().decode('utf-8'))
+        if manifest.get("format") != self.ARCHIVE_FORMAT or manifest.get("version") != self.ARCHIVE_VERSION:
+            raise ValueError("不是本工具导出的备份归档，或归档版本不受支持")
+        return manifest
+    
+    def _read_partial_archive(self, part_path: str) -> Tuple[Optional[Dict], set, int]:
+        """读取中断的导出归档
+        Returns:
+            (清单, 已完整写入的文件, 最后一个完整文件的结束位置)，无法继续时清单为None
+        """
+        manifest, done, offset = None, set(), 0
+        try:
+            size = os.path.getsize(part_path)
+            with tarfile.open(part_path, 'r:') as tar:
+                try:
+                    for member in tar:
+                        end = member.offset_data + -(-member.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+                        if end > size:
+                            break
+                        if manifest is None:
+                            manifest = self._read_archive_manifest(tar, member)
+                        else:
+                            done.add(member.name)
+                        offset = end
+                except tarfile.TarError:
+                    # 最后一个文件头不完整
+                    pass
+        except FileNotFoundError:
+            return None, set(), 0
+        except Exception as e:
+            print(f"读取未完成的归档失败 {part_path}: {e}")
+            return None, set(), 0
+        return (manifest, done, offset) if manifest is not None else (None, set(), 0)
+    
+    @profiled("archive.export")
+    def export_backups(self, archive_path: str, selection: Optional[Dict[str, Optional[List[str]]]] = None,
+                       resume: bool = True, progress_callback: Optional[Callable[[int, int], None]] = None,
+                       cancel_event: Optional[threading.Event] = None) -> Dict:
+        """把备份流式导出到一个tar归档，归档的第一个文件是清单
+        
+        先写入"归档路径.part"，全部完成后再改名。中断或取消后再次导出到同一路径时按未完成归档中的清单继续：
+        保留已完整写入的文件，截掉写了一半的文件后接着写入（此时忽略selection）。
+        每个文件按块复制，不会整个读入内存。
+        Args:
+            selection: {场景目录: 备份名称列表或None（全部备份）}，默认导出所有场景的全部备份
+            resume: 为False时忽略未完成的归档重新导出
+            progress_callback: 每写入一个文件回调(已写入字节数, 总字节数)
+            cancel_event: 设置后写完当前文件即停止，保留未完成的归档以便继续
+        
+        写入之前发现缺失或大小已改变的文件跳过并记入errors；写入某个文件的过程中出错时停止导出，
+        同样保留未完成的归档。
+        Returns:
+            {'scenarios', 'backups', 'files', 'bytes'（本次写入的字节数）, 'resumed'（上次已写入的文件数）,
+             'elapsed', 'throughput'（字节/秒）, 'completed', 'errors': {归档内路径: 错误信息}, 'error'}
+        """
+        start = time.perf_counter()
+        result = {'scenarios': 0, 'backups': 0, 'files': 0, 'bytes': 0, 'resumed': 0, 'elapsed': 0.0,
+                  'throughput': 0.0, 'completed': False, 'errors': {}, 'error': ""}
+        part_path = archive_path + ".part"
+        try:
+            manifest, done, offset = self._read_partial_archive(part_path) if resume else (None, set(), 0)
+            if manifest is None:
+                manifest = self._plan_export(selection)
+            result['scenarios'] = len(manifest["scenarios"])
+            result['resumed'] = len(done)
+            
+            routes_path = self._get_routes_path()
+            pending = []
+            written = 0
+            for scenario in manifest["scenarios"].values():
+                backup_dir = os.path.join(routes_path, scenario["route_uuid"], "Scenarios",
+                                          scenario["scenario_uuid"], self.backup_dir_name)
+                result['backups'] += len(scenario["backups"])
+                for backup in scenario["backups"]:
+                    for member in backup["members"]:
+                        if member["name"] in done:
+                            written += member["size"]
+                        else:
+                            pending.append((backup_dir, member))
+            
+            with open(part_path, 'r+b' if offset else 'wb') as f:
+                f.truncate(offset)
+                f.seek(offset)
+                with tarfile.open(fileobj=f, mode='w', format=tarfile.PAX_FORMAT,
+                                  copybufsize=self.ARCHIVE_CHUNK_SIZE) as tar:
+                    if offset == 0:
+                        data = json.dumps(manifest, ensure_ascii=False).encode('utf-8')
+                        info = tarfile.TarInfo(self.ARCHIVE_MANIFEST_NAME)
+                        info.size = len(data)
+                        info.mtime = time.time()
+                        tar.addfile(info, io.BytesIO(data))
+                    for backup_dir, member in pending:
+                        if cancel_event is not None and cancel_event.is_set():
+                            break
+                        # 写入之前发现文件缺失或已改变时跳过这个文件，归档仍然完整
+                        try:
+                            source = open(self._archive_source(backup_dir, member["name"].rsplit("/", 1)[1]), 'rb')
+                        except OSError as e:
+                            source = None
+                            result['errors'][member["name"]] = str(e)
+                        if source is not None:
+                            with source:
+                                source_stat = os.fstat(source.fileno())
+                                if source_stat.st_size != member["size"]:
+                                    result['errors'][member["name"]] = "备份在导出前已改变"
+                                else:
+                                    info = tarfile.TarInfo(member["name"])
+                                    info.size = source_stat.st_size
+                                    info.mtime = source_stat.st_mtime
+                                    try:
+                                        tar.addfile(info, source)
+                                    except Exception as e:
+                                        # 写了一半的文件使后面的内容错位：停止导出，保留未完成的归档，继续导出时截掉这个文件
+                                        result['errors'][member["name"]] = str(e)
+                                        raise
+                                    result['files'] += 1
+                                    result['bytes'] += member["size"]
+                        written += member["size"]
+                        if progress_callback:
+                            progress_callback(written, manifest["bytes"])
+                    else:
+                        result['completed'] = True
+            if result['completed']:
+                os.replace(part_path, archive_path)
+        except Exception as e:
+            result['error'] = f"导出备份失败: {e}"
+        result['elapsed'] = time.perf_counter() - start
+        if result['elapsed'] > 0:
+            result['throughput'] = result['bytes'] / result['elapsed']
+        return result
+    
+    def _match_scenarios(self, manifest: Dict) -> Tuple[Dict[str, str], List[str]]:
+        """把归档或镜像中的场景对应到扫描到的本机场景：按路线UUID/场景UUID，路线不同时按唯一的场景UUID
+        Returns:
+            ({场景键: 本机场景目录}, [找不到的场景键])
+        """
+        paths = {}
+        by_scenario = {}
+        for route_uuid, _, scenario in self.iter_scenarios(load=True):
+            paths[f"{route_uuid}/{scenario['uuid']}"] = scenario['path']
+            by_scenario.setdefault(scenario['uuid'], []).append(scenario['path'])
+        mapping, unmatched = {}, []
+        for key, scenario in manifest["scenarios"].items():
+            candidates = by_scenario.get(scenario["scenario_uuid"], [])
+            if key in paths:
+                mapping[key] = paths[key]
+            elif len(candidates) == 1:
+                mapping[key] = candidates[0]
+            else:
+                unmatched.append(key)
+        return mapping, unmatched
+    
+    @staticmethod
+    def _archive_backup_status(backups: List[Dict], existing: Dict[str, Dict]) -> Dict[str, str]:
+        """归档中一个场景的各备份的导入方式
+        Returns:
+            {备份名称: 'new'（导入）| 'present'（已有相同的备份）| 'conflict'（已有不同的同名备份，
+             或增量备份的基准无法导入）}
+        """
+        by_name = {backup["name"]: backup for backup in backups}
+        status = {}
+        
+        def resolve(name: str) -> str:
+            if name not in status:
+                status[name] = "conflict"  # 防止增量备份链存在循环
+                backup = by_name[name]
+                current = existing.get(name)
+                if current is not None:
+                    if current['sha256'] is not None and backup["sha256"] is not None:
+                        same = current['sha256'] == backup["sha256"]
+                    else:
+                        same = (current['size'], current['mtime_ns']) == (backup["size"], backup["mtime_ns"])
+                    status[name] = "present" if same else "conflict"
+                elif backup["kind"] != "delta" or (backup["base"] in by_name and resolve(backup["base"]) != "conflict"):
+                    status[name] = "new"
+            return status[name]
+        
+        for backup in backups:
+            resolve(backup["name"])
+        return status
+    
+    def _import_member(self, tar: tarfile.TarFile, member: tarfile.TarInfo, target_path: str, kind: Optional[str],
+                       sha256: Optional[str], mtime_ns: Optional[int]):
+        """按块把归档中的一个文件写入临时文件，校验后改名为目标文件
+        Args:
+            kind: 文件是备份本身时为备份方式，按sha256校验还原出的存档内容：压缩备份流式解压，
+                增量备份用同一saves目录中已导入的基准还原
+        """
+        temp_path = target_path + ".import"
+        digest = hashlib.sha256()
+        source = tar.extractfile(member)
+        with open(temp_path, 'wb') as f:
+            for chunk in iter(lambda: source.read(self.ARCHIVE_CHUNK_SIZE), b''):
+                f.write(chunk)
+                digest.update(chunk)
+        try:
+            if kind == "compressed":
+                actual = self._hash_chunks(BackupContainer.iter_chunks(temp_path))["sha256"]
+            elif kind == "delta":
+                delta = DeltaCodec.read(temp_path)
+                base = self._read_backup_data(os.path.dirname(target_path), delta["base"])
+                actual = hashlib.sha256(DeltaCodec.apply(base, delta["encoded"])).hexdigest()
+            else:
+                actual = digest.hexdigest() if kind == "copy" else sha256
+            if actual != sha256:
+                raise ValueError("SHA-256不一致")
+        except Exception as e:
+            os.remove(temp_path)
+            raise ValueError(f"归档中的文件已损坏（{e}）")
+        os.replace(temp_path, target_path)
+        if mtime_ns is None:
+            mtime_ns = int(member.mtime * 1e9)
+        os.utime(target_path, ns=(mtime_ns, mtime_ns))
+    
+    @profiled("archive.import")
+    def import_backups(self, archive_path: str, progress_callback: Optional[Callable[[int, int], None]] = None,
+                       cancel_event: Optional[threading.Event] = None) -> Dict:
+        """从导出的tar归档流式导入备份，写入扫描到的本机对应场景的saves目录
+        
+        已有内容相同的同名备份时跳过；同名但内容不同时作为冲突跳过，以它为基准的增量备份也一并跳过。
+        每个文件先写入临时文件再改名，中断后重新导入会跳过已经导入的文件；备份写入时校验还原出的存档的SHA-256
+        （增量备份用先导入的基准还原，基准导入失败时增量备份也不导入）。
+        Args:
+            progress_callback: 每导入一个文件回调(已导入字节数, 总字节数)
+            cancel_event: 设置后导入完当前文件即停止
+        Returns:
+            {'scenarios'（匹配到的场景数）, 'unmatched': [找不到的场景键], 'remapped': {场景键: 本机场景键},
+             'imported', 'present', 'conflicts': ["场景键/备份名称", ...], 'failed'（备份数）, 'files', 'bytes',
+             'elapsed', 'throughput'（字节/秒）, 'cancelled', 'errors': {归档内路径: 错误信息}, 'error'}
+        """
+        start = time.perf_counter()
+        result = {'scenarios': 0, 'unmatched': [], 'remapped': {}, 'imported': 0, 'present': 0, 'conflicts': [],
+                  'failed': 0, 'files': 0, 'bytes': 0, 'elapsed': 0.0, 'throughput': 0.0, 'cancelled': False,
+                  'errors': {}, 'error': ""}
+        touched = {}
+        try:
+            with tarfile.open(archive_path, 'r:') as tar:
+                manifest = self._read_archive_manifest(tar, tar.next())
+                mapping, result['unmatched'] = self._match_scenarios(manifest)
+                result['scenarios'] = len(mapping)
+                
+                # 归档内路径 -> (场景键, 备份名称, 目标文件, 备份方式（MD5校验文件为None）, 应有的哈希, 修改时间)
+                targets = {}
+                remaining = {}
+                total_bytes = 0
+                for key, scenario_path in mapping.items():
+                    if self._scenario_key(scenario_path) != key:
+                        result['remapped'][key] = self._scenario_key(scenario_path)
+                    backup_dir = os.path.join(scenario_path, self.backup_dir_name)
+                    existing = self._manifest_backups(backup_dir)
+                    backups = manifest["scenarios"][key]["backups"]
+                    statuses = self._archive_backup_status(backups, existing)
+                    for backup in backups:
+                        status = statuses[backup["name"]]
+                        if status == "conflict":
+                            result['conflicts'].append(f"{key}/{backup['name']}")
+                            continue
+                        if status == "present":
+                            result['present'] += 1
+                            if existing[backup["name"]]['kind'] != backup["kind"]:
+                                continue
+                        members = []
+                        suffix = dict(self.BACKUP_SUFFIXES)[backup["kind"]]
+                        for member in backup["members"]:
+                            target_path = os.path.join(backup_dir, member["name"].rsplit("/", 1)[1])
+                            if status == "present" and os.path.exists(target_path):
+                                continue
+                            main = target_path.endswith(suffix)
+                            targets[member["name"]] = (key, backup["name"], target_path,
+                                                       backup["kind"] if main else None,
+                                                       backup["sha256"] if main else None,
+                                                       backup["mtime_ns"] if main and backup["kind"] == "copy" else None)
+                            members.append(member["name"])
+                            total_bytes += member["size"]
+                        if members:
+                            remaining[(key, backup["name"])] = (status, set(members))
+                            sha256_updates = touched.setdefault(key, (scenario_path, existing, {}, []))[2]
+                            if backup["kind"] == "copy":
+                                # 完整复制备份的哈希记录在清单中（写入时已校验）
+                                sha256_updates[backup["name"]] = backup["sha256"]
+                
+                failed = set()
+                done_bytes = 0
+                for member in tar:
+                    target = targets.get(member.name)
+                    if target is None or not member.isfile():
+                        continue
+                    if cancel_event is not None and cancel_event.is_set():
+                        result['cancelled'] = True
+                        break
+                    key, backup_id, target_path, kind, sha256, mtime_ns = target
+                    try:
+                        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                        self._import_member(tar, member, target_path, kind, sha256, mtime_ns)
+                        remaining[(key, backup_id)][1].discard(member.name)
+                        result['files'] += 1
+                        result['bytes'] += member.size
+                        changed_ids = touched[key][3]
+                        if backup_id not in changed_ids:
+                            changed_ids.append(backup_id)
+                    except Exception as e:
+                        result['errors'][member.name] = str(e)
+                        failed.add((key, backup_id))
+                    done_bytes += member.size
+                    if progress_callback:
+                        progress_callback(done_bytes, total_bytes)
+                
+                for backup_key, (status, members) in remaining.items():
+                    if backup_key in failed or (members and not result['cancelled']):
+                        for name in members:
+                            result['errors'].setdefault(name, "归档中缺少此文件")
+                        result['failed'] += 1
+                    elif not members and status == "new":
+                        # 已有相同备份时只补充缺少的文件，已计入present
+                        result['imported'] += 1
+        except Exception as e:
+            result['error'] = f"导入备份失败: {e}"
+        
+        for scenario_path, existing, sha256_updates, changed_ids in touched.values():
+            if changed_ids:
+                self._update_manifest(os.path.join(scenario_path, self.backup_dir_name), existing, changed_ids,
+                                      sha256_updates)
+                self._catalog_scenario(scenario_path)
+        result['elapsed'] = time.perf_counter() - start
+        if result['elapsed'] > 0:
+            result['throughput'] = result['bytes'] / result['elapsed']
+        return result
+    
+    def _mirror_files(self, backup_dir: str) -> Dict[str, Dict]:
+        """saves目录中要镜像的文件，去重备份镜像为完整复制（存储对象同样位于RailWorks目录中）
+        Returns:
+            {文件名: {'source', 'size', 'mtime_ns', 'sha256'（文件内容的哈希，未知时为None）}}
+        """
+        files = {}
+        for entry in self._backup_details(backup_dir):
+            resolved = self._resolve_in_dir(backup_dir, entry['name'])
+            if resolved is None:
+                continue
+            kind, backup_path = resolved
+            if kind == "dedup":
+                files[entry['name'] + ".bin"] = {"source": self.get_object_store().object_path(entry['sha256']),
+                                                 "size": entry['size'], "mtime_ns": entry['mtime_ns'],
+                                                 "sha256": entry['sha256']}
+            else:
+                stat_result = os.stat(backup_path)
+                files[os.path.basename(backup_path)] = {"source": backup_path, "size": stat_result.st_size,
+                                                        "mtime_ns": stat_result.st_mtime_ns,
+                                                        "sha256": entry['sha256'] if kind == "copy" else None}
+            md5_path = os.path.join(backup_dir, entry['name'] + ".bin.MD5")
+            if entry['md5'] and kind != "compressed":
+                stat_result = os.stat(md5_path)
+                files[entry['name'] + ".bin.MD5"] = {"source": md5_path, "size": stat_result.st_size,
+                                                     "mtime_ns": stat_result.st_mtime_ns, "sha256": None}
+        return files
+    
+    def _split_backup_filename(self, filename: str) -> Tuple[str, Optional[str]]:
+        """saves目录中的文件名拆分为(备份名称, 备份方式)，MD5校验文件的备份方式为None"""
+        if filename.endswith(".bin.MD5"):
+            return filename[:-len(".bin.MD5")], None
+        for kind, suffix in self.BACKUP_SUFFIXES:
+            if filename.endswith(suffix):
+                return filename[:-len(suffix)], kind
+        return filename, None
+    
+    def _load_mirror_manifest(self, mirror_path: str) -> Dict:
+        """读取镜像清单，不存在或已损坏时返回空清单（之后的同步按文件大小重新核对）"""
+        try:
+            with open(os.path.join(mirror_path, self.MIRROR_MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("version") == self.MIRROR_MANIFEST_VERSION and isinstance(manifest.get("scenarios"), dict):
+                return manifest
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"读取镜像清单失败 {mirror_path}: {e}")
+        return {"version": self.MIRROR_MANIFEST_VERSION, "scenarios": {}}
+    
+    def _append_mirror_log(self, mirror_path: str, lines: List[str]):
+        """追加传输日志"""
+        try:
+            with open(os.path.join(mirror_path, self.MIRROR_LOG_NAME), 'a', encoding='utf-8') as f:
+                f.writelines(line + "\n" for line in lines)
+        except Exception as e:
+            print(f"写入传输日志失败: {e}")
+    
+    def _check_mirror_path(self, mirror_path: Optional[str]) -> Tuple[str, str]:
+        """检查镜像目录
+        Returns:
+            (镜像目录, 错误信息)
+        """
+        mirror_path = mirror_path or self.config_manager.get_mirror_path()
+        if not mirror_path:
+            return "", "未设置镜像目录"
+        if not self.railworks_path:
+            return mirror_path, "未设置RailWorks路径"
+        railworks = os.path.normcase(os.path.abspath(self.railworks_path))
+        mirror = os.path.normcase(os.path.abspath(mirror_path))
+        if mirror == railworks or mirror.startswith(railworks + os.sep):
+            return mirror_path, "镜像目录不能位于RailWorks目录中"
+        return mirror_path, ""
+    
+    def _copy_mirror_files(self, tasks: List[Tuple[str, str, str, Dict]], workers: int, result: Dict,
+                           on_copied: Callable[[str, str, Dict], None],
+                           progress_callback: Optional[Callable[[int, int], None]],
+                           cancel_event: Optional[threading.Event]):
+        """并发复制文件：先写临时文件，大小核对无误后改名并设置修改时间
+        Args:
+            tasks: [(场景键, 源文件, 目标文件, 文件信息{'size', 'mtime_ns', ...}), ...]
+            on_copied: 复制成功后在锁内回调(场景键, 目标文件, 文件信息)
+        """
+        lock = threading.Lock()
+        done = [0]
+        
+        def copy_one(task):
+            key, source, target, info = task
+            if cancel_event is not None and cancel_event.is_set():
+                outcome, error = 'cancelled', ""
+            else:
+                temp_file = target + ".tmp"
+                try:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    self._copy_file(source, temp_file, metadata=False)
+                    if os.path.getsize(temp_file) != info["size"]:
+                        os.remove(temp_file)
+                        raise ValueError("复制过程中文件已改变")
+                    os.utime(temp_file, ns=(info["mtime_ns"], info["mtime_ns"]))
+                    os.replace(temp_file, target)
+                    outcome, error = 'copied', ""
+                except Exception as e:
+                    outcome, error = 'failed', str(e)
+            with lock:
+                result[outcome] += 1
+                if outcome == 'copied':
+                    result['bytes'] += info["size"]
+                    on_copied(key, target, info)
+                elif error:
+                    result['errors'][f"{key}/{os.path.basename(target)}"] = error
+                done[0] += 1
+                count = done[0]
+            if progress_callback:
+                progress_callback(count, len(tasks))
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(copy_one, tasks))
+    
+    @profiled("mirror.sync")
+    def sync_mirror(self, mirror_path: Optional[str] = None, workers: Optional[int] = None,
+                    progress_callback: Optional[Callable[[int, int], None]] = None,
+                    cancel_event: Optional[threading.Event] = None) -> Dict:
+        """把所有saves目录中的备份增量同步到RailWorks目录之外的镜像目录（镜像目录/路线UUID/场景UUID/）
+        
+        与镜像清单比较每个文件的大小和修改时间，相同且镜像文件仍然存在时跳过；只有修改时间不同时，
+        内容哈希已知且相同的文件只更新修改时间；其余新的或变化的文件并发复制。
+        本机已删除的备份保留在镜像中，游戏目录被清空后同步不会删除镜像。每次复制记入传输日志。
+        Args:
+            mirror_path: 镜像目录，默认读取配置
+            workers: 并发复制的文件数，默认读取配置
+            progress_callback: 每复制完一个文件回调(已完成数, 要复制的文件数)
+            cancel_event: 设置后不再开始复制新的文件（已复制的文件记入清单，下次同步时跳过）
+        Returns:
+            {'scenarios', 'files'（检查的文件数）, 'unchanged', 'copied', 'failed', 'cancelled', 'bytes',
+             'elapsed', 'throughput'（字节/秒）, 'errors': {场景键/文件名: 错误信息}, 'error'}
+        """
+        start = time.perf_counter()
+        result = {'scenarios': 0, 'files': 0, 'unchanged': 0, 'copied': 0, 'failed': 0, 'cancelled': 0,
+                  'bytes': 0, 'elapsed': 0.0, 'throughput': 0.0, 'errors': {}, 'error': ""}
+        mirror_path, result['error'] = self._check_mirror_path(mirror_path)
+        if result['error']:
+            return result
+        try:
+            os.makedirs(mirror_path, exist_ok=True)
+            manifest = self._load_mirror_manifest(mirror_path)
+            names = self._scenario_names()
+            tasks = []
+            for scenario_path, backup_dir in self.iter_backup_dirs():
+                key = self._scenario_key(scenario_path)
+                try:
+                    files = self._mirror_files(backup_dir)
+                except Exception as e:
+                    result['errors'][key] = f"读取备份清单失败: {e}"
+                    continue
+                if not files:
+                    continue
+                result['scenarios'] += 1
+                route_uuid, scenario_uuid = key.split("/")
+                entry = manifest["scenarios"].setdefault(key, {"route_uuid": route_uuid, "scenario_uuid": scenario_uuid,
+                                                               "route_name": "", "scenario_name": "", "files": {}})
+                if key in names:
+                    entry["route_name"], entry["scenario_name"] = names[key]
+                target_dir = os.path.join(mirror_path, route_uuid, scenario_uuid)
+                for filename, local in files.items():
+                    result['files'] += 1
+                    target = os.path.join(target_dir, filename)
+                    mirrored = entry["files"].get(filename)
+                    try:
+                        intact = mirrored is not None and os.path.getsize(target) == mirrored["size"]
+                    except OSError:
+                        intact = False
+                    if intact and (mirrored["size"], mirrored["mtime_ns"]) == (local["size"], local["mtime_ns"]):
+                        result['unchanged'] += 1
+                        continue
+                    if intact and mirrored["size"] == local["size"] and local["sha256"] is not None \
+                            and mirrored.get("sha256") == local["sha256"]:
+                        os.utime(target, ns=(local["mtime_ns"], local["mtime_ns"]))
+                        mirrored["mtime_ns"] = local["mtime_ns"]
+                        result['unchanged'] += 1
+                        continue
+                    tasks.append((key, local["source"], target, local))
+            
+            log = []
+            
+            def on_copied(key: str, target: str, info: Dict):
+                filename = os.path.basename(target)
+                manifest["scenarios"][key]["files"][filename] = {"size": info["size"], "mtime_ns": info["mtime_ns"],
+                                                                 "sha256": info["sha256"]}
+                log.append(f"{datetime.now().isoformat(timespec='seconds')} 复制 {key}/{filename} {info['size']}")
+            
+            self._copy_mirror_files(tasks, workers or self.config_manager.get_mirror_workers(), result, on_copied,
+                                    progress_callback, cancel_event)
+            self._write_json_atomic(os.path.join(mirror_path, self.MIRROR_MANIFEST_NAME), manifest)
+            log.append(f"{datetime.now().isoformat(timespec='seconds')} 同步完成: {result['scenarios']} 个场景，"
+                       f"复制 {result['copied']} 个文件 {result['bytes']} 字节，未变化 {result['unchanged']}，"
+                       f"失败 {result['failed']}，取消 {result['cancelled']}")
+            self._append_mirror_log(mirror_path, log)
+        except Exception as e:
+            result['error'] = f"同步镜像失败: {e}"
+        result['elapsed'] = time.perf_counter() - start
+        if result['elapsed'] > 0:
+            result['throughput'] = result['bytes'] / result['elapsed']
+        return result
+    
+    def list_mirror_scenarios(self, mirror_path: Optional[str] = None) -> List[Dict]:
+        """镜像中的场景，按路线和场景名称排序
+        Returns:
+            [{'key', 'route_uuid', 'scenario_uuid', 'route_name', 'scenario_name', 'backups', 'bytes'}, ...]
+        """
+        mirror_path = mirror_path or self.config_manager.get_mirror_path()
+        if not mirror_path:
+            return []
+        scenarios = []
+        for key, entry in self._load_mirror_manifest(mirror_path)["scenarios"].items():
+            backups = {self._split_backup_filename(filename)[0] for filename in entry["files"]}
+            scenarios.append({"key": key, "route_uuid": entry["route_uuid"], "scenario_uuid": entry["scenario_uuid"],
+                              "route_name": entry["route_name"] or entry["route_uuid"],
+                              "scenario_name": entry["scenario_name"] or entry["scenario_uuid"],
+                              "backups": len(backups), "bytes": sum(info["size"] for info in entry["files"].values())})
+        scenarios.sort(key=lambda item: (item["route_name"], item["scenario_name"]))
+        return scenarios
+    
+    @profiled("mirror.restore")
+    def restore_from_mirror(self, scenario_keys: Optional[List[str]] = None, mirror_path: Optional[str] = None,
+                            workers: Optional[int] = None,
+                            progress_callback: Optional[Callable[[int, int], None]] = None,
+                            cancel_event: Optional[threading.Event] = None) -> Dict:
+        """把镜像中场景的备份复制回本机对应场景的saves目录（按扫描结果对应，与导入归档相同）
+        
+        只复制本机没有的备份，本机已有的同名备份保留不变。
+        Args:
+            scenario_keys: 要还原的场景（"路线UUID/场景UUID"），默认还原镜像中的所有场景
+        Returns:
+            {'scenarios', 'unmatched': [场景键], 'restored'（备份数）, 'present', 'copied'（文件数）, 'failed',
+             'cancelled', 'bytes', 'elapsed', 'throughput', 'errors': {场景键/文件名: 错误信息}, 'error'}
+        """
+        start = time.perf_counter()
+        result = {'scenarios': 0, 'unmatched': [], 'restored': 0, 'present': 0, 'copied': 0, 'failed': 0,
+                  'cancelled': 0, 'bytes': 0, 'elapsed': 0.0, 'throughput': 0.0, 'errors': {}, 'error': ""}
+        mirror_path, result['error'] = self._check_mirror_path(mirror_path)
+        if result['error']:
+            return result
+        touched = {}
+        try:
+            manifest = self._load_mirror_manifest(mirror_path)
+            if scenario_keys is not None:
+                manifest["scenarios"] = {key: entry for key, entry in manifest["scenarios"].items()
+                                         if key in scenario_keys}
+            mapping, result['unmatched'] = self._match_scenarios(manifest)
+            result['scenarios'] = len(mapping)
+            tasks = []
+            for key, scenario_path in mapping.items():
+                entry = manifest["scenarios"][key]
+                backup_dir = os.path.join(scenario_path, self.backup_dir_name)
+                existing = self._manifest_backups(backup_dir)
+                remaining = {}
+                for filename, info in sorted(entry["files"].items()):
+                    backup_id, _ = self._split_backup_filename(filename)
+                    if backup_id in existing:
+                        continue
+                    remaining.setdefault(backup_id, set()).add(filename)
+                    tasks.append((key, os.path.join(mirror_path, entry["route_uuid"], entry["scenario_uuid"], filename),
+                                  os.path.join(backup_dir, filename), info))
+                result['present'] += len({self._split_backup_filename(filename)[0]
+                                          for filename in entry["files"]} - set(remaining))
+                if remaining:
+                    touched[key] = (scenario_path, existing, remaining, {})
+            
+            log = []
+            
+            def on_copied(key: str, target: str, info: Dict):
+                filename = os.path.basename(target)
+                backup_id, kind = self._split_backup_filename(filename)
+                touched[key][2][backup_id].discard(filename)
+                if kind == "copy" and info.get("sha256"):
+                    touched[key][3][backup_id] = info["sha256"]
+                log.append(f"{datetime.now().isoformat(timespec='seconds')} 还原 {key}/{filename} {info['size']}")
+            
+            self._copy_mirror_files(tasks, workers or self.config_manager.get_mirror_workers(), result, on_copied,
+                                    progress_callback, cancel_event)
+            result['restored'] = sum(1 for _, _, remaining, _ in touched.values()
+                                     for filenames in remaining.values() if not filenames)
+            log.append(f"{datetime.now().isoformat(timespec='seconds')} 还原完成: {result['scenarios']} 个场景，"
+                       f"复制 {result['copied']} 个文件 {result['bytes']} 字节，失败 {result['failed']}")
+            self._append_mirror_log(mirror_path, log)
+        except Exception as e:
+            result['error'] = f"从镜像还原失败: {e}"
+        
+        for scenario_path, existing, remaining, sha256_updates in touched.values():
+            self._update_manifest(os.path.join(scenario_path, self.backup_dir_name), existing, sorted(remaining),
+                                  sha256_updates)
+            self._catalog_scenario(scenario_path)
+        result['elapsed'] = time.perf_counter() - start
+        if result['elapsed'] > 0:
+            result['throughput'] = result['bytes'] / result['elapsed']
+        return result
+
+
+class AutoBackupService:
+    """存档保存后自动备份
+    
+    所有场景共用一个检查循环：每次tick()按轮转顺序检查一批场景的CurrentSave.bin和CurrentSave.bin.MD5
+    （每个文件一次stat），notify()报告有变化的场景优先检查，因此监视数千个场景也不需要为每个文件设置定时器。
+    两个文件在settle_seconds内都不再变化才备份（游戏先写存档再写校验文件），同一场景两次自动备份至少间隔
+    min_interval秒，所有自动备份合计每秒最多读写max_bytes_per_second字节（超出的场景留到之后的tick）。
+    
+    tick()只应在一个线程中调用；notify()和set_scenarios()可以在其他线程中调用，在下一次tick()时生效。
+    """
+    
+    SAVE_FILES = ("CurrentSave.bin", "CurrentSave.bin.MD5")
+    NAME_PREFIX = "Auto"
+    
+    def __init__(self, tool: TrainSimulatorBackupTool, settle_seconds: float = 5.0, min_interval: float = 600.0,
+                 max_bytes_per_second: int = 0, sweep_batch: int = 200, clock: Callable[[], float] = time.monotonic):
+        self.tool = tool
+        self.settle_seconds = settle_seconds
+        self.min_interval = min_interval
+        self.max_bytes_per_second = max_bytes_per_second
+        self.sweep_batch = sweep_batch
+        self.clock = clock
+        
+        self.baselines = {}  # 场景目录 -> 上次备份（或开始监视）时两个文件的签名
+        self.pending = {}  # 场景目录 -> (签名, 签名最近一次变化的时间)
+        self.last_backup = {}  # 场景目录 -> 最近一次自动备份（或失败）的时间
+        self._paths = []
+        self._cursor = 0
+        self._tokens = 0.0
+        self._refilled_at = None
+        
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._requested_paths = None
+    
+    @classmethod
+    def from_config(cls, tool: TrainSimulatorBackupTool) -> "AutoBackupService":
+        """按配置中的自动备份设置创建服务，并开始监视设置中的场景"""
+        settings = tool.config_manager.get_auto_backup()
+        service = cls(tool, settings["settle_seconds"], settings["min_interval_seconds"],
+                      settings["max_bytes_per_second"])
+        service.set_scenarios(tool.auto_backup_paths())
+        return service
+    
+    @classmethod
+    def _signature(cls, scenario_path: str) -> Tuple:
+        """两个存档文件的(mtime_ns, size)，不存在的文件为None"""
+        signatures = []
+        for name in cls.SAVE_FILES:
+            signature = DirectoryPoller._signature(os.path.join(scenario_path, name))
+            signatures.append(tuple(signature) if signature is not None else None)
+        return tuple(signatures)
+    
+    def set_scenarios(self, scenario_paths: List[str]):
+        """设置监视的场景；新加入的场景以调用时的存档为基准，只有之后的保存才会触发备份"""
+        known = set(self._paths)  # tick()只会整体替换_paths，可以在其他线程中读取
+        requested = {}
+        for path in scenario_paths:
+            path = os.path.normpath(path)
+            requested[path] = None if path in known else self._signature(path)
+        with self._lock:
+            self._requested_paths = requested
+    
+    def notify(self, paths):
+        """报告有变化的路径（场景目录或其中的文件），这些场景在下一次tick()时优先检查"""
+        with self._lock:
+            for path in paths:
+                path = os.path.normpath(path)
+                if os.path.basename(path) in self.SAVE_FILES:
+                    path = os.path.dirname(path)
+                self._dirty.add(path)
+    
+    def scenarios(self) -> List[str]:
+        """监视的场景目录（包括尚未生效的设置）"""
+        with self._lock:
+            requested = self._requested_paths
+        return list(requested) if requested is not None else list(self._paths)
+    
+    def _apply_requested_paths(self):
+        with self._lock:
+            requested, self._requested_paths = self._requested_paths, None
+        if requested is None:
+            return
+        for table in (self.baselines, self.pending, self.last_backup):
+            for path in [path for path in table if path not in requested]:
+                del table[path]
+        for path, signature in requested.items():
+            if path not in self.baselines:
+                self.baselines[path] = signature if signature is not None else self._signature(path)
+        self._paths = list(requested)
+        self._cursor = 0
+    
+    def _paths_to_check(self) -> List[str]:
+        """本次要检查的场景：有变化通知的、等待稳定的和轮转到的一批"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        paths = [path for path in dirty if path in self.baselines]
+        paths.extend(self.pending)
+        if self._paths:
+            count = min(self.sweep_batch, len(self._paths))
+            paths.extend(self._paths[(self._cursor + i) % len(self._paths)] for i in range(count))
+            self._cursor = (self._cursor + count) % len(self._paths)
+        return list(dict.fromkeys(paths))
+    
+    def _refill(self, now: float):
+        """按经过的时间补充读写额度，最多积累一秒的额度"""
+        if self._refilled_at is not None:
+            self._tokens = min(float(self.max_bytes_per_second),
+                               self._tokens + (now - self._refilled_at) * self.max_bytes_per_second)
+        else:
+            self._tokens = float(self.max_bytes_per_second)
+        self._refilled_at = now
+    
+    def _backup_name(self, scenario_path: str) -> str:
+        """按当前时间生成备份名称，同名备份已存在时加序号"""
+        name = f"{self.NAME_PREFIX}-{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}"
+        candidate = name
+        index = 2
+        while self.tool._resolve_backup(scenario_path, candidate + ".bin") is not None:
+            candidate = f"{name}-{index}"
+            index += 1
+        return candidate
+    
+    def tick(self) -> List[Dict]:
+        """检查存档变化并备份已经稳定的存档
+        Returns:
+            本次创建（或失败）的自动备份 [{'scenario_path', 'backup_name', 'success', 'error', 'bytes'}, ...]
+        """
+        now = self.clock()
+        self._apply_requested_paths()
+        if self.max_bytes_per_second:
+            self._refill(now)
+        
+        for path in self._paths_to_check():
+            signature = self._signature(path)
+            if signature == self.baselines.get(path):
+                self.pending.pop(path, None)
+            elif path not in self.pending or self.pending[path][0] != signature:
+                self.pending[path] = (signature, now)
+        
+        results = []
+        for path, (signature, changed_at) in list(self.pending.items()):
+            if now - changed_at < self.settle_seconds:
+                continue
+            if signature[0] is None:
+                # 存档被删除，不需要备份
+                self.baselines[path] = signature
+                del self.pending[path]
+                continue
+            if path in self.last_backup and now - self.last_backup[path] < self.min_interval:
+                continue
+            if self.max_bytes_per_second and self._tokens <= 0:
+                break
+            
+            del self.pending[path]
+            self.baselines[path] = signature
+            # 与界面、批量备份和清理旧备份等线程对同一场景的操作依次进行（检查、命名和创建之间不会插入其他操作）
+            with self.tool._backup_dir_lock(os.path.join(path, self.tool.backup_dir_name)):
+                if self.tool.save_unchanged_since_backup(path):
+                    continue  # 用户已经手动备份过这个存档
+                backup_name = self._backup_name(path)
+                success, error = self.tool.create_backup(path, backup_name)
+            self.last_backup[path] = now
+            size = signature[0][1] if success else 0
+            if not success:
+                # 失败的存档在最短间隔后重试
+                self.baselines[path] = None
+                self.tool.profiler.add("auto_backup.failed")
+            else:
+                self.tool.profiler.add("auto_backup.created")
+                self.tool.profiler.add("auto_backup.bytes", size)
+            if self.max_bytes_per_second:
+                # 备份需要读一次存档、写一次备份
+                self._tokens -= 2 * size
+            results.append({'scenario_path': path, 'backup_name': backup_name, 'success': success,
+                            'error': error, 'bytes': size})
+        return results
+
+
+# PyQt5/6 GUI实现
+if PYQT_VERSION in [5, 6]:
+    class ScanWorker(QThread):
+        """后台扫描线程，按批发送扫描到的路线，扫描期间界面保持可用"""
+        
+        batch_ready = pyqtSignal(object)
+        progress = pyqtSignal(int, int)
+        scan_finished = pyqtSignal(bool)
+        
+        def __init__(self, tool, parent=None):
+            super().__init__(parent)
+            self.tool = tool
+            self.cancel_event = threading.Event()
+        
+        def cancel(self):
+            """请求取消扫描，当前批次完成后停止"""
+            self.cancel_event.set()
+        
+        def run(self):
+            success = self.tool.scan_content(batch_callback=self.batch_ready.emit,
+                                             progress_callback=self.progress.emit,
+                                             cancel_event=self.cancel_event)
+            self.scan_finished.emit(success)
+    
+    
+    class RouteLoadWorker(QThread):
+        """后台逐个加载延迟扫描模式下路线的场景，供搜索使用"""
+        
+        route_loaded = pyqtSignal(str, bool)
+        load_finished = pyqtSignal(int, int)
+        
+        def __init__(self, tool, route_uuids: List[str], parent=None):
+            super().__init__(parent)
+            self.tool = tool
+            self.route_uuids = route_uuids
+            self.cancel_event = threading.Event()
+        
+        def cancel(self):
+            """请求取消，当前路线加载完成后停止"""
+            self.cancel_event.set()
+        
+        def run(self):
+            loaded = 0
+            for route_uuid in self.route_uuids:
+                if self.cancel_event.is_set():
+                    break
+                success = self.tool.load_route_scenarios(route_uuid)
+                loaded += success
+                self.route_loaded.emit(route_uuid, success)
+            self.load_finished.emit(loaded, len(self.route_uuids))
+    
+    
+    class BackupAllWorker(QThread):
+        """后台批量备份线程"""
+        
+        progress = pyqtSignal(int, int, object)  # 字节数可能超过int范围
+        backup_finished = pyqtSignal(object)
+        
+        def __init__(self, tool, parent=None):
+            super().__init__(parent)
+            self.tool = tool
+            self.cancel_event = threading.Event()
+        
+        def cancel(self):
+            """请求取消，已开始的备份完成后停止"""
+            self.cancel_event.set()
+        
+        def run(self):
+            result = self.tool.backup_all(progress_callback=self.progress.emit, cancel_event=self.cancel_event)
+            self.backup_finished.emit(result)
+    
+    
+    class RetentionWorker(QThread):
+        """后台按保留策略清理旧备份"""
+        
+        progress = pyqtSignal(int, int, int)
+        retention_finished = pyqtSignal(object)
+        
+        def __init__(self, tool, policy: Dict, parent=None):
+            super().__init__(parent)
+            self.tool = tool
+            self.policy = policy
+            self.cancel_event = threading.Event()
+        
+        def cancel(self):
+            """请求取消，正在处理的场景完成后停止"""
+            self.cancel_event.set()
+        
+        def run(self):
+            result = self.tool.apply_retention(self.policy, progress_callback=self.progress.emit,
+                                               cancel_event=self.cancel_event)
+            self.retention_finished.emit(result)
+    
+    
+    class VerifyWorker(QThread):
+        """后台校验备份线程"""
+        
+        progress = pyqtSignal(int, int)
+        verify_finished = pyqtSignal(object)
+        
+        def __init__(self, tool, scenario_paths: Optional[List[str]], parent=None):
+            super().__init__(parent)
+            self.tool = tool
+            self.scenario_paths = scenario_paths
+            self.cancel_event = threading.Event()
+        
+        def cancel(self):
+            """请求取消，正在校验的文件完成后停止"""
+            self.cancel_event.set()
+        
+        def run(self):
+            result = self.tool.verify_backups(self.scenario_paths, progress_callback=self.progress.emit,
+                                              cancel_event=self.cancel_event)
+            self.verify_finished.emit(result)
+    
+    
+    class ArchiveWorker(QThread):
+        """后台导出或导入备份归档"""
+        
+        progress = pyqtSignal(object, object)  # 字节数可能超过int范围
+        archive_finished = pyqtSignal(str, object)
+        
+        def __init__(self, tool, operation: str, archive_path: str,
+                     selection: Optional[Dict[str, Optional[List[str]]]] = None, resume: bool = True, parent=None):
+            super().__init__(parent)
+            self.tool = tool
+            self.operation = operation
+            self.archive_path = archive_path
+            self.selection = selection
+            self.resume = resume
+            self.cancel_event = threading.Event()
+        
+        def cancel(self):
+            """请求取消，正在写入的文件完成后停止"""
+            self.cancel_event.set()
+        
+        def run(self):
+            if self.operation == "export":
+                result = self.tool.export_backups(self.archive_path, self.selection, self.resume,
+                                                  progress_callback=self.progress.emit, cancel_event=self.cancel_event)
+            else:
+                result = self.tool.import_backups(self.archive_path, progress_callback=self.progress.emit,
+                                                  cancel_event=self.cancel_event)
+            self.archive_finished.emit(self.operation, result)
+    
+    
+    class MirrorWorker(QThread):
+        """后台同步备份镜像或从镜像还原"""
+        
+        progress = pyqtSignal(int, int)
+        mirror_finished = pyqtSignal(str, object)
+        
+        def __init__(self, tool, operation: str, scenario_keys: Optional[List[str]] = None, parent=None):
+            super().__init__(parent)
+            self.tool = tool
+            self.operation = operation
+            self.scenario_keys = scenario_keys
+            self.cancel_event = threading.Event()
+        
+        def cancel(self):
+            """请求取消，正在复制的文件完成后停止"""
+            self.cancel_event.set()
+        
+        def run(self):
+            if self.operation == "sync":
+                result = self.tool.sync_mirror(progress_callback=self.progress.emit, cancel_event=self.cancel_event)
+            else:
+                result = self.tool.restore_from_mirror(self.scenario_keys, progress_callback=self.progress.emit,
+                                                       cancel_event=self.cancel_event)
+            self.mirror_finished.emit(self.operation, result)
+    
+    
+    class SnapshotWorker(QThread):
+        """后台创建存档快照，或先为当前存档创建快照再整体还原一个快照"""
+        
+        progress = pyqtSignal(int, int)
+        snapshot_finished = pyqtSignal(str, object)
+        
+        def __init__(self, tool, operation: str, name: str, parent=None):
+            super().__init__(parent)
+            self.tool = tool
+            self.operation = operation
+            self.name = name
+            self.cancel_event = threading.Event()
+        
+        def cancel(self):
+            """请求取消，正在读取或还原的存档完成后停止"""
+            self.cancel_event.set()
+        
+        def run(self):
+            if self.operation == "create":
+                result = self.tool.create_snapshot(self.name, progress_callback=self.progress.emit,
+                                                   cancel_event=self.cancel_event)
+            else:
+                safety = self.tool.create_snapshot(f"还原前-{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}",
+                                                   progress_callback=self.progress.emit, cancel_event=self.cancel_event)
+                result = None
+                if not safety['error'] and not safety['cancelled']:
+                    result = self.tool.restore_snapshot(self.name, progress_callback=self.progress.emit,
+                                                        cancel_event=self.cancel_event)
+                result = {'safety': safety, 'restore': result}
+            self.snapshot_finished.emit(self.operation, result)
+    
+    
+    class AutoBackupWorker(QThread):
+        """后台自动备份线程，每秒调用一次AutoBackupService.tick()"""
+        
+        backup_created = pyqtSignal(object)
+        
+        TICK_SECONDS = 1.0
+        
+        def __init__(self, service: AutoBackupService, parent=None):
+            super().__init__(parent)
+            self.service = service
+            self.stop_event = threading.Event()
+        
+        def stop(self):
+            """请求停止，正在进行的备份完成后退出"""
+            self.stop_event.set()
+        
+        def run(self):
+            while not self.stop_event.wait(self.TICK_SECONDS):
+                for result in self.service.tick():
+                    self.backup_created.emit(result)
+    
+    
+    class ContentWatcher(QObject):
+        """监视Routes、Scenarios和saves目录，将变化合并去抖后通过changes_ready发出
+        
+        优先使用QFileSystemWatcher（Windows上基于ReadDirectoryChangesW，Linux上基于inotify），
+        无法监视的路径（例如尚不存在的saves目录）或poll模式下改用DirectoryPoller定时轮询。
+        """
+        
+        changes_ready = pyqtSignal(object)
+        
+        DEBOUNCE_MS = 500
+        POLL_INTERVAL_MS = 2000
+        
+        def __init__(self, mode: str = "auto", parent=None):
+            super().__init__(parent)
+            self.fs_watcher = None
+            if mode == "auto":
+                self.fs_watcher = QFileSystemWatcher(self)
+                self.fs_watcher.directoryChanged.connect(self._on_path_changed)
+                self.fs_watcher.fileChanged.connect(self._on_path_changed)
+            self.poller = DirectoryPoller()
+            self.watched = set()
+            self.pending = set()
             
-            # 删除对应的MD5校验文件
-            md5_filename = backup_filename + ".MD5"
-            backup_md5_path = os.path.join(scenario_path, self.backup_dir_name, md5_filename)
-            if os.path.exists(backup_md5_path):
-                os.remove(backup_md5_path)
-                deleted = True
+            self.poll_timer = QTimer(self)
+            self.poll_timer.setInterval(self.POLL_INTERVAL_MS)
+            self.poll_timer.timeout.connect(self._poll)
             
-            return deleted
+            self.debounce_timer = QTimer(self)
+            self.debounce_timer.setSingleShot(True)
+            self.debounce_timer.timeout.connect(self._flush)
+        
+        def set_paths(self, paths):
+            """设置要监视的路径集合，只增删有变化的部分"""
+            paths = {os.path.normpath(path) for path in paths}
+            for path in self.watched - paths:
+                if self.fs_watcher is not None:
+                    self.fs_watcher.removePath(path)
+                self.poller.remove_path(path)
+            for path in paths - self.watched:
+                if self.fs_watcher is None or not os.path.exists(path) or not self.fs_watcher.addPath(path):
+                    self.poller.add_path(path)
+            self.watched = paths
             
-        except Exception as e:
-            print(f"删除备份失败: {e}")
-            return False
-    
-    def list_backups(self, scenario_path: str) -> List[str]:
-        """列出所有备份文件"""
-        backup_dir = os.path.join(scenario_path, self.backup_dir_name)
-        if not os.path.exists(backup_dir):
-            return []
+            if self.poller.paths():
+                self.poll_timer.start()
+            else:
+                self.poll_timer.stop()
         
-        backups = []
-        backup_sets = set()  # 用于跟踪已处理的备份集
-        try:
-            for filename in os.listdir(backup_dir):
-                # 识别任何以.bin结尾的文件作为备份文件
-                if filename.endswith(".bin") and not filename.endswith(".bin.MD5"):
-                    # 提取备份集标识（移除.bin后缀）
-                    backup_id = filename[:-4]  # 移除.bin
-                    if backup_id not in backup_sets:
-                        backup_sets.add(backup_id)
-                        backups.append(backup_id)
-            backups.sort(reverse=True)  # 最新的在前面
-        except Exception as e:
-            print(f"列出备份失败: {e}")
+        def _on_path_changed(self, path: str):
+            """记录变化的路径，在去抖时间内的多次变化合并为一次"""
+            self.pending.add(os.path.normpath(path))
+            self.debounce_timer.start(self.DEBOUNCE_MS)
         
-        return backups
-
-
-# PyQt5/6 GUI实现
-if PYQT_VERSION in [5, 6]:
+        def _poll(self):
+            for path in self.poller.poll():
+                self._on_path_changed(path)
+        
+        def _flush(self):
+            paths, self.pending = self.pending, set()
+            if paths:
+                self.changes_ready.emit(paths)
+    
+    
     class MainWindow(QMainWindow):
         """主窗口"""
         
+        BACKUP_CACHE_SIZE = 32  # 最多缓存（并监视）的saves目录数量
+        SEARCH_ROUTE_LIMIT = 50  # 搜索最多处理的路线数量，避免卡顿
+        SEARCH_SCENARIO_LIMIT = 20  # 搜索时每个路线最多处理的场景数量
+        LANGUAGE_LABELS = {
+            "zh": "中文", "en": "English", "de": "Deutsch", "fr": "Français", "es": "Español",
+            "it": "Italiano", "ru": "Русский", "nl": "Nederlands", "pl": "Polski"
+        }
+        BACKUP_MODE_LABELS = {"copy": "完整复制", "dedup": "去重存储（相同存档只保存一次）", "compressed": "压缩",
+                              "delta": "增量（只保存与上一个备份的差异）"}
+        BACKUP_KIND_LABELS = {"copy": "完整", "dedup": "去重", "compressed": "压缩", "delta": "增量"}
+        
         def __init__(self):
             super().__init__()
             self.tool = TrainSimulatorBackupTool()
+            self.profiler = self.tool.profiler
+            self.scan_worker = None
+            self.backup_all_worker = None
+            self.retention_worker = None
+            self.auto_backup_worker = None
+            self.verify_worker = None
+            self.archive_worker = None
+            self.mirror_worker = None
+            self.snapshot_worker = None
+            self.route_load_worker = None
+            self._route_load_queue = []  # 等待后台加载的路线UUID（搜索用）
+            self._route_load_failed = set()  # 加载失败的路线，下次扫描前不再重试
+            self._refilter_timer = QTimer(self)
+            self._refilter_timer.setSingleShot(True)
+            self._refilter_timer.setInterval(200)
+            self._refilter_timer.timeout.connect(self.refilter_route_tree)
+            self.route_items = {}  # 路线UUID -> 路线树节点
+            self.backup_cache = OrderedDict()  # saves目录 -> 备份信息列表，由文件监视保持最新
+            self.watcher = None
+            watcher_mode = self.tool.config_manager.get_watcher_mode()
+            if watcher_mode != "off":
+                self.watcher = ContentWatcher(watcher_mode, self)
+                self.watcher.changes_ready.connect(self.on_content_changed)
             self.init_ui()
             self.setup_connections()
+            if self.tool.config_manager.get_auto_backup()["enabled"]:
+                self.start_auto_backup()
             
         def init_ui(self):
             """初始化用户界面"""
@@ -456,122 +5413,1306 @@ if PYQT_VERSION in [5, 6]:
             central_widget = QWidget()
             self.setCentralWidget(central_widget)
             
-            # 主布局
-            main_layout = QHBoxLayout(central_widget)
+            # 主布局
+            main_layout = QHBoxLayout(central_widget)
+            
+            # 创建分割器
+            splitter = QSplitter(Qt.Horizontal)
+            main_layout.addWidget(splitter)
+            
+            # 左侧：路线和场景树
+            left_widget = QWidget()
+            left_layout = QVBoxLayout(left_widget)
+            
+            # 搜索框
+            search_layout = QHBoxLayout()
+            search_label = QLabel("搜索:")
+            self.search_input = QLineEdit()
+            self.search_input.setPlaceholderText("输入路线或场景名称...")
+            search_layout.addWidget(search_label)
+            search_layout.addWidget(self.search_input)
+            left_layout.addLayout(search_layout)
+            
+            # 路线标题
+            route_label = QLabel("路线和场景:")
+            left_layout.addWidget(route_label)
+            
+            # 路线树
+            self.route_tree = QTreeWidget()
+            self.route_tree.setHeaderLabels(["路线/场景"])
+            left_layout.addWidget(self.route_tree)
+            
+            splitter.addWidget(left_widget)
+            
+            # 右侧：备份管理
+            right_widget = QWidget()
+            right_layout = QVBoxLayout(right_widget)
+            
+            # 场景信息
+            scenario_group = QGroupBox("场景信息")
+            scenario_layout = QFormLayout(scenario_group)
+            
+            self.scenario_name_label = QLabel("未选择场景")
+            scenario_layout.addRow("当前场景:", self.scenario_name_label)
+            
+            self.scenario_path_label = QLabel("")
+            scenario_layout.addRow("路径:", self.scenario_path_label)
+            
+            right_layout.addWidget(scenario_group)
+            
+            # 备份列表
+            backup_group = QGroupBox("备份列表")
+            backup_layout = QVBoxLayout(backup_group)
+            
+            self.backup_list = QListWidget()
+            backup_layout.addWidget(self.backup_list)
+            
+            # 按钮布局
+            button_layout = QHBoxLayout()
+            
+            self.backup_button = QPushButton("创建备份")
+            self.restore_button = QPushButton("还原备份")
+            self.delete_button = QPushButton("删除备份")
+            
+            self.backup_button.setEnabled(False)
+            self.restore_button.setEnabled(False)
+            self.delete_button.setEnabled(False)
+            
+            button_layout.addWidget(self.backup_button)
+            button_layout.addWidget(self.restore_button)
+            button_layout.addWidget(self.delete_button)
+            
+            backup_layout.addLayout(button_layout)
+            right_layout.addWidget(backup_group)
+            
+            splitter.addWidget(right_widget)
+            
+            # 设置分割器比例
+            splitter.setSizes([400, 600])
+            
+            # 菜单栏
+            self.create_menu_bar()
+            
+            # 状态栏
+            self.statusBar().showMessage("就绪")
+            self.scan_progress = QProgressBar()
+            self.scan_progress.setMaximumWidth(200)
+            self.scan_progress.hide()
+            self.cancel_scan_button = QPushButton("取消扫描")
+            self.cancel_scan_button.hide()
+            self.statusBar().addPermanentWidget(self.scan_progress)
+            self.statusBar().addPermanentWidget(self.cancel_scan_button)
+            
+            # 初始扫描：先从索引载入，再在后台校验
+            if self.tool.load_scan_index():
+                self.populate_route_tree()
+            self.scan_content()
+        
+        def create_menu_bar(self):
+            """创建菜单栏"""
+            menubar = self.menuBar()
+            
+            # 文件菜单
+            file_menu = menubar.addMenu('文件')
+            
+            # 设置路径动作
+            set_path_action = file_menu.addAction('设置RailWorks路径')
+            set_path_action.triggered.connect(self.set_railworks_path)
+            
+            file_menu.addSeparator()
+            
+            # 退出动作
+            exit_action = file_menu.addAction('退出')
+            exit_action.triggered.connect(self.close)
+            
+            # 工具菜单
+            tools_menu = menubar.addMenu('工具')
+            
+            # 重新扫描动作
+            rescan_action = tools_menu.addAction('重新扫描内容')
+            rescan_action.triggered.connect(self.scan_content)
+            
+            # 取消扫描动作
+            self.cancel_scan_action = tools_menu.addAction('取消扫描')
+            self.cancel_scan_action.setEnabled(False)
+            self.cancel_scan_action.triggered.connect(self.cancel_scan)
+            
+            tools_menu.addSeparator()
+            
+            # 批量备份动作
+            backup_all_action = tools_menu.addAction('备份全部存档...')
+            backup_all_action.triggered.connect(self.backup_all)
+            
+            self.cancel_backup_all_action = tools_menu.addAction('取消批量备份')
+            self.cancel_backup_all_action.setEnabled(False)
+            self.cancel_backup_all_action.triggered.connect(self.cancel_backup_all)
+            
+            # 清理旧备份动作
+            retention_action = tools_menu.addAction('清理旧备份...')
+            retention_action.triggered.connect(self.show_retention)
+            
+            # 自动备份动作
+            self.auto_backup_action = tools_menu.addAction('自动备份')
+            self.auto_backup_action.setCheckable(True)
+            self.auto_backup_action.setChecked(self.tool.config_manager.get_auto_backup()["enabled"])
+            self.auto_backup_action.triggered.connect(self.toggle_auto_backup)
+            
+            auto_backup_settings_action = tools_menu.addAction('自动备份设置...')
+            auto_backup_settings_action.triggered.connect(self.show_auto_backup_settings)
+            
+            # 校验备份动作
+            verify_action = tools_menu.addAction('校验备份...')
+            verify_action.triggered.connect(self.verify_backups)
+            
+            # 导出/导入备份动作
+            export_action = tools_menu.addAction('导出备份...')
+            export_action.triggered.connect(self.export_backups)
+            
+            import_action = tools_menu.addAction('导入备份...')
+            import_action.triggered.connect(self.import_backups)
+            
+            self.cancel_archive_action = tools_menu.addAction('取消导出/导入')
+            self.cancel_archive_action.setEnabled(False)
+            self.cancel_archive_action.triggered.connect(self.cancel_archive)
+            
+            # 备份镜像菜单：同步到RailWorks目录之外的目录，游戏目录被清空后可以还原
+            mirror_menu = tools_menu.addMenu('备份镜像')
+            mirror_path_action = mirror_menu.addAction('设置镜像目录...')
+            mirror_path_action.triggered.connect(self.set_mirror_path)
+            
+            sync_mirror_action = mirror_menu.addAction('同步到镜像')
+            sync_mirror_action.triggered.connect(self.sync_mirror)
+            
+            restore_mirror_action = mirror_menu.addAction('从镜像还原...')
+            restore_mirror_action.triggered.connect(self.show_mirror_restore)
+            
+            self.cancel_mirror_action = mirror_menu.addAction('取消')
+            self.cancel_mirror_action.setEnabled(False)
+            self.cancel_mirror_action.triggered.connect(self.cancel_mirror)
+            
+            # 所有备份动作
+            all_backups_action = tools_menu.addAction('所有备份...')
+            all_backups_action.triggered.connect(self.show_all_backups)
+            
+            # 存档快照动作
+            snapshots_action = tools_menu.addAction('存档快照...')
+            snapshots_action.triggered.connect(self.show_snapshots)
+            
+            self.cancel_snapshot_action = tools_menu.addAction('取消快照操作')
+            self.cancel_snapshot_action.setEnabled(False)
+            self.cancel_snapshot_action.triggered.connect(self.cancel_snapshot)
+            
+            # 备份方式菜单
+            backup_mode_menu = tools_menu.addMenu('备份方式')
+            self.backup_mode_actions = {}
+            current_mode = self.tool.config_manager.get_backup_mode()
+            for mode, label in self.BACKUP_MODE_LABELS.items():
+                action = backup_mode_menu.addAction(label)
+                action.setCheckable(True)
+                action.setChecked(mode == current_mode)
+                action.triggered.connect(lambda checked, m=mode: self.change_backup_mode(m))
+                self.backup_mode_actions[mode] = action
+            
+            # 压缩算法（只影响压缩方式的新备份）
+            backup_mode_menu.addSeparator()
+            self.compression_actions = {}
+            current_codec = self.tool.config_manager.get_compression()
+            for codec in BackupContainer.available_codecs():
+                action = backup_mode_menu.addAction(f"压缩算法: {codec}")
+                action.setCheckable(True)
+                action.setChecked(codec == current_codec)
+                action.triggered.connect(lambda checked, c=codec: self.change_compression(c))
+                self.compression_actions[codec] = action
+            
+            # 清理去重存储动作
+            gc_action = tools_menu.addAction('清理去重存储')
+            gc_action.triggered.connect(self.collect_backup_garbage)
+            
+            # 备份空间分析动作
+            analyze_action = tools_menu.addAction('备份空间分析')
+            analyze_action.triggered.connect(self.analyze_backups)
+            
+            tools_menu.addSeparator()
+            
+            # 性能诊断动作
+            diagnostics_action = tools_menu.addAction('性能诊断...')
+            diagnostics_action.triggered.connect(self.show_diagnostics)
+            
+            # 语言菜单：名称表已包含所有语言，切换时无需重新扫描
+            language_menu = tools_menu.addMenu('显示语言')
+            self.language_actions = {}
+            current_language = self.tool.config_manager.get_language()
+            for language, label in self.LANGUAGE_LABELS.items():
+                action = language_menu.addAction(label)
+                action.setCheckable(True)
+                action.setChecked(language == current_language)
+                action.triggered.connect(lambda checked, lang=language: self.change_language(lang))
+                self.language_actions[language] = action
+        
+        def show_diagnostics(self):
+            """显示性能统计对话框"""
+            dialog = QDialog(self)
+            dialog.setWindowTitle("性能诊断")
+            dialog.resize(760, 520)
+            
+            layout = QVBoxLayout(dialog)
+            
+            report = QTextEdit()
+            report.setReadOnly(True)
+            report.setFont(QFont("Consolas", 9))
+            layout.addWidget(report)
+            
+            def refresh():
+                report.setPlainText(self.profiler.format_report())
+            
+            def toggle(enabled):
+                self.profiler.enabled = enabled
+                self.tool.config_manager.set_profiling(enabled)
+                enable_button.setText("停用统计" if enabled else "启用统计")
+                refresh()
+            
+            def reset():
+                self.profiler.reset()
+                refresh()
+            
+            def export():
+                path, _ = QFileDialog.getSaveFileName(dialog, "导出性能统计", "train_simulator_profile.json",
+                                                      "JSON (*.json)")
+                if not path:
+                    return
+                if self.profiler.export_json(path):
+                    self.statusBar().showMessage(f"性能统计已导出到 {path}")
+                else:
+                    QMessageBox.warning(dialog, "失败", "导出性能统计失败")
+            
+            # 按钮
+            button_layout = QHBoxLayout()
+            enable_button = QPushButton("停用统计" if self.profiler.enabled else "启用统计")
+            enable_button.setCheckable(True)
+            enable_button.setChecked(self.profiler.enabled)
+            refresh_button = QPushButton("刷新")
+            reset_button = QPushButton("清空")
+            export_button = QPushButton("导出JSON")
+            close_button = QPushButton("关闭")
+            for button in (enable_button, refresh_button, reset_button, export_button, close_button):
+                button_layout.addWidget(button)
+            layout.addLayout(button_layout)
+            
+            enable_button.toggled.connect(toggle)
+            refresh_button.clicked.connect(refresh)
+            reset_button.clicked.connect(reset)
+            export_button.clicked.connect(export)
+            close_button.clicked.connect(dialog.accept)
+            
+            refresh()
+            dialog.exec_()
+        
+        def show_all_backups(self):
+            """显示所有场景的备份（来自备份目录数据库）和按路线的占用空间统计"""
+            if not self.tool.railworks_path:
+                QMessageBox.information(self, "信息", "请先设置RailWorks安装路径！")
+                return
+
+            dialog = QDialog(self)
+            dialog.setWindowTitle("所有备份")
+            dialog.resize(960, 640)
+            layout = QVBoxLayout(dialog)
+
+            summary_label = QLabel()
+            layout.addWidget(summary_label)
+            search_input = QLineEdit()
+            search_input.setPlaceholderText("按备份名称、路线或场景过滤...")
+            layout.addWidget(search_input)
+
+            splitter = QSplitter(Qt.Vertical)
+            backup_tree = QTreeWidget()
+            backup_tree.setHeaderLabels(["存档时间", "路线", "场景", "备份名称", "大小", "占用", "方式"])
+            backup_tree.setRootIsDecorated(False)
+            backup_tree.setSortingEnabled(True)
+            route_tree = QTreeWidget()
+            route_tree.setHeaderLabels(["路线", "有备份的场景", "备份数", "存档大小", "占用空间", "最新备份"])
+            route_tree.setRootIsDecorated(False)
+            splitter.addWidget(backup_tree)
+            splitter.addWidget(route_tree)
+            splitter.setSizes([420, 200])
+            layout.addWidget(splitter)
+
+            def format_time(mtime_ns):
+                return datetime.fromtimestamp(mtime_ns / 1e9).strftime("%Y-%m-%d %H:%M:%S") if mtime_ns else ""
+
+            def refresh_backups():
+                backup_tree.setSortingEnabled(False)
+                backup_tree.clear()
+                for row in self.tool.query_all_backups(search_input.text()):
+                    item = QTreeWidgetItem([format_time(row['mtime_ns']), row['route_name'], row['scenario_name'],
+                                            row['name'], f"{row['size'] / 1024:.1f} KB",
+                                            f"{row['stored_bytes'] / 1024:.1f} KB",
+                                            self.BACKUP_KIND_LABELS.get(row['kind'], row['kind'])])
+                    item.setData(0, Qt.UserRole, row['scenario_path'])
+                    backup_tree.addTopLevelItem(item)
+                backup_tree.setSortingEnabled(True)
+                backup_tree.sortByColumn(0, Qt.DescendingOrder)
+
+            def refresh():
+                self.tool.sync_backup_catalog()
+                totals = self.tool.get_backup_catalog().totals()
+                summary_label.setText(f"共 {totals['scenarios']} 个场景有 {totals['backups']} 个备份，"
+                                      f"占用 {totals['stored_bytes'] / 1024 / 1024:.1f} MB"
+                                      f"（存档共 {totals['size'] / 1024 / 1024:.1f} MB），"
+                                      f"最新备份: {format_time(totals['newest_mtime_ns']) or '无'}")
+                route_tree.clear()
+                for row in self.tool.backup_usage_by_route():
+                    route_tree.addTopLevelItem(QTreeWidgetItem([
+                        row['route_name'], str(row['scenarios']), str(row['backups']),
+                        f"{row['size'] / 1024 / 1024:.1f} MB", f"{row['stored_bytes'] / 1024 / 1024:.1f} MB",
+                        format_time(row['newest_mtime_ns'])]))
+                refresh_backups()
+
+            def open_scenario(item, column):
+                # 在主窗口中选中该场景
+                if self.select_scenario(item.data(0, Qt.UserRole)):
+                    dialog.accept()
+
+            search_input.textChanged.connect(refresh_backups)
+            backup_tree.itemDoubleClicked.connect(open_scenario)
+
+            # 按钮
+            button_layout = QHBoxLayout()
+            refresh_button = QPushButton("刷新")
+            close_button = QPushButton("关闭")
+            button_layout.addStretch()
+            button_layout.addWidget(refresh_button)
+            button_layout.addWidget(close_button)
+            layout.addLayout(button_layout)
+            refresh_button.clicked.connect(refresh)
+            close_button.clicked.connect(dialog.accept)
+
+            refresh()
+            dialog.exec_()
+
+        def select_scenario(self, scenario_path: str) -> bool:
+            """在路线树中选中场景（延迟模式下先加载路线），找不到时返回False"""
+            for route_uuid, route_item in self.route_items.items():
+                route_data = self.tool.routes_data.get(route_uuid)
+                if route_data is None or not os.path.normcase(scenario_path).startswith(
+                        os.path.normcase(route_data['path']) + os.sep):
+                    continue
+                self.load_route_item(route_uuid)
+                for i in range(route_item.childCount()):
+                    child = route_item.child(i)
+                    if child.data(0, Qt.UserRole)['scenario_path'] == scenario_path:
+                        route_item.setExpanded(True)
+                        self.route_tree.setCurrentItem(child)
+                        self.route_tree.scrollToItem(child)
+                        return True
+            return False
+
+        def show_snapshots(self):
+            """显示存档快照对话框：创建、整体还原、比较和删除快照"""
+            if not self.tool.railworks_path:
+                QMessageBox.information(self, "信息", "请先设置RailWorks安装路径！")
+                return
+            
+            dialog = QDialog(self)
+            dialog.setWindowTitle("存档快照")
+            dialog.resize(640, 420)
+            
+            layout = QVBoxLayout(dialog)
+            layout.addWidget(QLabel("快照记录所有场景某一时刻的存档，可以整体还原；选择两个快照可以比较差异"))
+            snapshot_list = QListWidget()
+            snapshot_list.setSelectionMode(QListWidget.ExtendedSelection)
+            layout.addWidget(snapshot_list)
+            
+            def refresh():
+                snapshot_list.clear()
+                for snapshot in self.tool.list_snapshots():
+                    item = QListWidgetItem(f"{snapshot['name']}    {snapshot['created'].replace('T', ' ')}    "
+                                           f"{snapshot['scenarios']} 个场景    {snapshot['bytes'] / 1024 / 1024:.1f} MB")
+                    item.setData(Qt.UserRole, snapshot['name'])
+                    snapshot_list.addItem(item)
+            
+            def selected_names() -> List[str]:
+                return [item.data(Qt.UserRole) for item in snapshot_list.selectedItems()]
+            
+            def snapshot_busy() -> bool:
+                if self.snapshot_worker is not None and self.snapshot_worker.isRunning():
+                    QMessageBox.information(dialog, "存档快照", "正在创建或还原快照，请稍候")
+                    return True
+                return False
+            
+            def create():
+                default_name = f"Snapshot-{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}"
+                if snapshot_busy():
+                    return
+                name, ok = QInputDialog.getText(dialog, "创建快照", "快照名称:", QLineEdit.Normal, default_name)
+                if not ok or not name.strip():
+                    return
+                dialog.accept()
+                self.start_snapshot_worker(SnapshotWorker(self.tool, "create", name.strip(), self))
+            
+            def restore():
+                if snapshot_busy():
+                    return
+                names = selected_names()
+                if len(names) != 1:
+                    QMessageBox.information(dialog, "还原快照", "请选择一个快照")
+                    return
+                difference = self.tool.compare_snapshots(names[0])
+                reply = QMessageBox.question(
+                    dialog, "还原快照",
+                    f"将用快照 '{names[0]}' 覆盖 {len(difference['changed']) + len(difference['removed'])} 个场景的当前存档，"
+                    f"快照之后才有存档的 {len(difference['added'])} 个场景不受影响。\n"
+                    f"还原前会自动为当前存档创建一个快照。确定要继续吗？",
+                    QMessageBox.Yes | QMessageBox.No)
+                if reply != QMessageBox.Yes:
+                    return
+                dialog.accept()
+                self.start_snapshot_worker(SnapshotWorker(self.tool, "restore", names[0], self))
+            
+            def compare():
+                names = selected_names()
+                if len(names) not in (1, 2):
+                    QMessageBox.information(dialog, "比较快照", "请选择一个快照（与当前存档比较）或两个快照")
+                    return
+                if len(names) == 2:
+                    # 按创建时间由旧到新比较
+                    created = {item['name']: item['created'] for item in self.tool.list_snapshots()}
+                    names.sort(key=lambda n: created.get(n, ""))
+                    title = f"{names[0]} → {names[1]}"
+                    difference = self.tool.compare_snapshots(names[0], names[1])
+                else:
+                    title = f"{names[0]} → 当前存档"
+                    difference = self.tool.compare_snapshots(names[0])
+                labels = {}
+                for name in names:
+                    for key, entry in (self.tool.load_snapshot(name) or {}).get("scenarios", {}).items():
+                        if entry.get("scenario_name"):
+                            labels[key] = f"{entry['route_name']} / {entry['scenario_name']}"
+                lines = [title, f"未变化 {difference['unchanged']} 个场景", ""]
+                for field, label in (("changed", "已变化"), ("added", "新增存档"), ("removed", "存档已删除")):
+                    lines.append(f"{label}（{len(difference[field])}）:")
+                    lines.extend(f"    {labels.get(key, key)}" for key in difference[field])
+            
+                report_dialog = QDialog(dialog)
+                report_dialog.setWindowTitle("比较快照")
+                report_dialog.resize(560, 400)
+                report_layout = QVBoxLayout(report_dialog)
+                report = QTextEdit()
+                report.setReadOnly(True)
+                report.setPlainText("\n".join(lines))
+                report_layout.addWidget(report)
+                report_dialog.exec_()
+            
+            def delete():
+                names = selected_names()
+                if not names:
+                    return
+                reply = QMessageBox.question(dialog, "删除快照", f"确定要删除 {len(names)} 个快照吗？",
+                                             QMessageBox.Yes | QMessageBox.No)
+                if reply != QMessageBox.Yes:
+                    return
+                failed = [name for name in names if not self.tool.delete_snapshot(name)]
+                if failed:
+                    QMessageBox.warning(dialog, "删除快照", f"删除失败: {', '.join(failed)}")
+                refresh()
+            
+            # 按钮
+            button_layout = QHBoxLayout()
+            create_button = QPushButton("创建快照")
+            restore_button = QPushButton("还原")
+            compare_button = QPushButton("比较")
+            delete_button = QPushButton("删除")
+            close_button = QPushButton("关闭")
+            for button in (create_button, restore_button, compare_button, delete_button, close_button):
+                button_layout.addWidget(button)
+            layout.addLayout(button_layout)
+            
+            create_button.clicked.connect(create)
+            restore_button.clicked.connect(restore)
+            compare_button.clicked.connect(compare)
+            delete_button.clicked.connect(delete)
+            close_button.clicked.connect(dialog.accept)
+            
+            refresh()
+            dialog.exec_()
+        
+        def start_snapshot_worker(self, worker: SnapshotWorker):
+            """启动创建/还原快照线程并显示进度"""
+            self.statusBar().showMessage("正在创建快照..." if worker.operation == "create" else "正在为当前存档创建快照...")
+            self.scan_progress.setRange(0, 0)
+            self.scan_progress.show()
+            self.cancel_snapshot_action.setEnabled(True)
+            self.snapshot_worker = worker
+            worker.progress.connect(self.on_snapshot_progress)
+            worker.snapshot_finished.connect(self.on_snapshot_finished)
+            worker.start()
+        
+        def cancel_snapshot(self):
+            """取消正在进行的快照操作"""
+            if self.snapshot_worker is not None and self.snapshot_worker.isRunning():
+                self.snapshot_worker.cancel()
+                self.statusBar().showMessage("正在取消...")
+        
+        def on_snapshot_progress(self, done: int, total: int):
+            """更新快照进度（还原时先创建还原前快照，再还原）"""
+            self.scan_progress.setRange(0, total)
+            self.scan_progress.setValue(done)
+            self.statusBar().showMessage(f"正在处理快照... {done}/{total} 个场景")
+        
+        def on_snapshot_finished(self, operation: str, result: Dict):
+            """显示创建/还原快照的结果"""
+            self.scan_progress.hide()
+            self.cancel_snapshot_action.setEnabled(False)
+            if operation == "create":
+                title = "创建快照"
+                if result['cancelled']:
+                    message = "已取消，未创建快照"
+                elif result['error']:
+                    self.statusBar().showMessage(result['error'])
+                    QMessageBox.warning(self, title, result['error'])
+                    return
+                else:
+                    message = (f"快照 '{result['name']}' 已创建：{result['scenarios']} 个场景，"
+                               f"其中 {result['reused']} 个存档与上一个快照相同，新增数据 {result['new_objects']} 份，"
+                               f"用时 {result['elapsed']:.1f} 秒")
+                    if result['errors']:
+                        message += f"\n{len(result['errors'])} 个场景读取失败"
+                self.statusBar().showMessage(message.split("\n")[0])
+                QMessageBox.information(self, title, message)
+                return
+            
+            title = "还原快照"
+            safety, restore = result['safety'], result['restore']
+            if safety['cancelled']:
+                message = "已取消，未还原快照"
+                self.statusBar().showMessage(message)
+                QMessageBox.information(self, title, message)
+                return
+            if restore is None:
+                message = f"创建还原前快照失败，未进行还原: {safety['error']}"
+                self.statusBar().showMessage(message)
+                QMessageBox.warning(self, title, message)
+                return
+            if restore['error']:
+                self.statusBar().showMessage(restore['error'])
+                QMessageBox.warning(self, title, restore['error'])
+                return
+            message = (f"还原 {restore['restored']} 个场景，{restore['unchanged']} 个场景无需还原，"
+                       f"失败 {restore['failed']} 个，用时 {restore['elapsed']:.1f} 秒")
+            if restore['cancelled']:
+                message += f"\n已取消，{restore['cancelled']} 个场景未还原"
+            if restore['errors']:
+                message += "\n\n" + "\n".join(f"{key}: {error}" for key, error in sorted(restore['errors'].items()))
+            self.statusBar().showMessage(message.split("\n")[0])
+            if restore['errors']:
+                QMessageBox.warning(self, title, message)
+            else:
+                QMessageBox.information(self, title, message)
+            scenario_path = self._current_scenario_path()
+            if scenario_path:
+                self.update_backup_list(scenario_path, use_cache=False)
+        
+        def change_backup_mode(self, mode: str):
+            """切换新建备份使用的备份方式（已有备份不受影响）"""
+            for m, action in self.backup_mode_actions.items():
+                action.setChecked(m == mode)
+            self.tool.config_manager.set_backup_mode(mode)
+            self.statusBar().showMessage(f"备份方式已切换为 {self.BACKUP_MODE_LABELS[mode]}")
+        
+        def change_compression(self, codec: str):
+            """切换压缩备份使用的压缩算法"""
+            for c, action in self.compression_actions.items():
+                action.setChecked(c == codec)
+            self.tool.config_manager.set_compression(codec)
+            self.statusBar().showMessage(f"压缩算法已切换为 {codec}")
+        
+        def analyze_backups(self):
+            """显示当前场景备份的存储空间和还原耗时"""
+            scenario_path = self._current_scenario_path()
+            if not scenario_path:
+                QMessageBox.information(self, "备份空间分析", "请先选择一个场景")
+                return
+            
+            result = self.tool.analyze_delta_chains(scenario_path)
+            if not result['backups']:
+                QMessageBox.information(self, "备份空间分析", "该场景没有备份")
+                return
+            lines = [f"{row['name']}  {self.BACKUP_KIND_LABELS.get(row['kind'], row['kind'])}"
+                     f"{'(链深度 %d)' % row['depth'] if row['depth'] else ''}  "
+                     f"{row['stored_bytes'] / 1024:.1f} KB / {row['size'] / 1024:.1f} KB  "
+                     f"还原 {row['restore_ms']:.1f} ms"
+                     for row in result['backups']]
+            lines.append("")
+            lines.append(f"共占用 {result['stored_bytes'] / 1024 / 1024:.2f} MB，"
+                         f"完整复制需要 {result['original_bytes'] / 1024 / 1024:.2f} MB，节省 {result['savings']:.1%}")
+            lines.append(f"平均还原 {result['avg_restore_ms']:.1f} ms，最长 {result['max_restore_ms']:.1f} ms")
+            QMessageBox.information(self, "备份空间分析", "\n".join(lines))
+        
+        def show_retention(self):
+            """设置备份保留策略，预览要删除的备份后在后台清理"""
+            if not self.tool.railworks_path:
+                QMessageBox.information(self, "信息", "请先设置RailWorks安装路径！")
+                return
+            if self.retention_worker is not None and self.retention_worker.isRunning():
+                self.statusBar().showMessage("正在清理旧备份，请稍候...")
+                return
+            
+            dialog = QDialog(self)
+            dialog.setWindowTitle("清理旧备份")
+            dialog.resize(820, 560)
+            layout = QVBoxLayout(dialog)
+            layout.addWidget(QLabel("被任一数量规则选中的备份都会保留（0表示不使用该规则）；"
+                                    "超出空间上限时从最旧的备份开始删除，每个场景最新的备份总会保留"))
             
-            # 创建分割器
-            splitter = QSplitter(Qt.Horizontal)
-            main_layout.addWidget(splitter)
+            policy = self.tool.config_manager.get_retention_policy()
+            form = QFormLayout()
+            spin_boxes = {}
+            for key, label, scale in (("keep_last", "保留最新的备份数", 1),
+                                      ("keep_hourly", "按小时保留（最近N小时）", 1),
+                                      ("keep_daily", "按天保留（最近N天）", 1),
+                                      ("keep_weekly", "按周保留（最近N周）", 1),
+                                      ("max_scenario_bytes", "每个场景空间上限（MB）", 2 ** 20),
+                                      ("max_total_bytes", "所有场景空间上限（MB）", 2 ** 20)):
+                spin_box = QSpinBox()
+                spin_box.setRange(0, 1000000)
+                spin_box.setValue(policy[key] // scale)
+                form.addRow(label, spin_box)
+                spin_boxes[key] = (spin_box, scale)
+            layout.addLayout(form)
             
-            # 左侧：路线和场景树
-            left_widget = QWidget()
-            left_layout = QVBoxLayout(left_widget)
+            summary_label = QLabel()
+            layout.addWidget(summary_label)
+            preview_tree = QTreeWidget()
+            preview_tree.setHeaderLabels(["路线 / 场景", "备份名称", "存档时间", "占用"])
+            layout.addWidget(preview_tree)
             
-            # 搜索框
-            search_layout = QHBoxLayout()
-            search_label = QLabel("搜索:")
-            self.search_input = QLineEdit()
-            self.search_input.setPlaceholderText("输入路线或场景名称...")
-            search_layout.addWidget(search_label)
-            search_layout.addWidget(self.search_input)
-            left_layout.addLayout(search_layout)
+            def current_policy() -> Dict:
+                return dict(policy, **{key: spin_box.value() * scale for key, (spin_box, scale) in spin_boxes.items()})
             
-            # 路线标题
-            route_label = QLabel("路线和场景:")
-            left_layout.addWidget(route_label)
+            def preview():
+                QApplication.setOverrideCursor(Qt.WaitCursor)
+                try:
+                    plan = self.tool.plan_retention(current_policy())
+                finally:
+                    QApplication.restoreOverrideCursor()
+                summary_label.setText(f"{plan['scenarios']} 个场景：删除 {plan['delete']} 个备份"
+                                      f"（{plan['delete_bytes'] / 1024 / 1024:.1f} MB），"
+                                      f"保留 {plan['keep']} 个（{plan['keep_bytes'] / 1024 / 1024:.1f} MB）")
+                names = self.tool._scenario_names()
+                preview_tree.clear()
+                for scenario_path, entries in sorted(plan['deletions'].items()):
+                    route_name, scenario_name = names.get(self.tool._scenario_key(scenario_path),
+                                                          ("", os.path.basename(scenario_path)))
+                    scenario_item = QTreeWidgetItem([f"{route_name} / {scenario_name}", f"{len(entries)} 个", "",
+                                                     f"{sum(e['stored_bytes'] for e in entries) / 1024:.1f} KB"])
+                    for entry in entries:
+                        scenario_item.addChild(QTreeWidgetItem([
+                            "", entry['name'],
+                            datetime.fromtimestamp(entry['mtime_ns'] / 1e9).strftime("%Y-%m-%d %H:%M:%S"),
+                            f"{entry['stored_bytes'] / 1024:.1f} KB"]))
+                    preview_tree.addTopLevelItem(scenario_item)
+                return plan
             
-            # 路线树
-            self.route_tree = QTreeWidget()
-            self.route_tree.setHeaderLabels(["路线/场景"])
-            left_layout.addWidget(self.route_tree)
+            def apply():
+                plan = preview()
+                if not plan['delete']:
+                    QMessageBox.information(dialog, "清理旧备份", "没有需要删除的备份")
+                    return
+                reply = QMessageBox.question(dialog, "清理旧备份",
+                                             f"将删除 {len(plan['deletions'])} 个场景的 {plan['delete']} 个备份，"
+                                             f"释放 {plan['delete_bytes'] / 1024 / 1024:.1f} MB。确定要继续吗？",
+                                             QMessageBox.Yes | QMessageBox.No)
+                if reply != QMessageBox.Yes:
+                    return
+                self.tool.config_manager.set_retention_policy(current_policy())
+                dialog.accept()
+                self.start_retention(current_policy())
             
-            splitter.addWidget(left_widget)
+            # 按钮
+            button_layout = QHBoxLayout()
+            preview_button = QPushButton("预览")
+            apply_button = QPushButton("清理")
+            close_button = QPushButton("关闭")
+            button_layout.addStretch()
+            for button in (preview_button, apply_button, close_button):
+                button_layout.addWidget(button)
+            layout.addLayout(button_layout)
+            preview_button.clicked.connect(preview)
+            apply_button.clicked.connect(apply)
+            close_button.clicked.connect(dialog.reject)
             
-            # 右侧：备份管理
-            right_widget = QWidget()
-            right_layout = QVBoxLayout(right_widget)
+            dialog.exec_()
+        
+        def start_retention(self, policy: Dict):
+            """在后台线程中按保留策略删除旧备份"""
+            self.statusBar().showMessage("正在清理旧备份...")
+            self.scan_progress.setRange(0, 0)
+            self.scan_progress.show()
             
-            # 场景信息
-            scenario_group = QGroupBox("场景信息")
-            scenario_layout = QFormLayout(scenario_group)
+            self.retention_worker = RetentionWorker(self.tool, policy, self)
+            self.retention_worker.progress.connect(self.on_retention_progress)
+            self.retention_worker.retention_finished.connect(self.on_retention_finished)
+            self.retention_worker.start()
+        
+        def on_retention_progress(self, done: int, total: int, deleted: int):
+            """更新清理进度"""
+            self.scan_progress.setRange(0, total)
+            self.scan_progress.setValue(done)
+            self.statusBar().showMessage(f"正在清理旧备份... {done}/{total} 个场景，已删除 {deleted} 个备份")
+        
+        def on_retention_finished(self, result: Dict):
+            """清理完成处理：显示汇总和删除失败的备份"""
+            self.scan_progress.hide()
+            message = (f"删除 {result['deleted']} 个备份，释放 {result['deleted_bytes'] / 1024 / 1024:.1f} MB，"
+                       f"失败 {result['failed']} 个")
+            if result['cancelled']:
+                message += f"，取消 {result['cancelled']} 个"
+            message += f"\n用时 {result['elapsed']:.1f} 秒"
+            box = QMessageBox(self)
+            box.setWindowTitle("清理旧备份")
+            box.setText(message)
+            if result['errors']:
+                box.setIcon(QMessageBox.Warning)
+                box.setDetailedText("\n".join(f"{path}: {error}" for path, error in sorted(result['errors'].items())))
+            else:
+                box.setIcon(QMessageBox.Information)
+            box.exec_()
+            self.statusBar().showMessage(f"清理完成，删除 {result['deleted']} 个备份")
             
-            self.scenario_name_label = QLabel("未选择场景")
-            scenario_layout.addRow("当前场景:", self.scenario_name_label)
+            scenario_path = self._current_scenario_path()
+            if scenario_path:
+                self.update_backup_list(scenario_path, use_cache=False)
+        
+        def verify_backups(self):
+            """选择范围后在后台校验备份和当前存档"""
+            if not self.tool.railworks_path:
+                QMessageBox.information(self, "信息", "请先设置RailWorks安装路径！")
+                return
+            if self.verify_worker is not None and self.verify_worker.isRunning():
+                self.statusBar().showMessage("正在校验备份，请稍候...")
+                return
             
-            self.scenario_path_label = QLabel("")
-            scenario_layout.addRow("路径:", self.scenario_path_label)
+            scopes = ["所有场景"]
+            current_item = self.route_tree.currentItem()
+            data = current_item.data(0, Qt.UserRole) if current_item else None
+            route_uuid = None
+            scenario_path = self._current_scenario_path()
+            if data and data['type'] == 'scenario':
+                route_uuid = data['route_uuid']
+            elif data and data['type'] == 'route':
+                route_uuid = data['uuid']
+            if scenario_path:
+                scopes.insert(0, "当前场景")
+            if route_uuid:
+                scopes.insert(len(scopes) - 1, "当前路线")
+            scope, ok = QInputDialog.getItem(self, "校验备份", "校验范围:", scopes, 0, False)
+            if not ok:
+                return
+            if scope == "当前场景":
+                scenario_paths = [scenario_path]
+            elif scope == "当前路线":
+                scenario_paths = [path for route, _, path in self.tool.iter_scenario_dirs() if route == route_uuid]
+            else:
+                scenario_paths = None
             
-            right_layout.addWidget(scenario_group)
+            self.statusBar().showMessage("正在校验备份...")
+            self.scan_progress.setRange(0, 0)
+            self.scan_progress.show()
+            self.verify_worker = VerifyWorker(self.tool, scenario_paths, self)
+            self.verify_worker.progress.connect(self.on_verify_progress)
+            self.verify_worker.verify_finished.connect(self.on_verify_finished)
+            self.verify_worker.start()
+        
+        def on_verify_progress(self, done: int, total: int):
+            """更新校验进度"""
+            self.scan_progress.setRange(0, total)
+            self.scan_progress.setValue(done)
+            self.statusBar().showMessage(f"正在校验备份... {done}/{total} 个文件")
+        
+        def on_verify_finished(self, result: Dict):
+            """显示校验报告"""
+            self.scan_progress.hide()
+            problems = result['corrupt'] + result['md5_mismatch'] + result['error']
+            self.statusBar().showMessage(f"校验完成，{result['checked']} 个文件中 {problems} 个有问题")
             
-            # 备份列表
-            backup_group = QGroupBox("备份列表")
-            backup_layout = QVBoxLayout(backup_group)
+            dialog = QDialog(self)
+            dialog.setWindowTitle("校验报告")
+            dialog.resize(760, 480)
+            layout = QVBoxLayout(dialog)
+            report = QTextEdit()
+            report.setReadOnly(True)
+            report.setPlainText(self.tool.format_verify_report(result))
+            layout.addWidget(report)
             
-            self.backup_list = QListWidget()
-            backup_layout.addWidget(self.backup_list)
+            def save():
+                path, _ = QFileDialog.getSaveFileName(dialog, "保存校验报告", "train_simulator_verify_report.txt",
+                                                      "Text (*.txt)")
+                if not path:
+                    return
+                try:
+                    with open(path, 'w', encoding='utf-8') as f:
+                        f.write(report.toPlainText())
+                    self.statusBar().showMessage(f"校验报告已保存到 {path}")
+                except Exception as e:
+                    QMessageBox.warning(dialog, "失败", f"保存校验报告失败: {e}")
             
-            # 按钮布局
             button_layout = QHBoxLayout()
+            save_button = QPushButton("保存报告")
+            close_button = QPushButton("关闭")
+            button_layout.addStretch()
+            button_layout.addWidget(save_button)
+            button_layout.addWidget(close_button)
+            layout.addLayout(button_layout)
+            save_button.clicked.connect(save)
+            close_button.clicked.connect(dialog.accept)
+            dialog.exec_()
+        
+        def export_backups(self):
+            """选择范围和归档文件后在后台导出备份，上次中断的导出可以继续"""
+            if not self.tool.railworks_path:
+                QMessageBox.information(self, "信息", "请先设置RailWorks安装路径！")
+                return
+            if self.archive_worker is not None and self.archive_worker.isRunning():
+                self.statusBar().showMessage("正在导出或导入备份，请稍候...")
+                return
             
-            self.backup_button = QPushButton("创建备份")
-            self.restore_button = QPushButton("还原备份")
-            self.delete_button = QPushButton("删除备份")
+            scopes = ["所有场景"]
+            current_item = self.route_tree.currentItem()
+            data = current_item.data(0, Qt.UserRole) if current_item else None
+            route_uuid = None
+            scenario_path = self._current_scenario_path()
+            backup_item = self.backup_list.currentItem()
+            if data and data['type'] == 'scenario':
+                route_uuid = data['route_uuid']
+            elif data and data['type'] == 'route':
+                route_uuid = data['uuid']
+            if scenario_path:
+                scopes.insert(0, "当前场景")
+                if backup_item is not None:
+                    scopes.insert(0, "选中的备份")
+            if route_uuid:
+                scopes.insert(len(scopes) - 1, "当前路线")
+            scope, ok = QInputDialog.getItem(self, "导出备份", "导出范围:", scopes, 0, False)
+            if not ok:
+                return
+            if scope == "选中的备份":
+                selection = {scenario_path: [backup_item.data(Qt.UserRole)]}
+            elif scope == "当前场景":
+                selection = {scenario_path: None}
+            elif scope == "当前路线":
+                selection = {path: None for route, _, path in self.tool.iter_scenario_dirs() if route == route_uuid}
+            else:
+                selection = None
             
-            self.backup_button.setEnabled(False)
-            self.restore_button.setEnabled(False)
-            self.delete_button.setEnabled(False)
+            archive_path, _ = QFileDialog.getSaveFileName(
+                self, "导出备份", f"TrainSimulatorBackups-{datetime.now().strftime('%Y-%m-%d')}.tar", "Tar (*.tar)")
+            if not archive_path:
+                return
+            resume = False
+            if os.path.exists(archive_path + ".part"):
+                reply = QMessageBox.question(
+                    self, "导出备份", "找到上次中断的导出，是否继续？\n选择“否”将按本次选择的范围重新导出。",
+                    QMessageBox.Yes | QMessageBox.No)
+                resume = reply == QMessageBox.Yes
+            self.start_archive_worker(ArchiveWorker(self.tool, "export", archive_path, selection, resume, self))
+        
+        def import_backups(self):
+            """选择导出的归档后在后台导入到对应的场景"""
+            if not self.tool.railworks_path or not self.tool.routes_data:
+                QMessageBox.information(self, "信息", "请先设置RailWorks安装路径并完成扫描！")
+                return
+            if self.archive_worker is not None and self.archive_worker.isRunning():
+                self.statusBar().showMessage("正在导出或导入备份，请稍候...")
+                return
+            archive_path, _ = QFileDialog.getOpenFileName(self, "导入备份", "", "Tar (*.tar)")
+            if archive_path:
+                self.start_archive_worker(ArchiveWorker(self.tool, "import", archive_path, parent=self))
+        
+        def start_archive_worker(self, worker: ArchiveWorker):
+            """启动导出/导入线程并显示进度"""
+            self.statusBar().showMessage("正在导出备份..." if worker.operation == "export" else "正在导入备份...")
+            self.scan_progress.setRange(0, 0)
+            self.scan_progress.show()
+            self.cancel_archive_action.setEnabled(True)
+            self.archive_worker = worker
+            worker.progress.connect(self.on_archive_progress)
+            worker.archive_finished.connect(self.on_archive_finished)
+            worker.start()
+        
+        def cancel_archive(self):
+            """取消正在进行的导出或导入"""
+            if self.archive_worker is not None and self.archive_worker.isRunning():
+                self.archive_worker.cancel()
+                self.statusBar().showMessage("正在取消...")
+        
+        def on_archive_progress(self, done_bytes: int, total_bytes: int):
+            """更新导出/导入进度（按千分比显示，字节数可能超过进度条的范围）"""
+            self.scan_progress.setRange(0, 1000)
+            self.scan_progress.setValue(int(done_bytes * 1000 / total_bytes) if total_bytes else 1000)
+            label = "导出" if self.archive_worker.operation == "export" else "导入"
+            self.statusBar().showMessage(f"正在{label}备份... {done_bytes / 1024 / 1024:.1f}/"
+                                         f"{total_bytes / 1024 / 1024:.1f} MB")
+        
+        def on_archive_finished(self, operation: str, result: Dict):
+            """显示导出/导入结果"""
+            self.scan_progress.hide()
+            self.cancel_archive_action.setEnabled(False)
+            speed = f"{result['bytes'] / 1024 / 1024:.1f} MB，用时 {result['elapsed']:.1f} 秒" \
+                    f"（{result['throughput'] / 1024 / 1024:.1f} MB/s）"
+            if result['error']:
+                self.statusBar().showMessage(result['error'])
+                QMessageBox.warning(self, "失败", result['error'])
+                return
+            if operation == "export":
+                title = "导出备份"
+                if result['completed']:
+                    message = f"已导出 {result['scenarios']} 个场景的 {result['backups']} 个备份，写入 {speed}"
+                    if result['resumed']:
+                        message += f"\n继续上次中断的导出，沿用已写入的 {result['resumed']} 个文件"
+                else:
+                    message = f"导出已取消，写入 {speed}\n再次导出到同一文件可以继续"
+            else:
+                title = "导入备份"
+                message = (f"导入 {result['imported']} 个备份，{result['present']} 个已存在，"
+                           f"{len(result['conflicts'])} 个同名备份冲突，失败 {result['failed']} 个；写入 {speed}")
+                if result['cancelled']:
+                    message += "\n导入已取消，再次导入同一文件可以继续"
+                if result['remapped']:
+                    message += f"\n{len(result['remapped'])} 个场景位于不同的路线目录，已按场景UUID导入"
+                if result['unmatched']:
+                    message += f"\n{len(result['unmatched'])} 个场景在本机找不到: " + ", ".join(result['unmatched'])
+                if result['conflicts']:
+                    message += "\n\n冲突（未导入）:\n" + "\n".join(result['conflicts'])
+                scenario_path = self._current_scenario_path()
+                if scenario_path:
+                    self.update_backup_list(scenario_path, use_cache=False)
+            if result['errors']:
+                message += "\n\n" + "\n".join(f"{name}: {error}" for name, error in sorted(result['errors'].items()))
+            self.statusBar().showMessage(message.split("\n")[0])
+            if result['errors']:
+                QMessageBox.warning(self, title, message)
+            else:
+                QMessageBox.information(self, title, message)
+        
+        def set_mirror_path(self):
+            """选择备份镜像目录"""
+            path = QFileDialog.getExistingDirectory(self, "选择镜像目录（RailWorks目录之外，最好在另一个磁盘）",
+                                                    self.tool.config_manager.get_mirror_path())
+            if not path:
+                return
+            self.tool.config_manager.set_mirror_path(path)
+            _, error = self.tool._check_mirror_path(path)
+            if error:
+                QMessageBox.warning(self, "镜像目录", error)
+            else:
+                self.statusBar().showMessage(f"镜像目录: {path}")
+        
+        def _mirror_ready(self) -> bool:
+            """镜像操作前检查路径和是否有正在进行的镜像操作"""
+            if not self.tool.railworks_path:
+                QMessageBox.information(self, "信息", "请先设置RailWorks安装路径！")
+                return False
+            if not self.tool.config_manager.get_mirror_path():
+                self.set_mirror_path()
+                if not self.tool.config_manager.get_mirror_path():
+                    return False
+            if self.mirror_worker is not None and self.mirror_worker.isRunning():
+                self.statusBar().showMessage("正在同步或还原镜像，请稍候...")
+                return False
+            return True
+        
+        def sync_mirror(self):
+            """在后台把所有备份增量同步到镜像目录"""
+            if self._mirror_ready():
+                self.start_mirror_worker(MirrorWorker(self.tool, "sync", parent=self))
+        
+        def show_mirror_restore(self):
+            """选择镜像中的场景，把本机没有的备份复制回来"""
+            if not self._mirror_ready():
+                return
+            if not self.tool.routes_data:
+                QMessageBox.information(self, "信息", "请先完成扫描！")
+                return
+            scenarios = self.tool.list_mirror_scenarios()
+            if not scenarios:
+                QMessageBox.information(self, "从镜像还原", "镜像中没有备份，请先同步到镜像")
+                return
             
-            button_layout.addWidget(self.backup_button)
-            button_layout.addWidget(self.restore_button)
-            button_layout.addWidget(self.delete_button)
+            dialog = QDialog(self)
+            dialog.setWindowTitle("从镜像还原")
+            dialog.resize(640, 420)
+            layout = QVBoxLayout(dialog)
+            layout.addWidget(QLabel("选择要还原的场景，只复制本机没有的备份，已有的同名备份保持不变"))
+            scenario_list = QListWidget()
+            scenario_list.setSelectionMode(QListWidget.ExtendedSelection)
+            layout.addWidget(scenario_list)
+            current_path = self._current_scenario_path()
+            current_key = self.tool._scenario_key(current_path) if current_path else None
+            for scenario in scenarios:
+                item = QListWidgetItem(f"{scenario['route_name']} / {scenario['scenario_name']}    "
+                                       f"{scenario['backups']} 个备份    {scenario['bytes'] / 1024 / 1024:.1f} MB")
+                item.setData(Qt.UserRole, scenario['key'])
+                scenario_list.addItem(item)
+                if scenario['key'] == current_key:
+                    item.setSelected(True)
+                    scenario_list.scrollToItem(item)
             
-            backup_layout.addLayout(button_layout)
-            right_layout.addWidget(backup_group)
+            button_layout = QHBoxLayout()
+            select_all_button = QPushButton("全选")
+            restore_button = QPushButton("还原")
+            cancel_button = QPushButton("取消")
+            button_layout.addWidget(select_all_button)
+            button_layout.addStretch()
+            button_layout.addWidget(restore_button)
+            button_layout.addWidget(cancel_button)
+            layout.addLayout(button_layout)
+            select_all_button.clicked.connect(scenario_list.selectAll)
+            restore_button.clicked.connect(dialog.accept)
+            cancel_button.clicked.connect(dialog.reject)
             
-            splitter.addWidget(right_widget)
+            if dialog.exec_() != QDialog.Accepted:
+                return
+            keys = [item.data(Qt.UserRole) for item in scenario_list.selectedItems()]
+            if keys:
+                self.start_mirror_worker(MirrorWorker(self.tool, "restore", keys, self))
+        
+        def start_mirror_worker(self, worker: MirrorWorker):
+            """启动镜像线程并显示进度"""
+            self.statusBar().showMessage("正在同步到镜像..." if worker.operation == "sync" else "正在从镜像还原...")
+            self.scan_progress.setRange(0, 0)
+            self.scan_progress.show()
+            self.cancel_mirror_action.setEnabled(True)
+            self.mirror_worker = worker
+            worker.progress.connect(self.on_mirror_progress)
+            worker.mirror_finished.connect(self.on_mirror_finished)
+            worker.start()
+        
+        def cancel_mirror(self):
+            """取消正在进行的镜像同步或还原"""
+            if self.mirror_worker is not None and self.mirror_worker.isRunning():
+                self.mirror_worker.cancel()
+                self.statusBar().showMessage("正在取消...")
+        
+        def on_mirror_progress(self, done: int, total: int):
+            """更新镜像进度"""
+            self.scan_progress.setRange(0, total)
+            self.scan_progress.setValue(done)
+            label = "同步到镜像" if self.mirror_worker.operation == "sync" else "从镜像还原"
+            self.statusBar().showMessage(f"正在{label}... {done}/{total} 个文件")
+        
+        def on_mirror_finished(self, operation: str, result: Dict):
+            """显示镜像同步/还原结果"""
+            self.scan_progress.hide()
+            self.cancel_mirror_action.setEnabled(False)
+            if result['error']:
+                self.statusBar().showMessage(result['error'])
+                QMessageBox.warning(self, "失败", result['error'])
+                return
+            speed = f"{result['bytes'] / 1024 / 1024:.1f} MB，用时 {result['elapsed']:.1f} 秒" \
+                    f"（{result['throughput'] / 1024 / 1024:.1f} MB/s）"
+            if operation == "sync":
+                title = "同步到镜像"
+                message = (f"同步 {result['scenarios']} 个场景的 {result['files']} 个文件：复制 {result['copied']} 个，"
+                           f"未变化 {result['unchanged']} 个，失败 {result['failed']} 个；复制 {speed}")
+            else:
+                title = "从镜像还原"
+                message = (f"还原 {result['restored']} 个备份，{result['present']} 个本机已有，"
+                           f"失败 {result['failed']} 个文件；复制 {speed}")
+                if result['unmatched']:
+                    message += f"\n{len(result['unmatched'])} 个场景在本机找不到: " + ", ".join(result['unmatched'])
+                scenario_path = self._current_scenario_path()
+                if scenario_path:
+                    self.update_backup_list(scenario_path, use_cache=False)
+            if result['cancelled']:
+                message += f"\n已取消，{result['cancelled']} 个文件未复制"
+            if result['errors']:
+                message += "\n\n" + "\n".join(f"{name}: {error}" for name, error in sorted(result['errors'].items()))
+            self.statusBar().showMessage(message.split("\n")[0])
+            if result['errors']:
+                QMessageBox.warning(self, title, message)
+            else:
+                QMessageBox.information(self, title, message)
+        
+        def start_auto_backup(self):
+            """按当前设置（重新）启动自动备份线程"""
+            self.stop_auto_backup()
+            if not self.tool.railworks_path:
+                return
+            self.auto_backup_worker = AutoBackupWorker(AutoBackupService.from_config(self.tool), self)
+            self.auto_backup_worker.backup_created.connect(self.on_auto_backup_created)
+            self.auto_backup_worker.start()
+        
+        def stop_auto_backup(self):
+            """停止自动备份线程"""
+            if self.auto_backup_worker is not None:
+                self.auto_backup_worker.stop()
+                self.auto_backup_worker.wait()
+                self.auto_backup_worker = None
+        
+        def toggle_auto_backup(self, enabled: bool):
+            """启用或停用自动备份"""
+            settings = self.tool.config_manager.get_auto_backup()
+            settings["enabled"] = enabled
+            self.tool.config_manager.set_auto_backup(settings)
+            if enabled:
+                self.start_auto_backup()
+                count = len(self.auto_backup_worker.service.scenarios()) if self.auto_backup_worker else 0
+                self.statusBar().showMessage(f"自动备份已启用，监视 {count} 个场景")
+            else:
+                self.stop_auto_backup()
+                self.statusBar().showMessage("自动备份已停用")
+        
+        def on_auto_backup_created(self, result: Dict):
+            """自动备份完成：更新备份列表并在状态栏提示"""
+            scenario_path = result['scenario_path']
+            self.backup_cache.pop(os.path.normpath(os.path.join(scenario_path, self.tool.backup_dir_name)), None)
+            if not result['success']:
+                self.statusBar().showMessage(f"自动备份失败: {result['error']}")
+                return
+            current_path = self._current_scenario_path()
+            if current_path and os.path.normpath(current_path) == scenario_path:
+                self.update_backup_list(current_path, use_cache=False)
+            self.statusBar().showMessage(f"已自动备份 {os.path.basename(scenario_path)}: {result['backup_name']}")
+        
+        def show_auto_backup_settings(self):
+            """设置自动备份的等待时间、最短间隔、速率上限和监视的场景"""
+            settings = self.tool.config_manager.get_auto_backup()
             
-            # 设置分割器比例
-            splitter.setSizes([400, 600])
+            dialog = QDialog(self)
+            dialog.setWindowTitle("自动备份设置")
+            dialog.resize(560, 460)
+            layout = QVBoxLayout(dialog)
             
-            # 菜单栏
-            self.create_menu_bar()
+            form = QFormLayout()
+            settle_input = QSpinBox()
+            settle_input.setRange(1, 3600)
+            settle_input.setValue(max(1, settings["settle_seconds"]))
+            form.addRow("存档不再变化多少秒后备份", settle_input)
+            interval_input = QSpinBox()
+            interval_input.setRange(0, 24 * 60)
+            interval_input.setValue(settings["min_interval_seconds"] // 60)
+            form.addRow("同一场景最短备份间隔（分钟）", interval_input)
+            rate_input = QSpinBox()
+            rate_input.setRange(0, 10000)
+            rate_input.setValue(settings["max_bytes_per_second"] // 2 ** 20)
+            form.addRow("读写速率上限（MB/s，0为不限制）", rate_input)
+            layout.addLayout(form)
             
-            # 状态栏
-            self.statusBar().showMessage("就绪")
+            layout.addWidget(QLabel("监视的场景（列表为空时监视所有场景）:"))
+            scenario_list = QListWidget()
+            layout.addWidget(scenario_list)
+            names = self.tool._scenario_names()
             
-            # 初始扫描
-            self.scan_content()
-        
-        def create_menu_bar(self):
-            """创建菜单栏"""
-            menubar = self.menuBar()
+            def add_scenario_item(key: str):
+                route_name, scenario_name = names.get(key, ("", key))
+                item = QListWidgetItem(f"{route_name} / {scenario_name}" if route_name else key)
+                item.setData(Qt.UserRole, key)
+                scenario_list.addItem(item)
             
-            # 文件菜单
-            file_menu = menubar.addMenu('文件')
+            for key in settings["scenarios"]:
+                add_scenario_item(key)
             
-            # 设置路径动作
-            set_path_action = file_menu.addAction('设置RailWorks路径')
-            set_path_action.triggered.connect(self.set_railworks_path)
+            def add_current():
+                scenario_path = self._current_scenario_path()
+                if not scenario_path:
+                    QMessageBox.information(dialog, "自动备份设置", "请先在主窗口中选择一个场景")
+                    return
+                key = self.tool._scenario_key(scenario_path)
+                if key not in [scenario_list.item(i).data(Qt.UserRole) for i in range(scenario_list.count())]:
+                    add_scenario_item(key)
             
-            file_menu.addSeparator()
+            def remove_selected():
+                for item in scenario_list.selectedItems():
+                    scenario_list.takeItem(scenario_list.row(item))
             
-            # 退出动作
-            exit_action = file_menu.addAction('退出')
-            exit_action.triggered.connect(self.close)
+            list_buttons = QHBoxLayout()
+            add_button = QPushButton("添加当前场景")
+            remove_button = QPushButton("移除")
+            list_buttons.addWidget(add_button)
+            list_buttons.addWidget(remove_button)
+            list_buttons.addStretch()
+            layout.addLayout(list_buttons)
+            add_button.clicked.connect(add_current)
+            remove_button.clicked.connect(remove_selected)
             
-            # 工具菜单
-            tools_menu = menubar.addMenu('工具')
+            button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+            button_box.accepted.connect(dialog.accept)
+            button_box.rejected.connect(dialog.reject)
+            layout.addWidget(button_box)
             
-            # 重新扫描动作
-            rescan_action = tools_menu.addAction('重新扫描内容')
-            rescan_action.triggered.connect(self.scan_content)
+            if dialog.exec_() != QDialog.Accepted:
+                return
+            settings.update(settle_seconds=settle_input.value(),
+                            min_interval_seconds=interval_input.value() * 60,
+                            max_bytes_per_second=rate_input.value() * 2 ** 20,
+                            scenarios=[scenario_list.item(i).data(Qt.UserRole) for i in range(scenario_list.count())])
+            self.tool.config_manager.set_auto_backup(settings)
+            if settings["enabled"]:
+                self.start_auto_backup()
+            self.statusBar().showMessage("自动备份设置已保存")
+        
+        def collect_backup_garbage(self):
+            """重建去重存储的引用计数并删除无引用的对象"""
+            busy = [(self.backup_all_worker, "批量备份"), (self.retention_worker, "清理旧备份"),
+                    (self.archive_worker, "导出/导入备份"), (self.mirror_worker, "备份镜像"),
+                    (self.snapshot_worker, "创建/还原快照")]
+            for worker, label in busy:
+                if worker is not None and worker.isRunning():
+                    QMessageBox.information(self, "信息", f"{label}正在进行中，请完成后再清理去重存储")
+                    return
+            # 自动备份线程在清理期间暂停（等待正在进行的备份完成）
+            auto_backup = self.auto_backup_worker is not None
+            self.stop_auto_backup()
+            try:
+                result = self.tool.collect_backup_garbage()
+            finally:
+                if auto_backup:
+                    self.start_auto_backup()
+            if not result:
+                QMessageBox.warning(self, "警告", "请先设置RailWorks路径")
+                return
+            message = (f"引用 {result['references']} 个，保留对象 {result['objects']} 个，"
+                       f"删除无引用对象 {result['removed']} 个，释放 {result['freed_bytes'] / 1024 / 1024:.1f} MB")
+            if result['missing']:
+                message += f"\n警告: {len(result['missing'])} 个对象已丢失，对应的备份无法还原"
+                QMessageBox.warning(self, "清理去重存储", message)
+            else:
+                QMessageBox.information(self, "清理去重存储", message)
+            self.statusBar().showMessage("去重存储清理完成")
+        
+        def change_language(self, language: str):
+            """切换显示语言并原地更新路线树的名称"""
+            for lang, action in self.language_actions.items():
+                action.setChecked(lang == language)
+            if language == self.tool.config_manager.get_language():
+                return
+            
+            self.tool.set_language(language)
+            for route_uuid, route_item in self.route_items.items():
+                route_data = self.tool.routes_data.get(route_uuid)
+                if route_data is None:
+                    continue
+                route_item.setText(0, route_data['name'])
+                scenario_names = {scenario['uuid']: scenario['name'] for scenario in route_data['scenarios'] or []}
+                for i in range(route_item.childCount()):
+                    scenario_item = route_item.child(i)
+                    scenario_uuid = scenario_item.data(0, Qt.UserRole)['scenario_uuid']
+                    if scenario_uuid in scenario_names:
+                        scenario_item.setText(0, scenario_names[scenario_uuid])
+            
+            # 重新应用搜索过滤
+            self.filter_route_tree(self.search_input.text())
+            self.statusBar().showMessage(f"显示语言已切换为 {self.LANGUAGE_LABELS[language]}")
         
         def setup_connections(self):
             """设置信号连接"""
             self.route_tree.itemSelectionChanged.connect(self.on_item_selection_changed)
+            self.route_tree.itemExpanded.connect(self.on_item_expanded)
+            self.backup_list.itemSelectionChanged.connect(self.on_backup_selection_changed)
             self.backup_button.clicked.connect(self.create_backup)
             self.restore_button.clicked.connect(self.restore_backup)
             self.delete_button.clicked.connect(self.delete_backup)
+            self.cancel_scan_button.clicked.connect(self.cancel_scan)
             
             # 搜索框信号连接
             self.search_input.textChanged.connect(self.on_search_text_changed)
@@ -608,41 +6749,360 @@ if PYQT_VERSION in [5, 6]:
                     QMessageBox.warning(self, "警告", f"选择的目录中未找到RailWorks可执行文件！\n请确保目录包含以下任一文件：\n• Railworks.exe\n• Railworks64.exe\n• RailworksDX12_64.exe")
         
         def scan_content(self):
-            """扫描内容"""
+            """在后台线程中扫描内容，扫描到的路线分批加入路线树"""
             if not self.tool.railworks_path:
                 QMessageBox.information(self, "信息", "请先设置RailWorks安装路径！")
                 return
             
+            if self.scan_worker is not None and self.scan_worker.isRunning():
+                self.statusBar().showMessage("扫描正在进行中，请稍候...")
+                return
+            
             self.statusBar().showMessage("正在扫描内容...")
+            self.scan_progress.setRange(0, 0)  # 路线总数未知前显示忙碌状态
+            self.scan_progress.show()
+            self.cancel_scan_button.show()
+            self.cancel_scan_action.setEnabled(True)
             
-            if self.tool.scan_content():
-                self.populate_route_tree()
-                self.statusBar().showMessage(f"扫描完成，找到 {len(self.tool.routes_data)} 个路线")
+            # 扫描完成后按搜索条件重新过滤时再加载
+            self._route_load_queue = []
+            if self.route_load_worker is not None and self.route_load_worker.isRunning():
+                self.route_load_worker.cancel()
+            
+            self.scan_worker = ScanWorker(self.tool, self)
+            self.scan_worker.batch_ready.connect(self.on_scan_batch)
+            self.scan_worker.progress.connect(self.on_scan_progress)
+            self.scan_worker.scan_finished.connect(self.on_scan_finished)
+            self.scan_worker.start()
+        
+        def backup_all(self):
+            """在后台线程中备份所有含有存档的场景，跳过没有变化的存档"""
+            if not self.tool.railworks_path:
+                QMessageBox.information(self, "信息", "请先设置RailWorks安装路径！")
+                return
+            if self.backup_all_worker is not None and self.backup_all_worker.isRunning():
+                self.statusBar().showMessage("批量备份正在进行中，请稍候...")
+                return
+            if self.scan_worker is not None and self.scan_worker.isRunning():
+                QMessageBox.information(self, "信息", "请等待扫描完成后再批量备份")
+                return
+            
+            reply = QMessageBox.question(self, "备份全部存档",
+                                         "将备份所有含有存档的场景（存档自上次备份后没有变化的场景会跳过）。\n是否继续？",
+                                         QMessageBox.Yes | QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return
+            
+            self.statusBar().showMessage("正在备份全部存档...")
+            self.scan_progress.setRange(0, 0)
+            self.scan_progress.show()
+            self.cancel_backup_all_action.setEnabled(True)
+            
+            self.backup_all_worker = BackupAllWorker(self.tool, self)
+            self.backup_all_worker.progress.connect(self.on_backup_all_progress)
+            self.backup_all_worker.backup_finished.connect(self.on_backup_all_finished)
+            self.backup_all_worker.start()
+        
+        def cancel_backup_all(self):
+            """取消正在进行的批量备份"""
+            if self.backup_all_worker is not None and self.backup_all_worker.isRunning():
+                self.backup_all_worker.cancel()
+                self.statusBar().showMessage("正在取消批量备份...")
+        
+        def on_backup_all_progress(self, done: int, total: int, backed_up_bytes: int):
+            """更新批量备份进度"""
+            self.scan_progress.setRange(0, total)
+            self.scan_progress.setValue(done)
+            self.statusBar().showMessage(f"正在备份全部存档... {done}/{total} 个场景，"
+                                         f"已备份 {backed_up_bytes / 1024 / 1024:.1f} MB")
+        
+        def on_backup_all_finished(self, result: Dict):
+            """批量备份完成处理：显示汇总和每个失败场景的错误"""
+            self.scan_progress.hide()
+            self.cancel_backup_all_action.setEnabled(False)
+            
+            message = (f"共 {result['total']} 个场景有存档：备份 {result['backed_up']} 个，"
+                       f"跳过未变化 {result['skipped']} 个，失败 {result['failed']} 个")
+            if result['cancelled']:
+                message += f"，取消 {result['cancelled']} 个"
+            message += (f"\n备份名称: {result['backup_name']}\n"
+                        f"共 {result['bytes'] / 1024 / 1024:.1f} MB，用时 {result['elapsed']:.1f} 秒"
+                        f"（{result['mb_per_sec']:.1f} MB/s）")
+            box = QMessageBox(self)
+            box.setWindowTitle("备份全部存档")
+            box.setText(message)
+            if result['errors']:
+                box.setIcon(QMessageBox.Warning)
+                box.setDetailedText("\n".join(f"{path}: {error}" for path, error in sorted(result['errors'].items())))
+            else:
+                box.setIcon(QMessageBox.Information)
+            box.exec_()
+            self.statusBar().showMessage(f"批量备份完成，备份 {result['backed_up']} 个场景")
+            
+            scenario_path = self._current_scenario_path()
+            if scenario_path:
+                self.update_backup_list(scenario_path, use_cache=False)
+        
+        def cancel_scan(self):
+            """取消正在进行的扫描"""
+            if self.scan_worker is not None and self.scan_worker.isRunning():
+                self.scan_worker.cancel()
+                self.statusBar().showMessage("正在取消扫描...")
+        
+        def closeEvent(self, event):
+            """关闭窗口前停止后台扫描"""
+            if self.scan_worker is not None and self.scan_worker.isRunning():
+                self.scan_worker.cancel()
+                self.scan_worker.wait()
+            self._route_load_queue = []
+            if self.route_load_worker is not None and self.route_load_worker.isRunning():
+                self.route_load_worker.cancel()
+                self.route_load_worker.wait()
+            if self.backup_all_worker is not None and self.backup_all_worker.isRunning():
+                self.backup_all_worker.cancel()
+                self.backup_all_worker.wait()
+            if self.retention_worker is not None and self.retention_worker.isRunning():
+                self.retention_worker.cancel()
+                self.retention_worker.wait()
+            self.stop_auto_backup()
+            if self.verify_worker is not None and self.verify_worker.isRunning():
+                self.verify_worker.cancel()
+                self.verify_worker.wait()
+            if self.snapshot_worker is not None and self.snapshot_worker.isRunning():
+                self.snapshot_worker.cancel()
+                self.snapshot_worker.wait()
+            if self.archive_worker is not None and self.archive_worker.isRunning():
+                self.archive_worker.cancel()
+                self.archive_worker.wait()
+            if self.mirror_worker is not None and self.mirror_worker.isRunning():
+                self.mirror_worker.cancel()
+                self.mirror_worker.wait()
+            super().closeEvent(event)
+        
+        @profiled("gui.scan_batch")
+        def on_scan_batch(self, batch: Dict):
+            """将一批扫描结果合并到路线树"""
+            for route_uuid, route_data in batch.items():
+                self.add_or_update_route_item(route_uuid, route_data)
+        
+        def on_scan_progress(self, done: int, total: int):
+            """更新扫描进度"""
+            self.scan_progress.setRange(0, total)
+            self.scan_progress.setValue(done)
+            self.statusBar().showMessage(f"正在扫描内容... {done}/{total} 个路线")
+        
+        def on_scan_finished(self, success: bool):
+            """扫描完成处理"""
+            self.scan_progress.hide()
+            self.cancel_scan_button.hide()
+            self.cancel_scan_action.setEnabled(False)
+            
+            if success:
+                self.remove_stale_route_items()
+                stats = self.tool.last_scan_stats
+                self.statusBar().showMessage(
+                    f"扫描完成，找到 {len(self.tool.routes_data)} 个路线"
+                    f"（解析 {stats.get('parsed_files', 0)} 个文件，用时 {stats.get('elapsed', 0):.1f} 秒）")
+            elif self.scan_worker.cancel_event.is_set():
+                self.statusBar().showMessage("扫描已取消")
             else:
                 QMessageBox.warning(self, "警告", "扫描内容失败！请检查路径设置。")
                 self.statusBar().showMessage("扫描失败")
+            
+            self.update_watched_paths()
+            # 扫描可能发现新场景或新的RailWorks路径
+            if self.tool.config_manager.get_auto_backup()["enabled"]:
+                if self.auto_backup_worker is None:
+                    self.start_auto_backup()
+                else:
+                    self.auto_backup_worker.service.set_scenarios(self.tool.auto_backup_paths())
+            
+            # 扫描期间新加入的项目按当前搜索条件重新过滤
+            self._route_load_failed.clear()
+            if self.search_input.text().strip():
+                self.filter_route_tree(self.search_input.text())
+        
+        def update_watched_paths(self):
+            """根据当前内容更新监视的路径：Routes目录、已加载路线的Scenarios目录和已缓存的saves目录"""
+            if self.watcher is None:
+                return
+            
+            paths = set()
+            routes_path = self.tool._get_routes_path()
+            if routes_path:
+                paths.add(routes_path)
+            for route_data in self.tool.routes_data.values():
+                if route_data['scenarios'] is not None:
+                    paths.add(os.path.join(route_data['path'], "Scenarios"))
+            for saves_path in self.backup_cache:
+                # saves目录可能尚不存在，同时监视场景目录以发现它被创建
+                paths.add(saves_path)
+                paths.add(os.path.dirname(saves_path))
+            self.watcher.set_paths(paths)
+        
+        def on_content_changed(self, paths):
+            """处理合并后的文件变化，增量更新路线树和备份列表"""
+            if self.auto_backup_worker is not None:
+                self.auto_backup_worker.service.notify(paths)
+            if self.scan_worker is not None and self.scan_worker.isRunning():
+                return  # 正在进行的扫描会覆盖这些变化
+            
+            routes_path = self.tool._get_routes_path()
+            routes_changed = False
+            changed_routes = set()
+            current_path = self._current_scenario_path()
+            refresh_current = False
+            
+            for path in paths:
+                if routes_path and path == os.path.normpath(routes_path):
+                    routes_changed = True
+                elif os.path.basename(path) == "Scenarios" and routes_path and \
+                        os.path.dirname(os.path.dirname(path)) == os.path.normpath(routes_path):
+                    changed_routes.add(os.path.basename(os.path.dirname(path)))
+                else:
+                    # saves目录或场景目录的变化：使对应的备份列表缓存失效
+                    if os.path.basename(path) == self.tool.backup_dir_name:
+                        saves_path = path
+                    else:
+                        saves_path = os.path.join(path, self.tool.backup_dir_name)
+                    self.backup_cache.pop(saves_path, None)
+                    if current_path and saves_path == os.path.normpath(
+                            os.path.join(current_path, self.tool.backup_dir_name)):
+                        refresh_current = True
+            
+            if routes_changed:
+                added, removed = self.tool.refresh_routes()
+                for route_uuid in added:
+                    self.add_or_update_route_item(route_uuid, self.tool.routes_data[route_uuid])
+                if removed:
+                    self.remove_stale_route_items()
+            for route_uuid in changed_routes:
+                if self.tool.refresh_route(route_uuid):
+                    self.add_or_update_route_item(route_uuid, self.tool.routes_data[route_uuid])
+                else:
+                    self.remove_stale_route_items()
+            if refresh_current:
+                self.update_backup_list(current_path)
+            
+            self.update_watched_paths()
+            if routes_changed or changed_routes or refresh_current:
+                self.statusBar().showMessage("检测到文件变化，已更新")
+        
+        def _current_scenario_path(self) -> Optional[str]:
+            """获取当前选中场景的路径"""
+            current_item = self.route_tree.currentItem()
+            if current_item:
+                data = current_item.data(0, Qt.UserRole)
+                if data and data['type'] == 'scenario':
+                    return data['scenario_path']
+            return None
+        
+        def _add_scenario_items(self, route_item, route_uuid: str, route_data: Dict, selected_path: Optional[str] = None):
+            """为路线节点添加场景子节点，返回与selected_path对应的节点"""
+            if route_data['scenarios'] is None:
+                # 延迟加载：先显示展开箭头，展开时再加载场景
+                route_item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+                return None
+            route_item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicatorWhenChildless)
+            
+            selected_item = None
+            for scenario in route_data['scenarios']:
+                scenario_item = QTreeWidgetItem([scenario['name']])
+                scenario_item.setData(0, Qt.UserRole, {
+                    'type': 'scenario', 
+                    'route_uuid': route_uuid,
+                    'scenario_uuid': scenario['uuid'],
+                    'scenario_path': scenario['path']
+                })
+                route_item.addChild(scenario_item)
+                if scenario['path'] == selected_path:
+                    selected_item = scenario_item
+            return selected_item
+        
+        def add_or_update_route_item(self, route_uuid: str, route_data: Dict):
+            """添加新路线节点，或更新已有路线节点的名称和场景"""
+            route_item = self.route_items.get(route_uuid)
+            if route_item is None:
+                route_item = QTreeWidgetItem([route_data['name']])
+                route_item.setData(0, Qt.UserRole, {'type': 'route', 'uuid': route_uuid})
+                self._add_scenario_items(route_item, route_uuid, route_data)
+                self.route_items[route_uuid] = route_item
+                self.route_tree.addTopLevelItem(route_item)
+                return
+            
+            route_item.setText(0, route_data['name'])
+            if route_data['scenarios'] is None:
+                if route_item.childCount():
+                    return  # 扫描期间已加载的场景保留，扫描结束时合并到新的结果中
+                route_item.takeChildren()
+                self._add_scenario_items(route_item, route_uuid, route_data)
+                return
+            current = [(route_item.child(i).data(0, Qt.UserRole)['scenario_uuid'], route_item.child(i).text(0))
+                       for i in range(route_item.childCount())]
+            if current == [(scenario['uuid'], scenario['name']) for scenario in route_data['scenarios']]:
+                return
+            
+            # 场景有变化时重建子节点，并恢复原来的选择
+            selected_path = self._current_scenario_path()
+            route_item.takeChildren()
+            selected_item = self._add_scenario_items(route_item, route_uuid, route_data, selected_path)
+            if selected_item is not None:
+                self.route_tree.setCurrentItem(selected_item)
+        
+        def on_item_expanded(self, item):
+            """展开路线时加载尚未加载的场景"""
+            data = item.data(0, Qt.UserRole)
+            if data and data['type'] == 'route':
+                self.load_route_item(data['uuid'])
+        
+        def load_route_item(self, route_uuid: str):
+            """加载延迟扫描模式下路线的场景并填充路线节点"""
+            route_data = self.tool.routes_data.get(route_uuid)
+            route_item = self.route_items.get(route_uuid)
+            if route_data is None or route_item is None or route_item.childCount():
+                return
+            
+            if route_data['scenarios'] is None:
+                self.statusBar().showMessage(f"正在加载路线 '{route_data['name']}' 的场景...")
+                if not self.tool.load_route_scenarios(route_uuid):
+                    self.statusBar().showMessage("加载场景失败")
+                    return
+                self.statusBar().showMessage(f"路线 '{route_data['name']}' 共 {len(route_data['scenarios'])} 个场景")
+                self.update_watched_paths()
+            self._add_scenario_items(route_item, route_uuid, route_data)
+        
+        def remove_stale_route_items(self):
+            """移除扫描结果中已不存在的路线节点"""
+            for route_uuid in list(self.route_items):
+                if route_uuid not in self.tool.routes_data:
+                    route_item = self.route_items.pop(route_uuid)
+                    index = self.route_tree.indexOfTopLevelItem(route_item)
+                    if index >= 0:
+                        self.route_tree.takeTopLevelItem(index)
         
+        @profiled("gui.populate_route_tree")
         def populate_route_tree(self):
             """填充路线树"""
+            # 记住当前选中的场景，重建后恢复选择
+            selected_path = self._current_scenario_path()
+            
             self.route_tree.clear()
+            self.route_items = {}
             
+            selected_item = None
             for route_uuid, route_data in self.tool.routes_data.items():
                 route_item = QTreeWidgetItem([route_data['name']])
                 route_item.setData(0, Qt.UserRole, {'type': 'route', 'uuid': route_uuid})
                 
                 # 添加场景
-                for scenario in route_data['scenarios']:
-                    scenario_item = QTreeWidgetItem([scenario['name']])
-                    scenario_item.setData(0, Qt.UserRole, {
-                        'type': 'scenario', 
-                        'route_uuid': route_uuid,
-                        'scenario_uuid': scenario['uuid'],
-                        'scenario_path': scenario['path']
-                    })
-                    route_item.addChild(scenario_item)
+                selected_item = self._add_scenario_items(route_item, route_uuid, route_data, selected_path) or selected_item
                 
+                self.route_items[route_uuid] = route_item
                 self.route_tree.addTopLevelItem(route_item)
             
+            if selected_item is not None:
+                self.route_tree.setCurrentItem(selected_item)
+            
             # 不自动展开，让用户手动点击展开路线
         
         def on_item_selection_changed(self):
@@ -670,20 +7130,40 @@ if PYQT_VERSION in [5, 6]:
             self.restore_button.setEnabled(False)
             self.delete_button.setEnabled(False)
         
-        def update_backup_list(self, scenario_path: str):
-            """更新备份列表"""
+        @profiled("gui.update_backup_list")
+        def update_backup_list(self, scenario_path: str, use_cache: bool = True):
+            """更新备份列表
+            Args:
+                use_cache: 为True时使用缓存的备份列表（缓存由文件监视在目录变化时清除）
+            """
             self.backup_list.clear()
             
-            backups = self.tool.list_backups(scenario_path)
+            saves_path = os.path.normpath(os.path.join(scenario_path, self.tool.backup_dir_name))
+            backups = self.backup_cache.get(saves_path) if use_cache else None
+            if backups is None:
+                backups = self.tool.list_backup_details(scenario_path)
+                if self.watcher is not None:
+                    self.backup_cache[saves_path] = backups
+                    while len(self.backup_cache) > self.BACKUP_CACHE_SIZE:
+                        self.backup_cache.popitem(last=False)
+                    self.update_watched_paths()
+            else:
+                self.backup_cache.move_to_end(saves_path)
+            
             for backup in backups:
-                item = QListWidgetItem(backup)
+                # 显示存档时间、大小和备份方式，列表已按存档时间排序
+                saved_at = datetime.fromtimestamp(backup['mtime_ns'] / 1e9).strftime("%Y-%m-%d %H:%M:%S")
+                kind = self.BACKUP_KIND_LABELS.get(backup['kind'], backup['kind'])
+                item = QListWidgetItem(f"{backup['name']}    {saved_at}    {backup['size'] / 1024:.1f} KB    {kind}")
+                tooltip = f"备份占用 {backup['stored_bytes'] / 1024:.1f} KB"
+                if backup['sha256']:
+                    tooltip += f"\nSHA-256: {backup['sha256']}"
+                tooltip += "\n包含MD5校验文件" if backup['md5'] else "\n没有MD5校验文件"
+                item.setToolTip(tooltip)
                 # 存储完整文件名（添加.bin后缀）
-                full_filename = backup if backup.endswith(".bin") else backup + ".bin"
+                full_filename = backup['name'] + ".bin"
                 item.setData(Qt.UserRole, full_filename)
                 self.backup_list.addItem(item)
-            
-            # 连接选择变化信号
-            self.backup_list.itemSelectionChanged.connect(self.on_backup_selection_changed)
         
         def on_backup_selection_changed(self):
             """备份选择变化处理"""
@@ -720,9 +7200,12 @@ if PYQT_VERSION in [5, 6]:
             if len(search_text) < 2:
                 return
             
-            # 只处理前100个项目以避免卡顿
+            # 延迟加载模式下，可能匹配的路线在后台加载，加载后重新过滤
+            self.load_search_routes(search_text)
+            
+            # 只处理前面的项目以避免卡顿
             root = self.route_tree.invisibleRootItem()
-            route_count = min(root.childCount(), 50)  # 限制最多处理50个路线
+            route_count = min(root.childCount(), self.SEARCH_ROUTE_LIMIT)
             
             for i in range(route_count):
                 route_item = root.child(i)
@@ -734,7 +7217,7 @@ if PYQT_VERSION in [5, 6]:
                     # 不自动展开，让用户手动点击
                     
                     # 检查并显示匹配的场景
-                    scenario_count = min(route_item.childCount(), 20)  # 限制每个路线最多20个场景
+                    scenario_count = min(route_item.childCount(), self.SEARCH_SCENARIO_LIMIT)
                     for j in range(scenario_count):
                         scenario_item = route_item.child(j)
                         scenario_name = scenario_item.text(0).lower()
@@ -745,7 +7228,7 @@ if PYQT_VERSION in [5, 6]:
                 else:
                     # 检查路线下的场景是否匹配
                     has_matching_scenario = False
-                    scenario_count = min(route_item.childCount(), 20)  # 限制每个路线最多20个场景
+                    scenario_count = min(route_item.childCount(), self.SEARCH_SCENARIO_LIMIT)
                     for j in range(scenario_count):
                         scenario_item = route_item.child(j)
                         scenario_name = scenario_item.text(0).lower()
@@ -758,6 +7241,70 @@ if PYQT_VERSION in [5, 6]:
                     # 如果有匹配的场景，显示路线但隐藏不匹配的场景
                     route_item.setHidden(not has_matching_scenario)
         
+        def refilter_route_tree(self):
+            """后台加载的路线到达后按当前搜索条件重新过滤"""
+            if self.search_input.text().strip():
+                self.filter_route_tree(self.search_input.text())
+        
+        def load_search_routes(self, search_text: str):
+            """在后台加载搜索范围内名称匹配、索引中有匹配场景或索引中没有场景名称的未加载路线"""
+            candidates = set(self.tool.find_unloaded_routes_matching(search_text))
+            candidates.update(self.tool.unindexed_routes())
+            root = self.route_tree.invisibleRootItem()
+            pending = []
+            for i in range(min(root.childCount(), self.SEARCH_ROUTE_LIMIT)):
+                route_uuid = root.child(i).data(0, Qt.UserRole)['uuid']
+                route_data = self.tool.routes_data.get(route_uuid)
+                if route_data is None or route_data['scenarios'] is not None or \
+                        route_uuid in self._route_load_failed:
+                    continue
+                if route_uuid in candidates or search_text in route_data['name'].lower():
+                    pending.append(route_uuid)
+            self._route_load_queue = pending
+            if not pending:
+                return
+            
+            worker = self.route_load_worker
+            if worker is not None and worker.isRunning():
+                if not set(pending) <= set(worker.route_uuids):
+                    worker.cancel()  # 当前路线加载完成后停止，结束时加载新的队列
+                return
+            if self.scan_worker is not None and self.scan_worker.isRunning():
+                return  # 扫描完成后重新过滤时再加载
+            self.start_route_load_worker()
+        
+        def start_route_load_worker(self):
+            """启动后台线程加载等待队列中的路线"""
+            route_uuids, self._route_load_queue = self._route_load_queue, []
+            self.statusBar().showMessage(f"正在后台加载 {len(route_uuids)} 个路线的场景以便搜索...")
+            self.route_load_worker = RouteLoadWorker(self.tool, route_uuids, self)
+            self.route_load_worker.route_loaded.connect(self.on_search_route_loaded)
+            self.route_load_worker.load_finished.connect(self.on_route_load_finished)
+            self.route_load_worker.start()
+        
+        def on_search_route_loaded(self, route_uuid: str, success: bool):
+            """后台加载的路线到达：填充路线节点并稍后重新过滤"""
+            if not success:
+                self._route_load_failed.add(route_uuid)
+                return
+            route_data = self.tool.routes_data.get(route_uuid)
+            route_item = self.route_items.get(route_uuid)
+            if route_data is not None and route_item is not None and not route_item.childCount():
+                self._add_scenario_items(route_item, route_uuid, route_data)
+            self._refilter_timer.start()
+        
+        def on_route_load_finished(self, loaded: int, total: int):
+            """后台加载结束，加载搜索条件变化后新的队列"""
+            self.update_watched_paths()
+            queue = [route_uuid for route_uuid in self._route_load_queue
+                     if route_uuid not in self._route_load_failed and route_uuid in self.tool.routes_data and
+                     self.tool.routes_data[route_uuid]['scenarios'] is None]
+            self._route_load_queue = queue
+            if queue and not (self.scan_worker is not None and self.scan_worker.isRunning()):
+                self.start_route_load_worker()
+            else:
+                self.statusBar().showMessage(f"已在后台加载 {loaded}/{total} 个路线的场景")
+        
         def show_all_items(self):
             """显示所有项目（保持当前展开状态）"""
             root = self.route_tree.invisibleRootItem()
@@ -838,9 +7385,26 @@ if PYQT_VERSION in [5, 6]:
             if dialog.exec_() == QDialog.Accepted:
                 custom_filename = input_field.text().strip()
                 if custom_filename:
-                    success, error_message = self.tool.create_backup(scenario_path, custom_filename)
+                    # 存档没有变化时提示，可以不创建或创建为已有备份的硬链接
+                    link_to = None
+                    identical = self.tool.find_identical_backup(scenario_path)
+                    if identical is not None:
+                        box = QMessageBox(self)
+                        box.setWindowTitle("存档没有变化")
+                        box.setIcon(QMessageBox.Information)
+                        box.setText(f"当前存档自备份 '{identical}' 以来没有变化。")
+                        skip_button = box.addButton("不创建", QMessageBox.RejectRole)
+                        link_button = box.addButton("创建为硬链接", QMessageBox.AcceptRole)
+                        box.addButton("仍然创建", QMessageBox.AcceptRole)
+                        box.exec_()
+                        if box.clickedButton() == skip_button:
+                            self.statusBar().showMessage(f"存档自备份 '{identical}' 以来没有变化，未创建备份")
+                            return
+                        if box.clickedButton() == link_button:
+                            link_to = identical
+                    success, error_message = self.tool.create_backup(scenario_path, custom_filename, link_to)
                     if success:
-                        self.update_backup_list(scenario_path)
+                        self.update_backup_list(scenario_path, use_cache=False)
                         self.statusBar().showMessage(f"备份 '{custom_filename}' 创建成功")
                     else:
                         QMessageBox.warning(self, "失败", error_message)
@@ -866,6 +7430,13 @@ if PYQT_VERSION in [5, 6]:
             scenario_path = scenario_data['scenario_path']
             backup_filename = backup_item.data(Qt.UserRole)
             
+            # 当前存档与备份相同时不需要还原
+            backup_id = self.tool._backup_id(backup_filename)
+            if self.tool.find_identical_backup(scenario_path, backup_id, confirm=True) is not None:
+                QMessageBox.information(self, "无需还原", f"当前存档与备份 '{backup_id}' 相同，无需还原。")
+                self.statusBar().showMessage(f"当前存档与备份 '{backup_id}' 相同，未还原")
+                return
+            
             # 确认对话框
             reply = QMessageBox.question(
                 self, 
@@ -895,7 +7466,7 @@ if PYQT_VERSION in [5, 6]:
             
             scenario_path = scenario_data['scenario_path']
             backup_filename = backup_item.data(Qt.UserRole)
-            backup_display = backup_item.text()
+            backup_display = backup_filename[:-len(".bin")]
             
             # 确认对话框
             reply = QMessageBox.question(
@@ -908,7 +7479,7 @@ if PYQT_VERSION in [5, 6]:
             
             if reply == QMessageBox.Yes:
                 if self.tool.delete_backup(scenario_path, backup_filename):
-                    self.update_backup_list(scenario_path)
+                    self.update_backup_list(scenario_path, use_cache=False)
                     self.statusBar().showMessage(f"备份 '{backup_display}' 删除成功")
                 else:
                     QMessageBox.warning(self, "失败", "备份删除失败！")
@@ -954,6 +7525,8 @@ elif PYGTK_AVAILABLE:
 
 def main():
     """主函数"""
+    # 打包后的可执行文件使用进程池扫描时需要
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     
     # 设置应用程序信息